@@ -0,0 +1,72 @@
+"""Operator API routes."""
+
+from fastapi import APIRouter, Depends, Query
+
+from apps.api.schemas import (
+    ErrorResponse,
+    ProfileFrame,
+    ProfileResponse,
+    ProfileTask,
+)
+from apps.core.config import settings
+from apps.core.security import require_admin
+from apps.services.profiling import profile_worker
+
+router = APIRouter(
+    prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)]
+)
+
+
+@router.post(
+    "/profile",
+    response_model=ProfileResponse,
+    responses={
+        200: {"description": "Profile of the worker that took the request"},
+        403: {"model": ErrorResponse, "description": "Not an admin"},
+        404: {"model": ErrorResponse, "description": "Profiling is disabled"},
+        409: {"model": ErrorResponse, "description": "A profile is running"},
+    },
+)
+async def profile(
+    seconds: float = Query(
+        5.0,
+        gt=0,
+        le=settings.PROFILER_MAX_SECONDS,
+        description="How long to sample",
+    ),
+) -> ProfileResponse:
+    """
+    Profile the worker serving this request.
+
+    Samples the stacks of all of the worker's threads for ``seconds``, then
+    lists the asyncio tasks that are still waiting and what they await.
+    ``stacks`` is in the collapsed format, so ``jq -r '.stacks[]'`` feeds
+    flamegraph tools directly. Runs one at a time per worker.
+
+    Returns:
+        ProfileResponse: Collapsed stacks, top frames and waiting tasks.
+
+    Raises:
+        NotFoundError: If ``PROFILER_ENABLED`` is off.
+        ProfilerBusyError: If this worker is already being profiled.
+    """
+    result = await profile_worker(seconds)
+    profile = result.profile
+    return ProfileResponse(
+        seconds=profile.seconds,
+        samples=profile.rounds,
+        overhead=profile.overhead,
+        threads=sorted(profile.threads),
+        truncated=profile.truncated,
+        stacks=profile.collapsed(),
+        top_frames=[
+            ProfileFrame(frame=frame, self_samples=own, total_samples=total)
+            for frame, own, total in profile.top_frames(settings.PROFILER_TOP_FRAMES)
+        ],
+        tasks=[
+            ProfileTask(
+                name=task.name, coroutine=task.coroutine, awaiting=task.awaiting
+            )
+            for task in result.tasks
+        ],
+    )
@@ -0,0 +1,106 @@
+"""Change feed API routes."""
+
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from apps.api.schemas import ChangeEntry, ChangesResponse
+from apps.core.config import settings
+from apps.core.timing import TimedRoute
+from apps.db.session import get_db
+from apps.services.changes import Change, change_feed, changes_since
+
+router = APIRouter(prefix="/changes", tags=["changes"], route_class=TimedRoute)
+
+
+def _entry(change: Change) -> ChangeEntry:
+    return ChangeEntry(
+        seq=change.seq,
+        entity=change.entity,
+        entity_id=change.entity_id,
+        snippet_id=change.snippet_id,
+        op=change.op,
+        created_at=change.created_at,
+    )
+
+
+@router.get(
+    "",
+    response_model=ChangesResponse,
+    responses={200: {"description": "Changes after the cursor"}},
+)
+def read_changes(
+    since: int = Query(0, ge=0, description="Last sequence number already applied"),
+    limit: int = Query(
+        settings.CHANGES_BATCH_SIZE,
+        ge=1,
+        le=5000,
+        description="Maximum number of changes",
+    ),
+    db: Session = Depends(get_db),
+) -> ChangesResponse:
+    """
+    List the changes made after a sequence number.
+
+    Clients sync by repeating the request with ``since`` set to
+    ``nextSince`` while ``hasMore`` is true, then apply the deltas instead
+    of refetching lists.
+
+    Returns:
+        ChangesResponse: Changes, oldest first, and the next cursor.
+    """
+    changes = changes_since(db, since, limit + 1)
+    page = changes[:limit]
+    return ChangesResponse(
+        data=[_entry(change) for change in page],
+        next_since=page[-1].seq if page else since,
+        has_more=len(changes) > limit,
+    )
+
+
+async def _events(since: int | None) -> AsyncIterator[str]:
+    yield f"retry: {settings.CHANGES_POLL_INTERVAL * 1000:.0f}\n\n"
+    async for batch in change_feed.stream(
+        since, idle=settings.CHANGES_HEARTBEAT_SECONDS
+    ):
+        if not batch:
+            yield ": keep-alive\n\n"
+            continue
+        yield "".join(
+            f"id: {change.seq}\nevent: change\n"
+            f"data: {_entry(change).model_dump_json(by_alias=True)}\n\n"
+            for change in batch
+        )
+
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={200: {"description": "Server-Sent Events stream of changes"}},
+)
+async def stream_changes(
+    since: int | None = Query(
+        None, ge=0, description="Last sequence number already applied"
+    ),
+    last_event_id: str | None = Header(None, description="Set by EventSource"),
+) -> StreamingResponse:
+    """
+    Stream changes as Server-Sent Events.
+
+    Each event is a ``change`` with the sequence number as its id, so a
+    reconnecting ``EventSource`` resumes where it stopped. Without a cursor
+    the stream starts with the next change. All streams share one tailer of
+    the changelog.
+
+    Returns:
+        StreamingResponse: A ``text/event-stream`` that stays open.
+    """
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        _events(since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,60 @@
+"""Collaborative editing API routes."""
+
+import json
+from collections.abc import Mapping
+from typing import Any
+from uuid import UUID
+
+from fastapi import APIRouter, WebSocket
+
+from apps.services.collab import CLOSE_INVALID, CollabError, collab_sessions
+
+router = APIRouter(prefix="/code-snippets", tags=["collaboration"])
+
+
+def _decode(message: Mapping[str, Any]) -> Any:
+    try:
+        return json.loads(message["text"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise CollabError(CLOSE_INVALID, "Messages must be JSON text") from exc
+
+
+@router.websocket("/{snippet_id}/collab")
+async def collaborate(websocket: WebSocket, snippet_id: UUID) -> None:
+    """
+    Edit a snippet together with other clients.
+
+    Every frame from the server is a JSON array of messages. The first is
+    ``{"type": "init", "clientId", "revision", "content"}``. Clients send
+    ``{"type": "op", "revision", "op"}`` one at a time, where ``op`` is an
+    operation in the format of ``packages.common.ot`` against the text at
+    ``revision``, and wait for ``{"type": "ack", "revision"}`` before
+    sending the next. Edits of other clients arrive as ``{"type": "op",
+    "revision", "op", "clientId"}`` and are transformed against the
+    client's unacknowledged operations as usual.
+
+    The server closes the connection with a 44xx code named after the HTTP
+    status it resembles, e.g. 4404 for an unknown snippet, 4409 if another
+    worker holds the session and 4410, 4412 or 4429 when the client has to
+    rejoin; 4412 means the snippet was changed through the REST API and the
+    session's unsaved edits were dropped.
+    """
+    await websocket.accept()
+    try:
+        client = await collab_sessions.join(
+            snippet_id, websocket.send_json, websocket.close
+        )
+    except CollabError as exc:
+        await websocket.close(exc.code, exc.reason)
+        return
+    error = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            collab_sessions.submit(client, _decode(message))
+    except CollabError as exc:
+        error = exc
+    finally:
+        await collab_sessions.leave(client, error)
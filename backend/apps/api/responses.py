@@ -0,0 +1,57 @@
+"""Streaming responses for raw content downloads."""
+
+from fastapi import Request
+from starlette.responses import Response, StreamingResponse
+
+from apps.services.raw_content import RawContent
+from packages.common.ranges import (
+    RangeNotSatisfiableError,
+    etag_matches,
+    if_range_matches,
+    parse_range,
+)
+
+# For URLs whose body can never change, such as a version's.
+IMMUTABLE = "public, max-age=31536000, immutable"
+# For URLs whose body can change: cache, but ask every time.
+REVALIDATE = "no-cache"
+
+
+def raw_content_response(
+    request: Request, content: RawContent, *, cache_control: str
+) -> Response:
+    """Answer a request for raw content as ``text/plain``.
+
+    Honours ``If-None-Match`` with a 304, and a single byte ``Range``
+    (subject to ``If-Range``) with a 206, or a 416 past the end. The body
+    is streamed in chunks from the thread pool.
+    """
+    etag = f'"{content.etag}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+        "X-Content-Type-Options": "nosniff",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    byte_range = None
+    if if_range_matches(request.headers.get("if-range"), etag):
+        try:
+            byte_range = parse_range(request.headers.get("range"), content.size)
+        except RangeNotSatisfiableError:
+            headers["Content-Range"] = f"bytes */{content.size}"
+            return Response(status_code=416, headers=headers)
+    status_code = 200
+    start, end = 0, content.size
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{content.size}"
+    headers["Content-Length"] = str(end - start)
+    return StreamingResponse(
+        content.chunks(start, end),
+        status_code=status_code,
+        headers=headers,
+        media_type="text/plain; charset=utf-8",
+    )
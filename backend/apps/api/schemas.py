@@ -1,8 +1,11 @@
 """API schemas module."""
 
+from datetime import datetime
 from typing import Literal
+from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from pydantic.alias_generators import to_camel
 
 
 class HealthCheck(BaseModel):
@@ -53,3 +56,397 @@ class RootResponse(BaseModel):
         description="Current environment",
         examples=["development", "production", "staging"],
     )
+
+
+class DiffLineResponse(BaseModel):
+    """A single line of a diff hunk."""
+
+    op: Literal[" ", "-", "+"] = Field(
+        ...,
+        description="Context (space), removal (-) or addition (+)",
+        examples=["+"],
+    )
+    text: str = Field(
+        ...,
+        description="Line text including its line terminator",
+        examples=["print('Hello, Python!')\n"],
+    )
+
+
+class DiffHunkResponse(BaseModel):
+    """Diff hunk response schema."""
+
+    base_start: int = Field(..., description="First base line (1-based)")
+    base_lines: int = Field(..., description="Number of base lines in the hunk")
+    target_start: int = Field(..., description="First target line (1-based)")
+    target_lines: int = Field(..., description="Number of target lines in the hunk")
+    lines: list[DiffLineResponse] = Field(..., description="Hunk lines")
+
+
+class VersionDiffResponse(BaseModel):
+    """Version diff response schema."""
+
+    base_id: UUID = Field(..., description="Version treated as the original")
+    target_id: UUID = Field(..., description="Version treated as the new text")
+    format: Literal["unified", "hunks"] = Field(
+        ...,
+        description="Requested output format",
+        examples=["hunks"],
+    )
+    exact: bool = Field(
+        ...,
+        description="False when the diff was too large and a coarse diff was used",
+    )
+    truncated: bool = Field(
+        ...,
+        description="True when output was cut at the configured size cap",
+    )
+    added: int = Field(..., description="Number of added lines")
+    removed: int = Field(..., description="Number of removed lines")
+    unified: str | None = Field(
+        None,
+        description="Unified diff text (format=unified)",
+    )
+    hunks: list[DiffHunkResponse] | None = Field(
+        None,
+        description="Structured hunks (format=hunks)",
+    )
+
+
+class CamelModel(BaseModel):
+    """Base schema serialized with camelCase keys, as documented for the frontend."""
+
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+
+
+class VersionSummary(CamelModel):
+    """Version summary schema."""
+
+    number: int = Field(..., description="Version number", examples=[1])
+    created_at: datetime = Field(..., description="Version creation time")
+
+
+class HighlightResponse(CamelModel):
+    """Pre-tokenized syntax highlighting schema."""
+
+    tokenizer: str = Field(
+        ...,
+        description="Tokenizer that produced the spans",
+        examples=["pygments-2.19.2"],
+    )
+    legend: list[str] = Field(
+        ..., description="CSS class per span kind", examples=[["k", "nf", "s2"]]
+    )
+    lines: list[list[int]] = Field(
+        ...,
+        description=(
+            "Per content line, flat [start, length, kind] triples; offsets are"
+            " code points within the line, kind indexes legend"
+        ),
+        examples=[[[0, 5, 0]]],
+    )
+
+
+class SnippetDetail(CamelModel):
+    """Code snippet detail schema."""
+
+    id: UUID = Field(..., description="Snippet ID")
+    title: str = Field(..., description="Title", examples=["Example Snippet"])
+    content: str = Field(
+        ...,
+        description="Full code content",
+        examples=["print('Hello, World!')"],
+    )
+    language: str = Field(..., description="Programming language", examples=["python"])
+    description: str | None = Field(None, description="Description")
+    tags: list[str] = Field(..., description="Tag names", examples=[["example"]])
+    created_at: datetime = Field(..., description="Creation time")
+    updated_at: datetime = Field(..., description="Last update time")
+    current_version: VersionSummary | None = Field(
+        None, description="Latest version, if any"
+    )
+    highlight: HighlightResponse | None = Field(
+        None, description="Syntax highlighting of content, if available"
+    )
+
+
+class SnippetResponse(CamelModel):
+    """Single code snippet response schema."""
+
+    data: SnippetDetail
+
+
+class SnippetBatchRequest(CamelModel):
+    """Batch snippet read request schema."""
+
+    ids: list[UUID] = Field(
+        ..., min_length=1, max_length=100, description="Snippet IDs to read"
+    )
+
+
+class SnippetBatchItem(CamelModel):
+    """Result for one id of a batch read."""
+
+    id: UUID = Field(..., description="Requested snippet ID")
+    status: Literal["ok", "not_found"] = Field(
+        ..., description="Whether the snippet was found"
+    )
+    data: SnippetDetail | None = Field(None, description="The snippet, if found")
+
+
+class SnippetBatchResponse(CamelModel):
+    """Batch snippet read response schema, in request order."""
+
+    data: list[SnippetBatchItem]
+
+
+class SimilarSnippet(CamelModel):
+    """Near-duplicate snippet schema."""
+
+    id: UUID = Field(..., description="Snippet ID")
+    title: str = Field(..., description="Title", examples=["Example Snippet"])
+    similarity: float = Field(
+        ...,
+        description="Estimated Jaccard similarity of code token shingles",
+        examples=[0.92],
+    )
+
+
+class SimilarSnippetsResponse(CamelModel):
+    """Near-duplicate snippets response schema."""
+
+    data: list[SimilarSnippet]
+
+
+class CodeSearchHit(CamelModel):
+    """Code search hit schema."""
+
+    id: UUID = Field(..., description="Snippet ID")
+    title: str = Field(..., description="Title", examples=["Example Snippet"])
+    language: str = Field(..., description="Programming language", examples=["python"])
+    line: int = Field(
+        ..., description="Line of the first match (1-based)", examples=[3]
+    )
+    preview: str = Field(
+        ..., description="Text of that line", examples=["    items.append(item)"]
+    )
+
+
+class CodeSearchResponse(CamelModel):
+    """Code search response schema."""
+
+    data: list[CodeSearchHit]
+    candidates: int = Field(
+        ..., description="Snippets that passed the trigram index and were verified"
+    )
+    timed_out: bool = Field(
+        ..., description="The regex time budget ran out; results may be incomplete"
+    )
+
+
+class TagSetRequest(CamelModel):
+    """Replace a snippet's tags request schema."""
+
+    tags: list[str] = Field(
+        ..., max_length=100, description="Complete new tag set", examples=[["python"]]
+    )
+
+
+class TagAssignment(CamelModel):
+    """Tags of one snippet."""
+
+    snippet_id: UUID = Field(..., description="Snippet ID")
+    tags: list[str] = Field(
+        ..., max_length=100, description="Complete tag set", examples=[["python"]]
+    )
+
+
+class BulkTagRequest(CamelModel):
+    """Bulk retagging request schema."""
+
+    assignments: list[TagAssignment] = Field(
+        ..., min_length=1, max_length=1000, description="New tag set per snippet"
+    )
+
+
+class TagAssignmentsResponse(CamelModel):
+    """Tag sets after an update."""
+
+    data: list[TagAssignment]
+
+
+class SnippetSummary(CamelModel):
+    """Snippet list item schema.
+
+    Only the fields selected with ``fields=`` are present; by default all
+    but ``description``, ``content`` and ``updatedAt``.
+    """
+
+    id: UUID = Field(..., description="Snippet ID")
+    title: str | None = Field(None, description="Title", examples=["Example Snippet"])
+    language: str | None = Field(
+        None, description="Programming language", examples=["python"]
+    )
+    description: str | None = Field(None, description="Description")
+    content: str | None = Field(
+        None, description="Full code content", examples=["print('Hello, World!')"]
+    )
+    tags: list[str] | None = Field(
+        None, description="Tag names", examples=[["example"]]
+    )
+    created_at: datetime | None = Field(None, description="Creation time")
+    updated_at: datetime | None = Field(None, description="Last update time")
+
+
+class SnippetListResponse(CamelModel):
+    """Snippet list response schema."""
+
+    data: list[SnippetSummary]
+
+
+class ChangeEntry(CamelModel):
+    """Change feed entry schema."""
+
+    seq: int = Field(..., description="Position in the feed", examples=[42])
+    entity: Literal["snippet", "version", "snippet_tag"] = Field(
+        ..., description="Kind of the changed row"
+    )
+    entity_id: UUID = Field(..., description="ID of the changed row")
+    snippet_id: UUID = Field(..., description="Snippet the row belongs to")
+    op: Literal["insert", "update", "delete"] = Field(
+        ..., description="What happened to the row"
+    )
+    created_at: datetime = Field(..., description="Commit time")
+
+
+class ChangesResponse(CamelModel):
+    """Page of the change feed."""
+
+    data: list[ChangeEntry]
+    next_since: int = Field(
+        ..., description="Cursor for the next request", examples=[42]
+    )
+    has_more: bool = Field(..., description="Whether more changes are waiting")
+
+
+class DraftRequest(CamelModel):
+    """Autosave request schema."""
+
+    session_id: str = Field(
+        ..., min_length=1, max_length=64, description="Editor session ID"
+    )
+    content: str = Field(..., description="Full current content")
+
+
+class DraftSaveRequest(CamelModel):
+    """Explicit save request schema."""
+
+    session_id: str = Field(
+        ..., min_length=1, max_length=64, description="Editor session ID"
+    )
+    content: str | None = Field(
+        None, description="Final content; omit to save the stored draft"
+    )
+
+
+class DraftResponse(CamelModel):
+    """Autosave or save result schema."""
+
+    edit_count: int = Field(
+        ..., description="Autosaves coalesced into the draft", examples=[12]
+    )
+    version: VersionSummary | None = Field(
+        None, description="The version written, if the draft was saved"
+    )
+
+
+class DraftDetail(CamelModel):
+    """Unsaved draft schema."""
+
+    session_id: str = Field(..., description="Editor session ID")
+    content: str = Field(..., description="Draft content")
+    edit_count: int = Field(..., description="Autosaves coalesced into the draft")
+    updated_at: datetime = Field(..., description="Time of the last autosave")
+
+
+class EditOperation(CamelModel):
+    """One character edit against the base content."""
+
+    at: int = Field(..., ge=0, description="Offset in the base, in code points")
+    delete: int = Field(0, ge=0, description="Characters removed at the offset")
+    insert: str = Field("", description="Text inserted at the offset")
+
+
+class ContentPatchRequest(CamelModel):
+    """Content patch request schema; give either edits or a diff."""
+
+    base_hash: str = Field(
+        ...,
+        pattern="^[0-9a-f]{64}$",
+        description="SHA-256 of the content the patch was made against",
+    )
+    edits: list[EditOperation] | None = Field(
+        None,
+        max_length=10000,
+        description="Edits in ascending, non-overlapping base order",
+    )
+    diff: str | None = Field(None, description="Unified diff against the base")
+    description: str | None = Field(None, description="Change description")
+
+    @model_validator(mode="after")
+    def _one_patch_form(self) -> "ContentPatchRequest":
+        if (self.edits is None) == (self.diff is None):
+            raise ValueError("Give exactly one of edits and diff")
+        return self
+
+
+class ContentPatchResponse(CamelModel):
+    """Content patch result schema."""
+
+    content_hash: str = Field(..., description="SHA-256 of the new content")
+    version: VersionSummary | None = Field(
+        None, description="The version written; absent if nothing changed"
+    )
+
+
+class ProfileFrame(CamelModel):
+    """Frame of a profile, with how often it was sampled."""
+
+    frame: str = Field(
+        ...,
+        description="Function, file and line",
+        examples=["search_code (apps/services/code_search.py:120)"],
+    )
+    self_samples: int = Field(..., description="Samples with the frame innermost")
+    total_samples: int = Field(..., description="Samples with the frame on the stack")
+
+
+class ProfileTask(CamelModel):
+    """Suspended asyncio task at the end of a profile."""
+
+    name: str = Field(..., description="Task name", examples=["Task-42"])
+    coroutine: str = Field(..., description="Coroutine the task runs")
+    awaiting: list[str] = Field(
+        ..., description="Await chain, from the task's coroutine inward"
+    )
+
+
+class ProfileResponse(CamelModel):
+    """Sampling profile of one worker."""
+
+    seconds: float = Field(..., description="Wall time sampled")
+    samples: int = Field(..., description="Sampling rounds over all threads")
+    overhead: float = Field(..., description="Share of the time spent sampling")
+    threads: list[str] = Field(..., description="Threads seen")
+    truncated: bool = Field(
+        ..., description="Whether new stacks stopped being told apart"
+    )
+    stacks: list[str] = Field(
+        ...,
+        description="Collapsed stacks for flamegraph tools, most sampled first",
+        examples=[
+            ["MainThread;main (apps/serve.py:40);run (asyncio/runners.py:118) 97"]
+        ],
+    )
+    top_frames: list[ProfileFrame] = Field(..., description="Frames most often running")
+    tasks: list[ProfileTask] = Field(..., description="Tasks waiting at the end")
@@ -0,0 +1,67 @@
+"""Code search API routes."""
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from apps.api.schemas import CodeSearchHit, CodeSearchResponse, ErrorResponse
+from apps.core.timing import TimedRoute
+from apps.db.session import get_db
+from apps.services.code_search import search_code
+
+router = APIRouter(prefix="/search", tags=["search"], route_class=TimedRoute)
+
+
+@router.get(
+    "/code",
+    response_model=CodeSearchResponse,
+    responses={
+        200: {"description": "Matching snippets"},
+        422: {
+            "model": ErrorResponse,
+            "description": "Invalid regular expression",
+        },
+    },
+)
+def search_snippet_code(
+    q: str = Query(..., min_length=1, max_length=1000, description="Search text"),
+    regex: bool = Query(False, description="Treat q as a regular expression"),
+    case_sensitive: bool = Query(True, description="Match case exactly"),
+    language: str | None = Query(None, description="Restrict to one language"),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of hits"),
+    db: Session = Depends(get_db),
+) -> CodeSearchResponse:
+    """
+    Search snippet code by substring or regular expression.
+
+    A trigram index narrows the corpus to candidates before any content is
+    read. Regexes are verified in worker processes under a time budget; if
+    it runs out the hits found so far are returned with ``timedOut`` set.
+
+    Returns:
+        CodeSearchResponse: Hits with the first matching line of each.
+
+    Raises:
+        InvalidSearchPatternError: If ``q`` is not a valid regex.
+    """
+    result = search_code(
+        db,
+        q,
+        regex=regex,
+        case_sensitive=case_sensitive,
+        language=language,
+        limit=limit,
+    )
+    return CodeSearchResponse(
+        data=[
+            CodeSearchHit(
+                id=hit.snippet_id,
+                title=hit.title,
+                language=hit.language,
+                line=hit.line,
+                preview=hit.preview,
+            )
+            for hit in result.hits
+        ],
+        candidates=result.candidates,
+        timed_out=result.timed_out,
+    )
@@ -0,0 +1,622 @@
+"""Code snippet API routes."""
+
+from typing import Any
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.api.responses import REVALIDATE, raw_content_response
+from apps.api.schemas import (
+    BulkTagRequest,
+    ContentPatchRequest,
+    ContentPatchResponse,
+    DraftDetail,
+    DraftRequest,
+    DraftResponse,
+    DraftSaveRequest,
+    ErrorResponse,
+    HighlightResponse,
+    SimilarSnippet,
+    SimilarSnippetsResponse,
+    SnippetBatchItem,
+    SnippetBatchRequest,
+    SnippetBatchResponse,
+    SnippetDetail,
+    SnippetListResponse,
+    SnippetResponse,
+    SnippetSummary,
+    TagAssignment,
+    TagAssignmentsResponse,
+    TagSetRequest,
+    VersionSummary,
+)
+from apps.core.exceptions import SnippetNotFoundError
+from apps.core.timing import TimedRoute
+from apps.db.session import get_db, get_session_factory
+from apps.services.drafts import DraftResult, autosave, get_draft, save_draft
+from apps.services.highlight import get_highlight, get_highlights
+from apps.services.hot_lists import ListKind, hot_ids
+from apps.services.raw_content import open_snippet_content
+from apps.services.read_cache import cached_read, cached_read_many, invalidate
+from apps.services.similarity import find_similar
+from apps.services.snippets import (
+    get_current_version,
+    get_current_versions,
+    get_snippet,
+    get_snippets,
+    list_item,
+    list_load_options,
+    parse_list_fields,
+)
+from apps.services.tags import set_tags
+from apps.services.versions import patch_content
+from packages.common.highlight import LEGEND, TOKENIZER_VERSION, Highlight
+from packages.common.patch import Edit
+from packages.models import Snippet, Version
+
+router = APIRouter(prefix="/code-snippets", tags=["snippets"], route_class=TimedRoute)
+
+
+def _snippet_detail(
+    snippet: Snippet, current: Version | None, highlight: Highlight | None
+) -> SnippetDetail:
+    return SnippetDetail(
+        id=snippet.id,
+        title=snippet.title,
+        content=snippet.content,
+        language=snippet.language,
+        description=snippet.description,
+        tags=snippet.tags,
+        created_at=snippet.created_at,
+        updated_at=snippet.updated_at,
+        current_version=(
+            VersionSummary(number=current.version_number, created_at=current.created_at)
+            if current is not None
+            else None
+        ),
+        highlight=(
+            HighlightResponse(
+                tokenizer=TOKENIZER_VERSION, legend=list(LEGEND), lines=highlight.lines
+            )
+            if highlight is not None
+            else None
+        ),
+    )
+
+
+def load_snippet_detail(db: Session, snippet_id: UUID) -> SnippetDetail:
+    """Load and serialize a snippet with its tags, current version and highlight."""
+    snippet = get_snippet(db, snippet_id)
+    current = get_current_version(db, snippet_id)
+    highlight = get_highlight(db, snippet.content, snippet.language)
+    detail = _snippet_detail(snippet, current, highlight)
+    # Persist a freshly computed highlight.
+    db.commit()
+    return detail
+
+
+def load_snippet_details(
+    db: Session, snippet_ids: list[UUID]
+) -> dict[UUID, SnippetDetail]:
+    """Batch form of ``load_snippet_detail``; missing snippets are left out."""
+    snippets = list(get_snippets(db, snippet_ids).values())
+    current = get_current_versions(db, [snippet.id for snippet in snippets])
+    highlights = get_highlights(
+        db, [(snippet.content, snippet.language) for snippet in snippets]
+    )
+    details = {
+        snippet.id: _snippet_detail(snippet, current.get(snippet.id), highlight)
+        for snippet, highlight in zip(snippets, highlights, strict=True)
+    }
+    db.commit()
+    return details
+
+
+def _hot_list(
+    db: Session,
+    kind: ListKind,
+    language: str | None,
+    limit: int,
+    fields: str | None,
+) -> SnippetListResponse:
+    selected = parse_list_fields(fields)
+    ids = hot_ids(db, kind, language, limit)
+    stmt = (
+        select(Snippet)
+        .options(*list_load_options(selected))
+        .where(Snippet.id.in_(ids), Snippet._is_deleted.is_(False))
+    )
+    if language is not None:
+        stmt = stmt.where(Snippet.language == language)
+    snippets = {snippet.id: snippet for snippet in db.scalars(stmt)}
+    return SnippetListResponse(
+        data=[
+            SnippetSummary(**list_item(snippets[snippet_id], selected))
+            for snippet_id in ids
+            if snippet_id in snippets
+        ]
+    )
+
+
+_FIELDS_QUERY = Query(
+    None,
+    description=(
+        "Comma-separated fields to return, e.g. title,content; defaults to all"
+        " but description, content and updatedAt"
+    ),
+)
+
+
+@router.get(
+    "/recent",
+    response_model=SnippetListResponse,
+    response_model_exclude_unset=True,
+    responses={
+        200: {"description": "Newest snippets"},
+        422: {"model": ErrorResponse, "description": "Unknown field"},
+    },
+)
+def read_recent_snippets(
+    language: str | None = Query(None, description="Only this language"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    fields: str | None = _FIELDS_QUERY,
+    db: Session = Depends(get_db),
+) -> SnippetListResponse:
+    """
+    List the newest code snippets.
+
+    Served from a materialized list kept up to date on every write, so the
+    cost does not grow with the number of snippets.
+
+    Only the columns behind ``fields`` are read, so the potentially large
+    ``content`` and ``description`` cost nothing unless asked for.
+
+    Returns:
+        SnippetListResponse: Snippets, newest first.
+
+    Raises:
+        InvalidFieldsError: If ``fields`` names an unknown field.
+    """
+    return _hot_list(db, "recent", language, limit, fields)
+
+
+@router.get(
+    "/trending",
+    response_model=SnippetListResponse,
+    response_model_exclude_unset=True,
+    responses={
+        200: {"description": "Trending snippets"},
+        422: {"model": ErrorResponse, "description": "Unknown field"},
+    },
+)
+def read_trending_snippets(
+    language: str | None = Query(None, description="Only this language"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    fields: str | None = _FIELDS_QUERY,
+    db: Session = Depends(get_db),
+) -> SnippetListResponse:
+    """
+    List the code snippets with the most recent activity.
+
+    Creations and edits raise a snippet's score, and their weight halves
+    every ``HOT_LIST_HALF_LIFE_HOURS``. Served from a materialized list.
+
+    Only the columns behind ``fields`` are read, so the potentially large
+    ``content`` and ``description`` cost nothing unless asked for.
+
+    Returns:
+        SnippetListResponse: Snippets, most active first.
+
+    Raises:
+        InvalidFieldsError: If ``fields`` names an unknown field.
+    """
+    return _hot_list(db, "trending", language, limit, fields)
+
+
+@router.post(
+    "/batch",
+    response_model=SnippetBatchResponse,
+    responses={200: {"description": "One result per requested id"}},
+)
+async def read_snippets_batch(
+    request: SnippetBatchRequest,
+    session_factory: sessionmaker[Any] = Depends(get_session_factory),
+) -> SnippetBatchResponse:
+    """
+    Get many code snippets at once.
+
+    Each id is answered from the shared read cache used by
+    ``GET /code-snippets/{snippet_id}``. Misses already being loaded, by a
+    single read or another batch, are joined; the rest are loaded together,
+    with one query each for the snippets, their tags, their current
+    versions and their stored highlights. Like the single read, the load
+    may outlive the request, so it uses a session of its own.
+
+    Returns:
+        SnippetBatchResponse: A result per distinct id, in request order,
+        marked ``not_found`` for missing or deleted snippets.
+    """
+
+    def load(ids: list[UUID]) -> dict[UUID, SnippetDetail]:
+        with session_factory() as db:
+            return load_snippet_details(db, ids)
+
+    details = await cached_read_many(
+        "snippets.get", "id", request.ids, load, not_found=(SnippetNotFoundError,)
+    )
+    return SnippetBatchResponse(
+        data=[
+            SnippetBatchItem(
+                id=snippet_id,
+                status="ok" if snippet_id in details else "not_found",
+                data=details.get(snippet_id),
+            )
+            for snippet_id in dict.fromkeys(request.ids)
+        ]
+    )
+
+
+@router.get(
+    "/{snippet_id}",
+    response_model=SnippetResponse,
+    responses={
+        200: {"description": "Snippet detail"},
+        404: {
+            "model": ErrorResponse,
+            "description": "Snippet not found",
+        },
+    },
+)
+async def read_snippet(
+    snippet_id: UUID,
+    session_factory: sessionmaker[Any] = Depends(get_session_factory),
+) -> SnippetResponse:
+    """
+    Get a code snippet.
+
+    Served from the shared read cache. Concurrent requests for the same
+    snippet that miss the cache are coalesced into a single database load.
+    The load may outlive the request that started it, so it uses a session
+    of its own.
+
+    The content is syntax highlighted server-side once per distinct body and
+    served as token spans.
+
+    Returns:
+        SnippetResponse: The snippet with its tags, current version and
+        highlight.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist.
+    """
+
+    def load() -> SnippetDetail:
+        with session_factory() as db:
+            return load_snippet_detail(db, snippet_id)
+
+    detail = await cached_read("snippets.get", {"id": snippet_id}, load)
+    return SnippetResponse(data=detail)
+
+
+@router.get(
+    "/{snippet_id}/similar",
+    response_model=SimilarSnippetsResponse,
+    responses={
+        200: {"description": "Near-duplicate snippets"},
+        404: {
+            "model": ErrorResponse,
+            "description": "Snippet not found",
+        },
+    },
+)
+def read_similar_snippets(
+    snippet_id: UUID,
+    threshold: float | None = Query(
+        None, ge=0, le=1, description="Minimum similarity (default from settings)"
+    ),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    db: Session = Depends(get_db),
+) -> SimilarSnippetsResponse:
+    """
+    Find near-duplicates of a code snippet.
+
+    Candidates come from the MinHash LSH band index, so the cost depends on
+    how many snippets are alike rather than on how many exist.
+
+    Returns:
+        SimilarSnippetsResponse: Similar snippets, most similar first.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist.
+    """
+    matches = find_similar(db, snippet_id, threshold=threshold, limit=limit)
+    titles: dict[UUID, str] = {
+        row.id: row.title
+        for row in db.execute(
+            select(Snippet.id, Snippet.title).where(
+                Snippet.id.in_([match.snippet_id for match in matches])
+            )
+        )
+    }
+    return SimilarSnippetsResponse(
+        data=[
+            SimilarSnippet(
+                id=match.snippet_id,
+                title=titles[match.snippet_id],
+                similarity=match.similarity,
+            )
+            for match in matches
+        ]
+    )
+
+
+_RAW_RESPONSES: dict[int | str, dict[str, Any]] = {
+    200: {
+        "description": "The content",
+        "content": {"text/plain": {"schema": {"type": "string"}}},
+    },
+    206: {"description": "A byte range of the content"},
+    304: {"description": "The client's copy is current"},
+    416: {"description": "The range lies past the end"},
+}
+
+
+@router.get(
+    "/{snippet_id}/raw",
+    response_class=Response,
+    responses={
+        **_RAW_RESPONSES,
+        404: {
+            "model": ErrorResponse,
+            "description": "Snippet not found",
+        },
+    },
+)
+def read_snippet_raw(
+    snippet_id: UUID, request: Request, db: Session = Depends(get_db)
+) -> Response:
+    """
+    Download the current content of a code snippet as plain text.
+
+    The body is streamed in chunks from the snippet's current version, so
+    large snippets are never wrapped in JSON or held in memory whole. The
+    ETag is the content hash; the response is cacheable but revalidated,
+    and supports ``If-None-Match`` and single byte ``Range`` requests.
+
+    Returns:
+        Response: The UTF-8 content, or the requested part of it.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist.
+    """
+    return raw_content_response(
+        request, open_snippet_content(db, snippet_id), cache_control=REVALIDATE
+    )
+
+
+def _replace_tags(
+    db: Session, assignments: dict[UUID, list[str]]
+) -> TagAssignmentsResponse:
+    applied = set_tags(db, assignments)
+    db.commit()
+    for snippet_id in applied:
+        invalidate("snippets.get", {"id": snippet_id})
+    return TagAssignmentsResponse(
+        data=[
+            TagAssignment(snippet_id=snippet_id, tags=tags)
+            for snippet_id, tags in applied.items()
+        ]
+    )
+
+
+@router.put(
+    "/tags",
+    response_model=TagAssignmentsResponse,
+    responses={
+        200: {"description": "Tag sets after the update"},
+        404: {
+            "model": ErrorResponse,
+            "description": "Snippet not found",
+        },
+    },
+)
+def replace_tags_bulk(
+    request: BulkTagRequest, db: Session = Depends(get_db)
+) -> TagAssignmentsResponse:
+    """
+    Replace the tags of many snippets at once.
+
+    Runs a fixed number of statements regardless of how many snippets and
+    tags are involved. Nothing is changed if any snippet is missing.
+
+    Returns:
+        TagAssignmentsResponse: The normalized tag set of each snippet.
+
+    Raises:
+        SnippetNotFoundError: If a snippet does not exist.
+        InvalidTagError: If a tag name is too long.
+    """
+    return _replace_tags(
+        db, {item.snippet_id: item.tags for item in request.assignments}
+    )
+
+
+@router.put(
+    "/{snippet_id}/tags",
+    response_model=TagAssignmentsResponse,
+    responses={
+        200: {"description": "Tag set after the update"},
+        404: {
+            "model": ErrorResponse,
+            "description": "Snippet not found",
+        },
+    },
+)
+def replace_tags(
+    snippet_id: UUID, request: TagSetRequest, db: Session = Depends(get_db)
+) -> TagAssignmentsResponse:
+    """
+    Replace the tags of a code snippet.
+
+    Returns:
+        TagAssignmentsResponse: The normalized tag set.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist.
+        InvalidTagError: If a tag name is too long.
+    """
+    return _replace_tags(db, {snippet_id: request.tags})
+
+
+def _draft_response(result: DraftResult) -> DraftResponse:
+    version = result.version
+    return DraftResponse(
+        edit_count=result.edit_count,
+        version=(
+            VersionSummary(number=version.version_number, created_at=version.created_at)
+            if version is not None
+            else None
+        ),
+    )
+
+
+@router.put(
+    "/{snippet_id}/draft",
+    response_model=DraftResponse,
+    responses={
+        200: {"description": "Draft stored"},
+        404: {"model": ErrorResponse, "description": "Snippet not found"},
+    },
+)
+def autosave_snippet(
+    snippet_id: UUID, request: DraftRequest, db: Session = Depends(get_db)
+) -> DraftResponse:
+    """
+    Autosave the content of an editor session.
+
+    Autosaves overwrite the session's draft instead of adding versions. The
+    draft becomes a version after a quiet period or once it has absorbed
+    enough edits, time or change; the response says when that happened.
+
+    Returns:
+        DraftResponse: Edits coalesced so far and any version written.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist.
+    """
+    result = autosave(db, snippet_id, request.session_id, request.content)
+    db.commit()
+    return _draft_response(result)
+
+
+@router.get(
+    "/{snippet_id}/draft",
+    response_model=DraftDetail,
+    responses={
+        200: {"description": "Unsaved draft"},
+        404: {"model": ErrorResponse, "description": "No draft"},
+    },
+)
+def read_draft(
+    snippet_id: UUID,
+    session_id: str = Query(..., alias="sessionId", description="Editor session ID"),
+    db: Session = Depends(get_db),
+) -> DraftDetail:
+    """
+    Get the unsaved draft of an editor session.
+
+    Returns:
+        DraftDetail: The draft, e.g. to restore an editor after a reload.
+
+    Raises:
+        DraftNotFoundError: If the session has no unsaved draft.
+    """
+    draft = get_draft(db, snippet_id, session_id)
+    return DraftDetail(
+        session_id=draft.session_id,
+        content=draft.content,
+        edit_count=draft.edit_count,
+        updated_at=draft.updated_at,
+    )
+
+
+@router.post(
+    "/{snippet_id}/draft/save",
+    response_model=DraftResponse,
+    responses={
+        200: {"description": "Draft saved"},
+        404: {"model": ErrorResponse, "description": "Snippet or draft not found"},
+    },
+)
+def save_snippet_draft(
+    snippet_id: UUID, request: DraftSaveRequest, db: Session = Depends(get_db)
+) -> DraftResponse:
+    """
+    Save an editor session's draft as a version now.
+
+    Returns:
+        DraftResponse: Edits coalesced into the version, and the version;
+        no version is written if the draft matches the current content.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist.
+        DraftNotFoundError: If there is no draft and no content to save.
+    """
+    result = save_draft(db, snippet_id, request.session_id, request.content)
+    db.commit()
+    return _draft_response(result)
+
+
+@router.patch(
+    "/{snippet_id}/content",
+    response_model=ContentPatchResponse,
+    responses={
+        200: {"description": "Patch applied"},
+        404: {"model": ErrorResponse, "description": "Snippet not found"},
+        409: {"model": ErrorResponse, "description": "Base is not current"},
+        422: {"model": ErrorResponse, "description": "Patch does not apply"},
+    },
+)
+def patch_snippet_content(
+    snippet_id: UUID, request: ContentPatchRequest, db: Session = Depends(get_db)
+) -> ContentPatchResponse:
+    """
+    Update a snippet's content with a patch instead of the full body.
+
+    The patch is either character edits or a unified diff, made against the
+    content whose SHA-256 is ``baseHash``. It is applied server-side as a
+    new version parented to the current one. If the content has changed
+    since, nothing is written and the client should rebase.
+
+    Returns:
+        ContentPatchResponse: The new content hash and version.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist.
+        VersionConflictError: If ``baseHash`` is not the current content.
+        InvalidPatchError: If the patch does not apply to the base.
+    """
+    result = patch_content(
+        db,
+        snippet_id,
+        request.base_hash,
+        edits=(
+            [Edit(edit.at, edit.delete, edit.insert) for edit in request.edits]
+            if request.edits is not None
+            else None
+        ),
+        diff=request.diff,
+        description=request.description,
+    )
+    db.commit()
+    version = result.version
+    return ContentPatchResponse(
+        content_hash=result.content_hash,
+        version=(
+            VersionSummary(number=version.version_number, created_at=version.created_at)
+            if version is not None
+            else None
+        ),
+    )
@@ -0,0 +1,127 @@
+"""Version API routes."""
+
+from typing import Literal
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.orm import Session
+
+from apps.api.responses import IMMUTABLE, raw_content_response
+from apps.api.schemas import (
+    DiffHunkResponse,
+    DiffLineResponse,
+    ErrorResponse,
+    VersionDiffResponse,
+)
+from apps.core.timing import TimedRoute
+from apps.db.session import get_db
+from apps.services.raw_content import open_version_content
+from apps.services.version_diff import diff_versions
+from packages.common.diff import format_unified
+
+router = APIRouter(prefix="/versions", tags=["versions"], route_class=TimedRoute)
+
+
+@router.get(
+    "/diff",
+    response_model=VersionDiffResponse,
+    responses={
+        200: {"description": "Diff between the two versions"},
+        404: {
+            "model": ErrorResponse,
+            "description": "Version not found",
+        },
+    },
+)
+def get_version_diff(
+    base: UUID = Query(..., description="Version treated as the original"),
+    target: UUID = Query(..., description="Version treated as the new text"),
+    output: Literal["unified", "hunks"] = Query(
+        "hunks", alias="format", description="Output format"
+    ),
+    context: int | None = Query(
+        None, ge=0, le=100, description="Unchanged lines around each hunk"
+    ),
+    db: Session = Depends(get_db),
+) -> VersionDiffResponse:
+    """
+    Diff two versions.
+
+    Declared as a plain function so FastAPI runs it in the worker thread pool
+    and the CPU-bound diff never blocks the event loop. Results are cached by
+    the content hashes of both sides.
+
+    Returns:
+        VersionDiffResponse: Unified text or structured hunks.
+
+    Raises:
+        VersionNotFoundError: If either version does not exist.
+    """
+    diff = diff_versions(db, base, target, context=context)
+    unified = None
+    hunks = None
+    if output == "unified":
+        unified = format_unified(
+            diff.hunks, base_label=str(base), target_label=str(target)
+        )
+    else:
+        hunks = [
+            DiffHunkResponse(
+                base_start=hunk.base_start,
+                base_lines=hunk.base_lines,
+                target_start=hunk.target_start,
+                target_lines=hunk.target_lines,
+                lines=[DiffLineResponse(op=ln.op, text=ln.text) for ln in hunk.lines],
+            )
+            for hunk in diff.hunks
+        ]
+    return VersionDiffResponse(
+        base_id=base,
+        target_id=target,
+        format=output,
+        exact=diff.exact,
+        truncated=diff.truncated,
+        added=diff.added,
+        removed=diff.removed,
+        unified=unified,
+        hunks=hunks,
+    )
+
+
+@router.get(
+    "/{version_id}/raw",
+    response_class=Response,
+    responses={
+        200: {
+            "description": "The content",
+            "content": {"text/plain": {"schema": {"type": "string"}}},
+        },
+        206: {"description": "A byte range of the content"},
+        304: {"description": "The client's copy is current"},
+        404: {
+            "model": ErrorResponse,
+            "description": "Version not found",
+        },
+        416: {"description": "The range lies past the end"},
+    },
+)
+def read_version_raw(
+    version_id: UUID, request: Request, db: Session = Depends(get_db)
+) -> Response:
+    """
+    Download the content of a version as plain text.
+
+    The body is streamed in chunks straight from the database row, or
+    decompressed from its pack as it is sent if the version is archived.
+    Versions never change, so the response may be cached for good; it
+    supports ``If-None-Match`` and single byte ``Range`` requests.
+
+    Returns:
+        Response: The UTF-8 content, or the requested part of it.
+
+    Raises:
+        VersionNotFoundError: If the version does not exist.
+    """
+    return raw_content_response(
+        request, open_version_content(db, version_id), cache_control=IMMUTABLE
+    )
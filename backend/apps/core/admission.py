@@ -0,0 +1,176 @@
+"""Adaptive admission control.
+
+Requests are grouped into route classes (read, write, heavy), each with its
+own concurrency limit. A request that finds its class full waits briefly in
+a bounded queue; if no slot frees up in time it is rejected at once with
+``503`` and ``Retry-After`` instead of piling onto the event loop and the
+SQLite write queue.
+
+Limits adapt with AIMD: every request that finishes under the class latency
+target grows the limit by ``1 / limit`` (about one slot per window of
+requests), every slow one shrinks it by a constant factor.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Literal
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from apps.api.schemas import ErrorResponse
+from apps.core.config import Settings, settings
+from packages.telemetry.timing import record
+
+RouteClass = Literal["read", "write", "heavy"]
+
+_READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class AdaptiveLimiter:
+    """Concurrency limiter with a bounded wait queue and an AIMD limit."""
+
+    def __init__(
+        self,
+        *,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        target_latency: float,
+        queue_size: int,
+        queue_timeout: float,
+        backoff: float = 0.9,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot."""
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting up to ``queue_timeout``.
+
+        Returns:
+            bool: ``False`` if the request should be shed.
+        """
+        if self.in_flight < int(self.limit) and not self.queued:
+            self.in_flight += 1
+            return True
+        if self.queued >= self.queue_size:
+            return False
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            # Client went away; give back a slot that was handed over meanwhile.
+            if waiter.done() and not waiter.cancelled():
+                self._return_slot()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        # The releasing request handed its slot over; in_flight is unchanged.
+        return True
+
+    def release(self, latency: float) -> None:
+        """Return a slot and feed the observed latency into the limit."""
+        if latency > self.target_latency:
+            self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+        self._return_slot()
+
+    def _return_slot(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware that sheds load per route class."""
+
+    def __init__(self, app: ASGIApp, config: Settings = settings) -> None:
+        self.app = app
+        self.heavy_paths = tuple(config.ADMISSION_HEAVY_PATHS)
+        self.exempt_paths = frozenset(config.ADMISSION_EXEMPT_PATHS)
+        self.retry_after = config.ADMISSION_RETRY_AFTER
+        self.limiters: dict[RouteClass, AdaptiveLimiter] = {
+            route_class: AdaptiveLimiter(
+                initial_limit=config.ADMISSION_LIMITS[route_class],
+                min_limit=config.ADMISSION_MIN_LIMIT,
+                max_limit=config.ADMISSION_MAX_LIMIT,
+                target_latency=config.ADMISSION_TARGET_LATENCY_MS[route_class] / 1000,
+                queue_size=config.ADMISSION_QUEUE_SIZE,
+                queue_timeout=config.ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+            )
+            for route_class in ("read", "write", "heavy")
+        }
+
+    def classify(self, scope: Scope) -> RouteClass | None:
+        """Return the route class of a request, or ``None`` if exempt."""
+        path: str = scope["path"]
+        if path in self.exempt_paths:
+            return None
+        if path.startswith(self.heavy_paths):
+            return "heavy"
+        return "read" if scope["method"] in _READ_METHODS else "write"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route_class = self.classify(scope)
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[route_class]
+        arrived = time.perf_counter()
+        if not await limiter.acquire():
+            await self._reject(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        record("queue", started - arrived)
+        finished: float | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal finished
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                finished = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end = finished if finished is not None else time.perf_counter()
+            limiter.release(end - started)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            status_code=503,
+            content=ErrorResponse(
+                detail="Server is busy, please retry shortly",
+                error_code="SERVICE_OVERLOADED",
+            ).model_dump(),
+            headers={"Retry-After": str(self.retry_after)},
+        )
+        await response(scope, receive, send)
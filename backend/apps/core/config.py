@@ -22,6 +22,18 @@ class Settings(BaseSettings):
     APP_HOST: str = "0.0.0.0"
     APP_BASE_URL: str = "http://localhost:8000"
     APP_SECRET_KEY: str = "your-secret-key-here"
+    ADMIN_TOKEN: str = ""  # bearer token of the admin endpoints; empty = disabled
+
+    # Server
+    SERVER_WORKERS: int = 0  # 0 = one worker per available CPU core
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE_TIMEOUT: int = 5
+    SERVER_MAX_REQUESTS: int = (
+        10000  # gunicorn only: recycle a worker after this many; 0 = never
+    )
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_LIMIT_CONCURRENCY: int | None = None
 
     # API
     API_V1_PREFIX: str = "/api/v1"
@@ -37,6 +49,126 @@ class Settings(BaseSettings):
     DB_DRIVER: str = "sqlite"
     DB_PATH: str = "./data/codewave.db"
     DB_ECHO: bool = True
+    # Snippets spread over this many files by id hash; 0 keeps one file.
+    # DB_PATH then holds the shared catalog (tags, jobs, change feed...).
+    DB_SHARDS: int = 0
+    DB_SHARD_PATH: str = "./data/codewave-shard{shard}.db"
+
+    # Background jobs
+    JOBS_ENABLED: bool = True
+    JOBS_WORKERS: int = 2
+    JOBS_POLL_INTERVAL: float = 1.0
+    JOBS_VISIBILITY_TIMEOUT: float = 300.0
+    JOBS_MAX_ATTEMPTS: int = 5
+    JOBS_RETRY_BASE_SECONDS: float = 2.0
+    JOBS_RETRY_MAX_SECONDS: float = 600.0
+    JOBS_RETENTION_HOURS: float = 168.0  # finished jobs are kept this long
+    JOBS_PURGE_INTERVAL: float = 3600.0
+
+    # Backfills
+    BACKFILL_CHUNK_SIZE: int = 1000  # rows per transaction
+    BACKFILL_DUTY_CYCLE: float = 0.5  # share of time spent holding the write lock
+    BACKFILL_TIME_BUDGET_SECONDS: float = 60.0  # per backfill.run job
+
+    # Version archive
+    ARCHIVE_DIR: str = "./data/packs"
+    ARCHIVE_AFTER_DAYS: int = 30  # age before a superseded version is archived
+    ARCHIVE_BATCH_SIZE: int = 1000  # versions per pack written by one job
+    ARCHIVE_INTERVAL_SECONDS: float = 3600.0  # between runs once caught up
+    ARCHIVE_COMPACT_THRESHOLD: float = 0.5  # rewrite packs below this live share
+    ARCHIVE_OPEN_PACKS: int = 64  # memory-mapped packs kept open
+
+    # Autosave
+    AUTOSAVE_IDLE_SECONDS: float = 30.0  # quiet time before a draft is saved
+    AUTOSAVE_MAX_EDITS: int = 50  # autosaves coalesced into one version at most
+    AUTOSAVE_MAX_AGE_SECONDS: float = 600.0  # since a draft's first edit
+    AUTOSAVE_MAX_DELTA_CHARS: int = 2000  # size change since the last version
+
+    # Raw content downloads
+    RAW_CHUNK_SIZE: int = 65536  # bytes read and sent at a time
+
+    # Read cache
+    READ_CACHE_SIZE: int = 4096
+    READ_CACHE_TTL_SECONDS: float = 30.0
+
+    # Diff
+    DIFF_CACHE_SIZE: int = 256
+    DIFF_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    DIFF_CONTEXT_LINES: int = 3
+    DIFF_MAX_EDIT_DISTANCE: int = 1000
+    DIFF_MAX_OUTPUT_LINES: int = 10000
+
+    # Syntax highlighting
+    HIGHLIGHT_WORKERS: int = 2  # tokenizer processes; 0 = tokenize in the caller
+    HIGHLIGHT_MAX_CHARS: int = 1_000_000  # larger content is served unhighlighted
+    HIGHLIGHT_TIMEOUT_SECONDS: float = 10.0
+
+    # Near-duplicate detection (changing these requires a reindex)
+    SIMILARITY_NUM_PERM: int = 128
+    SIMILARITY_BANDS: int = 16  # 8 rows per band: candidates from ~0.7 similarity
+    SIMILARITY_SHINGLE_SIZE: int = 5
+    SIMILARITY_THRESHOLD: float = 0.8
+
+    # Code search
+    SEARCH_WORKERS: int = 2  # regex verifier processes; 0 = verify in the caller
+    SEARCH_BATCH_SIZE: int = 200  # candidates per verification task
+    SEARCH_REGEX_TIMEOUT_SECONDS: float = 2.0  # budget for one regex search
+
+    # Hot lists
+    HOT_LIST_SIZE: int = 100  # entries served per list
+    HOT_LIST_TTL_SECONDS: float = 5.0  # staleness of copies in other processes
+    HOT_LIST_HALF_LIFE_HOURS: float = 24.0  # trending activity decay
+
+    # Change feed
+    CHANGES_BATCH_SIZE: int = 500  # changes per page and per tailer read
+    CHANGES_POLL_INTERVAL: float = 1.0  # seconds; local commits wake it sooner
+    CHANGES_QUEUE_SIZE: int = 64  # batches buffered per stream before catch-up
+    CHANGES_HEARTBEAT_SECONDS: float = 15.0  # keep-alive on idle streams
+
+    # Collaborative editing
+    COLLAB_MAX_SESSIONS: int = 200  # open documents per worker
+    COLLAB_MAX_CLIENTS: int = 16  # editors per document
+    COLLAB_MAX_CHARS: int = 1_000_000  # document size
+    COLLAB_HISTORY_SIZE: int = 500  # operations kept to rebase late edits
+    COLLAB_HISTORY_CHARS: int = 1_000_000  # inserted text kept in that history
+    COLLAB_QUEUE_SIZE: int = 256  # messages buffered per editor before dropping it
+    COLLAB_CHECKPOINT_SECONDS: float = 10.0  # edits are saved as a version this often
+    COLLAB_IDLE_SECONDS: float = 600.0  # without edits before a session is closed
+    COLLAB_LEASE_SECONDS: float = 60.0  # worker pinning, renewed every checkpoint
+
+    # Server-Timing
+    SERVER_TIMING_ENABLED: bool = False  # off: no timing, whatever the header
+    SERVER_TIMING_HEADER: str = ""  # only time requests sending it; empty: all
+    SERVER_TIMING_SAMPLE_RATE: float = 1.0  # share of those requests answered
+
+    # Sampling profiler (admin endpoint)
+    PROFILER_ENABLED: bool = False
+    PROFILER_MAX_SECONDS: float = 30.0  # longest run one request may ask for
+    PROFILER_INTERVAL_MS: float = 10.0  # between samples, at the least
+    PROFILER_MAX_OVERHEAD: float = 0.05  # share of wall time spent sampling
+    PROFILER_MAX_DEPTH: int = 64  # innermost frames kept per stack
+    PROFILER_MAX_STACKS: int = 5000  # distinct stacks kept per run
+    PROFILER_TOP_FRAMES: int = 50
+
+    # Admission control
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_LIMITS: dict[str, int] = {"read": 64, "write": 16, "heavy": 4}
+    ADMISSION_TARGET_LATENCY_MS: dict[str, int] = {
+        "read": 250,
+        "write": 500,
+        "heavy": 2000,
+    }
+    ADMISSION_MIN_LIMIT: int = 2
+    ADMISSION_MAX_LIMIT: int = 512
+    ADMISSION_QUEUE_SIZE: int = 128
+    ADMISSION_QUEUE_TIMEOUT_MS: int = 500
+    ADMISSION_RETRY_AFTER: int = 1
+    ADMISSION_HEAVY_PATHS: list[str] = ["/api/v1/versions/diff", "/api/v1/search"]
+    ADMISSION_EXEMPT_PATHS: list[str] = [
+        "/health",
+        "/api/v1/changes/stream",
+        "/api/v1/admin/profile",
+    ]
 
     # CORS
     CORS_ORIGINS: list[str] = ["http://localhost:3000"]
@@ -0,0 +1,90 @@
+"""Application exceptions.
+
+Services raise these instead of ``HTTPException`` so they stay usable outside
+a request; ``apps.main`` renders them with the ``ErrorResponse`` schema.
+"""
+
+
+class CodeWaveError(Exception):
+    """Base class for domain errors."""
+
+    status_code: int = 400
+    error_code: str = "BAD_REQUEST"
+
+    def __init__(self, detail: str) -> None:
+        super().__init__(detail)
+        self.detail = detail
+
+
+class ForbiddenError(CodeWaveError):
+    """The caller may not use an endpoint."""
+
+    status_code = 403
+    error_code = "FORBIDDEN"
+
+
+class NotFoundError(CodeWaveError):
+    """A requested resource does not exist."""
+
+    status_code = 404
+    error_code = "NOT_FOUND"
+
+
+class VersionNotFoundError(NotFoundError):
+    """A requested version does not exist."""
+
+    error_code = "VERSION_NOT_FOUND"
+
+
+class SnippetNotFoundError(NotFoundError):
+    """A requested snippet does not exist or was deleted."""
+
+    error_code = "SNIPPET_NOT_FOUND"
+
+
+class DraftNotFoundError(NotFoundError):
+    """A snippet has no draft in the requested session."""
+
+    error_code = "DRAFT_NOT_FOUND"
+
+
+class VersionConflictError(CodeWaveError):
+    """An update was based on content that is no longer current."""
+
+    status_code = 409
+    error_code = "VERSION_CONFLICT"
+
+
+class ProfilerBusyError(CodeWaveError):
+    """A profiling run is already in progress in this worker."""
+
+    status_code = 409
+    error_code = "PROFILER_BUSY"
+
+
+class InvalidPatchError(CodeWaveError):
+    """A patch is malformed or does not apply to its base."""
+
+    status_code = 422
+    error_code = "INVALID_PATCH"
+
+
+class InvalidSearchPatternError(CodeWaveError):
+    """A search pattern is not a valid regular expression."""
+
+    status_code = 422
+    error_code = "INVALID_SEARCH_PATTERN"
+
+
+class InvalidTagError(CodeWaveError):
+    """A tag name is not acceptable."""
+
+    status_code = 422
+    error_code = "INVALID_TAG"
+
+
+class InvalidFieldsError(CodeWaveError):
+    """A field selection names fields the resource does not have."""
+
+    status_code = 422
+    error_code = "INVALID_FIELDS"
@@ -0,0 +1,34 @@
+"""Access control of operator endpoints.
+
+Admin endpoints take ``Authorization: Bearer <ADMIN_TOKEN>``. With no token
+configured nobody is an admin, so the endpoints are closed by default.
+"""
+
+import secrets
+
+from fastapi import Depends
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from apps.core.config import settings
+from apps.core.exceptions import ForbiddenError
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def require_admin(
+    credentials: HTTPAuthorizationCredentials | None = Depends(_bearer),
+) -> None:
+    """Dependency that lets only holders of the admin token through.
+
+    Raises:
+        ForbiddenError: If the token is missing, wrong or not configured.
+    """
+    token = settings.ADMIN_TOKEN
+    if (
+        not token
+        or credentials is None
+        or not secrets.compare_digest(
+            credentials.credentials.encode("utf-8"), token.encode("utf-8")
+        )
+    ):
+        raise ForbiddenError("Admin access required")
@@ -0,0 +1,148 @@
+"""Server-Timing breakdown of request latency.
+
+:class:`ServerTimingMiddleware` adds a ``Server-Timing`` header to the
+responses of timed requests; browser developer tools show it with the
+request. Nothing is timed unless ``SERVER_TIMING_ENABLED`` is set. Then every
+request is timed, or, when ``SERVER_TIMING_HEADER`` names a header, only the
+requests that carry it and are picked by ``SERVER_TIMING_SAMPLE_RATE``. The
+timings reveal internals, so only name a header on deployments where any
+client may see them.
+The phases are:
+
+- ``queue``: waiting for an admission slot (``apps.core.admission``).
+- ``db``: executing statements, from the engine events in ``apps.db.session``.
+- ``orm``: fetching rows and building ORM objects from them, from the
+  session events in the same module; to measure it, the ORM selects of a
+  timed request are buffered whole (streamed ones are not timed).
+- ``app``: the rest of the endpoint function.
+- ``serialize``: what the route does around the endpoint, mostly validating
+  the response model and encoding JSON; reported for routes of routers
+  using :class:`TimedRoute`.
+- ``total``: from the middleware until the response headers are sent.
+
+Requests that are not timed pay one context variable lookup per hook.
+"""
+
+import functools
+import inspect
+import random
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from apps.core.config import Settings, settings
+from packages.telemetry import timing
+from packages.telemetry.timing import Timings, format_server_timing
+
+_DESCRIPTIONS = {
+    "queue": "Admission queue",
+    "db": "Database",
+    "orm": "ORM hydrate",
+    "app": "Endpoint",
+    "serialize": "Serialize",
+    "total": "Total",
+}
+
+
+def server_timing(timings: Timings) -> str:
+    """Build the ``Server-Timing`` value of a request's timings."""
+    db, orm = timings.get("db"), timings.get("orm")
+    metrics = {"queue": timings.get("queue"), "db": db, "orm": orm}
+    if "endpoint" in timings.durations:
+        endpoint = timings.get("endpoint")
+        metrics["app"] = max(endpoint - db - orm, 0.0)
+        metrics["serialize"] = max(timings.get("route") - endpoint, 0.0)
+    metrics["total"] = timings.elapsed()
+    return format_server_timing(metrics, _DESCRIPTIONS)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware that reports where a request's time went."""
+
+    def __init__(self, app: ASGIApp, config: Settings = settings) -> None:
+        self.app = app
+        self.enabled = config.SERVER_TIMING_ENABLED
+        self.header = config.SERVER_TIMING_HEADER.lower().encode("latin-1")
+        self.sample_rate = config.SERVER_TIMING_SAMPLE_RATE
+
+    def wanted(self, scope: Scope) -> bool:
+        """Return whether to time a request."""
+        if not self.enabled:
+            return False
+        if not self.header:
+            return True
+        if not any(name == self.header for name, _ in scope["headers"]):
+            return False
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.wanted(scope):
+            await self.app(scope, receive, send)
+            return
+        timings, token = timing.start()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(timings))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            timing.stop(token)
+
+
+def _timed_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # Keep the endpoint sync or async, so FastAPI still runs sync endpoints
+    # in the thread pool; the signature is read through ``__wrapped__``.
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def timed_async(*args: Any, **kwargs: Any) -> Any:
+            timings = timing.current()
+            if timings is None:
+                return await endpoint(*args, **kwargs)
+            with timings.measure("endpoint"):
+                return await endpoint(*args, **kwargs)
+
+        return timed_async
+
+    @functools.wraps(endpoint)
+    def timed_sync(*args: Any, **kwargs: Any) -> Any:
+        timings = timing.current()
+        if timings is None:
+            return endpoint(*args, **kwargs)
+        with timings.measure("endpoint"):
+            return endpoint(*args, **kwargs)
+
+    return timed_sync
+
+
+class TimedRoute(APIRoute):
+    """Route that times its endpoint apart from the work around it.
+
+    Use it as ``APIRouter(route_class=TimedRoute)``.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(
+        self,
+    ) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            timings = timing.current()
+            if timings is None:
+                return await handler(request)
+            with timings.measure("route"):
+                return await handler(request)
+
+        return timed_handler
@@ -0,0 +1,258 @@
+"""Online, resumable backfills for large tables.
+
+A backfill walks a table in primary-key order, ``chunk_size`` rows at a
+time. Each chunk reads its rows with a keyset predicate (``key > last``,
+an index range scan however far along it is), applies the change and
+advances its ``backfill_checkpoints`` row, all in one short transaction.
+Between chunks the runner sleeps in proportion to how long the chunk took,
+so on SQLite the write lock is free for the application most of the time.
+
+Backfills are declared once with :func:`backfill` and scheduled from an
+Alembic revision with :func:`schedule_backfill`: the revision only makes the
+cheap schema change and queues a ``backfill.run`` job, which the job
+workers run in time-boxed slices until the table is done. Restarting,
+crashing or running two slices at once is safe; a chunk whose checkpoint
+moved underneath it is rolled back and redone from the new position. With
+sharding, a backfill of a shard table walks every shard file in turn, each
+with its own checkpoint (``<name>:shard<i>``); let it finish before moving
+snippets with ``apps.db.reshard``.
+"""
+
+import logging
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any, cast
+
+from sqlalchemy import ColumnElement, Row, Table, func, insert, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from apps.core.config import settings
+from apps.db.sharding import SHARD_TABLES, is_sharded, shard_binds, shard_name
+from apps.jobs import enqueue, job_handler
+from packages.models import BackfillCheckpoint
+
+logger = logging.getLogger(__name__)
+
+BackfillApply = Callable[[Connection, Sequence[Row[Any]]], None]
+
+_checkpoints = cast(Table, BackfillCheckpoint.__table__)
+
+
+@dataclass(frozen=True, slots=True)
+class Backfill:
+    """A registered backfill.
+
+    Attributes:
+        name: Unique name, also the checkpoint key.
+        table: Table to walk.
+        apply: Called with the chunk's connection and rows; each row has the
+            key column followed by ``columns``.
+        key: Unique, indexed column the walk is ordered by.
+        columns: Extra columns to read.
+        where: Optional filter; rows not matching it are skipped.
+    """
+
+    name: str
+    table: Table
+    apply: BackfillApply
+    key: str = "id"
+    columns: tuple[str, ...] = ()
+    where: ColumnElement[bool] | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class BackfillProgress:
+    """Where a backfill stands after a run."""
+
+    name: str
+    rows_done: int
+    chunks_done: int
+    finished: bool
+
+
+BACKFILLS: dict[str, Backfill] = {}
+
+
+def backfill(
+    name: str,
+    table: Table,
+    *,
+    key: str = "id",
+    columns: Sequence[str] = (),
+    where: ColumnElement[bool] | None = None,
+) -> Callable[[BackfillApply], BackfillApply]:
+    """Register a function as the chunk body of a named backfill.
+
+    Example:
+        >>> @backfill("versions.content_hash", versions, columns=["content"])
+        ... def fill(connection: Connection, rows: Sequence[Row[Any]]) -> None:
+        ...     ...
+    """
+
+    def register(apply: BackfillApply) -> BackfillApply:
+        if name in BACKFILLS:
+            raise ValueError(f"Duplicate backfill {name!r}")
+        BACKFILLS[name] = Backfill(name, table, apply, key, tuple(columns), where)
+        return apply
+
+    return register
+
+
+def _progress(row: Any) -> BackfillProgress:
+    return BackfillProgress(
+        row.name, row.rows_done, row.chunks_done, row.finished_at is not None
+    )
+
+
+def _checkpoint(connection: Connection, name: str) -> Any:
+    row = connection.execute(
+        select(_checkpoints).where(_checkpoints.c.name == name)
+    ).first()
+    if row is not None:
+        return row
+    connection.execute(insert(_checkpoints).values(name=name))
+    return connection.execute(
+        select(_checkpoints).where(_checkpoints.c.name == name)
+    ).one()
+
+
+def _run_chunk(
+    engine: Engine, definition: Backfill, chunk_size: int, name: str
+) -> BackfillProgress | None:
+    """Process one chunk; returns ``None`` if another runner got there first."""
+    key = definition.table.c[definition.key]
+    with engine.begin() as connection:
+        checkpoint = _checkpoint(connection, name)
+        if checkpoint.finished_at is not None:
+            return _progress(checkpoint)
+        stmt = (
+            select(key, *(definition.table.c[name] for name in definition.columns))
+            .order_by(key)
+            .limit(chunk_size)
+        )
+        if checkpoint.last_key is not None:
+            stmt = stmt.where(key > key.type.python_type(checkpoint.last_key))
+        if definition.where is not None:
+            stmt = stmt.where(definition.where)
+        rows = connection.execute(stmt).all()
+        if rows:
+            definition.apply(connection, rows)
+        advanced = connection.execute(
+            update(_checkpoints)
+            .where(
+                _checkpoints.c.name == name,
+                _checkpoints.c.chunks_done == checkpoint.chunks_done,
+            )
+            .values(
+                last_key=str(rows[-1][0]) if rows else checkpoint.last_key,
+                rows_done=_checkpoints.c.rows_done + len(rows),
+                chunks_done=_checkpoints.c.chunks_done + 1,
+                finished_at=func.now() if len(rows) < chunk_size else None,
+                updated_at=func.now(),
+            )
+            .returning(_checkpoints)
+        ).first()
+        if advanced is None:
+            connection.rollback()
+            return None
+        return _progress(advanced)
+
+
+def run_backfill(
+    engine: Engine,
+    name: str,
+    *,
+    chunk_size: int | None = None,
+    duty_cycle: float | None = None,
+    time_budget: float | None = None,
+    checkpoint: str | None = None,
+) -> BackfillProgress:
+    """Run a backfill until it finishes or the time budget runs out.
+
+    Args:
+        engine: Engine to open one short transaction per chunk on; never a
+            connection that is already inside a transaction.
+        name: Registered backfill name.
+        chunk_size: Rows per chunk; defaults to ``BACKFILL_CHUNK_SIZE``.
+        duty_cycle: Fraction of wall time spent inside chunks; defaults to
+            ``BACKFILL_DUTY_CYCLE``. ``1`` disables throttling.
+        time_budget: Seconds after which to stop at the next chunk boundary;
+            ``None`` runs to completion.
+        checkpoint: Name of the checkpoint row; defaults to ``name``. Runs
+            of one backfill on different files each need their own.
+
+    Returns:
+        BackfillProgress: Progress as of the last committed chunk.
+
+    Raises:
+        KeyError: If no backfill is registered under ``name``.
+    """
+    definition = BACKFILLS[name]
+    chunk_size = chunk_size or settings.BACKFILL_CHUNK_SIZE
+    duty = duty_cycle if duty_cycle is not None else settings.BACKFILL_DUTY_CYCLE
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    while True:
+        started = time.monotonic()
+        progress = _run_chunk(engine, definition, chunk_size, checkpoint or name)
+        if progress is None:
+            logger.info("Backfill %s: checkpoint moved, retrying chunk", name)
+            continue
+        if progress.finished:
+            logger.info(
+                "Backfill %s finished: %d rows", progress.name, progress.rows_done
+            )
+            return progress
+        elapsed = time.monotonic() - started
+        if deadline is not None and time.monotonic() >= deadline:
+            return progress
+        if 0 < duty < 1:
+            time.sleep(elapsed * (1 - duty) / duty)
+
+
+def schedule_backfill(connection: Connection, name: str) -> None:
+    """Queue a backfill for the job workers, e.g. from an Alembic revision.
+
+    Call it as ``schedule_backfill(op.get_bind(), "versions.content_hash")``;
+    the job becomes visible when the revision commits. Scheduling a backfill
+    that is already queued does nothing.
+    """
+    enqueue(
+        Session(bind=connection),
+        "backfill.run",
+        {"name": name},
+        dedup_key=f"backfill:{name}",
+    )
+
+
+def _targets(db: Session, definition: Backfill) -> list[tuple[str, Engine]]:
+    # Shard tables are walked on every shard file, catalog tables once.
+    if is_sharded(db) and definition.table.name in SHARD_TABLES:
+        return [
+            (f"{definition.name}:{shard_name(index)}", engine)
+            for index, engine in enumerate(shard_binds(db))
+        ]
+    return [(definition.name, db.get_bind())]  # type: ignore[list-item]
+
+
+@job_handler("backfill.run")
+def run_job(db: Session, payload: dict[str, Any]) -> None:
+    """Run one time-boxed slice of ``payload["name"]`` and queue the next.
+
+    Chunks commit on their own connections; the continuation is queued in
+    the job's transaction and has no dedup key, because this job's key is
+    still held until it completes.
+    """
+    definition = BACKFILLS[payload["name"]]
+    deadline = time.monotonic() + settings.BACKFILL_TIME_BUDGET_SECONDS
+    for checkpoint, engine in _targets(db, definition):
+        progress = run_backfill(
+            engine,
+            definition.name,
+            time_budget=max(deadline - time.monotonic(), 0.0),
+            checkpoint=checkpoint,
+        )
+        if not progress.finished:
+            enqueue(db, "backfill.run", payload)
+            return
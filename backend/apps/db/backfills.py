@@ -0,0 +1,35 @@
+"""Registered backfills.
+
+Importing this module registers them; an Alembic revision that needs one
+queues it by name with :func:`apps.db.backfill.schedule_backfill`.
+"""
+
+from collections.abc import Sequence
+from typing import Any, cast
+
+from sqlalchemy import Row, Table, bindparam, update
+from sqlalchemy.engine import Connection
+
+from apps.db.backfill import backfill
+from packages.common.hashing import content_hash
+from packages.models import Version
+
+_versions = cast(Table, Version.__table__)
+
+
+@backfill(
+    "versions.content_hash",
+    _versions,
+    columns=["content"],
+    where=_versions.c.content_hash.is_(None),
+)
+def fill_version_content_hashes(
+    connection: Connection, rows: Sequence[Row[Any]]
+) -> None:
+    """Hash the content of versions written before the column existed."""
+    connection.execute(
+        update(_versions)
+        .where(_versions.c.id == bindparam("row_id"))
+        .values(content_hash=bindparam("digest")),
+        [{"row_id": row.id, "digest": content_hash(row.content)} for row in rows],
+    )
@@ -0,0 +1,170 @@
+"""Offline tool that moves snippets to a new number of shard files.
+
+Run with ``python -m apps.db.reshard --to M`` while the application and job
+workers are stopped, then set ``DB_SHARDS=M``. The current layout is read
+from ``DB_SHARDS`` unless ``--from`` says otherwise; 0 on either side means
+the single catalog file at ``DB_PATH``.
+
+Snippets are moved in batches, each with its versions, tag links and index
+rows. A batch is copied into the attached destination file with
+``INSERT OR IGNORE`` in one transaction, then deleted from the source in
+another, so a run interrupted at any point can simply be started again. Jump
+hashing keeps growth cheap: going from ``n`` to ``m`` shards moves only the
+snippets that land on the new files. Files left empty by shrinking are not
+deleted.
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+from collections.abc import Iterator
+from uuid import UUID
+
+from sqlalchemy import Table, create_engine
+
+from apps.core.config import settings
+from apps.db.sharding import create_shard_schema, shard_path, shard_tables
+from packages.common.sharding import shard_of
+
+logger = logging.getLogger(__name__)
+
+_DESTINATION = "destination"
+
+
+def _files(count: int) -> list[str]:
+    if count == 0:
+        return [settings.DB_PATH]
+    return [shard_path(index) for index in range(count)]
+
+
+def _columns(table: Table) -> str:
+    # Generated columns are computed again by the destination.
+    return ", ".join(
+        f'"{column.name}"' for column in table.columns if column.computed is None
+    )
+
+
+def _selection(table: Table, marks: str) -> str:
+    if table.name == "snippets":
+        return f"id IN ({marks})"
+    if table.name == "version_closure":
+        versions = f"SELECT id FROM main.versions WHERE snippet_id IN ({marks})"
+        return f"descendant_id IN ({versions})"
+    return f"snippet_id IN ({marks})"
+
+
+def _batches(conn: sqlite3.Connection, batch_size: int) -> Iterator[list[str]]:
+    last = ""
+    while True:
+        ids = [
+            row[0]
+            for row in conn.execute(
+                "SELECT id FROM main.snippets WHERE id > ? ORDER BY id LIMIT ?",
+                (last, batch_size),
+            )
+        ]
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def _transaction(
+    conn: sqlite3.Connection, statements: list[str], ids: list[str]
+) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for statement in statements:
+            conn.execute(statement, ids)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _move(conn: sqlite3.Connection, destination: str, ids: list[str]) -> None:
+    tables = shard_tables()
+    marks = ", ".join("?" * len(ids))
+    copies = [
+        f"INSERT OR IGNORE INTO {_DESTINATION}.{table.name} ({_columns(table)}) "
+        f"SELECT {_columns(table)} FROM main.{table.name} "
+        f"WHERE {_selection(table, marks)}"
+        for table in tables
+    ]
+    # Dependents first: the closure is found through the versions.
+    deletes = [
+        f"DELETE FROM main.{table.name} WHERE {_selection(table, marks)}"
+        for table in reversed(tables)
+    ]
+    conn.execute(f"ATTACH DATABASE ? AS {_DESTINATION}", (destination,))
+    try:
+        _transaction(conn, copies, ids)
+        _transaction(conn, deletes, ids)
+    finally:
+        conn.execute(f"DETACH DATABASE {_DESTINATION}")
+
+
+def reshard(source: int, target: int, *, batch_size: int = 500) -> int:
+    """Move every snippet from ``source`` shards to ``target`` shards.
+
+    Returns:
+        int: The number of snippets moved.
+    """
+    destinations = _files(target)
+    for path in destinations:
+        engine = create_engine(f"sqlite:///{path}")
+        try:
+            create_shard_schema(engine)
+        finally:
+            engine.dispose()
+    moved = 0
+    for path in _files(source):
+        if not os.path.exists(path):
+            continue
+        conn = sqlite3.connect(path, isolation_level=None)
+        try:
+            for ids in _batches(conn, batch_size):
+                groups: dict[str, list[str]] = {}
+                for snippet_id in ids:
+                    index = shard_of(UUID(snippet_id), target) if target else 0
+                    destination = destinations[index]
+                    if os.path.abspath(destination) != os.path.abspath(path):
+                        groups.setdefault(destination, []).append(snippet_id)
+                for destination, group in groups.items():
+                    _move(conn, destination, group)
+                    moved += len(group)
+        finally:
+            conn.close()
+        logger.info("Resharded %s; %d snippets moved so far", path, moved)
+    return moved
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        description="Move snippets to a new number of shard files (offline)."
+    )
+    parser.add_argument(
+        "--to", type=int, required=True, dest="target", help="New shard count"
+    )
+    parser.add_argument(
+        "--from",
+        type=int,
+        dest="source",
+        help="Current shard count (default: DB_SHARDS)",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="Snippets per transaction"
+    )
+    args = parser.parse_args(argv)
+    if args.target < 0 or (args.source is not None and args.source < 0):
+        parser.error("shard counts cannot be negative")
+    logging.basicConfig(level=logging.INFO)
+    source = settings.DB_SHARDS if args.source is None else args.source
+    moved = reshard(source, args.target, batch_size=args.batch_size)
+    logger.info("Done: %d snippets moved; now set DB_SHARDS=%d", moved, args.target)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Schema helpers for Alembic revisions."""
+
+from typing import Any
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.types import TypeEngine
+
+from packages.models.version import metadata_expression
+
+
+def migrating_shard() -> bool:
+    """Whether the running revision is being applied to a shard file.
+
+    ``migrations/env.py`` applies every revision to the catalog, then to each
+    shard file (see ``apps.db.sharding``). Shard files only hold the shard
+    tables, so a revision skips its other tables there::
+
+        if not migrating_shard():
+            op.create_table("jobs", ...)
+    """
+    return bool(op.get_context().opts.get("shard_file", False))
+
+
+def add_promoted_metadata_column(key: str, column: str, type_: TypeEngine[Any]) -> None:
+    """Promote a ``version_metadata`` key to an indexed virtual column.
+
+    SQLite adds ``VIRTUAL`` generated columns in place, so this is safe on a
+    large ``versions`` table: no row is rewritten and only the index is built.
+    Register the key in ``PROMOTED_METADATA_KEYS`` and declare the column on
+    ``Version`` in the same change.
+
+    Args:
+        key: Top-level key in ``version_metadata``.
+        column: Name of the generated column, conventionally ``meta_<key>``.
+        type_: SQL type of the extracted value.
+    """
+    op.add_column(
+        "versions",
+        sa.Column(
+            column,
+            type_,
+            sa.Computed(metadata_expression(key), persisted=False),
+            nullable=True,
+        ),
+    )
+    op.create_index(f"ix_versions_{column}", "versions", [column, "snippet_id"])
+
+
+def drop_promoted_metadata_column(column: str) -> None:
+    """Undo :func:`add_promoted_metadata_column`."""
+    op.drop_index(f"ix_versions_{column}", table_name="versions")
+    op.drop_column("versions", column)
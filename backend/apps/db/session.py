@@ -1,9 +1,17 @@
 """Database session configuration."""
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import time
+from collections.abc import Generator
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import Result, create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session, sessionmaker
 
 from apps.core.config import settings
+from apps.db.sharding import create_shard_engines, sharded_sessionmaker
+from packages.telemetry import timing
 
 engine = create_engine(
     settings.database_url,
@@ -11,8 +19,87 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if settings.DB_DRIVER == "sqlite" else {},
 )
 
-SessionLocal = sessionmaker(
-    bind=engine,
-    autocommit=False,
-    autoflush=False,
-)
+SessionLocal: sessionmaker[Any]
+if settings.DB_SHARDS > 0:
+    SessionLocal = sharded_sessionmaker(
+        create_shard_engines(engine, settings.DB_SHARDS, echo=settings.DB_ECHO),
+        autocommit=False,
+        autoflush=False,
+    )
+else:
+    SessionLocal = sessionmaker(
+        bind=engine,
+        autocommit=False,
+        autoflush=False,
+    )
+
+
+def get_db() -> Generator[Session, None, None]:
+    """Yield a database session scoped to a single request."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_session_factory() -> sessionmaker[Any]:
+    """Return the session factory, for work that may outlive the request."""
+    return SessionLocal
+
+
+# Server-Timing hooks (see ``apps.core.timing``). They listen on every
+# engine and session, so job workers and tests are covered too, and return
+# at once unless the current request is being timed.
+
+_in_orm_execute: ContextVar[bool] = ContextVar("in_orm_execute", default=False)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    if context is not None and timing.current() is not None:
+        context.timing_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    started = getattr(context, "timing_started", None)
+    if started is not None:
+        timing.record("db", time.perf_counter() - started)
+
+
+# To time hydration apart from the statement, an ORM select run during a
+# timed request is buffered: every row is fetched and every object built
+# before the result is returned, as with ``Result.freeze()``. Timed requests
+# therefore hold whole results in memory and lose lazy row fetching, which
+# can change their timings and memory use. Statements run with ``yield_per``
+# or ``stream_results`` are left alone, and requests that are not timed are
+# never buffered.
+@event.listens_for(Session, "do_orm_execute")
+def _time_orm_execute(state: ORMExecuteState) -> Result[Any] | None:
+    timings = timing.current()
+    options = state.execution_options
+    if (
+        timings is None
+        or not state.is_select
+        or _in_orm_execute.get()
+        or options.get("yield_per")
+        or options.get("stream_results")
+    ):
+        return None
+    db_before = timings.get("db")
+    started = time.perf_counter()
+    token = _in_orm_execute.set(True)
+    try:
+        # Buffer the result, so that fetching the rows and building the
+        # objects (lazy loads included) happen here, where they are timed.
+        frozen = state.invoke_statement().freeze()
+    finally:
+        _in_orm_execute.reset(token)
+    elapsed = time.perf_counter() - started
+    timings.add("orm", max(elapsed - (timings.get("db") - db_before), 0.0))
+    return frozen()
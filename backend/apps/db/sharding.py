@@ -0,0 +1,409 @@
+"""Hash-sharded SQLite storage.
+
+With ``DB_SHARDS`` above zero, snippets and the rows that belong to a single
+snippet (versions, tag links and the search and similarity indexes) are
+spread over that many SQLite files by a hash of the snippet id (see
+``packages.common.sharding``). Every other table, ``tags`` included, stays
+in the catalog at ``DB_PATH``. Each file has its own write lock, so writes
+to snippets on different shards no longer queue behind one writer.
+
+Sessions route by themselves (``sqlalchemy.ext.horizontal_shard``):
+
+- Objects are flushed to the shard of their snippet. A new snippet gets its
+  id as soon as it is routed, so its dependents follow it.
+- A statement on catalog tables only goes to the catalog. Any other one goes
+  to the shards named by an ``=`` or ``IN`` criterion on the snippet id at
+  the top level of its ``WHERE`` clause, or else to every shard, and the
+  results are concatenated. That is right for lookups and for writes keyed
+  by row, but not for ``ORDER BY ... LIMIT``: such queries go through
+  :func:`scatter`, which runs them on every shard in parallel, and combine
+  the sorted parts with :func:`merge_sorted`.
+- ``Session.connection()`` is the catalog's, which is where the change feed,
+  hot lists and queued jobs are written after a flush. Those commits are
+  not atomic with the shard's: see ``apps.services.changes``,
+  ``apps.services.hot_lists`` and ``apps.jobs.queue`` for what a crash
+  between them leaves behind.
+
+Every shard connection attaches the catalog as ``catalog``. Shard files only
+hold the shard tables, so queries that join a snippet with catalog rows,
+such as its tags or activity score, run on the shard unchanged.
+
+A transaction touching several files commits them one after the other; a
+crash in between can leave one committed without the other. ``alembic
+upgrade head`` migrates the shard files after the catalog, creating missing
+ones (see ``migrations/env.py``), and backfills walk every shard file. Shards
+are moved between files offline with ``python -m apps.db.reshard``. With
+``DB_SHARDS=0`` (the default) none of this is used.
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from heapq import merge
+from itertools import islice
+from typing import Any, TypeVar, cast
+from uuid import UUID
+
+from sqlalchemy import Connection, Engine, Table, create_engine, event, inspect
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Mapper, ORMExecuteState, Session, sessionmaker
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import (
+    BinaryExpression,
+    BindParameter,
+    BooleanClauseList,
+    ClauseElement,
+)
+from sqlalchemy.sql.util import find_tables
+
+from apps.core.config import settings
+from packages.common.ids import uuid7
+from packages.common.sharding import shard_of
+from packages.models import Base
+
+T = TypeVar("T")
+
+CATALOG = "catalog"
+
+# Tables whose rows each belong to one snippet, and live on its shard.
+SHARD_TABLES = frozenset(
+    {
+        "snippets",
+        "versions",
+        "version_closure",
+        "snippet_tags",
+        "snippet_trigrams",
+        "snippet_signatures",
+        "snippet_lsh_bands",
+    }
+)
+
+_executor: ThreadPoolExecutor | None = None
+
+
+class ShardingError(RuntimeError):
+    """A statement or object cannot be routed to a single shard."""
+
+
+def shard_name(index: int) -> str:
+    """Return the shard id of shard ``index``, e.g. ``"shard0"``."""
+    return f"shard{index}"
+
+
+def shard_path(index: int, template: str | None = None) -> str:
+    """Return the file of shard ``index`` from ``DB_SHARD_PATH``."""
+    return (template or settings.DB_SHARD_PATH).format(shard=index)
+
+
+def shard_tables() -> list[Table]:
+    """The tables kept in shard files, in dependency order."""
+    return [
+        table for table in Base.metadata.sorted_tables if table.name in SHARD_TABLES
+    ]
+
+
+def create_shard_engine(path: str, catalog_path: str, **kwargs: Any) -> Engine:
+    """Create the engine of a shard file, with the catalog attached."""
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}, **kwargs
+    )
+
+    @event.listens_for(engine, "connect")
+    def _attach_catalog(dbapi_connection: Any, _record: Any) -> None:
+        dbapi_connection.execute(f"ATTACH DATABASE ? AS {CATALOG}", (catalog_path,))
+        # A shard connection inside a write transaction keeps a read lock on
+        # the catalog it joined with, which would block the catalog's own
+        # commit in rollback journal mode.
+        for schema in ("main", CATALOG):
+            dbapi_connection.execute(f"PRAGMA {schema}.journal_mode=WAL")
+
+    return engine
+
+
+def create_shard_schema(bind: Engine | Connection) -> None:
+    """Create the shard tables that are missing from a shard file."""
+    Base.metadata.create_all(bind, tables=shard_tables())
+
+
+def create_shard_engines(
+    catalog: Engine, count: int, template: str | None = None, **kwargs: Any
+) -> dict[str, Engine]:
+    """Engines by shard id: the catalog plus ``count`` shard files."""
+    catalog_path = catalog.url.database or ""
+    engines = {CATALOG: catalog}
+    for index in range(count):
+        engines[shard_name(index)] = create_shard_engine(
+            shard_path(index, template), catalog_path, **kwargs
+        )
+    return engines
+
+
+def _key_value(value: Any) -> UUID | None:
+    if isinstance(value, BindParameter):
+        value = value.effective_value
+    if isinstance(value, UUID) or value is None:
+        return value
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _is_key(column: Any) -> bool:
+    table = getattr(column, "table", None)
+    if not isinstance(table, Table) or table.name not in SHARD_TABLES:
+        return False
+    return bool(column.name == ("id" if table.name == "snippets" else "snippet_id"))
+
+
+def _table_name(mapper: Mapper[Any]) -> str:
+    return cast(Table, mapper.local_table).name
+
+
+def _criteria_ids(clause: Any, parameters: dict[str, Any]) -> set[UUID] | None:
+    """Snippet ids a ``WHERE`` clause is limited to, if it says so plainly."""
+    if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+        for child in clause.clauses:
+            found = _criteria_ids(child, parameters)
+            if found is not None:
+                return found
+        return None
+    if (
+        not isinstance(clause, BinaryExpression)
+        or not isinstance(clause.right, BindParameter)
+        or not _is_key(clause.left)
+    ):
+        return None
+    bind = clause.right
+    value = parameters.get(bind.key, bind.effective_value)
+    if clause.operator is operators.eq:
+        values = [value]
+    elif clause.operator is operators.in_op:
+        values = list(value or ())
+    else:
+        return None
+    ids = {_key_value(item) for item in values}
+    return None if None in ids else ids  # type: ignore[return-value]
+
+
+def _inserted_ids(state: ORMExecuteState, table: Table) -> set[UUID] | None:
+    stmt: Any = state.statement
+    key = "id" if table.name == "snippets" else "snippet_id"
+    if stmt._multi_values:
+        rows = [row for values in stmt._multi_values for row in values]
+    elif stmt._values:
+        rows = [stmt._values]
+    else:
+        parameters = state.parameters or {}
+        rows = parameters if isinstance(parameters, list) else [parameters]
+    ids = set()
+    for row in rows:
+        values = {getattr(name, "key", name): value for name, value in row.items()}
+        snippet_id = _key_value(values.get(key))
+        if snippet_id is None:
+            return None
+        ids.add(snippet_id)
+    return ids
+
+
+class ShardSession(ShardedSession):
+    """Session over the catalog and ``DB_SHARDS`` shard files.
+
+    Args:
+        shards: Engines by shard id, as made by :func:`create_shard_engines`.
+    """
+
+    def __init__(self, shards: dict[str, Engine], **kwargs: Any) -> None:
+        super().__init__(
+            shard_chooser=self._choose_shard,
+            identity_chooser=self._choose_identity,
+            execute_chooser=self._choose_execution,
+            shards=shards,
+            **kwargs,
+        )
+        self.shard_ids = [shard for shard in shards if shard != CATALOG]
+        self._engines = shards
+
+    def shard_for(self, snippet_id: UUID) -> str:
+        """Return the id of the shard that holds ``snippet_id``."""
+        return shard_name(shard_of(snippet_id, len(self.shard_ids)))
+
+    def shard_engine(self, shard_id: str) -> Engine:
+        """Return the engine of a shard, or of the catalog."""
+        return self._engines[shard_id]
+
+    def get_bind(
+        self,
+        mapper: Any = None,
+        *,
+        shard_id: Any = None,
+        instance: Any = None,
+        clause: Any = None,
+        **kwargs: Any,
+    ) -> Any:
+        if shard_id is None and mapper is None and instance is None:
+            # ``Session.connection()`` and other unrouted requests.
+            shard_id = CATALOG
+        return super().get_bind(
+            mapper, shard_id=shard_id, instance=instance, clause=clause, **kwargs
+        )
+
+    def _choose_shard(
+        self,
+        mapper: Mapper[Any] | None,
+        instance: Any,
+        clause: ClauseElement | None = None,
+    ) -> str:
+        if mapper is None or _table_name(mapper) not in SHARD_TABLES:
+            return CATALOG
+        if instance is None:
+            raise ShardingError(f"Cannot route {mapper.class_.__name__} without a row")
+        if _table_name(mapper) == "snippets":
+            if instance.id is None:
+                instance.id = uuid7()
+            return self.shard_for(instance.id)
+        snippet_id = getattr(instance, "snippet_id", None)
+        if snippet_id is not None:
+            return self.shard_for(snippet_id)
+        # Not loaded, so routing never triggers a lazy load.
+        snippet = inspect(instance).dict.get("snippet")
+        if snippet is None:
+            raise ShardingError(f"{instance!r} belongs to no snippet")
+        return self._choose_shard(inspect(snippet).mapper, snippet)
+
+    def _choose_identity(
+        self,
+        mapper: Mapper[Any],
+        primary_key: Any,
+        *,
+        lazy_loaded_from: Any = None,
+        **_: Any,
+    ) -> list[str]:
+        name = _table_name(mapper)
+        if name not in SHARD_TABLES:
+            return [CATALOG]
+        if name == "snippets":
+            return [self.shard_for(primary_key[0])]
+        if lazy_loaded_from is not None and lazy_loaded_from.identity_token:
+            return [lazy_loaded_from.identity_token]
+        return self.shard_ids
+
+    def _choose_execution(self, state: ORMExecuteState) -> list[str]:
+        stmt: Any = state.statement
+        tables = {
+            table
+            for table in find_tables(
+                stmt, include_crud=True, include_joins=True, check_columns=True
+            )
+            if isinstance(table, Table) and table.name in SHARD_TABLES
+        }
+        if not tables:
+            return [CATALOG]
+        if state.is_insert:
+            ids = _inserted_ids(state, stmt.table)
+            if ids is None:
+                if stmt.select is None:
+                    raise ShardingError(f"An INSERT into {stmt.table.name} lacks ids")
+                # INSERT ... SELECT: every shard copies its own rows.
+                return self.shard_ids
+            shards = self._shards_of(ids)
+            if len(shards) > 1:
+                raise ShardingError(
+                    "An INSERT spans several shards; split it with partition()"
+                )
+            return shards
+        parameters = state.parameters if isinstance(state.parameters, dict) else {}
+        ids = _criteria_ids(getattr(stmt, "whereclause", None), parameters)
+        return self.shard_ids if ids is None else self._shards_of(ids)
+
+    def _shards_of(self, ids: set[UUID]) -> list[str]:
+        # A statement about no snippet at all still needs somewhere to run.
+        return sorted({self.shard_for(snippet_id) for snippet_id in ids}) or [
+            self.shard_ids[0]
+        ]
+
+
+def sharded_sessionmaker(
+    engines: dict[str, Engine], **kwargs: Any
+) -> sessionmaker[ShardSession]:
+    """A session factory over the engines made by :func:`create_shard_engines`."""
+    return sessionmaker(class_=ShardSession, shards=engines, **kwargs)
+
+
+def is_sharded(db: Session) -> bool:
+    """Whether ``db`` spreads snippets over shard files."""
+    return isinstance(db, ShardSession)
+
+
+def partition(
+    db: Session, items: Iterable[T], snippet_id: Callable[[T], UUID]
+) -> list[list[T]]:
+    """Split ``items`` into one group per shard of the snippets they belong to.
+
+    Multi-row writes of shard tables must be issued once per group. Without
+    sharding everything is one group.
+    """
+    items = list(items)
+    if not isinstance(db, ShardSession):
+        return [items] if items else []
+    groups: dict[str, list[T]] = {}
+    for item in items:
+        groups.setdefault(db.shard_for(snippet_id(item)), []).append(item)
+    return [groups[shard] for shard in sorted(groups)]
+
+
+def _run_on(engine: Engine, fn: Callable[[Session], T]) -> T:
+    with Session(engine) as session:
+        return fn(session)
+
+
+def scatter(db: Session, fn: Callable[[Session], T]) -> list[T]:
+    """Run ``fn`` once per shard, in parallel, and return the results.
+
+    Each call gets a session of its own on one shard file, with the catalog
+    attached, so it sees committed data only. Without sharding ``fn`` is
+    called once with ``db``.
+    """
+    global _executor
+    if not isinstance(db, ShardSession):
+        return [fn(db)]
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=len(db.shard_ids), thread_name_prefix="shard"
+        )
+    futures = [
+        _executor.submit(_run_on, db.shard_engine(shard), fn) for shard in db.shard_ids
+    ]
+    return [future.result() for future in futures]
+
+
+def merge_sorted(
+    parts: Iterable[Iterable[T]],
+    *,
+    key: Callable[[T], Any],
+    reverse: bool = False,
+    limit: int | None = None,
+) -> list[T]:
+    """Merge lists each sorted by ``key`` into one, keeping the first ``limit``."""
+    merged: Iterator[T] = merge(*parts, key=key, reverse=reverse)
+    return list(islice(merged, limit))
+
+
+def snippet_bind(db: Session, snippet_id: UUID) -> Engine:
+    """The engine of the file that holds ``snippet_id``."""
+    if isinstance(db, ShardSession):
+        return db.shard_engine(db.shard_for(snippet_id))
+    return db.get_bind()  # type: ignore[return-value]
+
+
+def snippet_connection(db: Session, snippet_id: UUID) -> Connection:
+    """The connection of ``db``'s transaction to the file of ``snippet_id``."""
+    if isinstance(db, ShardSession):
+        return db.connection(bind_arguments={"shard_id": db.shard_for(snippet_id)})
+    return db.connection()
+
+
+def shard_binds(db: Session) -> list[Engine]:
+    """The engines of all files holding snippets."""
+    if isinstance(db, ShardSession):
+        return [db.shard_engine(shard) for shard in db.shard_ids]
+    return [db.get_bind()]  # type: ignore[list-item]
@@ -0,0 +1,7 @@
+"""Durable background jobs stored in the application database."""
+
+from apps.jobs.queue import enqueue, schedule_next
+from apps.jobs.registry import job_handler
+from apps.jobs.worker import JobWorkerPool
+
+__all__ = ["JobWorkerPool", "enqueue", "job_handler", "schedule_next"]
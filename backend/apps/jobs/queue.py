@@ -0,0 +1,249 @@
+"""Job queue operations on the ``jobs`` table.
+
+Every operation is a single statement, so claiming is atomic even with
+several worker processes sharing the database.
+
+With ``DB_SHARDS`` set, ``jobs`` is a catalog table, and a handler's or an
+enqueuer's writes to snippet rows commit in their shard file separately
+from the job row. A crash in between can rerun a job whose writes were
+kept, or queue one for a write that was lost, so handlers must be
+idempotent and treat a missing row as nothing to do.
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, cast
+from uuid import UUID
+
+from sqlalchemy import CursorResult, Executable, delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from apps.core.config import settings
+from packages.models import Job, JobStatus
+
+# session.info key of a next run requested by the running handler.
+_NEXT = "jobs.next"
+
+
+@dataclass(frozen=True, slots=True)
+class ClaimedJob:
+    """Snapshot of a job handed to a worker."""
+
+    id: UUID
+    kind: str
+    payload: dict[str, Any]
+    attempts: int
+    max_attempts: int
+    priority: int = 0
+    dedup_key: str | None = None
+
+
+def utcnow() -> datetime:
+    """Current time in UTC, the clock all job timestamps use."""
+    return datetime.now(timezone.utc)
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict[str, Any] | None = None,
+    *,
+    priority: int = 0,
+    dedup_key: str | None = None,
+    delay: float = 0,
+    max_attempts: int | None = None,
+) -> UUID | None:
+    """Add a job to the queue.
+
+    The insert joins the caller's transaction, so a job enqueued next to a
+    write is only visible once that write commits (though, with sharding,
+    not atomically with it; see the module notes).
+
+    Args:
+        db: Database session; the caller commits.
+        kind: Registered handler name.
+        payload: JSON-serializable handler arguments.
+        priority: Higher values run first.
+        dedup_key: While a job with this key is pending or running, further
+            enqueues with the same key are dropped.
+        delay: Seconds before the job becomes eligible.
+        max_attempts: Attempts before the job is marked failed.
+
+    Returns:
+        UUID | None: The new job id, or ``None`` if deduplicated.
+    """
+    stmt = (
+        insert(Job)
+        .values(
+            kind=kind,
+            payload=payload or {},
+            priority=priority,
+            dedup_key=dedup_key,
+            run_after=utcnow() + timedelta(seconds=delay),
+            max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        )
+        .on_conflict_do_nothing()
+        .returning(Job.id)
+    )
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def claim(db: Session, visibility_timeout: float) -> ClaimedJob | None:
+    """Lease the most urgent eligible job and commit the lease.
+
+    Returns:
+        ClaimedJob | None: The leased job, or ``None`` if the queue is idle.
+    """
+    now = utcnow()
+    next_job = (
+        select(Job.id)
+        .where(Job.status == JobStatus.PENDING.value, Job.run_after <= now)
+        .order_by(Job.priority.desc(), Job.run_after)
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(Job)
+        .where(Job.id == next_job, Job.status == JobStatus.PENDING.value)
+        .values(
+            status=JobStatus.RUNNING.value,
+            attempts=Job.attempts + 1,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+        )
+        .returning(
+            Job.id,
+            Job.kind,
+            Job.payload,
+            Job.attempts,
+            Job.max_attempts,
+            Job.priority,
+            Job.dedup_key,
+        )
+    )
+    row = db.execute(stmt).first()
+    db.commit()
+    if row is None:
+        return None
+    return ClaimedJob(
+        row.id,
+        row.kind,
+        row.payload,
+        row.attempts,
+        row.max_attempts,
+        row.priority,
+        row.dedup_key,
+    )
+
+
+def schedule_next(
+    db: Session, payload: dict[str, Any] | None = None, *, delay: float = 0
+) -> None:
+    """From inside a handler, run the current job's kind again later.
+
+    The new job is queued when this run succeeds, in the same transaction
+    and after the run has released its dedup key, so it takes the key over:
+    a self-rescheduling job stays a single chain, and deduplicated enqueues
+    of the same kind made meanwhile are dropped. Handlers called outside a
+    worker only record the request.
+
+    Args:
+        db: The handler's session.
+        payload: Payload of the next run.
+        delay: Seconds before the next run becomes eligible.
+    """
+    db.info[_NEXT] = (payload, delay)
+
+
+def mark_succeeded(db: Session, job: ClaimedJob) -> bool:
+    """Record success; returns ``False`` if the lease was lost meanwhile.
+
+    A next run requested with :func:`schedule_next` is queued as well.
+    """
+    stmt = (
+        update(Job)
+        .where(*_lease_held(job))
+        .values(
+            status=JobStatus.SUCCEEDED.value,
+            locked_until=None,
+            finished_at=utcnow(),
+        )
+    )
+    if _rowcount(db, stmt) != 1:
+        return False
+    if _NEXT in db.info:
+        payload, delay = db.info.pop(_NEXT)
+        enqueue(
+            db,
+            job.kind,
+            payload,
+            priority=job.priority,
+            dedup_key=job.dedup_key,
+            delay=delay,
+            max_attempts=job.max_attempts,
+        )
+    return True
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter for the given attempt count."""
+    base = settings.JOBS_RETRY_BASE_SECONDS * 2.0 ** max(attempts - 1, 0)
+    delay = min(base, settings.JOBS_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def mark_failed(
+    db: Session, job: ClaimedJob, error: str, *, retry: bool = True
+) -> bool:
+    """Schedule a retry with backoff, or fail the job for good.
+
+    Jobs are retried while attempts remain, unless ``retry`` is ``False``.
+
+    Returns:
+        bool: ``False`` if the lease was lost meanwhile.
+    """
+    values: dict[str, Any] = {"last_error": error[:2000], "locked_until": None}
+    if retry and job.attempts < job.max_attempts:
+        values["status"] = JobStatus.PENDING.value
+        values["run_after"] = utcnow() + timedelta(seconds=retry_delay(job.attempts))
+    else:
+        values["status"] = JobStatus.FAILED.value
+        values["finished_at"] = utcnow()
+    stmt = update(Job).where(*_lease_held(job)).values(**values)
+    return _rowcount(db, stmt) == 1
+
+
+def requeue_expired(db: Session) -> int:
+    """Return jobs whose lease ran out (crashed or stuck worker) to the queue."""
+    stmt = (
+        update(Job)
+        .where(Job.status == JobStatus.RUNNING.value, Job.locked_until < utcnow())
+        .values(status=JobStatus.PENDING.value, locked_until=None)
+    )
+    count = _rowcount(db, stmt)
+    db.commit()
+    return count
+
+
+def purge_finished(db: Session, older_than: timedelta) -> int:
+    """Delete succeeded and failed jobs finished before the cutoff."""
+    stmt = delete(Job).where(
+        Job.status.in_([JobStatus.SUCCEEDED.value, JobStatus.FAILED.value]),
+        Job.finished_at < utcnow() - older_than,
+    )
+    count = _rowcount(db, stmt)
+    db.commit()
+    return count
+
+
+def _rowcount(db: Session, stmt: Executable) -> int:
+    return cast(CursorResult[Any], db.execute(stmt)).rowcount
+
+
+def _lease_held(job: ClaimedJob) -> tuple[Any, ...]:
+    return (
+        Job.id == job.id,
+        Job.status == JobStatus.RUNNING.value,
+        Job.attempts == job.attempts,
+    )
@@ -0,0 +1,32 @@
+"""Job handler registry."""
+
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+JobHandler = Callable[[Session, dict[str, Any]], None]
+
+JOB_HANDLERS: dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Register a function as the handler for a job kind.
+
+    Handlers run in a worker thread with their own session. Whatever they
+    write is committed together with the job's completion, and rolled back
+    if they raise.
+
+    Example:
+        >>> @job_handler("search.reindex")
+        ... def reindex(db: Session, payload: dict[str, Any]) -> None:
+        ...     ...
+    """
+
+    def register(handler: JobHandler) -> JobHandler:
+        if kind in JOB_HANDLERS:
+            raise ValueError(f"Duplicate handler for job kind {kind!r}")
+        JOB_HANDLERS[kind] = handler
+        return handler
+
+    return register
@@ -0,0 +1,123 @@
+"""Asyncio worker pool that drains the job queue."""
+
+import asyncio
+import contextlib
+import logging
+import time
+import traceback
+from collections.abc import Callable
+from datetime import timedelta
+
+from sqlalchemy.orm import Session
+
+from apps.core.config import settings
+from apps.db.session import SessionLocal
+from apps.jobs import queue
+from apps.jobs.registry import JOB_HANDLERS
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorkerPool:
+    """Run queued jobs on a fixed number of asyncio workers.
+
+    Workers claim jobs and execute handlers in threads, so the event loop
+    stays free while handlers touch the database. Between claims they
+    return expired leases to the queue and, every ``JOBS_PURGE_INTERVAL``
+    seconds, delete jobs finished more than ``JOBS_RETENTION_HOURS`` ago.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        *,
+        concurrency: int | None = None,
+        poll_interval: float | None = None,
+        visibility_timeout: float | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.concurrency = concurrency or settings.JOBS_WORKERS
+        self.poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+        self.visibility_timeout = visibility_timeout or settings.JOBS_VISIBILITY_TIMEOUT
+        self._stopping = asyncio.Event()
+        self._tasks: list[asyncio.Task[None]] = []
+        self._last_requeue = 0.0
+        self._last_purge: float | None = None
+
+    async def start(self) -> None:
+        """Spawn the workers."""
+        self._stopping.clear()
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"job-worker-{index}")
+            for index in range(self.concurrency)
+        ]
+        logger.info("Started %d job workers", self.concurrency)
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Let running jobs finish, then stop the workers."""
+        self._stopping.set()
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        self._tasks = []
+
+    async def run_once(self) -> bool:
+        """Claim and execute one job; returns ``False`` if none was ready."""
+        job = await asyncio.to_thread(self._claim)
+        if job is None:
+            return False
+        await asyncio.to_thread(self._execute, job)
+        return True
+
+    async def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                ran = await self.run_once()
+            except Exception:
+                logger.exception("Job worker iteration failed")
+                ran = False
+            if not ran:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+
+    def _claim(self) -> queue.ClaimedJob | None:
+        with self.session_factory() as db:
+            now = time.monotonic()
+            if now - self._last_requeue >= self.visibility_timeout / 2:
+                self._last_requeue = now
+                queue.requeue_expired(db)
+            if (
+                self._last_purge is None
+                or now - self._last_purge >= settings.JOBS_PURGE_INTERVAL
+            ):
+                self._last_purge = now
+                queue.purge_finished(db, timedelta(hours=settings.JOBS_RETENTION_HOURS))
+            return queue.claim(db, self.visibility_timeout)
+
+    def _execute(self, job: queue.ClaimedJob) -> None:
+        handler = JOB_HANDLERS.get(job.kind)
+        with self.session_factory() as db:
+            if handler is None:
+                queue.mark_failed(
+                    db,
+                    job,
+                    f"No handler registered for job kind {job.kind!r}",
+                    retry=False,
+                )
+                db.commit()
+                return
+            try:
+                handler(db, job.payload)
+                if not queue.mark_succeeded(db, job):
+                    # The lease expired and another worker took the job over.
+                    db.rollback()
+                    logger.warning("Lost lease on job %s", job.id)
+                    return
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception("Job %s (%s) failed", job.id, job.kind)
+                queue.mark_failed(db, job, traceback.format_exc())
+                db.commit()
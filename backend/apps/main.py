@@ -1,12 +1,61 @@
 """Main application module."""
 
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from sqlalchemy.exc import SQLAlchemyError
 
+from apps.api import admin, changes, collab, search, snippets, versions
 from apps.api.schemas import ErrorResponse, HealthCheck, RootResponse
+from apps.core.admission import AdmissionControlMiddleware
 from apps.core.config import settings
 from apps.core.docs import custom_openapi
+from apps.core.exceptions import CodeWaveError
+from apps.core.timing import ServerTimingMiddleware
+from apps.db import backfills  # noqa: F401  # registers backfills for the workers
+from apps.db.session import SessionLocal
+from apps.jobs import JobWorkerPool
+from apps.services.archive import schedule_archiving
+from apps.services.changes import change_feed
+from apps.services.code_search import shutdown_verifiers
+from apps.services.collab import collab_sessions
+from apps.services.highlight import shutdown_executor
+
+logger = logging.getLogger(__name__)
+
+
+def _schedule_periodic_jobs() -> None:
+    # Each run queues the next; this starts the chains that are not queued.
+    with SessionLocal() as db:
+        schedule_archiving(db)
+        db.commit()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Start and stop background services with the application."""
+    workers = JobWorkerPool() if settings.JOBS_ENABLED else None
+    if workers is not None:
+        try:
+            await asyncio.to_thread(_schedule_periodic_jobs)
+        except SQLAlchemyError:
+            logger.exception("Could not queue the periodic jobs")
+        await workers.start()
+    try:
+        yield
+    finally:
+        if workers is not None:
+            await workers.stop()
+        await collab_sessions.stop()
+        await change_feed.stop()
+        shutdown_executor()
+        shutdown_verifiers()
+
 
 app = FastAPI(
     title=settings.API_TITLE,
@@ -15,8 +64,13 @@ app = FastAPI(
     docs_url=settings.API_DOCS_URL,
     redoc_url=settings.API_REDOC_URL,
     openapi_url=settings.API_OPENAPI_URL,
+    lifespan=lifespan,
 )
 
+# Configure admission control (added first so CORS headers wrap its 503s)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -26,9 +80,21 @@ app.add_middleware(
     allow_credentials=True,
 )
 
+# Configure Server-Timing (outermost, so admission queueing is included)
+if settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+
 # Configure custom OpenAPI
 app.openapi = custom_openapi  # type: ignore
 
+# Routers
+app.include_router(admin.router, prefix=settings.API_V1_PREFIX)
+app.include_router(changes.router, prefix=settings.API_V1_PREFIX)
+app.include_router(collab.router, prefix=settings.API_V1_PREFIX)
+app.include_router(search.router, prefix=settings.API_V1_PREFIX)
+app.include_router(snippets.router, prefix=settings.API_V1_PREFIX)
+app.include_router(versions.router, prefix=settings.API_V1_PREFIX)
+
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
@@ -42,6 +108,20 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
     )
 
 
+@app.exception_handler(CodeWaveError)
+async def codewave_exception_handler(
+    request: Request, exc: CodeWaveError
+) -> JSONResponse:
+    """Handle domain exceptions raised by services."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content=ErrorResponse(
+            detail=exc.detail,
+            error_code=exc.error_code,
+        ).model_dump(),
+    )
+
+
 @app.get(
     "/",
     tags=["root"],
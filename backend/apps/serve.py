@@ -0,0 +1,183 @@
+"""Production server entry point.
+
+Run with ``python -m apps.serve`` (or the ``codewave-serve`` script). All
+tuning comes from ``Settings``; command line flags override host, port and
+worker count.
+
+With the ``server`` extra installed (``poetry install -E server``), gunicorn
+supervises ``UvicornWorker`` processes forked from a master that has the
+application preloaded, and replaces each worker after its request budget.
+
+Without it uvicorn's own process manager is used, which is a fallback rather
+than an equivalent:
+
+- workers are spawned, not forked, so each imports the application itself
+  and nothing is shared copy-on-write;
+- workers have no request budget and are never recycled, so
+  ``SERVER_MAX_REQUESTS`` and ``SERVER_MAX_REQUESTS_JITTER`` are ignored.
+
+uvloop and httptools are picked up automatically when installed
+(``uvicorn[standard]``).
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any
+
+from apps.core.config import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+APP_IMPORT_PATH = "apps.main:app"
+
+
+@dataclass(frozen=True, slots=True)
+class ServerConfig:
+    """Resolved serving options."""
+
+    host: str
+    port: int
+    workers: int
+    backlog: int
+    keepalive_timeout: int
+    max_requests: int
+    max_requests_jitter: int
+    graceful_timeout: int
+    limit_concurrency: int | None
+
+
+def available_cores() -> int:
+    """Return the number of CPU cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def build_server_config(
+    config: Settings,
+    *,
+    host: str | None = None,
+    port: int | None = None,
+    workers: int | None = None,
+) -> ServerConfig:
+    """Resolve serving options from settings and overrides.
+
+    ``SERVER_WORKERS=0`` sizes the pool to one worker per available core.
+    """
+    worker_count = workers if workers is not None else config.SERVER_WORKERS
+    if worker_count <= 0:
+        worker_count = available_cores()
+    return ServerConfig(
+        host=host or config.APP_HOST,
+        port=port or config.APP_PORT,
+        workers=worker_count,
+        backlog=config.SERVER_BACKLOG,
+        keepalive_timeout=config.SERVER_KEEPALIVE_TIMEOUT,
+        max_requests=config.SERVER_MAX_REQUESTS,
+        max_requests_jitter=config.SERVER_MAX_REQUESTS_JITTER,
+        graceful_timeout=config.SERVER_GRACEFUL_TIMEOUT,
+        limit_concurrency=config.SERVER_LIMIT_CONCURRENCY,
+    )
+
+
+def gunicorn_options(config: ServerConfig) -> dict[str, Any]:
+    """Translate a server config into gunicorn settings."""
+    return {
+        "bind": f"{config.host}:{config.port}",
+        "workers": config.workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "backlog": config.backlog,
+        "keepalive": config.keepalive_timeout,
+        "max_requests": config.max_requests,
+        "max_requests_jitter": config.max_requests_jitter,
+        "graceful_timeout": config.graceful_timeout,
+        "timeout": config.graceful_timeout + 30,
+        "worker_connections": config.limit_concurrency or 1000,
+    }
+
+
+def uvicorn_options(config: ServerConfig) -> dict[str, Any]:
+    """Translate a server config into ``uvicorn.run`` keyword arguments."""
+    return {
+        "host": config.host,
+        "port": config.port,
+        "workers": config.workers,
+        "loop": "auto",
+        "http": "auto",
+        "backlog": config.backlog,
+        "timeout_keep_alive": config.keepalive_timeout,
+        "limit_concurrency": config.limit_concurrency,
+        "timeout_graceful_shutdown": config.graceful_timeout,
+        "proxy_headers": True,
+    }
+
+
+def _serve_gunicorn(config: ServerConfig) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class _Application(BaseApplication):
+        def load_config(self) -> None:
+            for key, value in gunicorn_options(config).items():
+                self.cfg.set(key, value)
+
+        def load(self) -> Any:
+            from apps.main import app
+
+            return app
+
+    _Application().run()
+
+
+def _serve_uvicorn(config: ServerConfig) -> None:
+    import uvicorn
+
+    if config.max_requests:
+        logger.warning(
+            "Worker recycling (SERVER_MAX_REQUESTS) needs gunicorn, from the "
+            "server extra; running without it"
+        )
+    # Only a smoke test: a broken app fails here, once, rather than in every
+    # worker. The workers are spawned and import the app again themselves.
+    importlib.import_module(APP_IMPORT_PATH.split(":")[0])
+    uvicorn.run(APP_IMPORT_PATH, **uvicorn_options(config))
+
+
+def serve(config: ServerConfig) -> None:
+    """Run the application until it receives a shutdown signal."""
+    logger.info(
+        "Serving %s on %s:%d with %d workers",
+        APP_IMPORT_PATH,
+        config.host,
+        config.port,
+        config.workers,
+    )
+    if importlib.util.find_spec("gunicorn") is not None:
+        _serve_gunicorn(config)
+    else:
+        _serve_uvicorn(config)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Serve the CodeWave API.")
+    parser.add_argument("--host", help="Bind address (default: APP_HOST)")
+    parser.add_argument("--port", type=int, help="Bind port (default: APP_PORT)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Worker processes; 0 means one per core (default: SERVER_WORKERS)",
+    )
+    args = parser.parse_args(argv)
+    serve(
+        build_server_config(
+            settings, host=args.host, port=args.port, workers=args.workers
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""Cold storage of old versions in pack files.
+
+Superseded versions older than ``ARCHIVE_AFTER_DAYS`` are moved out of the
+database by the ``versions.archive`` job: a batch is written to a new
+immutable pack file (see ``packages.common.packfile``), then the rows are
+pointed at their records and their ``content`` is emptied, in one
+transaction. The current version of a snippet is never archived.
+
+Reads stay transparent. :func:`load_contents` is the way to fetch version
+bodies by id, and ORM-loaded ``Version`` objects get their ``content``
+filled in from the pack whenever it is loaded or refreshed. Packs are
+memory-mapped and kept open in a small LRU, so a read is a page-cache slice
+plus one decompression; :func:`stream_archived` decompresses a body piece by
+piece instead.
+
+The archive job runs every ``ARCHIVE_INTERVAL_SECONDS``; the application
+queues the first run at startup (see :func:`schedule_archiving`) and each run
+queues the next. The ``packs.compact`` job, queued after a run that emptied
+the backlog, merges packs whose live records (after snippets
+were deleted) fall below ``ARCHIVE_COMPACT_THRESHOLD`` of their size into a
+new pack, copying compressed records as they are. Pack files no row points
+at are deleted one grace period later, which also covers files left behind
+by a failed archive transaction and readers still using a replaced pack.
+"""
+
+import contextlib
+import logging
+import os
+import time
+from collections.abc import Iterable, Iterator
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, cast
+from uuid import UUID
+
+from sqlalchemy import (
+    Table,
+    bindparam,
+    delete,
+    event,
+    exists,
+    func,
+    insert,
+    inspect,
+    select,
+    update,
+)
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.attributes import set_committed_value
+
+from apps.core.config import settings
+from apps.db.sharding import merge_sorted, scatter
+from apps.jobs import enqueue, job_handler, schedule_next
+from apps.jobs.queue import utcnow
+from packages.common.cache import LRUCache
+from packages.common.hashing import content_hash
+from packages.common.ids import uuid7
+from packages.common.packfile import MAGIC, PackReader, PackWriter
+from packages.models import Version, VersionPack
+
+logger = logging.getLogger(__name__)
+
+# Unreferenced pack files younger than this are left alone.
+_ORPHAN_GRACE_SECONDS = 3600.0
+_ARCHIVE_KEY = "versions.archive"
+
+_versions = cast(Table, Version.__table__)
+_readers: LRUCache[UUID, PackReader] = LRUCache(settings.ARCHIVE_OPEN_PACKS)
+
+
+def pack_path(pack_id: UUID) -> Path:
+    """Path of a pack file."""
+    return Path(settings.ARCHIVE_DIR) / f"{pack_id}.pack"
+
+
+def _reader(pack_id: UUID) -> PackReader:
+    reader = _readers.get(pack_id)
+    if reader is None:
+        # Evicted readers are unmapped when the last reference goes away.
+        reader = PackReader(pack_path(pack_id))
+        _readers.set(pack_id, reader)
+    return reader
+
+
+def read_archived(version_id: UUID, pack_id: UUID, offset: int, length: int) -> str:
+    """Read an archived version body.
+
+    Raises:
+        PackCorruptError: If the record is damaged or belongs to another id.
+    """
+    return _reader(pack_id).read(offset, length, version_id).decode("utf-8")
+
+
+def stream_archived(
+    version_id: UUID, pack_id: UUID, offset: int, length: int, *, chunk_size: int
+) -> tuple[int, Iterator[bytes]]:
+    """Read an archived version body piece by piece.
+
+    Returns:
+        tuple[int, Iterator[bytes]]: Length of the UTF-8 body, and the body
+        in pieces of at most ``chunk_size`` bytes.
+
+    Raises:
+        PackCorruptError: If the record is damaged or belongs to another id;
+            a bad checksum is only noticed at the end of the iteration.
+    """
+    reader = _reader(pack_id)
+    size = reader.raw_length(offset, length, version_id)
+    return size, reader.stream(offset, length, version_id, chunk_size=chunk_size)
+
+
+def load_contents(db: Session, version_ids: Iterable[UUID]) -> dict[UUID, str]:
+    """Return the content of versions, wherever it is stored.
+
+    Missing ids are left out of the result.
+    """
+    rows = db.execute(
+        select(
+            Version.id,
+            Version.content,
+            Version.pack_id,
+            Version.pack_offset,
+            Version.pack_length,
+        ).where(Version.id.in_(set(version_ids)))
+    ).all()
+    return {
+        row.id: (
+            row.content
+            if row.pack_id is None
+            else read_archived(row.id, row.pack_id, row.pack_offset, row.pack_length)
+        )
+        for row in rows
+    }
+
+
+def _fill_archived(target: Version) -> None:
+    loaded = inspect(target).dict
+    if loaded.get("pack_id") is None or "content" not in loaded:
+        return
+    content = read_archived(
+        loaded["id"], loaded["pack_id"], loaded["pack_offset"], loaded["pack_length"]
+    )
+    set_committed_value(target, "content", content)
+
+
+@event.listens_for(Version, "load")
+def _on_version_load(target: Version, _context: Any) -> None:
+    _fill_archived(target)
+
+
+# Expired objects are reloaded through these rather than ``load``.
+@event.listens_for(Version, "refresh")
+@event.listens_for(Version, "refresh_flush")
+def _on_version_refresh(
+    target: Version, _context: Any, attrs: Iterable[str] | None
+) -> None:
+    if attrs is None or "content" in attrs:
+        _fill_archived(target)
+
+
+def archive_versions(
+    db: Session, *, older_than: timedelta | None = None, limit: int | None = None
+) -> int:
+    """Move one batch of old, superseded versions into a new pack.
+
+    Args:
+        db: Database session; the caller commits. Until then the new pack is
+            an unreferenced file, and on shards, which are read through
+            :func:`~apps.db.sharding.scatter`, the next batch would pick the
+            same versions again.
+        older_than: Minimum age; defaults to ``ARCHIVE_AFTER_DAYS``.
+        limit: Versions per pack; defaults to ``ARCHIVE_BATCH_SIZE``.
+
+    Returns:
+        int: Number of versions archived.
+    """
+    if older_than is None:
+        older_than = timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    limit = limit or settings.ARCHIVE_BATCH_SIZE
+    newer = aliased(Version)
+    stmt = (
+        select(Version.id, Version.content)
+        .where(
+            Version.pack_id.is_(None),
+            Version.created_at < utcnow() - older_than,
+            exists().where(
+                newer.snippet_id == Version.snippet_id,
+                newer.version_number > Version.version_number,
+            ),
+        )
+        .order_by(Version.id)
+        .limit(limit)
+    )
+    # Every shard offers its first candidates; the batch is the first of all.
+    rows = merge_sorted(
+        scatter(db, lambda shard: shard.execute(stmt).all()),
+        key=lambda row: row.id,
+        limit=limit,
+    )
+    if not rows:
+        return 0
+
+    pack_id = uuid7()
+    path = pack_path(pack_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with PackWriter(path) as writer:
+        pointers = [
+            (row, *writer.append(row.id, row.content.encode("utf-8"))) for row in rows
+        ]
+    db.execute(
+        insert(VersionPack).values(
+            id=pack_id, size=writer.size, record_count=writer.count
+        )
+    )
+    db.execute(
+        update(_versions)
+        .where(_versions.c.id == bindparam("row_id"), _versions.c.pack_id.is_(None))
+        .values(
+            pack_id=pack_id,
+            pack_offset=bindparam("offset"),
+            pack_length=bindparam("length"),
+            content="",
+            # Rows still waiting for the content hash backfill get it now,
+            # while the content is at hand.
+            content_hash=func.coalesce(_versions.c.content_hash, bindparam("digest")),
+        ),
+        [
+            {
+                "row_id": row.id,
+                "offset": offset,
+                "length": length,
+                "digest": content_hash(row.content),
+            }
+            for row, offset, length in pointers
+        ],
+    )
+    logger.info("Archived %d versions into %s", len(rows), path.name)
+    return len(rows)
+
+
+def _sweep_orphans(referenced: set[UUID]) -> int:
+    directory = Path(settings.ARCHIVE_DIR)
+    if not directory.is_dir():
+        return 0
+    cutoff = time.time() - _ORPHAN_GRACE_SECONDS
+    removed = 0
+    for path in directory.glob("*.pack*"):
+        stem = path.name.split(".", 1)[0]
+        try:
+            pack_id = UUID(stem)
+        except ValueError:
+            continue
+        if pack_id in referenced or path.stat().st_mtime > cutoff:
+            continue
+        path.unlink(missing_ok=True)
+        _readers.pop(pack_id)
+        removed += 1
+    return removed
+
+
+def compact_packs(db: Session, *, threshold: float | None = None) -> int:
+    """Merge sparse packs into one new pack and drop empty ones.
+
+    Args:
+        db: Database session; the caller commits.
+        threshold: Live share of a pack's records below which it is
+            rewritten; defaults to ``ARCHIVE_COMPACT_THRESHOLD``.
+
+    Returns:
+        int: Number of packs retired.
+    """
+    if threshold is None:
+        threshold = settings.ARCHIVE_COMPACT_THRESHOLD
+    _sweep_orphans(set(db.scalars(select(VersionPack.id))))
+    # A pack's records can be spread over every shard; add up their parts.
+    sums = (
+        select(Version.pack_id, func.sum(Version.pack_length))
+        .where(Version.pack_id.is_not(None))
+        .group_by(Version.pack_id)
+    )
+    live: dict[UUID | None, int] = {}
+    for part in scatter(db, lambda shard: shard.execute(sums).tuples().all()):
+        for pack_id, length in part:
+            live[pack_id] = live.get(pack_id, 0) + (length or 0)
+    packs = db.scalars(select(VersionPack)).all()
+    retired = [
+        pack.id
+        for pack in packs
+        if (live.get(pack.id) or 0) < threshold * (pack.size - len(MAGIC))
+    ]
+    if retired:
+        rows = db.execute(
+            select(
+                Version.id, Version.pack_id, Version.pack_offset, Version.pack_length
+            )
+            .where(Version.pack_id.in_(retired))
+            .order_by(Version.id)
+        ).all()
+        if rows:
+            pack_id = uuid7()
+            with PackWriter(pack_path(pack_id)) as writer:
+                moves = [
+                    (
+                        row,
+                        *writer.append_raw(
+                            *_reader(row.pack_id).raw(row.pack_offset, row.pack_length)
+                        ),
+                    )
+                    for row in rows
+                ]
+            db.execute(
+                insert(VersionPack).values(
+                    id=pack_id, size=writer.size, record_count=writer.count
+                )
+            )
+            db.execute(
+                update(_versions)
+                .where(
+                    _versions.c.id == bindparam("row_id"),
+                    _versions.c.pack_id == bindparam("old_pack"),
+                )
+                .values(
+                    pack_id=pack_id,
+                    pack_offset=bindparam("offset"),
+                    pack_length=bindparam("length"),
+                ),
+                [
+                    {
+                        "row_id": row.id,
+                        "old_pack": row.pack_id,
+                        "offset": offset,
+                        "length": length,
+                    }
+                    for row, offset, length in moves
+                ],
+            )
+        db.execute(delete(VersionPack).where(VersionPack.id.in_(retired)))
+        # Restart the grace period: readers may still hold the old pointers.
+        for old_pack in retired:
+            with contextlib.suppress(FileNotFoundError):
+                os.utime(pack_path(old_pack))
+        logger.info("Compacted %d packs", len(retired))
+    return len(retired)
+
+
+def schedule_archiving(db: Session) -> None:
+    """Queue the archive job unless it is already queued or running.
+
+    Args:
+        db: Database session; the caller commits.
+    """
+    enqueue(db, "versions.archive", dedup_key=_ARCHIVE_KEY)
+
+
+@job_handler("versions.archive")
+def archive_job(db: Session, payload: dict[str, Any]) -> None:
+    """Archive one batch; run again at once while batches are full.
+
+    Once the backlog is cleared, compaction is queued and the next run is
+    due after ``ARCHIVE_INTERVAL_SECONDS``.
+    """
+    if archive_versions(db) >= settings.ARCHIVE_BATCH_SIZE:
+        schedule_next(db, payload)
+    else:
+        enqueue(db, "packs.compact", dedup_key="packs.compact")
+        schedule_next(db, payload, delay=settings.ARCHIVE_INTERVAL_SECONDS)
+
+
+@job_handler("packs.compact")
+def compact_job(db: Session, payload: dict[str, Any]) -> None:
+    """Compact sparse packs and delete unreferenced pack files."""
+    compact_packs(db)
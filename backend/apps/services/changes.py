@@ -0,0 +1,339 @@
+"""Sequenced change feed.
+
+Every insert, update and delete of a snippet, version or tag link appends a
+``changelog`` row in the same transaction (see ``ChangeLogEntry``), from the
+ORM flush or, for the set-based statements in ``apps.services.tags``, through
+:func:`record_changes`. Clients keep the last ``seq`` they applied and ask
+for what came after it, either by paging with :func:`changes_since` or by
+holding a stream open on :class:`ChangeFeed`. A soft-deleted snippet is
+reported as a ``delete`` of the snippet; a deleted snippet implies the
+deletion of its versions and tag links.
+
+One :class:`ChangeFeed` tails the table per process and fans each batch out
+to the connected streams, so the database sees one indexed range read per
+new batch rather than one poller per client. Commits in this process wake
+the tailer at once; commits elsewhere are picked up on the next poll. A
+stream that falls too far behind, or joins with an old cursor, catches up
+from the table and then rejoins the live fan-out.
+
+With ``DB_SHARDS`` set, the changelog lives in the catalog while snippet
+rows live in shard files, and SQLite commits each file on its own. A crash
+between the two commits can leave an entry for a write that was lost, or a
+kept write with no entry. Entries only name what changed, so clients that
+re-read the entity already cope with the first case: it may be unchanged or
+gone. The second heals on the entity's next change.
+"""
+
+import asyncio
+import contextlib
+import logging
+import weakref
+from collections.abc import AsyncIterator, Callable, Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Literal, cast
+from uuid import UUID
+
+from sqlalchemy import Table, event, func, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from apps.core.config import settings
+from apps.db.session import SessionLocal
+from packages.models import ChangeLogEntry, Snippet, SnippetTag, Version
+
+EntityKind = Literal["snippet", "version", "snippet_tag"]
+ChangeOp = Literal["insert", "update", "delete"]
+
+_ENTITIES: dict[type, EntityKind] = {
+    Snippet: "snippet",
+    Version: "version",
+    SnippetTag: "snippet_tag",
+}
+_WRITTEN = "changes.written"
+
+_changelog = cast(Table, ChangeLogEntry.__table__)
+_feeds: "weakref.WeakSet[ChangeFeed]" = weakref.WeakSet()
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Change:
+    """One changelog entry.
+
+    Apply it by re-reading the entity, which may since have changed again or
+    been deleted, or, after a crash under sharding, never have changed.
+    """
+
+    seq: int
+    entity: EntityKind
+    entity_id: UUID
+    snippet_id: UUID
+    op: ChangeOp
+    created_at: datetime
+
+
+def record_changes(
+    db: Session,
+    entity: EntityKind,
+    op: ChangeOp,
+    rows: Iterable[tuple[UUID, UUID]],
+) -> None:
+    """Append changes made by statements that bypass the unit of work.
+
+    Args:
+        db: Session whose transaction made the changes.
+        entity: Kind of the changed rows.
+        op: What happened to them.
+        rows: ``(entity id, snippet id)`` of each changed row.
+    """
+    values = [
+        {"entity": entity, "entity_id": entity_id, "snippet_id": snippet_id, "op": op}
+        for entity_id, snippet_id in rows
+    ]
+    if values:
+        db.execute(insert(_changelog), values)
+        db.info[_WRITTEN] = True
+
+
+def _snippet_id(obj: Any) -> UUID:
+    return obj.id if isinstance(obj, Snippet) else obj.snippet_id
+
+
+def _rank(obj: Any) -> int:
+    return list(_ENTITIES).index(type(obj))
+
+
+def _collect(session: Session) -> list[dict[str, Any]]:
+    """Changes of one flush; parents are inserted first and deleted last."""
+    values = []
+
+    def add(obj: Any, op: ChangeOp) -> None:
+        values.append(
+            {
+                "entity": _ENTITIES[type(obj)],
+                "entity_id": obj.id,
+                "snippet_id": _snippet_id(obj),
+                "op": op,
+            }
+        )
+
+    for obj in sorted(
+        (obj for obj in session.new if type(obj) in _ENTITIES), key=_rank
+    ):
+        add(obj, "insert")
+    for obj in session.dirty:
+        if type(obj) not in _ENTITIES or not session.is_modified(
+            obj, include_collections=False
+        ):
+            continue
+        if isinstance(obj, Snippet) and inspect(obj).attrs._is_deleted.history.added:
+            add(obj, "delete" if obj.is_deleted else "insert")
+        else:
+            add(obj, "update")
+    for obj in sorted(
+        (obj for obj in session.deleted if type(obj) in _ENTITIES),
+        key=_rank,
+        reverse=True,
+    ):
+        add(obj, "delete")
+    return values
+
+
+@event.listens_for(Session, "before_flush")
+def _before_flush(session: Session, _context: Any, _instances: Any) -> None:
+    # Deleted rows cannot be loaded after the flush; make sure the snippet
+    # id of each one is at hand.
+    for obj in session.deleted:
+        if type(obj) in _ENTITIES:
+            _snippet_id(obj)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, _context: Any) -> None:
+    values = _collect(session)
+    if values:
+        session.connection().execute(insert(_changelog), values)
+        session.info[_WRITTEN] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_WRITTEN, False):
+        for feed in list(_feeds):
+            feed.notify()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session: Session, _previous: Any) -> None:
+    session.info.pop(_WRITTEN, None)
+
+
+def changes_since(db: Session, since: int, limit: int) -> list[Change]:
+    """Return up to ``limit`` changes with ``seq`` above ``since``, oldest first."""
+    rows = db.execute(
+        select(
+            ChangeLogEntry.seq,
+            ChangeLogEntry.entity,
+            ChangeLogEntry.entity_id,
+            ChangeLogEntry.snippet_id,
+            ChangeLogEntry.op,
+            ChangeLogEntry.created_at,
+        )
+        .where(ChangeLogEntry.seq > since)
+        .order_by(ChangeLogEntry.seq)
+        .limit(limit)
+    ).all()
+    return [Change(*row) for row in rows]
+
+
+def head_seq(db: Session) -> int:
+    """Return the newest ``seq``, or ``0`` if nothing has changed yet."""
+    return db.scalar(select(func.coalesce(func.max(ChangeLogEntry.seq), 0))) or 0
+
+
+class _Subscriber:
+    """Bounded buffer of one stream; ``None`` marks an overflow."""
+
+    def __init__(self, size: int) -> None:
+        self.queue: asyncio.Queue[list[Change] | None] = asyncio.Queue(size)
+        self.overflowed = False
+
+    def offer(self, batch: list[Change]) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(batch)
+        except asyncio.QueueFull:
+            # Drop the backlog; the stream re-reads it from the table.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            self.overflowed = True
+
+
+class ChangeFeed:
+    """In-process tailer of the changelog, fanned out to many streams.
+
+    The tailer task starts with the first stream and runs until
+    :meth:`stop`.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        *,
+        poll_interval: float | None = None,
+        batch_size: int | None = None,
+        queue_size: int | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval or settings.CHANGES_POLL_INTERVAL
+        self.batch_size = batch_size or settings.CHANGES_BATCH_SIZE
+        self.queue_size = queue_size or settings.CHANGES_QUEUE_SIZE
+        self.head = 0
+        self._subscribers: set[_Subscriber] = set()
+        self._task: asyncio.Task[None] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+
+    @property
+    def subscribers(self) -> int:
+        """Number of connected streams."""
+        return len(self._subscribers)
+
+    async def start(self) -> None:
+        """Start the tailer from the current end of the changelog."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self.head = await asyncio.to_thread(self._read, head_seq)
+        self._task = asyncio.create_task(self._tail(self._wake), name="change-feed")
+        _feeds.add(self)
+
+    async def stop(self) -> None:
+        """Stop the tailer; connected streams stop receiving live changes."""
+        _feeds.discard(self)
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    def notify(self) -> None:
+        """Wake the tailer; safe to call from any thread."""
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None:
+            with contextlib.suppress(RuntimeError):  # loop already closed
+                loop.call_soon_threadsafe(wake.set)
+
+    def _read(self, query: Callable[..., Any], *args: Any) -> Any:
+        with self.session_factory() as db:
+            return query(db, *args)
+
+    async def _fetch(self, since: int) -> list[Change]:
+        return await asyncio.to_thread(
+            self._read, changes_since, since, self.batch_size
+        )
+
+    async def _tail(self, wake: asyncio.Event) -> None:
+        while True:
+            wake.clear()
+            try:
+                while True:
+                    batch = await self._fetch(self.head)
+                    if batch:
+                        self.head = batch[-1].seq
+                        for subscriber in list(self._subscribers):
+                            subscriber.offer(batch)
+                    if len(batch) < self.batch_size:
+                        break
+            except Exception:
+                logger.exception("Change feed poll failed")
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(wake.wait(), self.poll_interval)
+
+    async def stream(
+        self, since: int | None = None, *, idle: float | None = None
+    ) -> AsyncIterator[list[Change]]:
+        """Yield batches of changes after ``since``, oldest first, forever.
+
+        Args:
+            since: Last ``seq`` the client has; ``None`` starts from now.
+            idle: Yield an empty batch after this many seconds without
+                changes, e.g. to send a keep-alive.
+        """
+        await self.start()
+        subscriber = _Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        try:
+            last = self.head if since is None else since
+            while True:
+                # Catch up from the table, on joining and after an overflow.
+                # Anything published meanwhile is queued and skipped by seq.
+                subscriber.overflowed = False
+                while True:
+                    batch = await self._fetch(last)
+                    if batch:
+                        last = batch[-1].seq
+                        yield batch
+                    if len(batch) < self.batch_size:
+                        break
+                while True:
+                    try:
+                        queued = await asyncio.wait_for(subscriber.queue.get(), idle)
+                    except asyncio.TimeoutError:
+                        yield []
+                        continue
+                    if queued is None:
+                        break
+                    fresh = [change for change in queued if change.seq > last]
+                    if fresh:
+                        last = fresh[-1].seq
+                        yield fresh
+        finally:
+            self._subscribers.discard(subscriber)
+
+
+change_feed = ChangeFeed()
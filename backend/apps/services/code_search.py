@@ -0,0 +1,392 @@
+"""Substring and regex search over snippet content.
+
+A trigram index (``snippet_trigrams``) turns a query into a candidate set
+with a few posting-list lookups; only candidates are loaded and verified.
+Substring checks are linear and run inline. Regexes can backtrack
+catastrophically, so they are verified in a process pool under a time
+budget: on timeout the search's workers are killed and the hits found so
+far are returned.
+
+The index follows ``Snippet.content`` through mapper events, in the same
+transaction as the write; saving a new version updates that content, and
+only the trigrams that appeared or disappeared are written. Importing this
+module registers the events; the ``search.reindex`` job indexes snippets
+written before it existed.
+"""
+
+import multiprocessing
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from dataclasses import dataclass
+from multiprocessing.pool import AsyncResult
+from typing import Any, cast
+from uuid import UUID
+
+from sqlalchemy import (
+    CompoundSelect,
+    Select,
+    Table,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    intersect,
+    select,
+    union,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Mapper, Session
+
+from apps.core.config import settings
+from apps.core.exceptions import InvalidSearchPatternError
+from apps.db.sharding import merge_sorted, scatter, snippet_connection
+from apps.jobs import job_handler
+from packages.common.trigram import (
+    And,
+    TrigramQuery,
+    regex_query,
+    substring_query,
+    trigrams,
+)
+from packages.models import Snippet, SnippetTrigram
+
+_postings = cast(Table, SnippetTrigram.__table__)
+_PREVIEW_CHARS = 200
+
+# (snippet id, 1-based line of the first match, that line)
+_Match = tuple[UUID, int, str]
+
+
+@dataclass(frozen=True, slots=True)
+class SearchHit:
+    """A snippet containing a match."""
+
+    snippet_id: UUID
+    title: str
+    language: str
+    line: int
+    preview: str
+
+
+@dataclass(frozen=True, slots=True)
+class SearchResult:
+    """Hits plus how the search went."""
+
+    hits: list[SearchHit]
+    candidates: int
+    timed_out: bool
+
+
+def index_content(connection: Connection, snippet_id: UUID, content: str) -> None:
+    """Bring a snippet's posting list entries up to date with ``content``."""
+    current = set(
+        connection.scalars(
+            select(_postings.c.trigram).where(_postings.c.snippet_id == snippet_id)
+        )
+    )
+    wanted = trigrams(content)
+    stale = current - wanted
+    if stale:
+        connection.execute(
+            delete(_postings).where(
+                _postings.c.snippet_id == snippet_id,
+                _postings.c.trigram.in_(stale),
+            )
+        )
+    fresh = wanted - current
+    if fresh:
+        connection.execute(
+            insert(_postings),
+            [{"trigram": trigram, "snippet_id": snippet_id} for trigram in fresh],
+        )
+
+
+@event.listens_for(Snippet, "after_insert")
+def _on_snippet_insert(
+    _mapper: Mapper[Any], connection: Connection, target: Snippet
+) -> None:
+    index_content(connection, target.id, target.content)
+
+
+@event.listens_for(Snippet, "after_update")
+def _on_snippet_update(
+    _mapper: Mapper[Any], connection: Connection, target: Snippet
+) -> None:
+    if inspect(target).attrs.content.history.has_changes():
+        index_content(connection, target.id, target.content)
+
+
+def candidate_ids(query: TrigramQuery) -> Select[Any] | CompoundSelect | None:
+    """Compile a trigram query into a select of candidate snippet ids.
+
+    Returns:
+        The select, or ``None`` if the query does not constrain the corpus.
+    """
+    if query is None:
+        return None
+    if isinstance(query, frozenset):
+        return (
+            select(_postings.c.snippet_id)
+            .where(_postings.c.trigram.in_(query))
+            .group_by(_postings.c.snippet_id)
+            .having(func.count() == len(query))
+        )
+    parts: list[Select[Any]] = []
+    for part in query.parts:
+        compiled = candidate_ids(part)
+        if compiled is None:
+            # An unconstrained part adds nothing to an And, and lets an Or
+            # match everything.
+            if isinstance(query, And):
+                continue
+            return None
+        if isinstance(compiled, CompoundSelect):
+            # SQLite cannot nest compound selects without a subquery.
+            sub = compiled.subquery()
+            compiled = select(sub.c.snippet_id)
+        parts.append(compiled)
+    if not parts:
+        return None
+    combine = intersect if isinstance(query, And) else union
+    return combine(*parts)
+
+
+def _first_matches(
+    pattern: str, flags: int, docs: list[tuple[UUID, str]]
+) -> list[_Match]:
+    """Return the first match of ``pattern`` in each document that has one."""
+    compiled = re.compile(pattern, flags)
+    matches = []
+    for snippet_id, content in docs:
+        found = compiled.search(content)
+        if found is None:
+            continue
+        start = content.rfind("\n", 0, found.start()) + 1
+        end = content.find("\n", found.start())
+        line = content[start : end if end != -1 else len(content)]
+        number = content.count("\n", 0, found.start()) + 1
+        matches.append((snippet_id, number, line[:_PREVIEW_CHARS]))
+    return matches
+
+
+class _Worker:
+    """One verifier process and the tasks handed to it."""
+
+    def __init__(self) -> None:
+        self.pool = multiprocessing.get_context("spawn").Pool(1)
+        self.tasks: list[AsyncResult[list[_Match]]] = []
+
+    def submit(self, *args: Any) -> "AsyncResult[list[_Match]]":
+        task = self.pool.apply_async(_first_matches, args)
+        self.tasks.append(task)
+        return task
+
+    def idle(self) -> bool:
+        return all(task.ready() for task in self.tasks)
+
+
+class _VerifierPool:
+    """Verifier processes, leased to one search at a time.
+
+    A search that runs out of time kills only the workers it leased, so the
+    searches running next to it, including the other shards of the same
+    request, keep theirs. Up to ``SEARCH_WORKERS`` idle workers are kept
+    for reuse; concurrent searches start more as needed.
+    """
+
+    def __init__(self) -> None:
+        self._idle: list[_Worker] = []
+        self._lock = threading.Lock()
+
+    def lease(self, count: int) -> list[_Worker]:
+        with self._lock:
+            workers = [self._idle.pop() for _ in range(min(count, len(self._idle)))]
+        workers.extend(_Worker() for _ in range(count - len(workers)))
+        return workers
+
+    def release(self, workers: list[_Worker]) -> None:
+        """Take workers back; any still running a task are terminated."""
+        for worker in workers:
+            if worker.idle():
+                worker.tasks.clear()
+                with self._lock:
+                    if len(self._idle) < settings.SEARCH_WORKERS:
+                        self._idle.append(worker)
+                        continue
+                worker.pool.close()
+            else:
+                worker.pool.terminate()
+
+    def close(self) -> None:
+        """Let the idle workers exit."""
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.pool.close()
+            worker.pool.join()
+
+
+_verifiers = _VerifierPool()
+
+
+def shutdown_verifiers() -> None:
+    """Stop the regex verifier processes, if they were started."""
+    _verifiers.close()
+
+
+def _batches(db: Session, stmt: Select[Any]) -> Iterator[list[Any]]:
+    result = db.execute(stmt.execution_options(yield_per=settings.SEARCH_BATCH_SIZE))
+    try:
+        for batch in result.partitions():
+            yield list(batch)
+    finally:
+        result.close()
+
+
+def _verify_in_pool(
+    batches: Iterator[list[Any]], pattern: str, flags: int, limit: int
+) -> tuple[list[_Match], int, bool]:
+    deadline = time.monotonic() + settings.SEARCH_REGEX_TIMEOUT_SECONDS
+    workers = _verifiers.lease(settings.SEARCH_WORKERS)
+    pending: deque[AsyncResult[list[_Match]]] = deque()
+    matches: list[_Match] = []
+    candidates = 0
+    submitted = 0
+
+    def collect() -> None:
+        remaining = max(deadline - time.monotonic(), 0)
+        matches.extend(pending.popleft().get(timeout=remaining))
+
+    try:
+        for batch in batches:
+            candidates += len(batch)
+            docs = [(row.id, row.content) for row in batch]
+            worker = workers[submitted % len(workers)]
+            pending.append(worker.submit(pattern, flags, docs))
+            submitted += 1
+            while len(pending) >= len(workers) or (pending and pending[0].ready()):
+                collect()
+            if len(matches) >= limit:
+                break
+        while pending and len(matches) < limit:
+            collect()
+    except multiprocessing.TimeoutError:
+        return matches, candidates, True
+    finally:
+        # Workers still busy (timed out, or abandoned at the limit) are killed.
+        _verifiers.release(workers)
+    return matches, candidates, False
+
+
+def _search(
+    db: Session,
+    stmt: Select[Any],
+    pattern: str,
+    flags: int,
+    *,
+    regex: bool,
+    limit: int,
+) -> SearchResult:
+    titles: dict[UUID, tuple[str, str]] = {}
+
+    def batches() -> Iterator[list[Any]]:
+        for batch in _batches(db, stmt):
+            titles.update((row.id, (row.title, row.language)) for row in batch)
+            yield batch
+
+    if regex and settings.SEARCH_WORKERS > 0:
+        matches, candidates, timed_out = _verify_in_pool(
+            batches(), pattern, flags, limit
+        )
+    else:
+        matches, candidates, timed_out = [], 0, False
+        for batch in batches():
+            candidates += len(batch)
+            matches.extend(
+                _first_matches(pattern, flags, [(row.id, row.content) for row in batch])
+            )
+            if len(matches) >= limit:
+                break
+
+    hits = [
+        SearchHit(snippet_id, *titles[snippet_id], line, preview)
+        for snippet_id, line, preview in matches[:limit]
+    ]
+    return SearchResult(hits, candidates, timed_out)
+
+
+def search_code(
+    db: Session,
+    query: str,
+    *,
+    regex: bool = False,
+    case_sensitive: bool = True,
+    language: str | None = None,
+    limit: int = 50,
+) -> SearchResult:
+    """Find live snippets whose content matches a substring or regex.
+
+    Args:
+        db: Database session.
+        query: Literal text, or a Python regular expression if ``regex``.
+        regex: Treat ``query`` as a regular expression.
+        case_sensitive: Match case exactly.
+        language: Restrict the search to one language.
+        limit: Maximum number of hits.
+
+    Returns:
+        SearchResult: Hits in snippet creation order, the number of
+        candidates verified and whether the regex time budget ran out.
+
+    Raises:
+        InvalidSearchPatternError: If ``query`` is not a valid regex.
+    """
+    flags = 0 if case_sensitive else re.IGNORECASE
+    if regex:
+        try:
+            plan = regex_query(query, flags)
+        except re.error as exc:
+            raise InvalidSearchPatternError(f"Invalid pattern: {exc}") from exc
+        pattern = query
+    else:
+        plan = substring_query(query)
+        pattern = re.escape(query)
+
+    stmt = (
+        select(Snippet.id, Snippet.title, Snippet.language, Snippet.content)
+        .where(Snippet._is_deleted.is_(False))
+        .order_by(Snippet.id)
+    )
+    candidates_stmt = candidate_ids(plan)
+    if candidates_stmt is not None:
+        stmt = stmt.where(Snippet.id.in_(candidates_stmt))
+    if language is not None:
+        stmt = stmt.where(Snippet.language == language)
+
+    # Shards are searched in parallel; each returns its first hits in id
+    # order, so the first ``limit`` of the merge are the overall first.
+    parts = scatter(
+        db, lambda shard: _search(shard, stmt, pattern, flags, regex=regex, limit=limit)
+    )
+    hits = merge_sorted(
+        (part.hits for part in parts), key=lambda hit: hit.snippet_id, limit=limit
+    )
+    return SearchResult(
+        hits,
+        sum(part.candidates for part in parts),
+        any(part.timed_out for part in parts),
+    )
+
+
+@job_handler("search.reindex")
+def reindex_job(db: Session, payload: dict[str, Any]) -> None:
+    """Rebuild posting lists, for all snippets or ``payload["snippet_ids"]``."""
+    stmt = select(Snippet.id, Snippet.content)
+    if payload.get("snippet_ids"):
+        stmt = stmt.where(Snippet.id.in_([UUID(i) for i in payload["snippet_ids"]]))
+    for row in db.execute(stmt.execution_options(yield_per=500)):
+        index_content(snippet_connection(db, row.id), row.id, row.content)
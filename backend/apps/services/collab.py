@@ -0,0 +1,584 @@
+"""Live collaborative editing sessions.
+
+Editors of one snippet share a :class:`CollabSession` that the worker owning
+the snippet keeps in memory. Clients send operations (see
+``packages.common.ot``) tagged with the last revision they have seen; the
+session rebases each one over everything applied since, applies it,
+acknowledges it to the sender and broadcasts it to the other clients.
+
+Every client has a bounded outgoing queue drained by its own sender task,
+which sends everything queued since its previous send as one frame, so a
+burst of keystrokes costs one write per client instead of one per operation.
+A client whose queue fills up is disconnected and rejoins from a fresh
+snapshot; one slow connection never holds up the session or grows its
+memory. A session's memory is bounded by ``COLLAB_MAX_CHARS`` of text, the
+``COLLAB_HISTORY_*`` rebase window and ``COLLAB_QUEUE_SIZE`` messages per
+client.
+
+Edits are saved as a version (``apps.services.versions.create_version``)
+every ``COLLAB_CHECKPOINT_SECONDS`` and when the last client leaves. A
+checkpoint only writes over the content the session opened with or last
+saved: if the snippet was changed through the REST API meanwhile, the
+session is dropped unsaved and its clients are closed with
+:data:`CLOSE_CHANGED` to rejoin from the new content. A session without
+edits for ``COLLAB_IDLE_SECONDS`` is saved and closed; its clients reconnect
+when they need it again.
+
+A document must live in exactly one process. The worker that opens it takes
+the snippet's ``collab_leases`` row and renews it at every checkpoint, and
+a connection that reaches another worker meanwhile is closed with
+:data:`CLOSE_PINNED`. With more than one worker the proxy must therefore
+route collaboration sockets by snippet id, e.g. by hashing the path. The
+lease of a crashed worker expires after ``COLLAB_LEASE_SECONDS``.
+"""
+
+import asyncio
+import contextlib
+import itertools
+import logging
+import os
+import socket
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable
+from datetime import timedelta
+from typing import Any, cast
+from uuid import UUID
+
+from sqlalchemy import CursorResult, delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from apps.core.config import settings
+from apps.db.session import SessionLocal
+from apps.jobs.queue import utcnow
+from apps.services.versions import create_version
+from packages.common import ot
+from packages.common.hashing import content_hash
+from packages.common.ids import uuid7
+from packages.models import CollabLease, Snippet
+
+logger = logging.getLogger(__name__)
+
+Message = dict[str, Any]
+SendFrame = Callable[[list[Message]], Awaitable[None]]
+CloseConnection = Callable[[int, str], Awaitable[None]]
+
+# WebSocket close codes; the application range mirrors HTTP statuses.
+CLOSE_SHUTDOWN = 1001
+CLOSE_INVALID = 4400
+CLOSE_NOT_FOUND = 4404
+CLOSE_IDLE = 4408
+CLOSE_PINNED = 4409
+CLOSE_STALE = 4410
+CLOSE_CHANGED = 4412
+CLOSE_TOO_LARGE = 4413
+CLOSE_OVERLOADED = 4429
+
+
+class CollabError(Exception):
+    """Ends a client's connection with a WebSocket close code."""
+
+    def __init__(self, code: int, reason: str) -> None:
+        super().__init__(reason)
+        self.code = code
+        self.reason = reason
+
+
+def _cost(op: ot.Operation) -> int:
+    return sum(len(c) if isinstance(c, str) else 1 for c in op)
+
+
+class CollabDocument:
+    """Text at a revision, with the recent operations that led to it.
+
+    Operations older than the last ``history_size``, or beyond
+    ``history_chars`` of components and inserted text, are forgotten; a
+    client still working from before them has to rejoin.
+    """
+
+    def __init__(
+        self, text: str, *, max_chars: int, history_size: int, history_chars: int
+    ) -> None:
+        self.text = text
+        self.revision = 0
+        self.max_chars = max_chars
+        self.history_size = history_size
+        self.history_chars = history_chars
+        self._history: deque[ot.Operation] = deque()
+        self._history_cost = 0
+
+    @property
+    def oldest_revision(self) -> int:
+        """Oldest revision an operation can still be based on."""
+        return self.revision - len(self._history)
+
+    def submit(self, revision: int, op: ot.Operation) -> ot.Operation:
+        """Rebase an operation made at ``revision`` and apply it.
+
+        Returns:
+            Operation: The operation as applied to the current text.
+
+        Raises:
+            CollabError: If the revision is unknown or no longer kept, or the
+                operation is invalid or makes the text too long.
+        """
+        oldest = self.oldest_revision
+        if not oldest <= revision <= self.revision:
+            raise CollabError(
+                CLOSE_STALE, f"Revision {revision} is not available; rejoin"
+            )
+        try:
+            for concurrent in itertools.islice(self._history, revision - oldest, None):
+                _, op = ot.transform(concurrent, op)
+            if ot.target_length(op) > self.max_chars:
+                raise CollabError(
+                    CLOSE_TOO_LARGE, f"Text would exceed {self.max_chars} characters"
+                )
+            self.text = ot.apply(self.text, op)
+        except ot.OperationError as exc:
+            raise CollabError(CLOSE_INVALID, str(exc)) from exc
+        self.revision += 1
+        self._history.append(op)
+        self._history_cost += _cost(op)
+        while len(self._history) > self.history_size or (
+            self._history_cost > self.history_chars and len(self._history) > 1
+        ):
+            self._history_cost -= _cost(self._history.popleft())
+        return op
+
+
+class _Client:
+    """One connection; its sender task owns all writes to it."""
+
+    def __init__(
+        self,
+        session: "CollabSession",
+        send: SendFrame,
+        close: CloseConnection,
+        queue_size: int,
+    ) -> None:
+        self.id = str(uuid7())
+        self.session = session
+        self._send = send
+        self._close = close
+        self._queue: deque[Message] = deque()
+        self._queue_size = queue_size
+        self._ready = asyncio.Event()
+        self._closing: tuple[int, str] | None = None
+        self._task = asyncio.create_task(self._run(), name=f"collab-{self.id}")
+
+    def offer(self, message: Message) -> None:
+        if self._closing is not None:
+            return
+        if len(self._queue) >= self._queue_size:
+            self.kick(CLOSE_OVERLOADED, "Client fell behind; rejoin")
+            return
+        self._queue.append(message)
+        self._ready.set()
+
+    def kick(self, code: int, reason: str) -> None:
+        """Drop pending messages and close the connection."""
+        if self._closing is None:
+            self._closing = (code, reason)
+            self._queue.clear()
+            self._ready.set()
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                if self._closing is not None:
+                    await self._close(*self._closing)
+                    return
+                # Whatever queued up during the previous send goes out as one
+                # frame.
+                batch = list(self._queue)
+                self._queue.clear()
+                await self._send(batch)
+        except Exception:
+            # The connection is gone; the receiving side notices on its own.
+            logger.debug("Collaboration client %s stopped sending", self.id)
+
+    async def finish(self) -> None:
+        """Wait for a kicked client's close to go out."""
+        await self._task
+
+    async def cancel(self) -> None:
+        """Stop sending to a client that disconnected."""
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+
+class CollabSession:
+    """The live document of one snippet and its clients."""
+
+    def __init__(
+        self, snippet_id: UUID, document: CollabDocument, base_hash: str
+    ) -> None:
+        self.snippet_id = snippet_id
+        self.document = document
+        # Hash of the stored content this session is allowed to replace.
+        self.base_hash = base_hash
+        self.clients: dict[str, _Client] = {}
+        self.saved_revision = 0
+        self.last_edit = time.monotonic()
+        self.lost = False
+
+    def kick_all(self, code: int, reason: str) -> None:
+        for client in self.clients.values():
+            client.kick(code, reason)
+
+
+class CollabManager:
+    """The collaboration sessions of this worker.
+
+    The maintenance task, which checkpoints, renews leases and evicts idle
+    sessions, starts with the first client and runs until :meth:`stop`.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        *,
+        max_sessions: int | None = None,
+        max_clients: int | None = None,
+        queue_size: int | None = None,
+        checkpoint_interval: float | None = None,
+        idle_timeout: float | None = None,
+        lease_seconds: float | None = None,
+        owner: str | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self._owner = owner
+        self.max_sessions = max_sessions or settings.COLLAB_MAX_SESSIONS
+        self.max_clients = max_clients or settings.COLLAB_MAX_CLIENTS
+        self.queue_size = queue_size or settings.COLLAB_QUEUE_SIZE
+        self.checkpoint_interval = (
+            checkpoint_interval or settings.COLLAB_CHECKPOINT_SECONDS
+        )
+        self.idle_timeout = idle_timeout or settings.COLLAB_IDLE_SECONDS
+        self.lease_seconds = lease_seconds or settings.COLLAB_LEASE_SECONDS
+        self._sessions: dict[UUID, CollabSession] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+        self._closing: set[asyncio.Future[None]] = set()
+
+    @property
+    def owner(self) -> str:
+        """Lease owner name; defaults to this host and process."""
+        return self._owner or f"{socket.gethostname()}:{os.getpid()}"[-64:]
+
+    @property
+    def sessions(self) -> int:
+        """Number of open sessions."""
+        return len(self._sessions)
+
+    def get(self, snippet_id: UUID) -> CollabSession | None:
+        """Return the open session of a snippet, if any."""
+        return self._sessions.get(snippet_id)
+
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._lock = loop, asyncio.Lock()
+            self._task = loop.create_task(self._run(), name="collab-maintenance")
+
+    async def join(
+        self, snippet_id: UUID, send: SendFrame, close: CloseConnection
+    ) -> _Client:
+        """Add a connection to the snippet's session, opening it if needed.
+
+        The client is sent an ``init`` message with the current text and
+        revision first.
+
+        Raises:
+            CollabError: If the snippet does not exist, is pinned to another
+                worker, or this worker or session is full.
+        """
+        self._start()
+        async with self._lock:
+            session = self._sessions.get(snippet_id)
+            if session is None:
+                if len(self._sessions) >= self.max_sessions:
+                    raise CollabError(CLOSE_OVERLOADED, "Too many sessions; retry")
+                content = await asyncio.to_thread(self._open, snippet_id)
+                session = CollabSession(
+                    snippet_id,
+                    CollabDocument(
+                        content,
+                        max_chars=settings.COLLAB_MAX_CHARS,
+                        history_size=settings.COLLAB_HISTORY_SIZE,
+                        history_chars=settings.COLLAB_HISTORY_CHARS,
+                    ),
+                    content_hash(content),
+                )
+                self._sessions[snippet_id] = session
+            elif len(session.clients) >= self.max_clients:
+                raise CollabError(CLOSE_OVERLOADED, "Too many editors in this session")
+            client = _Client(session, send, close, self.queue_size)
+            session.clients[client.id] = client
+        client.offer(
+            {
+                "type": "init",
+                "clientId": client.id,
+                "revision": session.document.revision,
+                "content": session.document.text,
+            }
+        )
+        return client
+
+    def submit(self, client: _Client, message: Any) -> None:
+        """Apply an ``op`` message from a client and broadcast it.
+
+        Raises:
+            CollabError: If the message is invalid or cannot be applied.
+        """
+        if not isinstance(message, dict) or message.get("type") != "op":
+            raise CollabError(CLOSE_INVALID, "Expected an op message")
+        revision, components = message.get("revision"), message.get("op")
+        if type(revision) is not int or not isinstance(components, list):
+            raise CollabError(CLOSE_INVALID, "An op needs a revision and an op list")
+        try:
+            op = ot.normalize(components)
+        except ot.OperationError as exc:
+            raise CollabError(CLOSE_INVALID, str(exc)) from exc
+        session = client.session
+        op = session.document.submit(revision, op)
+        session.last_edit = time.monotonic()
+        revision = session.document.revision
+        client.offer({"type": "ack", "revision": revision})
+        broadcast = {
+            "type": "op",
+            "revision": revision,
+            "op": op,
+            "clientId": client.id,
+        }
+        for other in session.clients.values():
+            if other is not client:
+                other.offer(broadcast)
+
+    async def leave(self, client: _Client, error: CollabError | None = None) -> None:
+        """Remove a connection; the last one out saves and closes the session.
+
+        Args:
+            client: Client returned by :meth:`join`.
+            error: Why the server ends the connection; ``None`` if the
+                client disconnected.
+        """
+        if error is not None:
+            client.kick(error.code, error.reason)
+            await client.finish()
+        else:
+            await client.cancel()
+        session = client.session
+        session.clients.pop(client.id, None)
+        if not session.clients:
+            async with self._lock:
+                if not session.clients and self.get(session.snippet_id) is session:
+                    await self._close_session(session)
+
+    async def maintain(self) -> None:
+        """Renew leases, checkpoint edited sessions and evict idle ones."""
+        async with self._lock:
+            if not self._sessions:
+                return
+            renewed = await asyncio.to_thread(self._renew, list(self._sessions))
+            now = time.monotonic()
+            for session in list(self._sessions.values()):
+                if not session.clients:
+                    # Its last client went away without a clean leave.
+                    await self._close_session(session)
+                    continue
+                if session.snippet_id not in renewed:
+                    session.lost = True
+                    session.kick_all(CLOSE_PINNED, "Session moved to another worker")
+                    continue
+                await self._checkpoint(session)
+                if now - session.last_edit >= self.idle_timeout:
+                    session.kick_all(CLOSE_IDLE, "Session idle")
+
+    async def stop(self) -> None:
+        """Save and close every session, e.g. on shutdown."""
+        task, self._task, self._loop = self._task, None, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        for session in list(self._sessions.values()):
+            session.kick_all(CLOSE_SHUTDOWN, "Server shutting down")
+            await self._close_session(session)
+        # Closes started by departing clients, whose handlers may be cancelled.
+        await asyncio.gather(*self._closing, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                await self.maintain()
+            except Exception:
+                logger.exception("Collaboration maintenance failed")
+
+    async def _close_session(self, session: CollabSession) -> None:
+        self._sessions.pop(session.snippet_id, None)
+        if session.lost:
+            return
+        # The final save must finish even if the caller is cancelled.
+        task = asyncio.ensure_future(self._save_and_release(session))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+        await asyncio.shield(task)
+
+    async def _save_and_release(self, session: CollabSession) -> None:
+        await self._checkpoint(session)
+        try:
+            await asyncio.to_thread(self._release, session.snippet_id)
+        except Exception:
+            logger.exception("Releasing the lease of %s failed", session.snippet_id)
+
+    async def _checkpoint(self, session: CollabSession) -> None:
+        document = session.document
+        if document.revision == session.saved_revision or session.lost:
+            return
+        revision, text = document.revision, document.text
+        try:
+            saved = await asyncio.to_thread(
+                self._save, session.snippet_id, text, revision, session.base_hash
+            )
+        except CollabError as exc:
+            await self._drop(session, exc)
+            return
+        except Exception:
+            logger.exception("Checkpoint of %s failed", session.snippet_id)
+            return
+        if saved is None:
+            session.kick_all(CLOSE_NOT_FOUND, "Snippet was deleted")
+        else:
+            session.base_hash = saved
+        session.saved_revision = max(session.saved_revision, revision)
+
+    async def _drop(self, session: CollabSession, error: CollabError) -> None:
+        """Close a session without saving it, so its clients rejoin afresh."""
+        logger.warning("Dropping session of %s: %s", session.snippet_id, error)
+        session.lost = True
+        session.kick_all(error.code, error.reason)
+        if self._sessions.get(session.snippet_id) is session:
+            del self._sessions[session.snippet_id]
+        try:
+            await asyncio.to_thread(self._release, session.snippet_id)
+        except Exception:
+            logger.exception("Releasing the lease of %s failed", session.snippet_id)
+
+    def _live_content(self, db: Session, snippet_id: UUID) -> str | None:
+        return db.scalar(
+            select(Snippet.content).where(
+                Snippet.id == snippet_id, Snippet._is_deleted.is_(False)
+            )
+        )
+
+    def _open(self, snippet_id: UUID) -> str:
+        """Claim the snippet's lease and return its content."""
+        with self.session_factory() as db:
+            content = self._live_content(db, snippet_id)
+            if content is None:
+                raise CollabError(CLOSE_NOT_FOUND, f"Snippet {snippet_id} not found")
+            now = utcnow()
+            stmt = sqlite_insert(CollabLease).values(
+                snippet_id=snippet_id,
+                owner=self.owner,
+                expires_at=now + timedelta(seconds=self.lease_seconds),
+            )
+            claimed = db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[CollabLease.snippet_id],
+                    set_={
+                        "owner": stmt.excluded.owner,
+                        "expires_at": stmt.excluded.expires_at,
+                    },
+                    where=(CollabLease.owner == stmt.excluded.owner)
+                    | (CollabLease.expires_at < now),
+                ).returning(CollabLease.owner)
+            ).first()
+            if claimed is None:
+                raise CollabError(
+                    CLOSE_PINNED, "Snippet is being edited on another worker"
+                )
+            db.commit()
+            return content
+
+    def _renew(self, snippet_ids: Iterable[UUID]) -> set[UUID]:
+        """Extend this worker's leases; returns the snippets still held."""
+        with self.session_factory() as db:
+            renewed = db.scalars(
+                update(CollabLease)
+                .where(
+                    CollabLease.snippet_id.in_(list(snippet_ids)),
+                    CollabLease.owner == self.owner,
+                )
+                .values(expires_at=utcnow() + timedelta(seconds=self.lease_seconds))
+                .returning(CollabLease.snippet_id)
+            ).all()
+            db.commit()
+            return set(renewed)
+
+    def _save(
+        self, snippet_id: UUID, text: str, revision: int, base_hash: str
+    ) -> str | None:
+        """Write the session's text as a version over the content it expects.
+
+        Returns:
+            str | None: The hash of the content now stored, or ``None`` if
+            the snippet is gone.
+
+        Raises:
+            CollabError: If the stored content is no longer the one hashed
+                as ``base_hash``.
+        """
+        with self.session_factory() as db:
+            current = self._live_content(db, snippet_id)
+            if current is None:
+                return None
+            if content_hash(current) != base_hash:
+                raise CollabError(
+                    CLOSE_CHANGED, "Snippet was changed outside the session; rejoin"
+                )
+            if current != text:
+                # Claim the row so a REST write committed since the read
+                # fails this save instead of being overwritten by it.
+                claimed = cast(
+                    CursorResult[Any],
+                    db.execute(
+                        update(Snippet)
+                        .where(Snippet.id == snippet_id, Snippet.content == current)
+                        .values(updated_at=func.now())
+                        .execution_options(synchronize_session=False)
+                    ),
+                )
+                if claimed.rowcount != 1:
+                    raise CollabError(
+                        CLOSE_CHANGED, "Snippet was changed outside the session; rejoin"
+                    )
+                create_version(
+                    db,
+                    snippet_id,
+                    text,
+                    metadata={"collab": True, "collab_revision": revision},
+                )
+                db.commit()
+            return content_hash(text)
+
+    def _release(self, snippet_id: UUID) -> None:
+        with self.session_factory() as db:
+            db.execute(
+                delete(CollabLease).where(
+                    CollabLease.snippet_id == snippet_id,
+                    CollabLease.owner == self.owner,
+                )
+            )
+            db.commit()
+
+
+collab_sessions = CollabManager()
@@ -0,0 +1,237 @@
+"""Autosave drafts coalesced into versions.
+
+An autosave overwrites the ``drafts`` row of its snippet and editor session
+with one upsert instead of adding a version. The draft becomes a version
+when the session saves explicitly, when it has absorbed
+``AUTOSAVE_MAX_EDITS`` autosaves, is ``AUTOSAVE_MAX_AGE_SECONDS`` old or
+differs in size from the snippet by ``AUTOSAVE_MAX_DELTA_CHARS``, or after
+``AUTOSAVE_IDLE_SECONDS`` without autosaves. The version records the number
+of autosaves it coalesced as ``coalesced_edits`` in ``version_metadata``.
+
+Drafts live in the database, so they survive restarts, and idle drafts are
+saved by the ``drafts.flush`` job: every autosave queues it to run once the
+idle timeout has passed, and it queues itself again while drafts remain.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Literal
+from uuid import UUID
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from apps.core.config import settings
+from apps.core.exceptions import DraftNotFoundError, SnippetNotFoundError
+from apps.jobs import enqueue, job_handler, schedule_next
+from apps.jobs.queue import utcnow
+from apps.services.versions import create_version
+from packages.models import Draft, Snippet, Version
+
+SaveTrigger = Literal["save", "idle", "edits", "age", "size"]
+
+
+@dataclass(frozen=True, slots=True)
+class DraftResult:
+    """Outcome of an autosave or save."""
+
+    edit_count: int
+    version: Version | None
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands timestamps back without their zone; they are UTC.
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _upsert(
+    db: Session, snippet_id: UUID, session_id: str, content: str, now: datetime
+) -> Any:
+    stmt = sqlite_insert(Draft).values(
+        snippet_id=snippet_id,
+        session_id=session_id,
+        content=content,
+        edit_count=1,
+        created_at=now,
+        updated_at=now,
+    )
+    return db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[Draft.snippet_id, Draft.session_id],
+            set_={
+                "content": stmt.excluded.content,
+                "edit_count": Draft.edit_count + 1,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ).returning(Draft.edit_count, Draft.created_at)
+    ).one()
+
+
+def _materialize(
+    db: Session, snippet_id: UUID, session_id: str, trigger: SaveTrigger
+) -> DraftResult | None:
+    """Turn a draft into a version and delete it.
+
+    No version is written if the draft matches the snippet's content.
+    """
+    draft = db.execute(
+        delete(Draft)
+        .where(Draft.snippet_id == snippet_id, Draft.session_id == session_id)
+        .returning(Draft.content, Draft.edit_count)
+    ).first()
+    if draft is None:
+        return None
+    current = db.scalar(select(Snippet.content).where(Snippet.id == snippet_id))
+    if draft.content == current:
+        return DraftResult(draft.edit_count, None)
+    version = create_version(
+        db,
+        snippet_id,
+        draft.content,
+        metadata={
+            "session_id": session_id,
+            "autosave": trigger != "save",
+            "coalesced_edits": draft.edit_count,
+        },
+    )
+    return DraftResult(draft.edit_count, version)
+
+
+def _threshold(
+    db: Session, snippet_id: UUID, content: str, row: Any, now: datetime
+) -> SaveTrigger | None:
+    if row.edit_count >= settings.AUTOSAVE_MAX_EDITS:
+        return "edits"
+    age = now - _aware(row.created_at)
+    if age >= timedelta(seconds=settings.AUTOSAVE_MAX_AGE_SECONDS):
+        return "age"
+    size = db.scalar(
+        select(func.length(Snippet.content)).where(Snippet.id == snippet_id)
+    )
+    if abs(len(content) - (size or 0)) >= settings.AUTOSAVE_MAX_DELTA_CHARS:
+        return "size"
+    return None
+
+
+def _ensure_live(db: Session, snippet_id: UUID) -> None:
+    live = db.scalar(
+        select(Snippet.id).where(
+            Snippet.id == snippet_id, Snippet._is_deleted.is_(False)
+        )
+    )
+    if live is None:
+        raise SnippetNotFoundError(f"Snippet {snippet_id} not found")
+
+
+def autosave(
+    db: Session, snippet_id: UUID, session_id: str, content: str
+) -> DraftResult:
+    """Store the latest content of an editor session.
+
+    Args:
+        db: Database session; the caller commits.
+        snippet_id: Snippet being edited.
+        session_id: Editor session; each session has its own draft.
+        content: Full current content.
+
+    Returns:
+        DraftResult: Autosaves coalesced so far, and the version written if
+        this autosave crossed a threshold.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist or is deleted.
+    """
+    _ensure_live(db, snippet_id)
+    now = utcnow()
+    row = _upsert(db, snippet_id, session_id, content, now)
+    trigger = _threshold(db, snippet_id, content, row, now)
+    if trigger is not None:
+        result = _materialize(db, snippet_id, session_id, trigger)
+        if result is not None:
+            return result
+    enqueue(
+        db,
+        "drafts.flush",
+        delay=settings.AUTOSAVE_IDLE_SECONDS,
+        dedup_key="drafts.flush",
+    )
+    return DraftResult(row.edit_count, None)
+
+
+def save_draft(
+    db: Session, snippet_id: UUID, session_id: str, content: str | None = None
+) -> DraftResult:
+    """Save a session's draft as a version now.
+
+    Args:
+        db: Database session; the caller commits.
+        snippet_id: Snippet being edited.
+        session_id: Editor session.
+        content: Final content, counted as one more edit; ``None`` saves the
+            draft as it is.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist or is deleted.
+        DraftNotFoundError: If there is nothing to save.
+    """
+    _ensure_live(db, snippet_id)
+    if content is not None:
+        _upsert(db, snippet_id, session_id, content, utcnow())
+    result = _materialize(db, snippet_id, session_id, "save")
+    if result is None:
+        raise DraftNotFoundError(f"No draft of {snippet_id} in session {session_id}")
+    return result
+
+
+def get_draft(db: Session, snippet_id: UUID, session_id: str) -> Draft:
+    """Return a session's unsaved draft, e.g. to restore an editor.
+
+    Raises:
+        DraftNotFoundError: If the session has no draft.
+    """
+    draft = db.get(Draft, (snippet_id, session_id))
+    if draft is None:
+        raise DraftNotFoundError(f"No draft of {snippet_id} in session {session_id}")
+    return draft
+
+
+def flush_idle_drafts(db: Session) -> datetime | None:
+    """Save every draft idle for ``AUTOSAVE_IDLE_SECONDS``.
+
+    Drafts of deleted snippets are discarded.
+
+    Returns:
+        datetime | None: When the next remaining draft becomes idle.
+    """
+    idle = timedelta(seconds=settings.AUTOSAVE_IDLE_SECONDS)
+    rows = db.execute(
+        select(Draft.snippet_id, Draft.session_id, Snippet._is_deleted.label("deleted"))
+        .join(Snippet, Snippet.id == Draft.snippet_id)
+        .where(Draft.updated_at <= utcnow() - idle)
+    ).all()
+    for row in rows:
+        if row.deleted:
+            db.execute(
+                delete(Draft).where(
+                    Draft.snippet_id == row.snippet_id,
+                    Draft.session_id == row.session_id,
+                )
+            )
+        else:
+            _materialize(db, row.snippet_id, row.session_id, "idle")
+    oldest = db.scalar(select(func.min(Draft.updated_at)))
+    return _aware(oldest) + idle if oldest is not None else None
+
+
+@job_handler("drafts.flush")
+def flush_job(db: Session, payload: dict[str, Any]) -> None:
+    """Save idle drafts and come back when the next one goes idle.
+
+    The follow-up keeps the dedup key, so autosaves made meanwhile do not
+    start a second chain.
+    """
+    due = flush_idle_drafts(db)
+    if due is not None:
+        delay = max((due - utcnow()).total_seconds(), 0.0)
+        schedule_next(db, payload, delay=delay)
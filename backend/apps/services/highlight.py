@@ -0,0 +1,171 @@
+"""Syntax highlighting cached per content hash.
+
+Tokenization is CPU bound and holds the GIL, so it runs in a small process
+pool. Results are stored in ``content_highlights`` and shared by every body
+with the same hash.
+"""
+
+import logging
+import multiprocessing
+import threading
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from apps.core.config import settings
+from apps.core.exceptions import VersionNotFoundError
+from apps.jobs import job_handler
+from apps.services.archive import load_contents
+from packages.common.hashing import content_hash
+from packages.common.highlight import TOKENIZER_VERSION, Highlight, tokenize
+from packages.models import ContentHighlight, Snippet, Version
+
+logger = logging.getLogger(__name__)
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a process that runs an event loop and threads
+            # can copy held locks into the child.
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.HIGHLIGHT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the tokenizer processes, if they were started."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
+
+
+def _run(fn: Callable[..., Highlight], *args: Any) -> Highlight:
+    if settings.HIGHLIGHT_WORKERS <= 0:
+        return fn(*args)
+    future = _get_executor().submit(fn, *args)
+    return future.result(timeout=settings.HIGHLIGHT_TIMEOUT_SECONDS)
+
+
+def _load(db: Session, digest: str, language: str) -> Highlight | None:
+    row = db.execute(
+        select(ContentHighlight.lines).where(
+            ContentHighlight.content_hash == digest,
+            ContentHighlight.language == language,
+            ContentHighlight.tokenizer == TOKENIZER_VERSION,
+        )
+    ).first()
+    return Highlight(row.lines) if row is not None else None
+
+
+def _store(db: Session, digest: str, language: str, highlight: Highlight) -> None:
+    db.execute(
+        insert(ContentHighlight)
+        .values(
+            content_hash=digest,
+            language=language,
+            tokenizer=TOKENIZER_VERSION,
+            lines=highlight.lines,
+        )
+        .on_conflict_do_nothing()
+    )
+
+
+def get_highlight(db: Session, content: str, language: str) -> Highlight | None:
+    """Return the tokenization of ``content``, computing it on a miss.
+
+    Args:
+        db: Database session; the caller commits a newly stored result.
+        content: Text to tokenize.
+        language: Grammar name, e.g. ``Snippet.language``.
+
+    Returns:
+        Highlight | None: The spans, or ``None`` if the content exceeds
+        ``HIGHLIGHT_MAX_CHARS`` or tokenizing timed out.
+    """
+    if len(content) > settings.HIGHLIGHT_MAX_CHARS:
+        return None
+    language = language.lower()
+    digest = content_hash(content)
+    cached = _load(db, digest, language)
+    if cached is not None:
+        return cached
+
+    try:
+        highlight = _run(tokenize, content, language)
+    except FutureTimeoutError:
+        logger.warning("Tokenizing %s content %s timed out", language, digest)
+        return None
+    _store(db, digest, language, highlight)
+    return highlight
+
+
+def get_highlights(
+    db: Session, items: Sequence[tuple[str, str]]
+) -> list[Highlight | None]:
+    """Batch form of :func:`get_highlight` for ``(content, language)`` pairs.
+
+    Stored tokenizations are read in one query; only the misses are
+    tokenized, one at a time.
+    """
+    keys = [(content_hash(content), language.lower()) for content, language in items]
+    stored = {
+        (row.content_hash, row.language): Highlight(row.lines)
+        for row in db.execute(
+            select(
+                ContentHighlight.content_hash,
+                ContentHighlight.language,
+                ContentHighlight.lines,
+            ).where(
+                tuple_(ContentHighlight.content_hash, ContentHighlight.language).in_(
+                    set(keys)
+                ),
+                ContentHighlight.tokenizer == TOKENIZER_VERSION,
+            )
+        )
+    }
+    return [
+        stored[key] if key in stored else get_highlight(db, content, language)
+        for key, (content, language) in zip(keys, items, strict=True)
+    ]
+
+
+def highlight_version(db: Session, version_id: UUID) -> Highlight | None:
+    """Tokenize a version.
+
+    Raises:
+        VersionNotFoundError: If the version does not exist.
+    """
+    language = db.scalar(
+        select(Snippet.language)
+        .join(Version, Snippet.id == Version.snippet_id)
+        .where(Version.id == version_id)
+    )
+    if language is None:
+        raise VersionNotFoundError(f"Version {version_id} not found")
+    contents = load_contents(db, {version_id})
+    return get_highlight(db, contents[version_id], language)
+
+
+@job_handler("highlight.version")
+def highlight_version_job(db: Session, payload: dict[str, Any]) -> None:
+    """Precompute a new version's highlight; enqueue with ``version_id``."""
+    try:
+        highlight_version(db, UUID(payload["version_id"]))
+    except VersionNotFoundError:
+        # Deleted since, or lost in a crash after the job was queued.
+        logger.info("Version %s is gone; nothing to highlight", payload["version_id"])
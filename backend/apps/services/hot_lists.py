@@ -0,0 +1,411 @@
+"""Materialized landing-page lists: recent and trending, overall and per language.
+
+Each list is a ``hot_lists`` row of packed snippet ids and scores, best
+first, kept a little longer than ``HOT_LIST_SIZE`` so deletions do not
+immediately leave it short. Reads come from an in-process copy and cost one
+primary-key lookup when that copy is missing or expired; they never sort the
+``snippets`` table.
+
+Lists are maintained incrementally from write events. After each flush the
+snippets that were created, edited, moved to another language or deleted
+are folded into the affected lists in the same transaction, one read and one
+write per list. "Recent" ranks by creation time; "trending" ranks by a
+time-decayed activity score (see ``packages.common.ranking``) kept per
+snippet in ``snippet_activity``, so snippets below the cut can still climb
+back in. A write that starts a list, or depletes one with deletions, queues
+the ``hot_lists.rebuild`` job for it; until that has run, and for lists no
+write has touched yet, reads are served by an indexed top-N query, so they
+never write.
+
+With ``DB_SHARDS`` set, ``hot_lists`` and ``snippet_activity`` are catalog
+tables written next to snippet rows in shard files, and the files commit
+separately. A crash in between can leave a list naming a snippet that was
+never stored, which readers skip like any deleted snippet, or miss one that
+was; the next rebuild puts it back.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Literal, cast
+from uuid import UUID
+
+from sqlalchemy import Select, Table, event, func, inspect, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from apps.core.config import settings
+from apps.db.sharding import scatter
+from apps.jobs import enqueue, job_handler
+from packages.common.cache import LRUCache
+from packages.common.ids import uuid7_timestamp_ms
+from packages.common.ranking import RankedIds, decayed_score
+from packages.models import HotList, Snippet, SnippetActivity
+
+ListKind = Literal["recent", "trending"]
+KINDS: tuple[ListKind, ...] = ("recent", "trending")
+
+_CREATE_WEIGHT = 1.0
+_EDIT_WEIGHT = 0.5
+_TOUCHED = "hot_lists.touched"
+
+_lists = cast(Table, HotList.__table__)
+_activity = cast(Table, SnippetActivity.__table__)
+
+# Servable ids per list name.
+_memory: LRUCache[str, tuple[UUID, ...]] = LRUCache(
+    1024, ttl=settings.HOT_LIST_TTL_SECONDS
+)
+
+
+def list_name(kind: ListKind, language: str | None = None) -> str:
+    """Return the stored name of a list, e.g. ``"trending:python"``."""
+    return kind if language is None else f"{kind}:{language}"
+
+
+def _parse_name(name: str) -> tuple[ListKind, str | None]:
+    kind, _, language = name.partition(":")
+    if kind not in KINDS:
+        raise ValueError(f"Unknown hot list: {name!r}")
+    return kind, language or None
+
+
+def _capacity() -> int:
+    return settings.HOT_LIST_SIZE * 2
+
+
+def _half_life() -> float:
+    return settings.HOT_LIST_HALF_LIFE_HOURS * 3600
+
+
+def _created_score(snippet_id: UUID) -> float:
+    # Ids are UUIDv7, so the creation time is in the key itself.
+    try:
+        return float(uuid7_timestamp_ms(snippet_id))
+    except ValueError:
+        return 0.0
+
+
+@dataclass
+class _Changes:
+    """List updates gathered from one flush."""
+
+    upserts: dict[str, dict[UUID, float]] = field(default_factory=dict)
+    removals: dict[str, set[UUID]] = field(default_factory=dict)
+
+    def upsert(self, name: str, snippet_id: UUID, score: float) -> None:
+        self.upserts.setdefault(name, {})[snippet_id] = score
+        self.removals.get(name, set()).discard(snippet_id)
+
+    def remove(self, name: str, snippet_id: UUID) -> None:
+        self.removals.setdefault(name, set()).add(snippet_id)
+        self.upserts.get(name, {}).pop(snippet_id, None)
+
+    def names(self) -> set[str]:
+        return set(self.upserts) | set(self.removals)
+
+
+def _names_for(language: str | None) -> list[str]:
+    languages = (None,) if language is None else (None, language)
+    return [list_name(kind, lang) for kind in KINDS for lang in languages]
+
+
+def _record_activity(
+    connection: Connection, events: dict[UUID, tuple[str, float]]
+) -> tuple[dict[UUID, float], dict[UUID, str]]:
+    """Fold weighted events into the stored activity scores.
+
+    Returns:
+        The new scores, and the previous language of snippets that moved.
+    """
+    if not events:
+        return {}, {}
+    current = {
+        row.snippet_id: row
+        for row in connection.execute(
+            select(
+                _activity.c.snippet_id, _activity.c.language, _activity.c.score
+            ).where(_activity.c.snippet_id.in_(events))
+        )
+    }
+    now = time.time()
+    scores = {}
+    moved = {}
+    for snippet_id, (language, weight) in events.items():
+        row = current.get(snippet_id)
+        scores[snippet_id] = decayed_score(
+            row.score if row else None, weight, now, _half_life()
+        )
+        if row is not None and row.language != language:
+            moved[snippet_id] = row.language
+    stmt = sqlite_insert(_activity).values(
+        [
+            {
+                "snippet_id": snippet_id,
+                "language": language,
+                "score": scores[snippet_id],
+            }
+            for snippet_id, (language, _) in events.items()
+        ]
+    )
+    connection.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[_activity.c.snippet_id],
+            set_={
+                "language": stmt.excluded.language,
+                "score": stmt.excluded.score,
+                "updated_at": func.now(),
+            },
+        )
+    )
+    return scores, moved
+
+
+def _write_lists(connection: Connection, changes: _Changes) -> list[str]:
+    """Apply ``changes`` to the stored lists.
+
+    Returns:
+        list[str]: The lists left too short to serve, which need a rebuild.
+    """
+    names = changes.names()
+    rows = {
+        row.name: row
+        for row in connection.execute(
+            select(
+                _lists.c.name, _lists.c.ids, _lists.c.scores, _lists.c.exhaustive
+            ).where(_lists.c.name.in_(names))
+        )
+    }
+    values = []
+    short = []
+    for name in sorted(names):
+        row = rows.get(name)
+        if row is None:
+            # Started from a single event, so it knows nothing of older
+            # snippets until the rebuild job fills it.
+            ranked, exhaustive = RankedIds(_capacity()), False
+        else:
+            ranked = RankedIds.unpack(_capacity(), row.ids, row.scores)
+            exhaustive = row.exhaustive
+        for snippet_id in changes.removals.get(name, ()):
+            ranked.remove(snippet_id)
+        for snippet_id, score in changes.upserts.get(name, {}).items():
+            if not ranked.upsert(snippet_id, score):
+                exhaustive = False
+        ids, scores = ranked.pack()
+        values.append(
+            {"name": name, "ids": ids, "scores": scores, "exhaustive": exhaustive}
+        )
+        if not _servable(len(ranked), exhaustive):
+            short.append(name)
+    _store(connection, values)
+    return short
+
+
+def _servable(count: int, exhaustive: bool) -> bool:
+    return exhaustive or count >= settings.HOT_LIST_SIZE
+
+
+def _store(connection: Connection, values: list[dict[str, Any]]) -> None:
+    stmt = sqlite_insert(_lists).values(values)
+    connection.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[_lists.c.name],
+            set_={
+                "ids": stmt.excluded.ids,
+                "scores": stmt.excluded.scores,
+                "exhaustive": stmt.excluded.exhaustive,
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+def _leave_language(changes: _Changes, snippet_id: UUID, language: str) -> None:
+    for kind in KINDS:
+        changes.remove(list_name(kind, language), snippet_id)
+
+
+def _collect(session: Session) -> tuple[_Changes, dict[UUID, tuple[str, float]]]:
+    changes = _Changes()
+    events: dict[UUID, tuple[str, float]] = {}
+
+    def remove_everywhere(snippet_id: UUID, language: str | None) -> None:
+        for name in _names_for(language):
+            changes.remove(name, snippet_id)
+
+    for obj in session.new:
+        if isinstance(obj, Snippet) and not obj.is_deleted:
+            events[obj.id] = (obj.language, _CREATE_WEIGHT)
+            for language in (None, obj.language):
+                changes.upsert(
+                    list_name("recent", language), obj.id, _created_score(obj.id)
+                )
+    for obj in session.dirty:
+        if not isinstance(obj, Snippet):
+            continue
+        attrs = inspect(obj).attrs
+        if obj.is_deleted:
+            if attrs._is_deleted.history.has_changes():
+                remove_everywhere(obj.id, obj.language)
+            continue
+        languages = attrs.language.history
+        for old in languages.deleted:
+            if old != obj.language:
+                _leave_language(changes, obj.id, old)
+        if attrs._is_deleted.history.has_changes() or languages.has_changes():
+            for lang in (None, obj.language):
+                changes.upsert(
+                    list_name("recent", lang), obj.id, _created_score(obj.id)
+                )
+        if attrs.content.history.has_changes() or languages.has_changes():
+            events[obj.id] = (obj.language, _EDIT_WEIGHT)
+    for obj in session.deleted:
+        if isinstance(obj, Snippet):
+            # Never load a deleted row; an unknown language only leaves a
+            # dangling id in its lists, which readers skip.
+            remove_everywhere(obj.id, inspect(obj).dict.get("language"))
+    return changes, events
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, _context: Any) -> None:
+    changes, events = _collect(session)
+    if not events and not changes.names():
+        return
+    connection = session.connection()
+    scores, moved = _record_activity(connection, events)
+    for snippet_id, old in moved.items():
+        _leave_language(changes, snippet_id, old)
+    for snippet_id, score in scores.items():
+        language = events[snippet_id][0]
+        for lang in (None, language):
+            changes.upsert(list_name("trending", lang), snippet_id, score)
+    for name in _write_lists(connection, changes):
+        enqueue(
+            session,
+            "hot_lists.rebuild",
+            {"name": name},
+            dedup_key=f"hot_lists.rebuild:{name}",
+        )
+    session.info.setdefault(_TOUCHED, set()).update(changes.names())
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    for name in session.info.pop(_TOUCHED, ()):
+        _memory.pop(name)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session: Session, _previous: Any) -> None:
+    session.info.pop(_TOUCHED, None)
+
+
+def _ranked_query(kind: ListKind, language: str | None, limit: int) -> Select[Any]:
+    """Top ``limit`` live snippets of a list straight from the tables.
+
+    Both orders are index scans: ``recent`` walks the primary key (or
+    ``ix_snippets_language_id``) backwards and ``trending`` walks the
+    activity score indexes.
+    """
+    stmt: Select[Any]
+    if kind == "recent":
+        stmt = (
+            select(Snippet.id)
+            .where(Snippet._is_deleted.is_(False))
+            .order_by(Snippet.id.desc())
+        )
+        if language is not None:
+            stmt = stmt.where(Snippet.language == language)
+        return stmt.limit(limit)
+    stmt = (
+        select(SnippetActivity.snippet_id, SnippetActivity.score)
+        .join(Snippet, Snippet.id == SnippetActivity.snippet_id)
+        .where(Snippet._is_deleted.is_(False))
+        .order_by(SnippetActivity.score.desc(), SnippetActivity.snippet_id.desc())
+    )
+    if language is not None:
+        stmt = stmt.where(SnippetActivity.language == language)
+    return stmt.limit(limit)
+
+
+def _compute(db: Session, name: str) -> RankedIds:
+    kind, language = _parse_name(name)
+    stmt = _ranked_query(kind, language, _capacity())
+    # Each shard contributes its own top entries; RankedIds keeps the best.
+    rows = [
+        row
+        for part in scatter(db, lambda shard: shard.execute(stmt).all())
+        for row in part
+    ]
+    if kind == "recent":
+        entries = [(row.id, _created_score(row.id)) for row in rows]
+    else:
+        entries = [(row.snippet_id, row.score) for row in rows]
+    return RankedIds(_capacity(), entries)
+
+
+def hot_ids(
+    db: Session,
+    kind: ListKind,
+    language: str | None = None,
+    limit: int | None = None,
+) -> list[UUID]:
+    """Return the ids of a hot list, best first.
+
+    Args:
+        db: Database session; only read from.
+        kind: ``"recent"`` or ``"trending"``.
+        language: Restrict the list to one language.
+        limit: Number of ids, at most ``HOT_LIST_SIZE`` (the default).
+
+    Returns:
+        list[UUID]: Snippet ids; deleted snippets are never included.
+    """
+    size = settings.HOT_LIST_SIZE
+    limit = size if limit is None else min(limit, size)
+    name = list_name(kind, language)
+    ids = _memory.get(name)
+    if ids is None:
+        row = db.execute(
+            select(HotList.ids, HotList.exhaustive).where(HotList.name == name)
+        ).first()
+        if row is not None and _servable(len(row.ids) // 16, row.exhaustive):
+            ids = tuple(
+                UUID(bytes=row.ids[i : i + 16]) for i in range(0, len(row.ids), 16)
+            )
+        else:
+            # The write that left it short queued its rebuild.
+            ids = tuple(_compute(db, name).ids())
+        _memory.set(name, ids)
+    return list(ids[:limit])
+
+
+def rebuild(db: Session, name: str) -> None:
+    """Recompute a list from the tables and store it."""
+    ranked = _compute(db, name)
+    ids, scores = ranked.pack()
+    _store(
+        db.connection(),
+        [
+            {
+                "name": name,
+                "ids": ids,
+                "scores": scores,
+                "exhaustive": len(ranked) < ranked.capacity,
+            }
+        ],
+    )
+    db.info.setdefault(_TOUCHED, set()).add(name)
+
+
+@job_handler("hot_lists.rebuild")
+def rebuild_job(db: Session, payload: dict[str, Any]) -> None:
+    """Rebuild ``payload["name"]``, or every stored list plus the global ones."""
+    if payload.get("name"):
+        names = {payload["name"]}
+    else:
+        names = set(db.scalars(select(HotList.name))) | set(KINDS)
+    for name in sorted(names):
+        rebuild(db, name)
@@ -0,0 +1,87 @@
+"""On-demand profiling of a serving worker.
+
+:func:`profile_worker` samples every thread of this process for a few
+seconds with ``packages.telemetry.profiler`` and then describes the asyncio
+tasks still waiting, so a slowdown that only shows under real load can be
+looked at where it happens. It is off unless ``PROFILER_ENABLED`` is set,
+and one run at a time is allowed per worker; a request reaches a single
+worker, so profile each one that needs it.
+
+The sampler runs on a thread of its own rather than in the thread pool,
+whose threads it is meant to watch. It is stopped early if the request
+goes away, and the next run can only start once it has.
+"""
+
+import asyncio
+import contextlib
+import logging
+import threading
+from dataclasses import dataclass
+
+from apps.core.config import settings
+from apps.core.exceptions import NotFoundError, ProfilerBusyError
+from packages.telemetry.profiler import AwaitingTask, Profile, Sampler, awaiting_tasks
+
+logger = logging.getLogger(__name__)
+
+_running = threading.Lock()
+
+
+@dataclass
+class WorkerProfile:
+    """Result of :func:`profile_worker`."""
+
+    profile: Profile
+    tasks: list[AwaitingTask]
+
+
+def _settle(future: "asyncio.Future[Profile]", outcome: Profile | Exception) -> None:
+    if future.done():
+        return
+    if isinstance(outcome, Exception):
+        future.set_exception(outcome)
+    else:
+        future.set_result(outcome)
+
+
+async def profile_worker(seconds: float) -> WorkerProfile:
+    """Sample all threads of this worker for ``seconds``.
+
+    Raises:
+        NotFoundError: If profiling is disabled.
+        ProfilerBusyError: If a run is already in progress.
+    """
+    if not settings.PROFILER_ENABLED:
+        raise NotFoundError("Profiling is disabled")
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusyError("A profile of this worker is already running")
+    sampler = Sampler(
+        interval=settings.PROFILER_INTERVAL_MS / 1000,
+        max_overhead=settings.PROFILER_MAX_OVERHEAD,
+        max_depth=settings.PROFILER_MAX_DEPTH,
+        max_stacks=settings.PROFILER_MAX_STACKS,
+    )
+    loop = asyncio.get_running_loop()
+    done: asyncio.Future[Profile] = loop.create_future()
+
+    def run() -> None:
+        outcome: Profile | Exception
+        try:
+            outcome = sampler.run(min(seconds, settings.PROFILER_MAX_SECONDS))
+        except Exception as exc:
+            outcome = exc
+        finally:
+            _running.release()
+        # The loop is gone if the worker shut down meanwhile.
+        with contextlib.suppress(RuntimeError):
+            loop.call_soon_threadsafe(_settle, done, outcome)
+
+    logger.info("Profiling this worker for %.1f s", seconds)
+    threading.Thread(target=run, name="profiler", daemon=True).start()
+    try:
+        profile = await done
+    finally:
+        sampler.stop()
+    return WorkerProfile(
+        profile=profile, tasks=awaiting_tasks(limit=settings.PROFILER_MAX_DEPTH)
+    )
@@ -0,0 +1,270 @@
+"""Raw content of versions and snippets, read in pieces.
+
+A :class:`RawContent` describes a body as UTF-8 bytes: its length, its
+content hash and a way to read any byte range of it ``RAW_CHUNK_SIZE``
+bytes at a time, so a download never holds the whole body in memory.
+
+- A version stored in the database is read with SQLite's incremental blob
+  I/O (``substr`` on Python 3.10). Every piece is read on a freshly checked
+  out connection, so no read transaction stays open while a slow client
+  catches up, which would hold off writers. Version rows only change when
+  they are archived, which empties ``content``; a reader that notices
+  continues from the pack.
+- An archived version is decompressed from its pack as it is sent.
+- A snippet is served from its current version, which holds the same text
+  and never changes. Snippets whose content matches no version, such as
+  ones created without any, are read whole.
+"""
+
+import hashlib
+import sqlite3
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any, cast
+from uuid import UUID
+
+from sqlalchemy import ColumnClause, Connection, Engine, literal_column, select
+from sqlalchemy.orm import Session, aliased
+
+from apps.core.config import settings
+from apps.core.exceptions import SnippetNotFoundError, VersionNotFoundError
+from apps.db.sharding import shard_binds, snippet_bind
+from apps.services.archive import stream_archived
+from packages.models import Snippet, Version
+
+_VERSIONS = Version.__tablename__
+_version_rowid: ColumnClause[int] = literal_column(f"{_VERSIONS}.rowid")
+
+
+class _RowChanged(Exception):
+    """A row's content changed while it was being read."""
+
+
+@dataclass
+class RawContent:
+    """A body to send as UTF-8 bytes, read lazily."""
+
+    etag: str  # content hash of the body
+    size: int
+    read: Callable[[int, int], Iterator[bytes]]
+
+    def chunks(self, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+        """The bytes from ``start`` up to ``end`` (exclusive), in pieces."""
+        return self.read(start, self.size if end is None else end)
+
+
+def _slice(chunks: Iterable[bytes], start: int, end: int) -> Iterator[bytes]:
+    position = 0
+    for chunk in chunks:
+        if position >= end:
+            return
+        low, high = max(start - position, 0), min(end - position, len(chunk))
+        position += len(chunk)
+        if low < high:
+            yield chunk[low:high]
+
+
+def _hash(chunks: Iterable[bytes]) -> str:
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sqlite(conn: Connection) -> sqlite3.Connection:
+    # The sqlite3 connection beneath SQLAlchemy's pool wrapper.
+    return cast(sqlite3.Connection, conn.connection.driver_connection)
+
+
+if sys.version_info >= (3, 11):
+
+    def _blob_size(conn: Connection, rowid: int) -> int:
+        with _sqlite(conn).blobopen(_VERSIONS, "content", rowid, readonly=True) as blob:
+            return len(blob)
+
+    def _blob_read(
+        conn: Connection, rowid: int, size: int, position: int, count: int
+    ) -> bytes:
+        with _sqlite(conn).blobopen(_VERSIONS, "content", rowid, readonly=True) as blob:
+            if len(blob) != size:
+                raise _RowChanged
+            blob.seek(position)
+            return blob.read(count)
+
+else:
+    # Incremental blob I/O needs Python 3.11; read the same ranges with SQL.
+
+    def _blob_size(conn: Connection, rowid: int) -> int:
+        return int(
+            conn.exec_driver_sql(
+                f"SELECT length(CAST(content AS BLOB)) FROM {_VERSIONS} "
+                "WHERE rowid = ?",
+                (rowid,),
+            ).scalar_one()
+        )
+
+    def _blob_read(
+        conn: Connection, rowid: int, size: int, position: int, count: int
+    ) -> bytes:
+        row = conn.exec_driver_sql(
+            "SELECT length(CAST(content AS BLOB)), "
+            f"substr(CAST(content AS BLOB), ?, ?) FROM {_VERSIONS} WHERE rowid = ?",
+            (position + 1, count, rowid),
+        ).first()
+        if row is None or row[0] != size:
+            raise _RowChanged
+        return bytes(row[1])
+
+
+def _blob_chunks(
+    bind: Engine, rowid: int, size: int, start: int, end: int
+) -> Iterator[bytes]:
+    position = start
+    while position < end:
+        with bind.connect() as conn:
+            data = _blob_read(
+                conn,
+                rowid,
+                size,
+                position,
+                min(settings.RAW_CHUNK_SIZE, end - position),
+            )
+        position += len(data)
+        yield data
+
+
+def _archived_chunks(row: Any, start: int, end: int) -> Iterator[bytes]:
+    _, chunks = stream_archived(
+        row.id,
+        row.pack_id,
+        row.pack_offset,
+        row.pack_length,
+        chunk_size=settings.RAW_CHUNK_SIZE,
+    )
+    return _slice(chunks, start, end)
+
+
+def _stored_chunks(
+    bind: Engine, version_id: UUID, rowid: int, size: int, start: int, end: int
+) -> Iterator[bytes]:
+    position = start
+    try:
+        for data in _blob_chunks(bind, rowid, size, start, end):
+            position += len(data)
+            yield data
+    except _RowChanged:
+        with bind.connect() as conn:
+            row = conn.execute(
+                _version_columns().where(Version.id == version_id)
+            ).first()
+        if row is None or row.pack_id is None:
+            raise
+        # Archived meanwhile: the same body continues from its pack.
+        yield from _archived_chunks(row, position, end)
+
+
+def _version_columns() -> Any:
+    return select(
+        Version.id,
+        _version_rowid.label("rowid"),
+        Version.content_hash,
+        Version.pack_id,
+        Version.pack_offset,
+        Version.pack_length,
+    )
+
+
+def _open_version_row(bind: Engine, conn: Connection, row: Any) -> RawContent:
+    if row.pack_id is not None:
+        size, _ = stream_archived(
+            row.id,
+            row.pack_id,
+            row.pack_offset,
+            row.pack_length,
+            chunk_size=settings.RAW_CHUNK_SIZE,
+        )
+        content = RawContent(
+            etag="", size=size, read=lambda s, e: _archived_chunks(row, s, e)
+        )
+    else:
+        version_id, rowid = row.id, row.rowid
+        size = _blob_size(conn, rowid)
+        content = RawContent(
+            etag="",
+            size=size,
+            read=lambda s, e: _stored_chunks(bind, version_id, rowid, size, s, e),
+        )
+    # Rows still waiting for the content hash backfill are hashed as read.
+    content.etag = row.content_hash or _hash(content.chunks())
+    return content
+
+
+def _snapshot(conn: Connection) -> None:
+    # The row and the size of its blob have to come from the same snapshot,
+    # or archiving could slip in between. The pool ends it on return.
+    if not _sqlite(conn).in_transaction:
+        conn.exec_driver_sql("BEGIN")
+
+
+def open_version_content(db: Session, version_id: UUID) -> RawContent:
+    """Prepare a version's content for streaming.
+
+    Raises:
+        VersionNotFoundError: If the version does not exist.
+    """
+    for bind in shard_binds(db):
+        with bind.connect() as conn:
+            _snapshot(conn)
+            row = conn.execute(
+                _version_columns().where(Version.id == version_id)
+            ).first()
+            if row is not None:
+                return _open_version_row(bind, conn, row)
+    raise VersionNotFoundError(f"Version {version_id} not found")
+
+
+def open_snippet_content(db: Session, snippet_id: UUID) -> RawContent:
+    """Prepare a live snippet's current content for streaming.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist or is soft deleted.
+    """
+    bind = snippet_bind(db, snippet_id)
+    newer = aliased(Version)
+    with bind.connect() as conn:
+        _snapshot(conn)
+        found = conn.execute(
+            select(Snippet.id).where(
+                Snippet.id == snippet_id, Snippet._is_deleted.is_(False)
+            )
+        ).first()
+        if found is None:
+            raise SnippetNotFoundError(f"Snippet {snippet_id} not found")
+        # Compared in SQLite, so the text is not loaded to find the version.
+        row = conn.execute(
+            _version_columns()
+            .join(Snippet, Snippet.id == Version.snippet_id)
+            .where(
+                Version.snippet_id == snippet_id,
+                Version.pack_id.is_(None),
+                Version.content == Snippet.content,
+                ~select(newer.id)
+                .where(
+                    newer.snippet_id == Version.snippet_id,
+                    newer.version_number > Version.version_number,
+                )
+                .exists(),
+            )
+        ).first()
+        if row is not None:
+            return _open_version_row(bind, conn, row)
+        body = conn.execute(
+            select(Snippet.content).where(Snippet.id == snippet_id)
+        ).scalar_one()
+    data = body.encode("utf-8")
+    return RawContent(
+        etag=hashlib.sha256(data).hexdigest(),
+        size=len(data),
+        read=lambda s, e: _slice([data], s, e),
+    )
@@ -0,0 +1,165 @@
+"""Shared read-through cache for API responses.
+
+Entries are keyed by a normalized route name plus its parameters. A miss,
+including a refill after expiry, goes through a single-flight layer, so any
+number of concurrent requests for the same key cause one database load.
+Batch reads use the same entries and the same flights: a batch joins the
+loads already running for its keys, loads the rest together, and single or
+batch reads of those keys join it meanwhile.
+
+A load that is running when its key is invalidated still answers the
+requests waiting on it, but its result is not cached: it may have read the
+data from before the change.
+"""
+
+import threading
+from collections.abc import Callable, Hashable, Iterable, Mapping
+from typing import Any, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+
+from apps.core.config import settings
+from packages.common.cache import LRUCache
+from packages.common.singleflight import NotInBatch, SingleFlight
+
+read_cache: LRUCache[str, Any] = LRUCache(
+    settings.READ_CACHE_SIZE, ttl=settings.READ_CACHE_TTL_SECONDS
+)
+_flights: SingleFlight[Any] = SingleFlight()
+
+K = TypeVar("K", bound=Hashable)
+
+
+class _Fill:
+    """A load in progress for one key."""
+
+    __slots__ = ("stale",)
+
+    def __init__(self) -> None:
+        self.stale = False
+
+
+_fills: dict[str, set[_Fill]] = {}
+_fills_lock = threading.Lock()
+
+
+def _start_fill(key: str) -> _Fill:
+    fill = _Fill()
+    with _fills_lock:
+        _fills.setdefault(key, set()).add(fill)
+    return fill
+
+
+def _finish_fill(key: str, fill: _Fill, value: Any = None) -> None:
+    """Stop tracking ``fill``, caching ``value`` unless it went stale."""
+    with _fills_lock:
+        fills = _fills[key]
+        fills.discard(fill)
+        if not fills:
+            del _fills[key]
+        if value is not None and not fill.stale:
+            read_cache.set(key, value)
+
+
+def cache_key(route: str, params: Mapping[str, Any]) -> str:
+    """Build a key that ignores parameter order and value types."""
+    normalized = "&".join(f"{name}={params[name]}" for name in sorted(params))
+    return f"{route}?{normalized}"
+
+
+async def cached_read(
+    route: str, params: Mapping[str, Any], load: Callable[[], Any]
+) -> Any:
+    """Return a cached value, loading it at most once across concurrent callers.
+
+    Args:
+        route: Logical route name, e.g. ``"snippets.get"``.
+        params: Parameters that identify the result.
+        load: Blocking loader; it runs in the thread pool and its result is
+            cached unless it raises.
+
+    Returns:
+        Any: The cached or freshly loaded value.
+    """
+    key = cache_key(route, params)
+    cached = read_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def fill() -> Any:
+        started = _start_fill(key)
+        value = None
+        try:
+            value = await run_in_threadpool(load)
+        finally:
+            _finish_fill(key, started, value)
+        return value
+
+    try:
+        return await _flights.do(key, fill)
+    except NotInBatch:
+        # Joined a batch load that did not find it; let ``load`` report that.
+        return await run_in_threadpool(load)
+
+
+async def cached_read_many(
+    route: str,
+    param: str,
+    values: Iterable[K],
+    load: Callable[[list[K]], Mapping[K, Any]],
+    *,
+    not_found: tuple[type[Exception], ...] = (),
+) -> dict[K, Any]:
+    """Batch form of :func:`cached_read` for routes keyed by one parameter.
+
+    Args:
+        route: Logical route name shared with the single reads.
+        param: Name of the parameter, e.g. ``"id"``.
+        values: Parameter values to read.
+        load: Blocking loader called at most once, in the thread pool,
+            with the values that missed the cache and are not already being
+            loaded; values it leaves out of its result are treated as not
+            found and not cached.
+        not_found: Exceptions the single reads' loaders raise for a missing
+            value, so a joined single read that raises one means not found.
+
+    Returns:
+        dict[K, Any]: The found values.
+    """
+    found: dict[K, Any] = {}
+    missing: list[K] = []
+    for value in dict.fromkeys(values):
+        cached = read_cache.get(cache_key(route, {param: value}))
+        if cached is not None:
+            found[value] = cached
+        else:
+            missing.append(value)
+    if missing:
+        keys = {cache_key(route, {param: value}): value for value in missing}
+
+        async def fill(owned: list[str]) -> dict[str, Any]:
+            fills = {key: _start_fill(key) for key in owned}
+            loaded: Mapping[K, Any] = {}
+            try:
+                loaded = await run_in_threadpool(load, [keys[key] for key in owned])
+            finally:
+                for key, started in fills.items():
+                    _finish_fill(key, started, loaded.get(keys[key]))
+            return {key: loaded[keys[key]] for key in owned if keys[key] in loaded}
+
+        results = await _flights.do_many(keys, fill, absent=not_found)
+        found.update((keys[key], value) for key, value in results.items())
+    return found
+
+
+def invalidate(route: str, params: Mapping[str, Any]) -> None:
+    """Drop a cached entry after the underlying data changed.
+
+    Loads of the entry that are already running are not cached when they
+    finish.
+    """
+    key = cache_key(route, params)
+    with _fills_lock:
+        for fill in _fills.get(key, ()):
+            fill.stale = True
+        read_cache.pop(key)
@@ -0,0 +1,381 @@
+"""Near-duplicate snippet search backed by a MinHash LSH index.
+
+Each snippet's current content has a MinHash signature in
+``snippet_signatures`` and one ``snippet_lsh_bands`` row per band bucket.
+Candidates for "similar to X" are the snippets sharing any bucket with X, an
+indexed lookup whose cost depends on the number of near neighbours rather
+than on the number of snippets; only candidates have their similarity
+estimated.
+
+The index follows ``Snippet.content`` through mapper events, in the same
+transaction as the write. Saving a new version updates that content, and
+only the bands whose bucket changed are rewritten. Signatures are computed
+in ``before_flush``, so the SQLite write lock taken by the flush is not held
+while hashing; the mapper events only write rows. Importing this module
+registers the events; snippets written before it existed are indexed by the
+``similarity.reindex`` job.
+"""
+
+from dataclasses import dataclass
+from typing import Any, cast
+from uuid import UUID
+
+from sqlalchemy import (
+    Table,
+    and_,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    or_,
+    select,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Mapper, Session, object_session
+
+from apps.core.config import settings
+from apps.db.sharding import is_sharded, partition, scatter, snippet_connection
+from apps.jobs import job_handler
+from apps.services.snippets import get_snippet
+from packages.common.hashing import content_hash
+from packages.common.minhash import MinHasher, jaccard
+from packages.models import Snippet, SnippetLSHBand, SnippetSignature
+
+hasher = MinHasher(
+    num_perm=settings.SIMILARITY_NUM_PERM,
+    bands=settings.SIMILARITY_BANDS,
+    shingle_size=settings.SIMILARITY_SHINGLE_SIZE,
+)
+
+_signatures = cast(Table, SnippetSignature.__table__)
+_bands = cast(Table, SnippetLSHBand.__table__)
+
+# session.info key: content hash -> signature, computed before the flush.
+_PENDING = "similarity_signatures"
+
+
+@dataclass(frozen=True, slots=True)
+class SimilarSnippet:
+    """A snippet and its estimated similarity to the query."""
+
+    snippet_id: UUID
+    similarity: float
+
+
+def _band_keys(signature: tuple[int, ...]) -> dict[int, int]:
+    # Content without tokens has the all-max signature; never bucket it, or
+    # every empty snippet would be a duplicate of every other.
+    if not signature or min(signature) == 0xFFFFFFFF:
+        return {}
+    return dict(enumerate(hasher.band_keys(signature)))
+
+
+def index_content(
+    connection: Connection,
+    snippet_id: UUID,
+    content: str,
+    *,
+    signature: tuple[int, ...] | None = None,
+) -> bool:
+    """Bring a snippet's signature and band rows up to date with ``content``.
+
+    Args:
+        connection: Connection of the transaction making the change.
+        snippet_id: Snippet to index.
+        content: Its new content.
+        signature: The MinHash signature of ``content``, if already computed.
+
+    Returns:
+        bool: ``False`` if the stored signature was already for this content.
+    """
+    digest = content_hash(content)
+    existing = connection.execute(
+        select(_signatures.c.content_hash, _signatures.c.signature).where(
+            _signatures.c.snippet_id == snippet_id
+        )
+    ).first()
+    if existing is not None and existing.content_hash == digest:
+        return False
+
+    if signature is None:
+        signature = hasher.signature(content)
+    new_keys = _band_keys(signature)
+    old_keys = _band_keys(hasher.unpack(existing.signature)) if existing else {}
+    stale = [band for band, key in old_keys.items() if new_keys.get(band) != key]
+    if stale:
+        connection.execute(
+            delete(_bands).where(
+                _bands.c.snippet_id == snippet_id, _bands.c.band.in_(stale)
+            )
+        )
+    fresh = [
+        {"band": band, "bucket": key, "snippet_id": snippet_id}
+        for band, key in new_keys.items()
+        if old_keys.get(band) != key
+    ]
+    if fresh:
+        connection.execute(insert(_bands), fresh)
+
+    packed = hasher.pack(signature)
+    upsert = sqlite_insert(_signatures).values(
+        snippet_id=snippet_id, content_hash=digest, signature=packed
+    )
+    connection.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[_signatures.c.snippet_id],
+            set_={
+                "content_hash": digest,
+                "signature": packed,
+                "updated_at": func.now(),
+            },
+        )
+    )
+    return True
+
+
+def _content_changed(snippet: Snippet) -> bool:
+    return bool(inspect(snippet).attrs.content.history.has_changes())
+
+
+@event.listens_for(Session, "before_flush")
+def _before_flush(session: Session, _context: Any, _instances: Any) -> None:
+    pending: dict[str, tuple[int, ...]] = session.info.setdefault(_PENDING, {})
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Snippet) and obj.content is not None:
+            if obj in session.new or _content_changed(obj):
+                digest = content_hash(obj.content)
+                if digest not in pending:
+                    pending[digest] = hasher.signature(obj.content)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _after_flush(session: Session, _context: Any) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def _index(connection: Connection, target: Snippet) -> None:
+    session = object_session(target)
+    pending = session.info.get(_PENDING, {}) if session is not None else {}
+    index_content(
+        connection,
+        target.id,
+        target.content,
+        signature=pending.get(content_hash(target.content)),
+    )
+
+
+@event.listens_for(Snippet, "after_insert")
+def _on_snippet_insert(
+    _mapper: Mapper[Any], connection: Connection, target: Snippet
+) -> None:
+    _index(connection, target)
+
+
+@event.listens_for(Snippet, "after_update")
+def _on_snippet_update(
+    _mapper: Mapper[Any], connection: Connection, target: Snippet
+) -> None:
+    if _content_changed(target):
+        _index(connection, target)
+
+
+def _rank(
+    db: Session,
+    signature: tuple[int, ...],
+    *,
+    exclude: UUID | None,
+    threshold: float | None,
+    limit: int,
+) -> list[SimilarSnippet]:
+    keys = _band_keys(signature)
+    if not keys:
+        return []
+    if threshold is None:
+        threshold = settings.SIMILARITY_THRESHOLD
+    candidates = select(_bands.c.snippet_id).where(
+        or_(
+            *(
+                and_(_bands.c.band == band, _bands.c.bucket == key)
+                for band, key in keys.items()
+            )
+        )
+    )
+    stmt = (
+        select(SnippetSignature.snippet_id, SnippetSignature.signature)
+        .join(Snippet, Snippet.id == SnippetSignature.snippet_id)
+        .where(
+            SnippetSignature.snippet_id.in_(candidates),
+            Snippet._is_deleted.is_(False),
+        )
+    )
+    if exclude is not None:
+        stmt = stmt.where(SnippetSignature.snippet_id != exclude)
+
+    matches = []
+    for row in db.execute(stmt):
+        similarity = jaccard(signature, hasher.unpack(row.signature))
+        if similarity >= threshold:
+            matches.append(SimilarSnippet(row.snippet_id, similarity))
+    matches.sort(key=lambda match: match.similarity, reverse=True)
+    return matches[:limit]
+
+
+def find_similar(
+    db: Session,
+    snippet_id: UUID,
+    *,
+    threshold: float | None = None,
+    limit: int = 20,
+) -> list[SimilarSnippet]:
+    """Return live snippets whose content is similar to a snippet's.
+
+    Args:
+        db: Database session.
+        snippet_id: Snippet to compare against.
+        threshold: Minimum estimated Jaccard similarity of token shingles;
+            defaults to ``SIMILARITY_THRESHOLD``.
+        limit: Maximum number of results.
+
+    Returns:
+        list[SimilarSnippet]: Matches, most similar first.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist.
+    """
+    snippet = get_snippet(db, snippet_id)
+    packed = db.scalar(
+        select(SnippetSignature.signature).where(
+            SnippetSignature.snippet_id == snippet_id
+        )
+    )
+    # Snippets not indexed yet are compared without being written.
+    if packed is not None:
+        signature = hasher.unpack(packed)
+    else:
+        signature = hasher.signature(snippet.content)
+    return _rank(db, signature, exclude=snippet_id, threshold=threshold, limit=limit)
+
+
+def find_similar_to_content(
+    db: Session,
+    content: str,
+    *,
+    threshold: float | None = None,
+    limit: int = 20,
+) -> list[SimilarSnippet]:
+    """Return live snippets similar to arbitrary content, e.g. before saving it."""
+    return _rank(
+        db, hasher.signature(content), exclude=None, threshold=threshold, limit=limit
+    )
+
+
+def _shared_buckets(
+    db: Session,
+) -> tuple[dict[tuple[int, int], list[UUID]], dict[UUID, bytes]]:
+    """Buckets held by two or more live snippets, and those snippets' signatures."""
+    buckets: dict[tuple[int, int], list[UUID]] = {}
+    packed: dict[UUID, bytes] = {}
+    live = (
+        select(_bands.c.band, _bands.c.bucket, _bands.c.snippet_id)
+        .join(Snippet, Snippet.id == _bands.c.snippet_id)
+        .where(Snippet._is_deleted.is_(False))
+    )
+    if is_sharded(db):
+        # Near duplicates may live on different shards, so the buckets are
+        # grouped here over every shard's rows instead of in SQL.
+        for part in scatter(db, lambda shard: shard.execute(live).all()):
+            for row in part:
+                buckets.setdefault((row.band, row.bucket), []).append(row.snippet_id)
+        buckets = {key: members for key, members in buckets.items() if len(members) > 1}
+        members = {member for group in buckets.values() for member in group}
+        for group in partition(db, members, lambda snippet_id: snippet_id):
+            packed.update(
+                db.execute(
+                    select(_signatures.c.snippet_id, _signatures.c.signature).where(
+                        _signatures.c.snippet_id.in_(group)
+                    )
+                )
+                .tuples()
+                .all()
+            )
+        return buckets, packed
+    shared = (
+        select(_bands.c.band, _bands.c.bucket)
+        .group_by(_bands.c.band, _bands.c.bucket)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    rows = db.execute(
+        live.add_columns(_signatures.c.signature)
+        .join(
+            shared,
+            and_(_bands.c.band == shared.c.band, _bands.c.bucket == shared.c.bucket),
+        )
+        .join(_signatures, _signatures.c.snippet_id == _bands.c.snippet_id)
+        .order_by(_bands.c.band, _bands.c.bucket)
+    ).all()
+    for row in rows:
+        packed.setdefault(row.snippet_id, row.signature)
+        buckets.setdefault((row.band, row.bucket), []).append(row.snippet_id)
+    return buckets, packed
+
+
+def near_duplicate_clusters(
+    db: Session, *, threshold: float | None = None
+) -> list[list[UUID]]:
+    """Group live snippets into clusters of near duplicates.
+
+    Only snippets sharing a bucket are compared; pairs above the threshold
+    are merged with union-find, so a cluster is a chain of similar pairs.
+
+    Returns:
+        list[list[UUID]]: Clusters of two or more snippets, largest first.
+    """
+    if threshold is None:
+        threshold = settings.SIMILARITY_THRESHOLD
+    buckets, packed = _shared_buckets(db)
+    signatures = {
+        snippet_id: hasher.unpack(signature) for snippet_id, signature in packed.items()
+    }
+
+    parent: dict[UUID, UUID] = {}
+
+    def find(node: UUID) -> UUID:
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for members in buckets.values():
+        for i, left in enumerate(members):
+            for right in members[i + 1 :]:
+                if find(left) == find(right):
+                    continue
+                if jaccard(signatures[left], signatures[right]) >= threshold:
+                    parent[find(left)] = find(right)
+
+    clusters: dict[UUID, list[UUID]] = {}
+    for node in parent:
+        clusters.setdefault(find(node), []).append(node)
+    return sorted(
+        (sorted(members) for members in clusters.values() if len(members) > 1),
+        key=len,
+        reverse=True,
+    )
+
+
+@job_handler("similarity.reindex")
+def reindex_job(db: Session, payload: dict[str, Any]) -> None:
+    """Index snippets missing or stale in the near-duplicate index.
+
+    ``payload["snippet_ids"]`` limits the run to those snippets; without it
+    every snippet is checked.
+    """
+    stmt = select(Snippet.id, Snippet.content)
+    if payload.get("snippet_ids"):
+        stmt = stmt.where(Snippet.id.in_([UUID(i) for i in payload["snippet_ids"]]))
+    for row in db.execute(stmt.execution_options(yield_per=500)):
+        index_content(snippet_connection(db, row.id), row.id, row.content)
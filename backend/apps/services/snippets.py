@@ -0,0 +1,138 @@
+"""Snippet queries."""
+
+from collections.abc import Collection, Iterable
+from typing import Any
+from uuid import UUID
+
+from pydantic.alias_generators import to_snake
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy.orm.interfaces import ORMOption
+
+from apps.core.exceptions import InvalidFieldsError, SnippetNotFoundError
+from packages.models import Snippet, SnippetTag, Version
+
+# Fields a snippet list item can carry, by attribute name. ``tags`` is a
+# relationship; the rest are columns.
+LIST_FIELDS = (
+    "id",
+    "title",
+    "language",
+    "description",
+    "content",
+    "tags",
+    "created_at",
+    "updated_at",
+)
+# List profile: everything but the potentially large text columns.
+DEFAULT_LIST_FIELDS = ("id", "title", "language", "tags", "created_at")
+
+
+def get_snippet(db: Session, snippet_id: UUID) -> Snippet:
+    """Load a live snippet with its tags.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist or is soft deleted.
+    """
+    stmt = (
+        select(Snippet)
+        .options(selectinload(Snippet.snippet_tags).selectinload(SnippetTag.tag))
+        .where(Snippet.id == snippet_id, Snippet._is_deleted.is_(False))
+    )
+    snippet = db.scalars(stmt).first()
+    if snippet is None:
+        raise SnippetNotFoundError(f"Snippet {snippet_id} not found")
+    return snippet
+
+
+def get_current_version(db: Session, snippet_id: UUID) -> Version | None:
+    """Return the highest-numbered version of a snippet without its content."""
+    stmt = (
+        select(Version)
+        .options(load_only(Version.version_number, Version.created_at))
+        .where(Version.snippet_id == snippet_id)
+        .order_by(Version.version_number.desc())
+        .limit(1)
+    )
+    return db.scalars(stmt).first()
+
+
+def get_snippets(db: Session, snippet_ids: Collection[UUID]) -> dict[UUID, Snippet]:
+    """Load many live snippets with their tags in one ``IN`` query.
+
+    Missing and soft-deleted ids are left out of the result.
+    """
+    if not snippet_ids:
+        return {}
+    stmt = (
+        select(Snippet)
+        .options(selectinload(Snippet.snippet_tags).selectinload(SnippetTag.tag))
+        .where(Snippet.id.in_(snippet_ids), Snippet._is_deleted.is_(False))
+    )
+    return {snippet.id: snippet for snippet in db.scalars(stmt)}
+
+
+def get_current_versions(
+    db: Session, snippet_ids: Collection[UUID]
+) -> dict[UUID, Version]:
+    """Return the highest-numbered version of each snippet without content."""
+    if not snippet_ids:
+        return {}
+    latest = (
+        select(Version.snippet_id, func.max(Version.version_number))
+        .where(Version.snippet_id.in_(snippet_ids))
+        .group_by(Version.snippet_id)
+    )
+    stmt = select(Version).options(
+        load_only(Version.snippet_id, Version.version_number, Version.created_at)
+    )
+    stmt = stmt.where(tuple_(Version.snippet_id, Version.version_number).in_(latest))
+    return {version.snippet_id: version for version in db.scalars(stmt)}
+
+
+def parse_list_fields(fields: str | None) -> tuple[str, ...]:
+    """Parse a ``fields=`` projection of snippet list items.
+
+    Args:
+        fields: Comma-separated names, camelCase or snake_case; ``None``
+            selects ``DEFAULT_LIST_FIELDS``. ``id`` is always included.
+
+    Returns:
+        tuple[str, ...]: Attribute names in ``LIST_FIELDS`` order.
+
+    Raises:
+        InvalidFieldsError: If a name is not a list field.
+    """
+    if fields is None:
+        return DEFAULT_LIST_FIELDS
+    wanted = {to_snake(name.strip()) for name in fields.split(",") if name.strip()}
+    unknown = wanted - set(LIST_FIELDS)
+    if unknown:
+        raise InvalidFieldsError(
+            f"Unknown fields: {', '.join(sorted(unknown))}; "
+            f"choose from {', '.join(LIST_FIELDS)}"
+        )
+    return tuple(name for name in LIST_FIELDS if name in wanted or name == "id")
+
+
+def list_load_options(fields: Iterable[str]) -> list[ORMOption]:
+    """Loader options that read only the columns behind ``fields``."""
+    selected = set(fields)
+    options: list[ORMOption] = [
+        load_only(
+            *(
+                getattr(Snippet, name)
+                for name in LIST_FIELDS
+                if name in selected and name != "tags"
+            ),
+            raiseload=True,
+        )
+    ]
+    if "tags" in selected:
+        options.append(selectinload(Snippet.snippet_tags).selectinload(SnippetTag.tag))
+    return options
+
+
+def list_item(snippet: Snippet, fields: Iterable[str]) -> dict[str, Any]:
+    """The selected fields of a snippet loaded with ``list_load_options``."""
+    return {name: getattr(snippet, name) for name in fields}
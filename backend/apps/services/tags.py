@@ -0,0 +1,211 @@
+"""Set-based tag assignment.
+
+Tags are written with a fixed number of statements however many snippets
+and names are involved: missing tags are created with
+``INSERT ... ON CONFLICT DO NOTHING`` and their ids read back in one query;
+the current associations are read once, and the set differences become one
+``DELETE`` of stale links and one conflict-ignoring ``INSERT`` of new ones.
+The links actually added or removed are appended to the change feed with
+one more statement each.
+Concurrent writers assigning the same tags therefore never hit the unique
+constraints. Only very large batches are split, to stay under SQLite's
+bound parameter limit, and new links once per shard when snippets are
+sharded (see ``apps.db.sharding``).
+"""
+
+from collections.abc import Iterable, Mapping
+from uuid import UUID
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from apps.core.exceptions import InvalidTagError, SnippetNotFoundError
+from apps.db.sharding import partition
+from apps.services.changes import record_changes
+from packages.common.ids import uuid7
+from packages.models import Snippet, SnippetTag, Tag
+
+MAX_TAG_LENGTH = 50
+# Rows per multi-row INSERT, well under SQLite's bound parameter limit.
+_CHUNK_SIZE = 5000
+
+
+def normalize_tag_names(names: Iterable[str]) -> list[str]:
+    """Strip and deduplicate tag names, keeping their first-seen order.
+
+    Raises:
+        InvalidTagError: If a name is longer than ``MAX_TAG_LENGTH``.
+    """
+    seen: dict[str, None] = {}
+    for name in names:
+        name = name.strip()
+        if not name:
+            continue
+        if len(name) > MAX_TAG_LENGTH:
+            raise InvalidTagError(
+                f"Tag {name[:20]!r}... exceeds {MAX_TAG_LENGTH} characters"
+            )
+        seen.setdefault(name, None)
+    return list(seen)
+
+
+def _chunks(rows: list[dict], size: int = _CHUNK_SIZE) -> Iterable[list[dict]]:
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+def _ensure_live(db: Session, snippet_ids: set[UUID]) -> None:
+    found = set(
+        db.scalars(
+            select(Snippet.id).where(
+                Snippet.id.in_(snippet_ids), Snippet._is_deleted.is_(False)
+            )
+        )
+    )
+    missing = snippet_ids - found
+    if missing:
+        raise SnippetNotFoundError(f"Snippet {min(missing)} not found")
+
+
+def _upsert_tags(db: Session, names: set[str]) -> dict[str, UUID]:
+    if not names:
+        return {}
+    rows = [{"id": uuid7(), "name": name} for name in sorted(names)]
+    for chunk in _chunks(rows):
+        db.execute(sqlite_insert(Tag).values(chunk).on_conflict_do_nothing())
+    return dict(
+        db.execute(select(Tag.name, Tag.id).where(Tag.name.in_(names))).tuples().all()
+    )
+
+
+def _link(db: Session, pairs: list[tuple[UUID, UUID]]) -> None:
+    rows = [
+        {"id": uuid7(), "snippet_id": snippet_id, "tag_id": tag_id}
+        for snippet_id, tag_id in pairs
+    ]
+    added: list[tuple[UUID, UUID]] = []
+    for group in partition(db, rows, lambda row: row["snippet_id"]):
+        for chunk in _chunks(group):
+            added += (
+                db.execute(
+                    sqlite_insert(SnippetTag)
+                    .values(chunk)
+                    .on_conflict_do_nothing()
+                    .returning(SnippetTag.id, SnippetTag.snippet_id)
+                )
+                .tuples()
+                .all()
+            )
+    record_changes(db, "snippet_tag", "insert", added)
+
+
+def _expire_tags(db: Session, snippet_ids: set[UUID]) -> None:
+    # The statements bypass the unit of work; refresh loaded collections.
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, Snippet) and obj.id in snippet_ids:
+            db.expire(obj, ["snippet_tags"])
+
+
+def set_tags(
+    db: Session, assignments: Mapping[UUID, Iterable[str]]
+) -> dict[UUID, list[str]]:
+    """Replace the tags of one or many snippets.
+
+    Args:
+        db: Database session; the caller commits.
+        assignments: Snippet id to its complete new set of tag names. An
+            empty set removes every tag.
+
+    Returns:
+        dict[UUID, list[str]]: The normalized tag names now on each snippet.
+
+    Raises:
+        SnippetNotFoundError: If a snippet does not exist or is deleted.
+        InvalidTagError: If a tag name is too long.
+
+    Example:
+        >>> set_tags(db, {snippet_a: ["python", "sorting"], snippet_b: []})
+    """
+    wanted = {
+        snippet_id: normalize_tag_names(names)
+        for snippet_id, names in assignments.items()
+    }
+    if not wanted:
+        return wanted
+    snippet_ids = set(wanted)
+    _ensure_live(db, snippet_ids)
+    tag_ids = _upsert_tags(db, {name for names in wanted.values() for name in names})
+    desired = {
+        (snippet_id, tag_ids[name])
+        for snippet_id, names in wanted.items()
+        for name in names
+    }
+    current = {
+        (row.snippet_id, row.tag_id): row.id
+        for row in db.execute(
+            select(SnippetTag.id, SnippetTag.snippet_id, SnippetTag.tag_id).where(
+                SnippetTag.snippet_id.in_(snippet_ids)
+            )
+        )
+    }
+    stale = [
+        (link_id, pair[0]) for pair, link_id in current.items() if pair not in desired
+    ]
+    for start in range(0, len(stale), _CHUNK_SIZE):
+        db.execute(
+            delete(SnippetTag).where(
+                SnippetTag.id.in_(
+                    [link_id for link_id, _ in stale[start : start + _CHUNK_SIZE]]
+                )
+            )
+        )
+    record_changes(db, "snippet_tag", "delete", stale)
+    _link(db, sorted(desired - current.keys()))
+    _expire_tags(db, snippet_ids)
+    return wanted
+
+
+def add_tags(db: Session, snippet_ids: Iterable[UUID], names: Iterable[str]) -> None:
+    """Add tags to many snippets, keeping the tags they already have.
+
+    Raises:
+        SnippetNotFoundError: If a snippet does not exist or is deleted.
+        InvalidTagError: If a tag name is too long.
+    """
+    ids = set(snippet_ids)
+    tag_names = normalize_tag_names(names)
+    if not ids or not tag_names:
+        return
+    _ensure_live(db, ids)
+    tag_ids = _upsert_tags(db, set(tag_names))
+    _link(
+        db,
+        [(snippet_id, tag_ids[name]) for snippet_id in ids for name in tag_names],
+    )
+    _expire_tags(db, ids)
+
+
+def remove_tags(db: Session, snippet_ids: Iterable[UUID], names: Iterable[str]) -> None:
+    """Remove tags from many snippets in one statement.
+
+    Tags the snippets do not have are ignored.
+    """
+    ids = set(snippet_ids)
+    tag_names = normalize_tag_names(names)
+    if not ids or not tag_names:
+        return
+    removed = (
+        db.execute(
+            delete(SnippetTag)
+            .where(
+                SnippetTag.snippet_id.in_(ids),
+                SnippetTag.tag_id.in_(select(Tag.id).where(Tag.name.in_(tag_names))),
+            )
+            .returning(SnippetTag.id, SnippetTag.snippet_id)
+        )
+        .tuples()
+        .all()
+    )
+    record_changes(db, "snippet_tag", "delete", removed)
+    _expire_tags(db, ids)
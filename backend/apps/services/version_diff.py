@@ -0,0 +1,92 @@
+"""Diffs between arbitrary versions."""
+
+from dataclasses import dataclass
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from apps.core.config import settings
+from apps.core.exceptions import VersionNotFoundError
+from apps.services.archive import load_contents
+from packages.common.cache import LRUCache
+from packages.common.diff import DiffHunk, build_hunks, diff_lines
+from packages.common.hashing import content_hash
+
+
+@dataclass(frozen=True, slots=True)
+class VersionDiff:
+    """A rendered diff between two versions."""
+
+    base_hash: str
+    target_hash: str
+    exact: bool
+    added: int
+    removed: int
+    hunks: list[DiffHunk]
+    truncated: bool
+
+
+def _weight(diff: VersionDiff) -> int:
+    # Roughly the characters held; line objects cost about as much again.
+    return sum(2 * len(line.text) + 64 for hunk in diff.hunks for line in hunk.lines)
+
+
+# Keyed by (base hash, target hash, context) so identical contents in
+# different versions or snippets share one computation. Only the rendered
+# hunks are kept, and their total size is bounded as well as their number.
+_diff_cache: LRUCache[tuple[str, str, int], VersionDiff] = LRUCache(
+    settings.DIFF_CACHE_SIZE,
+    max_weight=settings.DIFF_CACHE_MAX_BYTES,
+    weigher=_weight,
+)
+
+
+def _load_contents(db: Session, base_id: UUID, target_id: UUID) -> tuple[str, str]:
+    contents = load_contents(db, {base_id, target_id})
+    for version_id in (base_id, target_id):
+        if version_id not in contents:
+            raise VersionNotFoundError(f"Version {version_id} not found")
+    return contents[base_id], contents[target_id]
+
+
+def diff_versions(
+    db: Session,
+    base_id: UUID,
+    target_id: UUID,
+    *,
+    context: int | None = None,
+) -> VersionDiff:
+    """Diff the content of two versions.
+
+    The computation is CPU bound; call this from a worker thread, not from
+    the event loop.
+
+    Args:
+        db: Database session.
+        base_id: Version treated as the original.
+        target_id: Version treated as the new text.
+        context: Unchanged lines around each hunk.
+
+    Returns:
+        VersionDiff: Hunks plus the diff's line counts.
+
+    Raises:
+        VersionNotFoundError: If either version does not exist.
+    """
+    if context is None:
+        context = settings.DIFF_CONTEXT_LINES
+    base, target = _load_contents(db, base_id, target_id)
+    key = (content_hash(base), content_hash(target), context)
+    cached = _diff_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = diff_lines(base, target, max_edit_distance=settings.DIFF_MAX_EDIT_DISTANCE)
+    hunks, truncated = build_hunks(
+        result, context=context, max_lines=settings.DIFF_MAX_OUTPUT_LINES
+    )
+    diff = VersionDiff(
+        key[0], key[1], result.exact, result.added, result.removed, hunks, truncated
+    )
+    _diff_cache.set(key, diff)
+    return diff
@@ -0,0 +1,97 @@
+"""Version graph queries backed by the closure table."""
+
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+
+from packages.models import Version, VersionClosure
+
+
+def get_ancestors(
+    db: Session, version_id: UUID, *, include_self: bool = False
+) -> list[Version]:
+    """Return the ancestors of a version, nearest first.
+
+    Args:
+        db: Database session.
+        version_id: Version whose lineage is requested.
+        include_self: Also return the version itself as the first element.
+
+    Returns:
+        list[Version]: Ancestors ordered from parent up to the root.
+    """
+    min_depth = 0 if include_self else 1
+    stmt = (
+        select(Version)
+        .join(VersionClosure, VersionClosure.ancestor_id == Version.id)
+        .where(
+            VersionClosure.descendant_id == version_id,
+            VersionClosure.depth >= min_depth,
+        )
+        .order_by(VersionClosure.depth)
+    )
+    return list(db.scalars(stmt))
+
+
+def get_descendants(
+    db: Session, version_id: UUID, *, include_self: bool = False
+) -> list[Version]:
+    """Return every version derived from a version, breadth first.
+
+    Args:
+        db: Database session.
+        version_id: Root of the subtree.
+        include_self: Also return the version itself as the first element.
+
+    Returns:
+        list[Version]: Descendants ordered by distance, then version number.
+    """
+    min_depth = 0 if include_self else 1
+    stmt = (
+        select(Version)
+        .join(VersionClosure, VersionClosure.descendant_id == Version.id)
+        .where(
+            VersionClosure.ancestor_id == version_id,
+            VersionClosure.depth >= min_depth,
+        )
+        .order_by(VersionClosure.depth, Version.version_number)
+    )
+    return list(db.scalars(stmt))
+
+
+def get_depth(db: Session, version_id: UUID) -> int | None:
+    """Return the distance from a version to its root.
+
+    Returns:
+        int | None: ``0`` for a root version, ``None`` if the version is unknown.
+    """
+    stmt = select(func.max(VersionClosure.depth)).where(
+        VersionClosure.descendant_id == version_id
+    )
+    return db.scalar(stmt)
+
+
+def get_lowest_common_ancestor(
+    db: Session, version_a: UUID, version_b: UUID
+) -> Version | None:
+    """Return the version where two branches diverged.
+
+    A version counts as its own ancestor, so if one version descends from the
+    other the older one is returned.
+
+    Returns:
+        Version | None: The nearest shared ancestor, or ``None`` if the versions
+        belong to unrelated lineages.
+    """
+    side_a = aliased(VersionClosure, name="side_a")
+    side_b = aliased(VersionClosure, name="side_b")
+    stmt = (
+        select(Version)
+        .join(side_a, side_a.ancestor_id == Version.id)
+        .join(side_b, side_b.ancestor_id == side_a.ancestor_id)
+        .where(side_a.descendant_id == version_a, side_b.descendant_id == version_b)
+        .order_by(side_a.depth)
+        .limit(1)
+    )
+    return db.scalars(stmt).first()
@@ -0,0 +1,87 @@
+"""Version queries filtered by ``version_metadata`` fields."""
+
+import re
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, func, select
+from sqlalchemy.orm import Session
+
+from apps.db.sharding import is_sharded, merge_sorted, scatter
+from packages.models import Version
+from packages.models.version import PROMOTED_METADATA_KEYS
+
+_KEY_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def metadata_column(key: str) -> ColumnElement[Any]:
+    """Return the SQL expression for a metadata key.
+
+    Promoted keys resolve to their indexed generated column; any other key
+    falls back to ``json_extract`` and therefore a scan.
+
+    Raises:
+        ValueError: If the key is not a plain identifier.
+    """
+    attribute = PROMOTED_METADATA_KEYS.get(key)
+    if attribute is not None:
+        column: ColumnElement[Any] = getattr(Version, attribute)
+        return column
+    if not _KEY_PATTERN.match(key):
+        raise ValueError(f"Invalid metadata key: {key!r}")
+    return func.json_extract(Version.version_metadata, f"$.{key}")
+
+
+def metadata_filter(key: str, value: Any) -> ColumnElement[bool]:
+    """Build a condition matching versions whose metadata ``key`` equals ``value``.
+
+    ``None`` matches versions where the key is absent or null.
+    """
+    column = metadata_column(key)
+    condition: ColumnElement[bool] = (
+        column.is_(None) if value is None else column == value
+    )
+    return condition
+
+
+def find_versions_by_metadata(
+    db: Session,
+    filters: dict[str, Any],
+    *,
+    snippet_id: UUID | None = None,
+    limit: int = 100,
+) -> list[Version]:
+    """Return versions matching every metadata filter, newest first.
+
+    Args:
+        db: Database session.
+        filters: Metadata key to expected value.
+        snippet_id: Restrict the search to one snippet.
+        limit: Maximum number of versions returned.
+
+    Returns:
+        list[Version]: Matching versions ordered by version number descending,
+        then by id descending.
+
+    Example:
+        >>> find_versions_by_metadata(db, {"session_id": "s-1", "autosave": False})
+    """
+    stmt = select(Version).where(
+        *(metadata_filter(key, value) for key, value in filters.items())
+    )
+    if snippet_id is not None:
+        stmt = stmt.where(Version.snippet_id == snippet_id)
+    stmt = stmt.order_by(Version.version_number.desc(), Version.id.desc()).limit(limit)
+    if snippet_id is not None or not is_sharded(db):
+        return list(db.scalars(stmt))
+    # Each shard returns its own newest matches; the first ``limit`` of the
+    # merge are the overall newest. Only those are then loaded.
+    keys = stmt.with_only_columns(Version.version_number, Version.id)
+    parts = scatter(db, lambda shard: shard.execute(keys).tuples().all())
+    newest = merge_sorted(parts, key=lambda row: row, reverse=True, limit=limit)
+    ids = [version_id for _, version_id in newest]
+    loaded = {
+        version.id: version
+        for version in db.scalars(select(Version).where(Version.id.in_(ids)))
+    }
+    return [loaded[version_id] for version_id in ids if version_id in loaded]
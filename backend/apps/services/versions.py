@@ -0,0 +1,172 @@
+"""Version writes."""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, cast
+from uuid import UUID
+
+from sqlalchemy import CursorResult, event, func, select, update
+from sqlalchemy.orm import Session
+
+from apps.core.exceptions import (
+    InvalidPatchError,
+    SnippetNotFoundError,
+    VersionConflictError,
+)
+from apps.jobs import enqueue
+from apps.services.read_cache import invalidate
+from packages.common.hashing import content_hash
+from packages.common.patch import Edit, PatchError, apply_edits, apply_unified
+from packages.models import Snippet, Version
+
+_CHANGED = "versions.changed_snippets"
+
+
+def create_version(
+    db: Session,
+    snippet_id: UUID,
+    content: str,
+    *,
+    metadata: dict[str, Any] | None = None,
+    description: str | None = None,
+) -> Version:
+    """Append a version to a snippet and make it the snippet's content.
+
+    The new version is numbered after, and parented to, the snippet's
+    latest version. Its highlight is precomputed by a job, and the cached
+    snippet detail is dropped once the caller commits.
+
+    Args:
+        db: Database session; the caller commits.
+        snippet_id: Live snippet to add the version to.
+        content: Full content of the version.
+        metadata: ``version_metadata`` of the version.
+        description: Optional change description.
+
+    Returns:
+        Version: The flushed version.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist or is deleted.
+    """
+    snippet = db.scalars(
+        select(Snippet).where(Snippet.id == snippet_id, Snippet._is_deleted.is_(False))
+    ).first()
+    if snippet is None:
+        raise SnippetNotFoundError(f"Snippet {snippet_id} not found")
+    latest = db.execute(
+        select(Version.id, Version.version_number)
+        .where(Version.snippet_id == snippet_id)
+        .order_by(Version.version_number.desc())
+        .limit(1)
+    ).first()
+    version = Version(
+        snippet_id=snippet_id,
+        content=content,
+        description=description,
+        version_number=latest.version_number + 1 if latest is not None else 1,
+        parent_version_id=latest.id if latest is not None else None,
+        version_metadata=metadata or {},
+    )
+    snippet.content = content
+    db.add(version)
+    db.flush()
+    enqueue(db, "highlight.version", {"version_id": str(version.id)})
+    db.info.setdefault(_CHANGED, set()).add(snippet_id)
+    return version
+
+
+@dataclass(frozen=True, slots=True)
+class PatchResult:
+    """Outcome of a patch."""
+
+    content_hash: str
+    version: Version | None
+
+
+def patch_content(
+    db: Session,
+    snippet_id: UUID,
+    base_hash: str,
+    *,
+    edits: Sequence[Edit] | None = None,
+    diff: str | None = None,
+    description: str | None = None,
+) -> PatchResult:
+    """Apply a patch to a snippet's current content as a new version.
+
+    The patch must be based on the current content, identified by its
+    SHA-256. The check and the write happen in one transaction, and the
+    snippet row is claimed with a guarded update first, so of two patches
+    against the same base exactly one wins.
+
+    Args:
+        db: Database session; the caller commits.
+        snippet_id: Snippet to patch.
+        base_hash: ``content_hash`` of the content the patch was made
+            against.
+        edits: Character edits, see ``packages.common.patch.Edit``.
+        diff: Unified diff; used if ``edits`` is ``None``.
+        description: Optional change description.
+
+    Returns:
+        PatchResult: Hash of the new content and the version written, or no
+        version if the patch changed nothing.
+
+    Raises:
+        SnippetNotFoundError: If the snippet does not exist or is deleted.
+        VersionConflictError: If the content changed since ``base_hash``.
+        InvalidPatchError: If the patch does not apply.
+    """
+    current = db.scalar(
+        select(Snippet.content).where(
+            Snippet.id == snippet_id, Snippet._is_deleted.is_(False)
+        )
+    )
+    if current is None:
+        raise SnippetNotFoundError(f"Snippet {snippet_id} not found")
+    current_hash = content_hash(current)
+    if base_hash != current_hash:
+        raise VersionConflictError(
+            f"Snippet {snippet_id} changed; current content hash is {current_hash}"
+        )
+    try:
+        content = (
+            apply_edits(current, edits)
+            if edits is not None
+            else apply_unified(current, diff or "")
+        )
+    except PatchError as exc:
+        raise InvalidPatchError(str(exc)) from exc
+    if content == current:
+        return PatchResult(current_hash, None)
+    claimed = cast(
+        CursorResult[Any],
+        db.execute(
+            update(Snippet)
+            .where(Snippet.id == snippet_id, Snippet.content == current)
+            .values(updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        ),
+    )
+    if claimed.rowcount != 1:
+        raise VersionConflictError(f"Snippet {snippet_id} changed during the update")
+    version = create_version(
+        db,
+        snippet_id,
+        content,
+        metadata={"patch": "edits" if edits is not None else "unified"},
+        description=description,
+    )
+    return PatchResult(version.content_hash or content_hash(content), version)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    for snippet_id in session.info.pop(_CHANGED, ()):
+        invalidate("snippets.get", {"id": snippet_id})
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session: Session, _previous: Any) -> None:
+    session.info.pop(_CHANGED, None)
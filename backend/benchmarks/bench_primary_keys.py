@@ -0,0 +1,79 @@
+"""Compare uuid4 and uuid7 primary keys on SQLite.
+
+Inserts the same rows into two file databases that differ only in how the
+``id`` column is generated, then reports insert throughput, file size and
+page count.
+
+Usage:
+    python -m benchmarks.bench_primary_keys --rows 200000 --batch 1000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from typing import cast
+from uuid import UUID, uuid4
+
+from sqlalchemy import Table, create_engine, insert, text
+from sqlalchemy.orm import Session
+
+from packages.common.ids import uuid7
+from packages.models import Base, Snippet
+
+
+def _run(
+    path: str, make_id: Callable[[], UUID], rows: int, batch: int
+) -> dict[str, float]:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[cast(Table, Snippet.__table__)])
+    payload = "print('hello world')\n" * 8
+    started = time.perf_counter()
+    with Session(engine) as session:
+        for offset in range(0, rows, batch):
+            session.execute(
+                insert(Snippet),
+                [
+                    {
+                        "id": make_id(),
+                        "title": f"snippet {offset + i}",
+                        "content": payload,
+                        "language": "python",
+                    }
+                    for i in range(min(batch, rows - offset))
+                ],
+            )
+            session.commit()
+    elapsed = time.perf_counter() - started
+    with engine.connect() as conn:
+        pages = conn.execute(text("PRAGMA page_count")).scalar_one()
+    engine.dispose()
+    return {
+        "rows_per_sec": rows / elapsed,
+        "file_mb": os.path.getsize(path) / 1_048_576,
+        "pages": pages,
+    }
+
+
+def main() -> None:
+    """Run the benchmark and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=1_000)
+    args = parser.parse_args()
+
+    print(f"{'key':<6} {'rows/s':>10} {'file MB':>9} {'pages':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, make_id in (("uuid4", uuid4), ("uuid7", uuid7)):
+            result = _run(
+                os.path.join(tmp, f"{name}.db"), make_id, args.rows, args.batch
+            )
+            print(
+                f"{name:<6} {result['rows_per_sec']:>10.0f} "
+                f"{result['file_mb']:>9.2f} {result['pages']:>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
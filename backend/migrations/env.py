@@ -5,7 +5,8 @@ import sys
 from logging.config import fileConfig
 
 from alembic import context
-from sqlalchemy import create_engine, pool, URL, MetaData
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, pool, URL, MetaData
 from sqlalchemy.engine import Connection
 
 # Add the project root directory to the Python path
@@ -17,6 +18,11 @@ sys.path.append(project_dir)
 from packages.models import Base  # noqa: E402
 from packages.models.test import TestModel  # noqa: E402
 from apps.core.config import settings  # noqa: E402
+from apps.db.sharding import (  # noqa: E402
+    create_shard_engine,
+    create_shard_schema,
+    shard_path,
+)
 
 print("Loaded models:", Base.metadata.tables.keys())
 
@@ -45,7 +51,10 @@ for table_name, table in target_metadata.tables.items():
         print(f"    - {column.name}: {column.type}")
 
 def run_migrations_offline() -> None:
-    """Run migrations in 'offline' mode."""
+    """Run migrations in 'offline' mode.
+
+    Only the catalog's script is generated; shard files are migrated online.
+    """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
@@ -62,6 +71,39 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
+def run_shard_migrations(path: str, catalog_revision: str | None) -> None:
+    """Apply the same revisions to a shard file.
+
+    Shard files only hold the shard tables; revisions skip the others there
+    (see ``apps.db.schema.migrating_shard``). A file without a version table
+    first gets the shard tables it lacks and is stamped: a new file at head,
+    one made before shard files were migrated at the catalog's revision
+    from before this run, which is as far as its schema can be.
+    """
+    print("Migrating shard file:", path)
+    engine = create_shard_engine(path, settings.DB_PATH, poolclass=pool.NullPool)
+    try:
+        with engine.connect() as connection:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                render_as_batch=True,
+                transaction_per_migration=True,
+                shard_file=True,
+            )
+            migration = context.get_context()
+            if migration.get_current_revision() is None:
+                existing = inspect(connection).has_table("snippets")
+                create_shard_schema(connection)
+                revision = catalog_revision if existing else None
+                migration.stamp(context.script, revision or "heads")
+                connection.commit()
+            with context.begin_transaction():
+                context.run_migrations()
+    finally:
+        engine.dispose()
+
+
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
     print("Starting online migrations")
@@ -73,6 +115,11 @@ def run_migrations_online() -> None:
         connectable = create_engine(url)
         print("Created engine:", connectable)
 
+        with connectable.connect() as connection:
+            catalog_revision = MigrationContext.configure(
+                connection
+            ).get_current_revision()
+
         with connectable.connect() as connection:
             print("Running migrations with connection:", connection)
             context.configure(
@@ -89,6 +136,9 @@ def run_migrations_online() -> None:
             with context.begin_transaction():
                 context.run_migrations()
 
+        for index in range(settings.DB_SHARDS):
+            run_shard_migrations(shard_path(index), catalog_revision)
+
         print("Migrations completed successfully")
     except Exception as e:
         print("Error during migrations:", str(e))
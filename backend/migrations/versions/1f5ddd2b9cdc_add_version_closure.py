@@ -0,0 +1,57 @@
+"""add version closure
+
+Revision ID: 1f5ddd2b9cdc
+Revises: 41346260175c
+Create Date: 2026-10-19 09:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "1f5ddd2b9cdc"
+down_revision: Union[str, None] = "41346260175c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "version_closure",
+        sa.Column("ancestor_id", sa.Uuid(), nullable=False),
+        sa.Column("descendant_id", sa.Uuid(), nullable=False),
+        sa.Column("depth", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["ancestor_id"], ["versions.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["descendant_id"], ["versions.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("ancestor_id", "descendant_id"),
+    )
+    op.create_index(
+        "ix_version_closure_descendant_depth",
+        "version_closure",
+        ["descendant_id", "depth"],
+        unique=False,
+    )
+    # Backfill the closure of every existing lineage in one pass.
+    op.execute(
+        """
+        WITH RECURSIVE lineage(ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM versions
+            UNION ALL
+            SELECT v.parent_version_id, l.descendant_id, l.depth + 1
+            FROM lineage AS l
+            JOIN versions AS v ON v.id = l.ancestor_id
+            WHERE v.parent_version_id IS NOT NULL
+        )
+        INSERT INTO version_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, depth FROM lineage
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_version_closure_descendant_depth", table_name="version_closure")
+    op.drop_table("version_closure")
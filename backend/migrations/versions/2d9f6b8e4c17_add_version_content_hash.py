@@ -0,0 +1,59 @@
+"""add version content hash
+
+Revision ID: 2d9f6b8e4c17
+Revises: 7b5e0c3a9d21
+Create Date: 2026-10-19 18:21:40.552093
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from apps.db.backfill import schedule_backfill
+from apps.db.schema import migrating_shard
+
+# revision identifiers, used by Alembic.
+revision: str = "2d9f6b8e4c17"
+down_revision: Union[str, None] = "7b5e0c3a9d21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if not migrating_shard():
+        op.create_table(
+            "backfill_checkpoints",
+            sa.Column("name", sa.String(length=100), nullable=False),
+            sa.Column("last_key", sa.Text(), nullable=True),
+            sa.Column("rows_done", sa.Integer(), nullable=False),
+            sa.Column("chunks_done", sa.Integer(), nullable=False),
+            sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("(CURRENT_TIMESTAMP)"),
+                nullable=False,
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("(CURRENT_TIMESTAMP)"),
+                nullable=False,
+            ),
+            sa.PrimaryKeyConstraint("name"),
+        )
+    # A nullable column is added without rewriting the table; existing rows
+    # are hashed online by the job workers.
+    op.add_column(
+        "versions", sa.Column("content_hash", sa.String(length=64), nullable=True)
+    )
+    if not migrating_shard():
+        # Queued once, in the catalog; the job walks every shard file.
+        schedule_backfill(op.get_bind(), "versions.content_hash")
+
+
+def downgrade() -> None:
+    op.drop_column("versions", "content_hash")
+    if not migrating_shard():
+        op.drop_table("backfill_checkpoints")
@@ -10,6 +10,8 @@ from typing import Sequence, Union
 import sqlalchemy as sa
 from alembic import op
 
+from apps.db.schema import migrating_shard
+
 # revision identifiers, used by Alembic.
 revision: str = "41346260175c"
 down_revision: Union[str, None] = None
@@ -18,6 +20,8 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
+    if migrating_shard():
+        return  # catalog tables only
     # ### commands auto generated by Alembic - please adjust! ###
     op.create_table(
         "test_model",
@@ -42,6 +46,8 @@ def upgrade() -> None:
 
 
 def downgrade() -> None:
+    if migrating_shard():
+        return  # catalog tables only
     # ### commands auto generated by Alembic - please adjust! ###
     op.drop_table("test_model")
     # ### end Alembic commands ###
@@ -0,0 +1,50 @@
+"""add content highlights
+
+Revision ID: 5d7e2f9a0b13
+Revises: c4b19e07d3a2
+Create Date: 2026-10-19 13:02:47.118305
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from apps.db.schema import migrating_shard
+
+# revision identifiers, used by Alembic.
+revision: str = "5d7e2f9a0b13"
+down_revision: Union[str, None] = "c4b19e07d3a2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if migrating_shard():
+        return  # catalog tables only
+    op.create_table(
+        "content_highlights",
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("language", sa.String(length=50), nullable=False),
+        sa.Column("tokenizer", sa.String(length=32), nullable=False),
+        sa.Column("lines", sa.JSON(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("content_hash", "language", "tokenizer"),
+    )
+
+
+def downgrade() -> None:
+    if migrating_shard():
+        return  # catalog tables only
+    op.drop_table("content_highlights")
@@ -0,0 +1,84 @@
+"""add hot lists
+
+Revision ID: 7b5e0c3a9d21
+Revises: e3f8a2c5d614
+Create Date: 2026-10-19 17:02:11.408315
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from apps.db.schema import migrating_shard
+
+# revision identifiers, used by Alembic.
+revision: str = "7b5e0c3a9d21"
+down_revision: Union[str, None] = "e3f8a2c5d614"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if not migrating_shard():
+        op.create_table(
+            "hot_lists",
+            sa.Column("name", sa.String(length=80), nullable=False),
+            sa.Column("ids", sa.LargeBinary(), nullable=False),
+            sa.Column("scores", sa.LargeBinary(), nullable=False),
+            sa.Column("exhaustive", sa.Boolean(), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("(CURRENT_TIMESTAMP)"),
+                nullable=False,
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("(CURRENT_TIMESTAMP)"),
+                nullable=False,
+            ),
+            sa.PrimaryKeyConstraint("name"),
+        )
+        op.create_table(
+            "snippet_activity",
+            sa.Column("snippet_id", sa.Uuid(), nullable=False),
+            sa.Column("language", sa.String(length=50), nullable=False),
+            sa.Column("score", sa.Float(), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("(CURRENT_TIMESTAMP)"),
+                nullable=False,
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("(CURRENT_TIMESTAMP)"),
+                nullable=False,
+            ),
+            sa.ForeignKeyConstraint(["snippet_id"], ["snippets.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("snippet_id"),
+        )
+        op.create_index("ix_snippet_activity_score", "snippet_activity", ["score"])
+        op.create_index(
+            "ix_snippet_activity_language_score",
+            "snippet_activity",
+            ["language", "score"],
+        )
+    op.create_index("ix_snippets_language_id", "snippets", ["language", "id"])
+    # Lists are built by the hot_lists.rebuild job, queued by the first write
+    # to each; reads fall back to the tables until then.
+
+
+def downgrade() -> None:
+    op.drop_index("ix_snippets_language_id", table_name="snippets")
+    if migrating_shard():
+        return  # the rest are catalog tables
+    op.drop_index(
+        "ix_snippet_activity_language_score", table_name="snippet_activity"
+    )
+    op.drop_index("ix_snippet_activity_score", table_name="snippet_activity")
+    op.drop_table("snippet_activity")
+    op.drop_table("hot_lists")
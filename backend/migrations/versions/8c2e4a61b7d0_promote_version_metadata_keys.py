@@ -0,0 +1,30 @@
+"""promote version metadata keys
+
+Revision ID: 8c2e4a61b7d0
+Revises: 1f5ddd2b9cdc
+Create Date: 2026-10-19 10:03:27.118904
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from apps.db.schema import add_promoted_metadata_column, drop_promoted_metadata_column
+
+# revision identifiers, used by Alembic.
+revision: str = "8c2e4a61b7d0"
+down_revision: Union[str, None] = "1f5ddd2b9cdc"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    add_promoted_metadata_column("session_id", "meta_session_id", sa.String(length=64))
+    add_promoted_metadata_column("autosave", "meta_autosave", sa.Boolean())
+    add_promoted_metadata_column("tests_passed", "meta_tests_passed", sa.Boolean())
+
+
+def downgrade() -> None:
+    drop_promoted_metadata_column("meta_tests_passed")
+    drop_promoted_metadata_column("meta_autosave")
+    drop_promoted_metadata_column("meta_session_id")
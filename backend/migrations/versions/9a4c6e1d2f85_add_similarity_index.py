@@ -0,0 +1,59 @@
+"""add similarity index
+
+Revision ID: 9a4c6e1d2f85
+Revises: 5d7e2f9a0b13
+Create Date: 2026-10-19 14:26:11.503927
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9a4c6e1d2f85"
+down_revision: Union[str, None] = "5d7e2f9a0b13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "snippet_signatures",
+        sa.Column("snippet_id", sa.Uuid(), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("signature", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["snippet_id"], ["snippets.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("snippet_id"),
+    )
+    op.create_table(
+        "snippet_lsh_bands",
+        sa.Column("band", sa.SmallInteger(), nullable=False),
+        sa.Column("bucket", sa.BigInteger(), nullable=False),
+        sa.Column("snippet_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(["snippet_id"], ["snippets.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("band", "bucket", "snippet_id"),
+        sqlite_with_rowid=False,
+    )
+    op.create_index(
+        "ix_snippet_lsh_bands_snippet_id", "snippet_lsh_bands", ["snippet_id"]
+    )
+    # Existing snippets are indexed by the similarity.reindex job.
+
+
+def downgrade() -> None:
+    op.drop_index("ix_snippet_lsh_bands_snippet_id", table_name="snippet_lsh_bands")
+    op.drop_table("snippet_lsh_bands")
+    op.drop_table("snippet_signatures")
@@ -0,0 +1,58 @@
+"""add version packs
+
+Revision ID: a6c3e9f1b742
+Revises: 2d9f6b8e4c17
+Create Date: 2026-10-19 19:12:05.934177
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from apps.db.schema import migrating_shard
+
+# revision identifiers, used by Alembic.
+revision: str = "a6c3e9f1b742"
+down_revision: Union[str, None] = "2d9f6b8e4c17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if not migrating_shard():
+        op.create_table(
+            "version_packs",
+            sa.Column("size", sa.BigInteger(), nullable=False),
+            sa.Column("record_count", sa.Integer(), nullable=False),
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("(CURRENT_TIMESTAMP)"),
+                nullable=False,
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("(CURRENT_TIMESTAMP)"),
+                nullable=False,
+            ),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    # Nullable columns are added without rewriting the versions table.
+    op.add_column("versions", sa.Column("pack_id", sa.Uuid(), nullable=True))
+    op.add_column("versions", sa.Column("pack_offset", sa.BigInteger(), nullable=True))
+    op.add_column("versions", sa.Column("pack_length", sa.Integer(), nullable=True))
+    op.create_index("ix_versions_pack_id", "versions", ["pack_id"])
+
+
+def downgrade() -> None:
+    # Archived versions must be restored before downgrading; their content
+    # column is empty.
+    op.drop_index("ix_versions_pack_id", table_name="versions")
+    op.drop_column("versions", "pack_length")
+    op.drop_column("versions", "pack_offset")
+    op.drop_column("versions", "pack_id")
+    if not migrating_shard():
+        op.drop_table("version_packs")
@@ -0,0 +1,74 @@
+"""add jobs table
+
+Revision ID: c4b19e07d3a2
+Revises: 8c2e4a61b7d0
+Create Date: 2026-10-19 11:21:09.634172
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from apps.db.schema import migrating_shard
+
+# revision identifiers, used by Alembic.
+revision: str = "c4b19e07d3a2"
+down_revision: Union[str, None] = "8c2e4a61b7d0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if migrating_shard():
+        return  # catalog tables only
+    op.create_table(
+        "jobs",
+        sa.Column("kind", sa.String(length=100), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_after", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("dedup_key", sa.String(length=200), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_jobs_claim", "jobs", ["status", "priority", "run_after"])
+    op.create_index(
+        "ix_jobs_status_locked_until", "jobs", ["status", "locked_until"]
+    )
+    op.create_index(
+        "uq_jobs_active_dedup_key",
+        "jobs",
+        ["dedup_key"],
+        unique=True,
+        sqlite_where=sa.text(
+            "dedup_key IS NOT NULL AND status IN ('pending', 'running')"
+        ),
+    )
+
+
+def downgrade() -> None:
+    if migrating_shard():
+        return  # catalog tables only
+    op.drop_index("uq_jobs_active_dedup_key", table_name="jobs")
+    op.drop_index("ix_jobs_status_locked_until", table_name="jobs")
+    op.drop_index("ix_jobs_claim", table_name="jobs")
+    op.drop_table("jobs")
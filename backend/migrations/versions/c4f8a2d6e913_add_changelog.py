@@ -0,0 +1,46 @@
+"""add changelog
+
+Revision ID: c4f8a2d6e913
+Revises: a6c3e9f1b742
+Create Date: 2026-10-19 20:41:17.208395
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from apps.db.schema import migrating_shard
+
+# revision identifiers, used by Alembic.
+revision: str = "c4f8a2d6e913"
+down_revision: Union[str, None] = "a6c3e9f1b742"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if migrating_shard():
+        return  # catalog tables only
+    op.create_table(
+        "changelog",
+        sa.Column("seq", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("entity", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.Uuid(), nullable=False),
+        sa.Column("snippet_id", sa.Uuid(), nullable=False),
+        sa.Column("op", sa.String(length=10), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("seq"),
+        sqlite_autoincrement=True,
+    )
+
+
+def downgrade() -> None:
+    if migrating_shard():
+        return  # catalog tables only
+    op.drop_table("changelog")
@@ -0,0 +1,37 @@
+"""add snippet trigrams
+
+Revision ID: e3f8a2c5d614
+Revises: 9a4c6e1d2f85
+Create Date: 2026-10-19 15:48:30.271946
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e3f8a2c5d614"
+down_revision: Union[str, None] = "9a4c6e1d2f85"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "snippet_trigrams",
+        sa.Column("trigram", sa.BigInteger(), nullable=False),
+        sa.Column("snippet_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(["snippet_id"], ["snippets.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("trigram", "snippet_id"),
+        sqlite_with_rowid=False,
+    )
+    op.create_index(
+        "ix_snippet_trigrams_snippet_id", "snippet_trigrams", ["snippet_id"]
+    )
+    # Existing snippets are indexed by the search.reindex job.
+
+
+def downgrade() -> None:
+    op.drop_index("ix_snippet_trigrams_snippet_id", table_name="snippet_trigrams")
+    op.drop_table("snippet_trigrams")
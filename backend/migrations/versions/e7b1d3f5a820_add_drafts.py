@@ -0,0 +1,53 @@
+"""add drafts
+
+Revision ID: e7b1d3f5a820
+Revises: c4f8a2d6e913
+Create Date: 2026-10-19 21:36:50.114236
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from apps.db.schema import migrating_shard
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b1d3f5a820"
+down_revision: Union[str, None] = "c4f8a2d6e913"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if migrating_shard():
+        return  # catalog tables only
+    op.create_table(
+        "drafts",
+        sa.Column("snippet_id", sa.Uuid(), nullable=False),
+        sa.Column("session_id", sa.String(length=64), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("edit_count", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["snippet_id"], ["snippets.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("snippet_id", "session_id"),
+    )
+    op.create_index("ix_drafts_updated_at", "drafts", ["updated_at"])
+
+
+def downgrade() -> None:
+    if migrating_shard():
+        return  # catalog tables only
+    op.drop_index("ix_drafts_updated_at", table_name="drafts")
+    op.drop_table("drafts")
@@ -0,0 +1,38 @@
+"""add collab leases
+
+Revision ID: f2a9c4e6b318
+Revises: e7b1d3f5a820
+Create Date: 2026-10-19 23:02:14.583190
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from apps.db.schema import migrating_shard
+
+# revision identifiers, used by Alembic.
+revision: str = "f2a9c4e6b318"
+down_revision: Union[str, None] = "e7b1d3f5a820"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if migrating_shard():
+        return  # catalog tables only
+    op.create_table(
+        "collab_leases",
+        sa.Column("snippet_id", sa.Uuid(), nullable=False),
+        sa.Column("owner", sa.String(length=64), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["snippet_id"], ["snippets.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("snippet_id"),
+    )
+
+
+def downgrade() -> None:
+    if migrating_shard():
+        return  # catalog tables only
+    op.drop_table("collab_leases")
@@ -0,0 +1,100 @@
+"""In-process caches."""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Thread-safe least-recently-used cache with a fixed number of entries.
+
+    With ``ttl`` set, entries also expire that many seconds after being stored.
+    With ``max_weight`` set, the summed ``weigher(value)`` of the entries is
+    kept under it too; a value heavier than the whole budget is not stored.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        ttl: float | None = None,
+        *,
+        max_weight: int | None = None,
+        weigher: Callable[[V], int] | None = None,
+    ) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        if (max_weight is None) != (weigher is None):
+            raise ValueError("max_weight and weigher go together")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self._weigher = weigher
+        self.weight = 0
+        self._data: OrderedDict[K, tuple[V, float | None]] = OrderedDict()
+        self._weights: dict[K, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> V | None:
+        """Return the cached value and mark it as recently used."""
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        weight = 0 if self._weigher is None else self._weigher(value)
+        with self._lock:
+            self._remove(key)
+            if self.max_weight is not None and weight > self.max_weight:
+                return
+            self._data[key] = (value, expires_at)
+            self._weights[key] = weight
+            self.weight += weight
+            while len(self._data) > self.maxsize or (
+                self.max_weight is not None and self.weight > self.max_weight
+            ):
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, key: K) -> tuple[V, float | None] | None:
+        entry = self._data.pop(key, None)
+        self.weight -= self._weights.pop(key, 0)
+        return entry
+
+    def pop(self, key: K) -> V | None:
+        """Remove and return a cached value."""
+        with self._lock:
+            entry = self._remove(key)
+        return None if entry is None else entry[0]
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+            self._weights.clear()
+            self.weight = 0
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,301 @@
+"""Line diffing.
+
+Lines are interned to integers and compared with Myers' O(ND) algorithm after
+trimming the common prefix and suffix. When the edit distance exceeds a
+budget the search stops early and the differing middle is reported as a
+single replacement, so huge rewrites cost bounded CPU.
+"""
+
+from dataclasses import dataclass, field
+from typing import Literal
+
+OpTag = Literal["equal", "delete", "insert", "replace"]
+Opcode = tuple[OpTag, int, int, int, int]
+
+
+@dataclass(frozen=True, slots=True)
+class DiffLine:
+    """A single line of a hunk."""
+
+    op: Literal[" ", "-", "+"]
+    text: str
+
+
+@dataclass(frozen=True, slots=True)
+class DiffHunk:
+    """A group of changes with surrounding context.
+
+    Line numbers are 1-based like unified diff headers; a zero-length range
+    starts at the line before the change.
+    """
+
+    base_start: int
+    base_lines: int
+    target_start: int
+    target_lines: int
+    lines: list[DiffLine] = field(default_factory=list)
+
+
+@dataclass(frozen=True, slots=True)
+class DiffResult:
+    """Outcome of comparing two texts."""
+
+    base_lines: list[str]
+    target_lines: list[str]
+    opcodes: list[Opcode]
+    exact: bool
+
+    @property
+    def added(self) -> int:
+        """Number of lines present only in the target."""
+        return sum(j2 - j1 for tag, _, _, j1, j2 in self.opcodes if tag != "equal")
+
+    @property
+    def removed(self) -> int:
+        """Number of lines present only in the base."""
+        return sum(i2 - i1 for tag, i1, i2, _, _ in self.opcodes if tag != "equal")
+
+    @property
+    def identical(self) -> bool:
+        """Whether both texts have the same lines."""
+        return all(tag == "equal" for tag, *_ in self.opcodes)
+
+
+def split_lines(text: str) -> list[str]:
+    """Split text into lines at ``\n`` only, keeping the line endings.
+
+    Unlike ``str.splitlines``, form feeds, ``\r``, ``\x85``, ``\u2028`` and
+    other separators stay inside their line, as they do in unified diffs.
+    """
+    lines = [line + "\n" for line in text.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def _intern(base: list[str], target: list[str]) -> tuple[list[int], list[int]]:
+    table: dict[str, int] = {}
+    a = [table.setdefault(line, len(table)) for line in base]
+    b = [table.setdefault(line, len(table)) for line in target]
+    return a, b
+
+
+def _myers(a: list[int], b: list[int], max_d: int) -> list[str] | None:
+    """Return the per-line edit script, or ``None`` if it exceeds ``max_d``.
+
+    The script is a list of ``"="``, ``"-"`` and ``"+"`` markers.
+    """
+    n, m = len(a), len(b)
+    limit = min(max_d, n + m)
+    offset = limit + 1
+    v = [0] * (2 * limit + 3)
+    trace: list[list[int]] = []
+    for d in range(limit + 1):
+        # Snapshot of the furthest x on diagonals -d..d before this round.
+        trace.append(v[offset - d : offset + d + 1])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+
+def _backtrack(trace: list[list[int]], n: int, m: int) -> list[str]:
+    script: list[str] = []
+    x, y = n, m
+    for d in range(len(trace) - 1, 0, -1):
+        prev = trace[d]
+        k = x - y
+        if k == -d or (k != d and prev[k - 1 + d] < prev[k + 1 + d]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = prev[prev_k + d]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            script.append("=")
+            x -= 1
+            y -= 1
+        script.append("+" if x == prev_x else "-")
+        x, y = prev_x, prev_y
+    script.extend("=" * x)
+    script.reverse()
+    return script
+
+
+def _script_to_opcodes(script: list[str], i: int, j: int) -> list[Opcode]:
+    opcodes: list[Opcode] = []
+    pos = 0
+    while pos < len(script):
+        if script[pos] == "=":
+            start = pos
+            while pos < len(script) and script[pos] == "=":
+                pos += 1
+            length = pos - start
+            opcodes.append(("equal", i, i + length, j, j + length))
+            i += length
+            j += length
+            continue
+        dels = ins = 0
+        while pos < len(script) and script[pos] != "=":
+            if script[pos] == "-":
+                dels += 1
+            else:
+                ins += 1
+            pos += 1
+        tag: OpTag = "replace" if dels and ins else ("delete" if dels else "insert")
+        opcodes.append((tag, i, i + dels, j, j + ins))
+        i += dels
+        j += ins
+    return opcodes
+
+
+def _change_opcode(i1: int, i2: int, j1: int, j2: int) -> Opcode:
+    if i1 < i2 and j1 < j2:
+        return ("replace", i1, i2, j1, j2)
+    return ("delete", i1, i2, j1, j2) if i1 < i2 else ("insert", i1, i2, j1, j2)
+
+
+def diff_lines(base: str, target: str, *, max_edit_distance: int = 1000) -> DiffResult:
+    """Compute a line diff between two texts.
+
+    Args:
+        base: Original text.
+        target: New text.
+        max_edit_distance: Number of inserted plus deleted lines after which
+            the search gives up and reports the differing middle as one
+            replacement.
+
+    Returns:
+        DiffResult: Opcodes over the split lines; ``exact`` is ``False`` when
+        the early cutoff was hit.
+    """
+    base_lines = split_lines(base)
+    target_lines = split_lines(target)
+    a, b = _intern(base_lines, target_lines)
+
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+
+    a_mid = a[prefix : len(a) - suffix]
+    b_mid = b[prefix : len(b) - suffix]
+    opcodes: list[Opcode] = []
+    if prefix:
+        opcodes.append(("equal", 0, prefix, 0, prefix))
+
+    exact = True
+    if a_mid or b_mid:
+        script = _myers(a_mid, b_mid, max_edit_distance)
+        if script is None:
+            exact = False
+            opcodes.append(
+                _change_opcode(prefix, prefix + len(a_mid), prefix, prefix + len(b_mid))
+            )
+        else:
+            opcodes.extend(_script_to_opcodes(script, prefix, prefix))
+
+    if suffix:
+        opcodes.append(("equal", len(a) - suffix, len(a), len(b) - suffix, len(b)))
+    return DiffResult(base_lines, target_lines, opcodes, exact)
+
+
+def _grouped_opcodes(opcodes: list[Opcode], context: int) -> list[list[Opcode]]:
+    """Split opcodes into hunks with ``context`` lines around each change."""
+    codes = list(opcodes)
+    if not codes or all(tag == "equal" for tag, *_ in codes):
+        return []
+    if codes[0][0] == "equal":
+        _, i1, i2, j1, j2 = codes[0]
+        codes[0] = ("equal", max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+    if codes[-1][0] == "equal":
+        _, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = ("equal", i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+
+    groups: list[list[Opcode]] = []
+    group: list[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > 2 * context:
+            group.append(
+                ("equal", i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+            )
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+    return groups
+
+
+def build_hunks(
+    result: DiffResult, *, context: int = 3, max_lines: int | None = None
+) -> tuple[list[DiffHunk], bool]:
+    """Group a diff into hunks.
+
+    Args:
+        result: Diff to render.
+        context: Unchanged lines kept around each change.
+        max_lines: Stop after emitting this many hunk lines.
+
+    Returns:
+        tuple[list[DiffHunk], bool]: The hunks and whether output was cut
+        short by ``max_lines``.
+    """
+    hunks: list[DiffHunk] = []
+    emitted = 0
+    for group in _grouped_opcodes(result.opcodes, context):
+        first, last = group[0], group[-1]
+        base_count = last[2] - first[1]
+        target_count = last[4] - first[3]
+        hunk = DiffHunk(
+            base_start=first[1] + 1 if base_count else first[1],
+            base_lines=base_count,
+            target_start=first[3] + 1 if target_count else first[3],
+            target_lines=target_count,
+        )
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                hunk.lines.extend(DiffLine(" ", t) for t in result.base_lines[i1:i2])
+                continue
+            hunk.lines.extend(DiffLine("-", t) for t in result.base_lines[i1:i2])
+            hunk.lines.extend(DiffLine("+", t) for t in result.target_lines[j1:j2])
+        emitted += len(hunk.lines)
+        if max_lines is not None and emitted > max_lines:
+            return hunks, True
+        hunks.append(hunk)
+    return hunks, False
+
+
+def format_unified(
+    hunks: list[DiffHunk], *, base_label: str = "a", target_label: str = "b"
+) -> str:
+    """Render hunks as a unified diff."""
+    if not hunks:
+        return ""
+    out = [f"--- {base_label}\n", f"+++ {target_label}\n"]
+    for hunk in hunks:
+        out.append(
+            f"@@ -{hunk.base_start},{hunk.base_lines} "
+            f"+{hunk.target_start},{hunk.target_lines} @@\n"
+        )
+        for line in hunk.lines:
+            text = line.text
+            if not text.endswith("\n"):
+                text += "\n\\ No newline at end of file\n"
+            out.append(line.op + text)
+    return "".join(out)
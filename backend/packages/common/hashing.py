@@ -0,0 +1,11 @@
+"""Content hashing helpers."""
+
+import hashlib
+
+
+def content_hash(content: str) -> str:
+    """Return the hex SHA-256 digest of a text body.
+
+    Used as a stable cache key for anything derived purely from content.
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
@@ -0,0 +1,125 @@
+"""Server-side syntax tokenization.
+
+Content is split on ``\\n`` after normalizing line endings. Each line becomes
+a flat list of ``[start, length, kind]`` integer triples, where offsets are
+code points within the line and ``kind`` indexes ``LEGEND``, the short
+Pygments CSS class names (``k`` keyword, ``s2`` double-quoted string, ...).
+Plain text and whitespace produce no spans.
+
+Without Pygments every language tokenizes as plain text.
+Everything here is pure and picklable so it can run in a process pool.
+"""
+
+import bisect
+from dataclasses import dataclass
+from typing import Any
+
+try:
+    import pygments
+    from pygments.lexer import Lexer
+    from pygments.lexers import get_lexer_by_name
+    from pygments.token import STANDARD_TYPES
+    from pygments.util import ClassNotFound
+except ImportError:  # pragma: no cover - exercised only without pygments
+    pygments = None
+
+if pygments is not None:
+    TOKENIZER_VERSION = f"pygments-{pygments.__version__}"
+    LEGEND: tuple[str, ...] = tuple(
+        sorted({name for name in STANDARD_TYPES.values() if name not in ("", "w")})
+    )
+else:  # pragma: no cover
+    TOKENIZER_VERSION = "plain"
+    LEGEND = ()
+
+_KIND_INDEX = {name: index for index, name in enumerate(LEGEND)}
+
+
+@dataclass(frozen=True, slots=True)
+class Highlight:
+    """Tokenized content.
+
+    Attributes:
+        lines: Per line, flat ``[start, length, kind]`` triples.
+    """
+
+    lines: list[list[int]]
+
+
+def normalize(content: str) -> str:
+    """Normalize line endings to ``\\n``."""
+    return content.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _line_starts(text: str) -> list[int]:
+    starts = [0]
+    index = text.find("\n")
+    while index != -1:
+        starts.append(index + 1)
+        index = text.find("\n", index + 1)
+    return starts
+
+
+def _get_lexer(language: str) -> "Lexer | None":
+    if pygments is None:
+        return None
+    try:
+        return get_lexer_by_name(language, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+
+
+def _kind(ttype: Any) -> int | None:
+    while ttype not in STANDARD_TYPES:
+        ttype = ttype.parent
+    return _KIND_INDEX.get(STANDARD_TYPES[ttype])
+
+
+class _Builder:
+    """Accumulates spans per line."""
+
+    def __init__(self, line_starts: list[int]) -> None:
+        self.line_starts = line_starts
+        self.lines: list[list[int]] = []
+
+    def _line(self, index: int) -> list[int]:
+        while len(self.lines) <= index:
+            self.lines.append([])
+        return self.lines[index]
+
+    def token(self, pos: int, ttype: Any, value: str) -> None:
+        kind = _kind(ttype)
+        if kind is None:
+            return
+        index = bisect.bisect_right(self.line_starts, pos) - 1
+        for offset, part in enumerate(value.split("\n")):
+            line = index + offset
+            start = pos - self.line_starts[line] if offset == 0 else 0
+            if part:
+                spans = self._line(line)
+                if spans and spans[-2] + spans[-3] == start and spans[-1] == kind:
+                    spans[-2] += len(part)
+                else:
+                    spans.extend((start, len(part), kind))
+
+    def finish(self, until: int) -> None:
+        """Pad to ``until`` lines so empty trailing lines are present."""
+        if until > 0:
+            self._line(until - 1)
+
+
+def tokenize(content: str, language: str) -> Highlight:
+    """Tokenize ``content`` with the grammar registered for ``language``.
+
+    Unknown languages, and everything when Pygments is missing, produce a
+    highlight without spans.
+    """
+    text = normalize(content)
+    line_starts = _line_starts(text)
+    builder = _Builder(line_starts)
+    lexer = _get_lexer(language)
+    if lexer is not None:
+        for pos, ttype, value in lexer.get_tokens_unprocessed(text):
+            builder.token(pos, ttype, value)
+    builder.finish(len(line_starts))
+    return Highlight(builder.lines)
@@ -0,0 +1,54 @@
+"""Identifier generation."""
+
+import os
+import threading
+import time
+from uuid import UUID
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+_COUNTER_BITS = 12
+_COUNTER_MAX = (1 << _COUNTER_BITS) - 1
+
+
+def uuid7() -> UUID:
+    """Generate a time-ordered UUID version 7 (RFC 9562).
+
+    Layout: 48-bit Unix timestamp in milliseconds, 4-bit version, a 12-bit
+    counter that keeps ids generated within the same millisecond strictly
+    increasing in this process, 2-bit variant and 62 random bits.
+
+    Returns:
+        UUID: A UUID whose byte order follows creation time.
+    """
+    global _last_ms, _counter  # noqa: PLW0603
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            _counter = int.from_bytes(os.urandom(2), "big") & (_COUNTER_MAX >> 1)
+        else:
+            # Same millisecond or clock moved backwards: keep counting from the
+            # last timestamp so ordering stays monotonic.
+            _counter += 1
+            if _counter > _COUNTER_MAX:
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+
+    rand_b = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (ms & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76
+    value |= counter << 64
+    value |= 0b10 << 62
+    value |= rand_b
+    return UUID(int=value)
+
+
+def uuid7_timestamp_ms(value: UUID) -> int:
+    """Return the Unix timestamp in milliseconds embedded in a UUIDv7."""
+    if value.version != 7:  # noqa: PLR2004
+        raise ValueError(f"Not a version 7 UUID: {value}")
+    return value.int >> 80
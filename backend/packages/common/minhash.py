@@ -0,0 +1,122 @@
+"""MinHash signatures and LSH banding for near-duplicate detection.
+
+Content is split into code tokens and hashed as overlapping token shingles.
+A signature keeps, for each of ``num_perm`` universal hash functions, the
+minimum hashed shingle value; the fraction of equal positions in two
+signatures estimates the Jaccard similarity of their shingle sets.
+
+For LSH the signature is cut into ``bands`` bands of ``rows`` values each.
+Two contents share at least one band bucket with probability
+``1 - (1 - s**rows)**bands`` for similarity ``s``, an S-curve whose midpoint
+sits near ``(1 / bands) ** (1 / rows)``.
+"""
+
+import hashlib
+import random
+import re
+import struct
+import zlib
+from collections.abc import Sequence
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = 0xFFFFFFFF
+
+
+def tokenize_code(content: str) -> list[str]:
+    """Split content into identifier, number and punctuation tokens.
+
+    Whitespace, and therefore formatting, is ignored.
+    """
+    return _TOKEN.findall(content)
+
+
+def jaccard(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    if len(a) != len(b):
+        raise ValueError("Signatures have different lengths")
+    if not a:
+        return 0.0
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class MinHasher:
+    """Computes MinHash signatures and their LSH band keys.
+
+    Instances with the same parameters always produce the same signatures,
+    so stored signatures stay comparable across processes and restarts.
+
+    Args:
+        num_perm: Signature length.
+        bands: Number of LSH bands; must divide ``num_perm``.
+        shingle_size: Tokens per shingle.
+        seed: Seed for the hash function parameters.
+    """
+
+    def __init__(
+        self, num_perm: int = 128, bands: int = 16, shingle_size: int = 5, seed: int = 1
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        # a, b < 2**32 and 32-bit shingle hashes keep a * x + b below 2**64.
+        self._params = [
+            (rng.randrange(1, 1 << 32), rng.randrange(0, 1 << 32))
+            for _ in range(num_perm)
+        ]
+        self._format = f"<{num_perm}I"
+
+    def shingles(self, content: str) -> set[int]:
+        """Return the 32-bit hashes of the content's token shingles.
+
+        Content shorter than one shingle becomes a single shingle.
+        """
+        tokens = tokenize_code(content)
+        if not tokens:
+            return set()
+        size = min(self.shingle_size, len(tokens))
+        return {
+            zlib.crc32("\x1f".join(tokens[i : i + size]).encode("utf-8"))
+            for i in range(len(tokens) - size + 1)
+        }
+
+    def signature(self, content: str) -> tuple[int, ...]:
+        """Compute the MinHash signature of ``content``.
+
+        Each hash function is applied to the whole shingle set in one
+        comprehension, which keeps the inner loop in C.
+        """
+        hashes = list(self.shingles(content))
+        if not hashes:
+            return (_MAX_HASH,) * self.num_perm
+        p = _MERSENNE_PRIME
+        return tuple(
+            min([(a * x + b) % p for x in hashes]) & _MAX_HASH for a, b in self._params
+        )
+
+    def band_keys(self, signature: Sequence[int]) -> list[int]:
+        """Return one signed 64-bit bucket key per band."""
+        packed = self.pack(signature)
+        width = self.rows * 4
+        return [
+            int.from_bytes(
+                hashlib.blake2b(
+                    packed[i * width : (i + 1) * width], digest_size=8
+                ).digest(),
+                "big",
+                signed=True,
+            )
+            for i in range(self.bands)
+        ]
+
+    def pack(self, signature: Sequence[int]) -> bytes:
+        """Serialize a signature as little-endian unsigned 32-bit integers."""
+        return struct.pack(self._format, *signature)
+
+    def unpack(self, data: bytes) -> tuple[int, ...]:
+        """Inverse of ``pack``."""
+        return struct.unpack(self._format, data)
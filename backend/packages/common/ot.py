@@ -0,0 +1,188 @@
+"""Operational transformation of plain text.
+
+An operation walks the whole document from start to end as a list of
+components: a positive integer keeps that many characters, a negative
+integer deletes that many, and a string inserts itself. The list is plain
+JSON, so it goes over the wire as is. Lengths count code points.
+
+:func:`transform` takes two operations made concurrently against the same
+text and rebases each over the other, so that applying either one followed
+by the other's rebased form gives the same text. When both insert at the
+same position, the first operation's text comes first; a server that has
+already applied ``a`` passes its own operation first and every client does
+the same, which keeps all copies of the document identical.
+"""
+
+from collections.abc import Iterable, Sequence
+
+Component = int | str
+Operation = list[Component]
+
+
+class OperationError(ValueError):
+    """An operation is malformed or does not fit the text."""
+
+
+class _Builder:
+    """Appends components in canonical form.
+
+    Neighbours of the same kind are merged, empty ones dropped, and an
+    insert next to a delete goes first.
+    """
+
+    def __init__(self) -> None:
+        self.ops: Operation = []
+
+    def retain(self, count: int) -> None:
+        if count <= 0:
+            return
+        if self.ops and _is_retain(self.ops[-1]):
+            self.ops[-1] += count  # type: ignore[operator]
+        else:
+            self.ops.append(count)
+
+    def delete(self, count: int) -> None:
+        if count <= 0:
+            return
+        if self.ops and _is_delete(self.ops[-1]):
+            self.ops[-1] -= count  # type: ignore[operator]
+        else:
+            self.ops.append(-count)
+
+    def insert(self, text: str) -> None:
+        if not text:
+            return
+        ops = self.ops
+        if ops and isinstance(ops[-1], str):
+            ops[-1] += text
+        elif ops and _is_delete(ops[-1]):
+            if len(ops) > 1 and isinstance(ops[-2], str):
+                ops[-2] += text
+            else:
+                ops.insert(len(ops) - 1, text)
+        else:
+            ops.append(text)
+
+
+def _is_retain(component: Component) -> bool:
+    return isinstance(component, int) and component > 0
+
+
+def _is_delete(component: Component) -> bool:
+    return isinstance(component, int) and component < 0
+
+
+def normalize(components: Iterable[object]) -> Operation:
+    """Validate an operation, e.g. one decoded from JSON, and canonicalize it.
+
+    Raises:
+        OperationError: If a component is not a non-zero integer or a
+            non-empty string.
+    """
+    builder = _Builder()
+    for index, component in enumerate(components):
+        if isinstance(component, str) and component:
+            builder.insert(component)
+        elif isinstance(component, int) and not isinstance(component, bool):
+            if component == 0:
+                raise OperationError(f"Component {index} is zero")
+            if component > 0:
+                builder.retain(component)
+            else:
+                builder.delete(-component)
+        else:
+            raise OperationError(f"Component {index} is not an integer or text")
+    return builder.ops
+
+
+def base_length(op: Sequence[Component]) -> int:
+    """Length of the text the operation applies to."""
+    return sum(abs(c) for c in op if isinstance(c, int))
+
+
+def target_length(op: Sequence[Component]) -> int:
+    """Length of the text the operation produces."""
+    return sum(c if isinstance(c, int) else len(c) for c in op if not _is_delete(c))
+
+
+def apply(text: str, op: Sequence[Component]) -> str:
+    """Apply an operation to text.
+
+    Raises:
+        OperationError: If the operation does not span the whole text.
+    """
+    if base_length(op) != len(text):
+        raise OperationError(
+            f"Operation spans {base_length(op)} characters, text has {len(text)}"
+        )
+    out = []
+    cursor = 0
+    for component in op:
+        if isinstance(component, str):
+            out.append(component)
+        elif component > 0:
+            out.append(text[cursor : cursor + component])
+            cursor += component
+        else:
+            cursor -= component
+    return "".join(out)
+
+
+def _consume(component: int, count: int) -> int:
+    """What is left of a retain or delete after ``count`` characters."""
+    return component - count if component > 0 else component + count
+
+
+def transform(
+    a: Sequence[Component], b: Sequence[Component]
+) -> tuple[Operation, Operation]:
+    """Rebase two concurrent operations over each other.
+
+    Returns:
+        tuple[Operation, Operation]: ``a`` rebased over ``b`` and ``b``
+        rebased over ``a``, so that ``apply(apply(s, a), b')`` equals
+        ``apply(apply(s, b), a')``.
+
+    Raises:
+        OperationError: If the operations apply to texts of different
+            lengths.
+    """
+    if base_length(a) != base_length(b):
+        raise OperationError("Concurrent operations must apply to the same text")
+    a_prime, b_prime = _Builder(), _Builder()
+    ops_a, ops_b = list(a), list(b)
+    i = j = 0
+    x = ops_a[0] if ops_a else None
+    y = ops_b[0] if ops_b else None
+    while x is not None or y is not None:
+        if isinstance(x, str):
+            a_prime.insert(x)
+            b_prime.retain(len(x))
+            i += 1
+            x = ops_a[i] if i < len(ops_a) else None
+            continue
+        if isinstance(y, str):
+            a_prime.retain(len(y))
+            b_prime.insert(y)
+            j += 1
+            y = ops_b[j] if j < len(ops_b) else None
+            continue
+        if x is None or y is None:
+            raise OperationError("Concurrent operations must apply to the same text")
+        count = min(abs(x), abs(y))
+        if x > 0 and y > 0:
+            a_prime.retain(count)
+            b_prime.retain(count)
+        elif x < 0 < y:
+            a_prime.delete(count)
+        elif y < 0 < x:
+            b_prime.delete(count)
+        # Both deleted the same characters: nothing is left to do.
+        x, y = _consume(x, count), _consume(y, count)
+        if x == 0:
+            i += 1
+            x = ops_a[i] if i < len(ops_a) else None
+        if y == 0:
+            j += 1
+            y = ops_b[j] if j < len(ops_b) else None
+    return a_prime.ops, b_prime.ops
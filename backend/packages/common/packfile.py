@@ -0,0 +1,217 @@
+"""Append-only pack files of compressed records, read through mmap.
+
+A pack starts with an 8-byte magic and is followed by records laid end to
+end. Each record is a fixed header (record id, CRC-32 and length of the
+uncompressed data, length of the compressed payload) and a zlib payload.
+Records are addressed by the byte offset and total length of the record,
+kept by the caller; the headers make a pack self-describing, so its
+contents can be listed or verified without the external index.
+
+Packs are written to a temporary file, flushed to disk and renamed into
+place, so a pack that exists under its final name is complete and never
+changes again.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+from collections.abc import Iterator
+from pathlib import Path
+from types import TracebackType
+from uuid import UUID
+
+MAGIC = b"CWPACK1\n"
+_HEADER = struct.Struct("<16sIII")
+_LEVEL = 6
+
+
+class PackCorruptError(ValueError):
+    """A record does not match its header or the expected id."""
+
+
+class PackWriter:
+    """Writes one pack file; use as a context manager.
+
+    Args:
+        path: Final path of the pack. Nothing appears there until the writer
+            is closed without error.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._tmp = path.with_name(path.name + ".tmp")
+        self._file = open(self._tmp, "wb")  # noqa: SIM115
+        self._file.write(MAGIC)
+        self.size = len(MAGIC)
+        self.count = 0
+
+    def append(self, record_id: UUID, data: bytes) -> tuple[int, int]:
+        """Compress and append a record.
+
+        Returns:
+            tuple[int, int]: Offset and total length of the record.
+        """
+        return self.append_raw(
+            record_id, zlib.crc32(data), len(data), zlib.compress(data, _LEVEL)
+        )
+
+    def append_raw(
+        self, record_id: UUID, crc: int, raw_length: int, payload: bytes
+    ) -> tuple[int, int]:
+        """Append an already compressed record, e.g. copied from another pack."""
+        offset = self.size
+        self._file.write(_HEADER.pack(record_id.bytes, crc, raw_length, len(payload)))
+        self._file.write(payload)
+        length = _HEADER.size + len(payload)
+        self.size += length
+        self.count += 1
+        return offset, length
+
+    def close(self) -> None:
+        """Flush the pack to disk and move it to its final path."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        """Discard the partially written pack."""
+        self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "PackWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class PackReader:
+    """Random access to the records of a finished pack file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise PackCorruptError(f"{path} is not a pack file")
+
+    def _header(self, offset: int) -> tuple[UUID, int, int, int]:
+        if offset < len(MAGIC) or offset + _HEADER.size > len(self._map):
+            raise PackCorruptError(f"Offset {offset} outside {self.path}")
+        raw_id, crc, raw_length, size = _HEADER.unpack_from(self._map, offset)
+        return UUID(bytes=raw_id), crc, raw_length, size
+
+    def raw(self, offset: int, length: int) -> tuple[UUID, int, int, bytes]:
+        """Return a record's id, CRC, uncompressed length and payload as stored."""
+        record_id, crc, raw_length, size = self._header(offset)
+        if _HEADER.size + size != length or offset + length > len(self._map):
+            raise PackCorruptError(f"Bad record length at {offset} in {self.path}")
+        start = offset + _HEADER.size
+        return record_id, crc, raw_length, self._map[start : start + size]
+
+    def _check_id(self, offset: int, found: UUID, record_id: UUID | None) -> None:
+        if record_id is not None and found != record_id:
+            raise PackCorruptError(
+                f"Expected record {record_id} at {offset}, found {found}"
+            )
+
+    def read(self, offset: int, length: int, record_id: UUID | None = None) -> bytes:
+        """Decompress and verify one record.
+
+        Raises:
+            PackCorruptError: If the record is damaged or is not ``record_id``.
+        """
+        found, crc, raw_length, payload = self.raw(offset, length)
+        self._check_id(offset, found, record_id)
+        try:
+            data = zlib.decompress(payload)
+        except zlib.error as exc:
+            raise PackCorruptError(f"Record {found}: {exc}") from exc
+        if len(data) != raw_length or zlib.crc32(data) != crc:
+            raise PackCorruptError(f"Record {found} failed its checksum")
+        return data
+
+    def raw_length(
+        self, offset: int, length: int, record_id: UUID | None = None
+    ) -> int:
+        """Uncompressed length of a record, from its header alone.
+
+        Raises:
+            PackCorruptError: If the header is damaged or is not ``record_id``'s.
+        """
+        found, _, raw_length, size = self._header(offset)
+        self._check_id(offset, found, record_id)
+        if _HEADER.size + size != length or offset + length > len(self._map):
+            raise PackCorruptError(f"Bad record length at {offset} in {self.path}")
+        return raw_length
+
+    def stream(
+        self,
+        offset: int,
+        length: int,
+        record_id: UUID | None = None,
+        *,
+        chunk_size: int = 65536,
+    ) -> Iterator[bytes]:
+        """Decompress a record piece by piece, at most ``chunk_size`` at a time.
+
+        Only one chunk of the record is in memory at once. The checksum can
+        only be verified at the end, so the error comes after the data.
+
+        Raises:
+            PackCorruptError: If the record is damaged or is not ``record_id``.
+        """
+        raw_length = self.raw_length(offset, length, record_id)
+        found, crc, _, size = self._header(offset)
+        position = offset + _HEADER.size
+        end = position + size
+        decompressor = zlib.decompressobj()
+        produced = 0
+        check = 0
+        try:
+            while True:
+                if decompressor.unconsumed_tail:
+                    data = decompressor.decompress(
+                        decompressor.unconsumed_tail, chunk_size
+                    )
+                elif position < end:
+                    step = min(chunk_size, end - position)
+                    data = decompressor.decompress(
+                        self._map[position : position + step], chunk_size
+                    )
+                    position += step
+                else:
+                    data = decompressor.flush()
+                    if not data:
+                        break
+                if data:
+                    produced += len(data)
+                    check = zlib.crc32(data, check)
+                    yield data
+        except zlib.error as exc:
+            raise PackCorruptError(f"Record {found}: {exc}") from exc
+        if produced != raw_length or check != crc or not decompressor.eof:
+            raise PackCorruptError(f"Record {found} failed its checksum")
+
+    def __iter__(self) -> Iterator[tuple[UUID, int, int]]:
+        """Yield ``(record id, offset, length)`` for every record."""
+        offset = len(MAGIC)
+        while offset < len(self._map):
+            record_id, _, _, size = self._header(offset)
+            yield record_id, offset, _HEADER.size + size
+            offset += _HEADER.size + size
+
+    def close(self) -> None:
+        """Unmap the file."""
+        self._map.close()
@@ -0,0 +1,134 @@
+"""Applying patches to text.
+
+Two patch forms are supported. Edits are character splices against the
+base text, the compact form for editors that track cursor operations.
+Unified diffs are the form produced by ``packages.common.diff``, and are
+split into lines the same way, at ``\n`` only. Both are
+applied strictly: an edit out of bounds or out of order, or a diff whose
+context and removed lines do not match the base, raises
+:class:`PatchError` rather than guessing.
+"""
+
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from packages.common.diff import split_lines
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_NO_NEWLINE = "\\ No newline at end of file"
+
+
+class PatchError(ValueError):
+    """A patch is malformed or does not apply to the base text."""
+
+
+@dataclass(frozen=True, slots=True)
+class Edit:
+    """Replace ``delete`` characters at offset ``at`` of the base with ``insert``.
+
+    Offsets count code points of the base text, not of the text as edited
+    so far.
+    """
+
+    at: int
+    delete: int = 0
+    insert: str = ""
+
+
+def apply_edits(base: str, edits: Sequence[Edit]) -> str:
+    """Apply edits given in ascending, non-overlapping order.
+
+    Raises:
+        PatchError: If an edit is out of bounds, overlaps the previous one
+            or comes before it.
+    """
+    out = []
+    cursor = 0
+    for index, edit in enumerate(edits):
+        if edit.at < cursor or edit.delete < 0:
+            raise PatchError(f"Edit {index} overlaps or precedes the previous edit")
+        end = edit.at + edit.delete
+        if end > len(base):
+            raise PatchError(f"Edit {index} extends past the end of the text")
+        out.append(base[cursor : edit.at])
+        out.append(edit.insert)
+        cursor = end
+    out.append(base[cursor:])
+    return "".join(out)
+
+
+@dataclass
+class _Hunk:
+    base_start: int
+    base_count: int
+    target_count: int
+    lines: list[tuple[str, str]]
+
+
+def _parse_unified(diff: str) -> list[_Hunk]:
+    hunks: list[_Hunk] = []
+    for number, line in enumerate(split_lines(diff), 1):
+        header = _HUNK_HEADER.match(line)
+        if header is not None:
+            base_start, base_count, _, target_count = header.groups()
+            hunks.append(
+                _Hunk(
+                    int(base_start),
+                    1 if base_count is None else int(base_count),
+                    1 if target_count is None else int(target_count),
+                    [],
+                )
+            )
+        elif not hunks:
+            if not line.startswith(("--- ", "+++ ")) and line.strip():
+                raise PatchError(f"Line {number}: expected a hunk header")
+        elif line.rstrip("\r\n") == _NO_NEWLINE:
+            if not hunks[-1].lines:
+                raise PatchError(f"Line {number}: marker outside a hunk body")
+            op, text = hunks[-1].lines[-1]
+            hunks[-1].lines[-1] = (op, text.removesuffix("\n"))
+        elif line[:1] in (" ", "-", "+"):
+            hunks[-1].lines.append((line[0], line[1:]))
+        else:
+            raise PatchError(f"Line {number}: unexpected {line[:20]!r}")
+    return hunks
+
+
+def apply_unified(base: str, diff: str) -> str:
+    """Apply a unified diff whose hunks are in base order.
+
+    Hunk line numbers must be exact; there is no fuzzy matching.
+
+    Raises:
+        PatchError: If the diff is malformed or does not match ``base``.
+    """
+    base_lines = split_lines(base)
+    out: list[str] = []
+    cursor = 0
+    for number, hunk in enumerate(_parse_unified(diff), 1):
+        # A zero-length range names the line before the change.
+        index = hunk.base_start - 1 if hunk.base_count else hunk.base_start
+        if index < cursor or index > len(base_lines):
+            raise PatchError(f"Hunk {number} is out of order or out of range")
+        out.extend(base_lines[cursor:index])
+        removed = added = 0
+        for op, text in hunk.lines:
+            if op == "+":
+                out.append(text)
+                added += 1
+                continue
+            if index >= len(base_lines) or base_lines[index] != text:
+                raise PatchError(
+                    f"Hunk {number} does not match line {index + 1} of the base"
+                )
+            if op == " ":
+                out.append(text)
+                added += 1
+            removed += 1
+            index += 1
+        if (removed, added) != (hunk.base_count, hunk.target_count):
+            raise PatchError(f"Hunk {number} line counts do not match its header")
+        cursor = index
+    out.extend(base_lines[cursor:])
+    return "".join(out)
@@ -0,0 +1,77 @@
+"""HTTP conditional and range request headers.
+
+Parsing for ``Range``, ``If-Range`` and ``If-None-Match`` as defined in
+RFC 9110, for responses that have a strong ETag and a known length. Only
+single byte ranges are served; a request for several ranges gets the whole
+body, which the RFC allows.
+"""
+
+
+class RangeNotSatisfiableError(ValueError):
+    """A byte range lies entirely past the end of the body."""
+
+
+def _etags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """Whether ``If-None-Match`` lists ``etag`` (weak comparison).
+
+    Args:
+        header: Value of the header, if it was sent.
+        etag: The response's entity tag, quotes included.
+    """
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.removeprefix("W/") == bare for tag in _etags(header))
+
+
+def if_range_matches(header: str | None, etag: str) -> bool:
+    """Whether a ``Range`` may be honoured under ``If-Range``.
+
+    Only strong entity tags count; dates are not trusted, so they ask for
+    the whole body.
+    """
+    if header is None:
+        return True
+    header = header.strip()
+    return not header.startswith("W/") and header == etag
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Resolve a ``Range`` header against a body of ``size`` bytes.
+
+    Returns:
+        tuple[int, int] | None: ``(start, end)`` with ``end`` exclusive, or
+        ``None`` when the whole body should be sent: no header, a header
+        that is malformed, not about bytes or asks for several ranges.
+
+    Raises:
+        RangeNotSatisfiableError: If the range starts past the end, or asks
+            for the suffix of an empty body.
+    """
+    if header is None:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash or not (first or last):
+        return None
+    if not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if not first:
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiableError(f"bytes=-{length} of {size}")
+        return max(size - length, 0), size
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiableError(f"bytes={start}- of {size}")
+    return start, min(int(last) + 1, size) if last else size
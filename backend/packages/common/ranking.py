@@ -0,0 +1,118 @@
+"""Bounded ranked id lists and time-decayed scores.
+
+A decayed score is kept in log space: an event of weight ``w`` at time ``t``
+contributes ``w * 2 ** (t / half_life)`` to a running sum whose base-2
+logarithm is stored. Because every contribution is scaled relative to the
+same origin rather than to "now", stored scores never need to be decayed
+again; comparing two of them at any later instant gives the same order as
+comparing their exponentially decayed values.
+"""
+
+import bisect
+import math
+import struct
+from collections.abc import Iterable
+from uuid import UUID
+
+
+def decayed_score(
+    score: float | None, weight: float, at: float, half_life: float
+) -> float:
+    """Add an event to a log-space decayed score.
+
+    Args:
+        score: Current score, or ``None`` for no events yet.
+        weight: Positive weight of the event.
+        at: Event time in seconds.
+        half_life: Seconds after which an event counts half as much.
+
+    Returns:
+        float: The updated score.
+    """
+    event = at / half_life + math.log2(weight)
+    if score is None:
+        return event
+    high, low = max(score, event), min(score, event)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+class RankedIds:
+    """Ids ordered by descending score, holding at most ``capacity`` entries.
+
+    Ties are broken by descending id, which matches ``ORDER BY score DESC,
+    id DESC``. Entries that fall off the end are forgotten, so the list is
+    the exact top ``capacity`` only while every candidate has been offered
+    to it.
+    """
+
+    def __init__(
+        self, capacity: int, entries: Iterable[tuple[UUID, float]] = ()
+    ) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        # Sorted ascending by (score, id), so the worst entry is first.
+        self._keys: list[tuple[float, UUID]] = []
+        self._scores: dict[UUID, float] = {}
+        for item_id, score in entries:
+            self.upsert(item_id, score)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, item_id: object) -> bool:
+        return item_id in self._scores
+
+    def upsert(self, item_id: UUID, score: float) -> bool:
+        """Insert an id or change its score.
+
+        Returns:
+            bool: ``True`` if the id is in the list afterwards.
+        """
+        self.remove(item_id)
+        key = (score, item_id)
+        if len(self._keys) >= self.capacity and key <= self._keys[0]:
+            return False
+        bisect.insort(self._keys, key)
+        self._scores[item_id] = score
+        if len(self._keys) > self.capacity:
+            _, dropped = self._keys.pop(0)
+            del self._scores[dropped]
+        return True
+
+    def remove(self, item_id: UUID) -> bool:
+        """Remove an id; returns whether it was present."""
+        score = self._scores.pop(item_id, None)
+        if score is None:
+            return False
+        del self._keys[bisect.bisect_left(self._keys, (score, item_id))]
+        return True
+
+    def ids(self, limit: int | None = None) -> list[UUID]:
+        """Return ids best first."""
+        best_first = reversed(self._keys)
+        return [item_id for _, item_id in best_first][:limit]
+
+    def entries(self) -> list[tuple[UUID, float]]:
+        """Return ``(id, score)`` pairs best first."""
+        return [(item_id, score) for score, item_id in reversed(self._keys)]
+
+    def pack(self) -> tuple[bytes, bytes]:
+        """Serialize as 16-byte ids and little-endian doubles, best first."""
+        entries = self.entries()
+        return (
+            b"".join(item_id.bytes for item_id, _ in entries),
+            struct.pack(f"<{len(entries)}d", *(score for _, score in entries)),
+        )
+
+    @classmethod
+    def unpack(cls, capacity: int, ids: bytes, scores: bytes) -> "RankedIds":
+        """Inverse of ``pack``; entries beyond ``capacity`` are dropped."""
+        values = struct.unpack(f"<{len(scores) // 8}d", scores)
+        return cls(
+            capacity,
+            (
+                (UUID(bytes=ids[i * 16 : (i + 1) * 16]), score)
+                for i, score in enumerate(values)
+            ),
+        )
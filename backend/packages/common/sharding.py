@@ -0,0 +1,38 @@
+"""Placement of keys on a fixed number of shards.
+
+Keys are spread with jump consistent hashing (Lamping and Veach, 2014): it
+needs no table, spreads keys evenly, and when the shard count grows from
+``n`` to ``m`` only the ``(m - n) / m`` share of keys that must move to the
+new shards changes place; nothing moves between the old ones. UUIDv7 ids
+start with a timestamp, so ids are hashed with BLAKE2b first rather than
+used as the key directly.
+"""
+
+import hashlib
+from uuid import UUID
+
+_MASK = (1 << 64) - 1
+_MULTIPLIER = 2862933555777941757
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Map a 64-bit ``key`` to a bucket in ``range(buckets)``.
+
+    Raises:
+        ValueError: If ``buckets`` is not positive.
+    """
+    if buckets <= 0:
+        raise ValueError(f"buckets must be positive, got {buckets}")
+    key &= _MASK
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * _MULTIPLIER + 1) & _MASK
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_of(key: UUID, shards: int) -> int:
+    """Return the shard, in ``range(shards)``, that owns ``key``."""
+    digest = hashlib.blake2b(key.bytes, digest_size=8).digest()
+    return jump_hash(int.from_bytes(digest, "big"), shards)
@@ -0,0 +1,109 @@
+"""Request coalescing.
+
+Concurrent callers asking for the same key share one in-flight computation
+instead of each repeating it (Go's ``singleflight``). A batch computation
+counts as in flight for every key it covers.
+"""
+
+import asyncio
+import functools
+from collections.abc import Awaitable, Callable, Hashable, Iterable, Mapping
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+K = TypeVar("K", bound=Hashable)
+
+
+class NotInBatch(LookupError):
+    """A batch call that a caller joined left the caller's key out."""
+
+
+class SingleFlight(Generic[T]):
+    """Deduplicate concurrent async calls by key."""
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Future[T]] = {}
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return ``await fn()``, joining a call already running for ``key``.
+
+        The work runs as its own task, so a caller that is cancelled (for
+        example a client that disconnects) does not cancel it for the others.
+        Exceptions are delivered to every waiting caller.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(call)
+
+    async def do_many(
+        self,
+        keys: Iterable[K],
+        fn: Callable[[list[K]], Awaitable[Mapping[K, T]]],
+        *,
+        absent: tuple[type[BaseException], ...] = (),
+    ) -> dict[K, T]:
+        """Batch form of :meth:`do`.
+
+        Keys with a call already running join it; the rest are computed by a
+        single ``fn(missing)`` call, which later :meth:`do` and
+        :meth:`do_many` callers for any of those keys join in turn.
+
+        Args:
+            keys: Keys to compute.
+            fn: Computes the given keys, leaving out those it has no result
+                for.
+            absent: Exceptions from a joined call that mean its key has no
+                result rather than that the batch failed.
+
+        Returns:
+            dict[K, T]: The result per key, without the keys that have none.
+            Callers of :meth:`do` that joined such a key get
+            :class:`NotInBatch`.
+        """
+        calls: dict[K, asyncio.Future[T]] = {}
+        missing: list[K] = []
+        for key in dict.fromkeys(keys):
+            call = self._calls.get(key)
+            if call is None:
+                missing.append(key)
+            else:
+                self.shared += 1
+                calls[key] = call
+        if missing:
+            batch = asyncio.ensure_future(fn(missing))
+            for key in missing:
+                call = asyncio.ensure_future(self._pick(batch, key))
+                self._calls[key] = call
+                call.add_done_callback(functools.partial(self._forget, key))
+                calls[key] = call
+        skipped: tuple[type[BaseException], ...] = (NotInBatch, *absent)
+        results: dict[K, T] = {}
+        for key, call in calls.items():
+            try:
+                results[key] = await asyncio.shield(call)
+            except skipped:
+                continue
+        return results
+
+    @staticmethod
+    async def _pick(batch: asyncio.Future[Mapping[K, T]], key: K) -> T:
+        results = await batch
+        if key not in results:
+            raise NotInBatch(key)
+        return results[key]
+
+    def _forget(self, key: Hashable, call: asyncio.Future[T]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every caller went away.
+        if not call.cancelled():
+            call.exception()
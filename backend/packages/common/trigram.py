@@ -0,0 +1,129 @@
+"""Trigram extraction and regex-to-trigram query planning.
+
+Text is indexed by the set of its case-folded three-character windows, each
+packed into one integer. A search is planned as a boolean query over those
+trigrams that every match must satisfy, so the index can narrow the corpus
+to a candidate set which is then verified with the real pattern.
+
+Regex planning follows the shape of the parsed pattern: consecutive literal
+characters form strings whose trigrams must all be present, alternations
+become ``Or`` nodes and required repetitions contribute their body. Anything
+the planner does not understand simply adds no constraint, which keeps the
+plan a necessary condition: it may admit extra candidates, never drop a
+match.
+"""
+
+import re
+import sys
+from dataclasses import dataclass
+from typing import Any, Union
+
+if sys.version_info >= (3, 11):
+    from re import _parser as sre_parse
+else:  # pragma: no cover - Python 3.10
+    import sre_parse
+
+
+@dataclass(frozen=True, slots=True)
+class And:
+    """Every part must match."""
+
+    parts: tuple["TrigramQuery", ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Or:
+    """At least one part must match."""
+
+    parts: tuple["TrigramQuery", ...]
+
+
+# A frozenset is a run of literal text: all of its trigrams must be present.
+# ``None`` places no constraint and matches every document.
+TrigramQuery = Union[And, Or, frozenset[int], None]
+
+
+def encode(trigram: str) -> int:
+    """Pack three characters into one non-negative 63-bit integer."""
+    a, b, c = (ord(char) for char in trigram)
+    return (a << 42) | (b << 21) | c
+
+
+def trigrams(text: str) -> set[int]:
+    """Return the encoded case-folded trigrams of ``text``."""
+    folded = text.lower()
+    return {encode(folded[i : i + 3]) for i in range(len(folded) - 2)}
+
+
+def _and(parts: list[TrigramQuery]) -> TrigramQuery:
+    kept = [part for part in parts if part is not None]
+    if not kept:
+        return None
+    if all(isinstance(part, frozenset) for part in kept):
+        return frozenset().union(*kept)  # type: ignore[arg-type]
+    return kept[0] if len(kept) == 1 else And(tuple(kept))
+
+
+def _or(parts: list[TrigramQuery]) -> TrigramQuery:
+    if not parts or any(part is None for part in parts):
+        return None
+    return parts[0] if len(parts) == 1 else Or(tuple(parts))
+
+
+def _literal(text: str) -> TrigramQuery:
+    return frozenset(trigrams(text)) or None
+
+
+def substring_query(text: str) -> TrigramQuery:
+    """Plan a plain substring search."""
+    return _literal(text)
+
+
+def _plan(items: Any) -> TrigramQuery:
+    parts: list[TrigramQuery] = []
+    run: list[str] = []
+
+    def flush() -> None:
+        if run:
+            parts.append(_literal("".join(run)))
+            run.clear()
+
+    for op, av in items:
+        name = str(op)
+        if name == "LITERAL":
+            run.append(chr(av))
+        elif name == "AT":
+            continue  # anchors consume nothing and keep the run intact
+        elif name == "SUBPATTERN":
+            # Inline the group so literals on both sides of it still join.
+            sub = av[-1]
+            if all(str(sub_op) == "LITERAL" for sub_op, _ in sub):
+                run.extend(chr(sub_av) for _, sub_av in sub)
+            else:
+                flush()
+                parts.append(_plan(sub))
+        elif name == "BRANCH":
+            flush()
+            parts.append(_or([_plan(branch) for branch in av[1]]))
+        elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"):
+            flush()
+            minimum, _, body = av
+            if minimum >= 1:
+                parts.append(_plan(body))
+        elif name == "ATOMIC_GROUP":
+            flush()
+            parts.append(_plan(av))
+        else:
+            flush()
+    flush()
+    return _and(parts)
+
+
+def regex_query(pattern: str, flags: int = 0) -> TrigramQuery:
+    """Plan a regular expression search.
+
+    Raises:
+        re.error: If the pattern is invalid.
+    """
+    re.compile(pattern, flags)
+    return _plan(sre_parse.parse(pattern, flags))
@@ -1,17 +1,42 @@
 """数据模型包"""
 
+from .archive import VersionPack
+from .backfill import BackfillCheckpoint
 from .base import Base, SoftDeleteMixin, TimestampMixin, UUIDMixin
+from .changelog import ChangeLogEntry
+from .collab import CollabLease
+from .draft import Draft
+from .highlight import ContentHighlight
+from .hot_list import HotList, SnippetActivity
+from .job import Job, JobStatus
+from .similarity import SnippetLSHBand, SnippetSignature
 from .snippet import Snippet
 from .tag import SnippetTag, Tag
+from .trigram import SnippetTrigram
 from .version import Version
+from .version_closure import VersionClosure
 
 __all__ = [
     "Base",
     "SoftDeleteMixin",
     "TimestampMixin",
     "UUIDMixin",
+    "BackfillCheckpoint",
+    "ChangeLogEntry",
+    "CollabLease",
+    "ContentHighlight",
+    "Draft",
+    "HotList",
+    "Job",
+    "JobStatus",
     "Snippet",
+    "SnippetActivity",
+    "SnippetLSHBand",
+    "SnippetSignature",
+    "SnippetTrigram",
     "Tag",
     "SnippetTag",
     "Version",
+    "VersionClosure",
+    "VersionPack",
 ]
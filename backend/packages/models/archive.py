@@ -0,0 +1,28 @@
+"""Version archive models."""
+
+from sqlalchemy import BigInteger, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin, UUIDMixin
+
+
+class VersionPack(Base, UUIDMixin, TimestampMixin):
+    """版本归档包模型
+
+    A finished pack file in ``ARCHIVE_DIR``, named ``<id>.pack``. Versions
+    archived into it point at their record with ``pack_id``, ``pack_offset``
+    and ``pack_length``.
+    """
+
+    __tablename__ = "version_packs"
+
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    record_count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    @property
+    def file_name(self) -> str:
+        """Name of the pack file."""
+        return f"{self.id}.pack"
+
+    def __repr__(self) -> str:
+        return f"<VersionPack(id={self.id}, records={self.record_count})>"
@@ -0,0 +1,34 @@
+"""Backfill checkpoint model."""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin
+
+
+class BackfillCheckpoint(Base, TimestampMixin):
+    """回填进度模型
+
+    Progress of one named backfill: the key of the last processed row, in
+    its string form, and counters. Each chunk updates its checkpoint in the
+    chunk's own transaction, so a restarted backfill resumes exactly after
+    the last committed chunk.
+    """
+
+    __tablename__ = "backfill_checkpoints"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    last_key: Mapped[str | None] = mapped_column(Text, nullable=True)
+    rows_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    chunks_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    finished_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<BackfillCheckpoint(name='{self.name}', rows_done={self.rows_done}, "
+            f"finished={self.finished_at is not None})>"
+        )
@@ -1,11 +1,13 @@
 """Base model for all database models."""
 
 from datetime import datetime
-from uuid import UUID, uuid4
+from uuid import UUID
 
 from sqlalchemy import Boolean, DateTime, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
+from packages.common.ids import uuid7
+
 
 class Base(DeclarativeBase):
     """Base class for all database models."""
@@ -28,11 +30,15 @@ class TimestampMixin:
 
 
 class UUIDMixin:
-    """Mixin to add UUID primary key to models."""
+    """Mixin to add UUID primary key to models.
+
+    Keys are time-ordered UUIDv7 values, so new rows append to the right edge
+    of the primary key B-tree instead of landing on random pages.
+    """
 
     id: Mapped[UUID] = mapped_column(
         primary_key=True,
-        default=uuid4,
+        default=uuid7,
         nullable=False,
     )
 
@@ -0,0 +1,40 @@
+"""Change feed models."""
+
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import DateTime, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class ChangeLogEntry(Base):
+    """变更日志模型
+
+    One row per inserted, updated or deleted snippet, version or tag link,
+    written in the transaction that made the change. ``seq`` comes from
+    SQLite's ``AUTOINCREMENT``, so it is never reused and, with a single
+    writer at a time, increases in commit order: a reader that has seen
+    ``seq = n`` has seen every change committed before it.
+    """
+
+    __tablename__ = "changelog"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    entity: Mapped[str] = mapped_column(String(20), nullable=False)
+    entity_id: Mapped[UUID] = mapped_column(nullable=False)
+    snippet_id: Mapped[UUID] = mapped_column(nullable=False)
+    op: Mapped[str] = mapped_column(String(10), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<ChangeLogEntry(seq={self.seq}, entity='{self.entity}', "
+            f"op='{self.op}', entity_id='{self.entity_id}')>"
+        )
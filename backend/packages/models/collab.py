@@ -0,0 +1,32 @@
+"""Collaborative editing models."""
+
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import DateTime, ForeignKey, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class CollabLease(Base):
+    """协作会话租约模型
+
+    Pins the live editing session of a snippet to one worker process. The
+    owner keeps extending ``expires_at`` while the session is open; another
+    worker may take the snippet over only once the lease has expired.
+    """
+
+    __tablename__ = "collab_leases"
+
+    snippet_id: Mapped[UUID] = mapped_column(
+        ForeignKey("snippets.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    owner: Mapped[str] = mapped_column(String(64), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<CollabLease(snippet_id='{self.snippet_id}', owner='{self.owner}')>"
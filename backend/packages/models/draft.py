@@ -0,0 +1,35 @@
+"""Autosave draft models."""
+
+from uuid import UUID
+
+from sqlalchemy import ForeignKey, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin
+
+
+class Draft(Base, TimestampMixin):
+    """自动保存草稿模型
+
+    The latest unsaved content of a snippet in one editor session. Autosaves
+    overwrite it in place; ``edit_count`` counts them until the draft is
+    turned into a version. ``created_at`` is the first coalesced edit and
+    ``updated_at`` the last one.
+    """
+
+    __tablename__ = "drafts"
+    __table_args__ = (Index("ix_drafts_updated_at", "updated_at"),)
+
+    snippet_id: Mapped[UUID] = mapped_column(
+        ForeignKey("snippets.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    session_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    edit_count: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+
+    def __repr__(self) -> str:
+        return (
+            f"<Draft(snippet_id='{self.snippet_id}', "
+            f"session_id='{self.session_id}', edits={self.edit_count})>"
+        )
@@ -0,0 +1,26 @@
+from sqlalchemy import JSON, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin
+
+
+class ContentHighlight(Base, TimestampMixin):
+    """内容语法高亮缓存模型
+
+    Keyed by content hash rather than version, so every version, snippet or
+    revert that shares a body shares one tokenization. Rows from an older
+    tokenizer are simply never read again.
+    """
+
+    __tablename__ = "content_highlights"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    language: Mapped[str] = mapped_column(String(50), primary_key=True)
+    tokenizer: Mapped[str] = mapped_column(String(32), primary_key=True)
+    lines: Mapped[list] = mapped_column(JSON, nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ContentHighlight(content_hash='{self.content_hash}', "
+            f"language='{self.language}', tokenizer='{self.tokenizer}')>"
+        )
@@ -0,0 +1,53 @@
+"""Materialized hot list models."""
+
+from uuid import UUID
+
+from sqlalchemy import Boolean, Float, ForeignKey, Index, LargeBinary, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin
+
+
+class HotList(Base, TimestampMixin):
+    """热门列表模型
+
+    A ranked list such as ``recent`` or ``trending:python``, stored as packed
+    16-byte snippet ids and the matching packed double scores, best first.
+    ``exhaustive`` records that the list held every matching snippet when it
+    was built, so a short list is complete rather than depleted.
+    """
+
+    __tablename__ = "hot_lists"
+
+    name: Mapped[str] = mapped_column(String(80), primary_key=True)
+    ids: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    scores: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    exhaustive: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+
+    def __repr__(self) -> str:
+        return f"<HotList(name='{self.name}', size={len(self.ids) // 16})>"
+
+
+class SnippetActivity(Base, TimestampMixin):
+    """代码片段热度模型
+
+    The time-decayed activity score of a snippet, in log space so it never
+    needs rewriting as time passes. ``language`` is copied from the snippet
+    so per-language rankings are a single index scan.
+    """
+
+    __tablename__ = "snippet_activity"
+    __table_args__ = (
+        Index("ix_snippet_activity_score", "score"),
+        Index("ix_snippet_activity_language_score", "language", "score"),
+    )
+
+    snippet_id: Mapped[UUID] = mapped_column(
+        ForeignKey("snippets.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    language: Mapped[str] = mapped_column(String(50), nullable=False)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<SnippetActivity(snippet_id='{self.snippet_id}', score={self.score})>"
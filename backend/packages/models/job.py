@@ -0,0 +1,58 @@
+"""Background job model."""
+
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import JSON, DateTime, Index, Integer, String, Text, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin, UUIDMixin
+
+
+class JobStatus(str, Enum):
+    """Lifecycle of a job."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(Base, UUIDMixin, TimestampMixin):
+    """后台任务模型"""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_claim", "status", "priority", "run_after"),
+        Index("ix_jobs_status_locked_until", "status", "locked_until"),
+        # A dedup key is unique only while its job is still queued or running.
+        Index(
+            "uq_jobs_active_dedup_key",
+            "dedup_key",
+            unique=True,
+            sqlite_where=text(
+                "dedup_key IS NOT NULL AND status IN ('pending', 'running')"
+            ),
+        ),
+    )
+
+    kind: Mapped[str] = mapped_column(String(100), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    status: Mapped[str] = mapped_column(
+        String(20), nullable=False, default=JobStatus.PENDING.value
+    )
+    priority: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=5)
+    run_after: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    locked_until: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    dedup_key: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    def __repr__(self) -> str:
+        return f"<Job(id={self.id}, kind='{self.kind}', status='{self.status}')>"
@@ -0,0 +1,56 @@
+"""Near-duplicate index models."""
+
+from uuid import UUID
+
+from sqlalchemy import BigInteger, ForeignKey, Index, LargeBinary, SmallInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin
+
+
+class SnippetSignature(Base, TimestampMixin):
+    """代码片段 MinHash 签名模型"""
+
+    __tablename__ = "snippet_signatures"
+
+    snippet_id: Mapped[UUID] = mapped_column(
+        ForeignKey("snippets.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    signature: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"<SnippetSignature(snippet_id='{self.snippet_id}', "
+            f"content_hash='{self.content_hash}')>"
+        )
+
+
+class SnippetLSHBand(Base):
+    """代码片段 LSH 分桶模型
+
+    One row per (band, bucket) a snippet's signature falls into. The primary
+    key leads with the bucket, so finding every snippet that shares a bucket
+    is an index range scan; ``WITHOUT ROWID`` keeps the rows inside that
+    index instead of duplicating them in a separate table B-tree.
+    """
+
+    __tablename__ = "snippet_lsh_bands"
+    __table_args__ = (
+        Index("ix_snippet_lsh_bands_snippet_id", "snippet_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+    band: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    bucket: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    snippet_id: Mapped[UUID] = mapped_column(
+        ForeignKey("snippets.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<SnippetLSHBand(band={self.band}, bucket={self.bucket}, "
+            f"snippet_id='{self.snippet_id}')>"
+        )
@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import String, Text
+from sqlalchemy import Index, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, SoftDeleteMixin, TimestampMixin, UUIDMixin
@@ -14,6 +14,8 @@ class Snippet(Base, UUIDMixin, TimestampMixin, SoftDeleteMixin):
     """代码片段模型"""
 
     __tablename__ = "snippets"
+    # Newest snippets of a language, in id (creation) order.
+    __table_args__ = (Index("ix_snippets_language_id", "language", "id"),)
 
     title: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
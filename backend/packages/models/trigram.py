@@ -0,0 +1,34 @@
+"""Trigram index model."""
+
+from uuid import UUID
+
+from sqlalchemy import BigInteger, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class SnippetTrigram(Base):
+    """代码片段三元组倒排索引模型
+
+    One row per distinct case-folded trigram of a snippet's content. Rows
+    with the same trigram are adjacent in the ``WITHOUT ROWID`` primary key,
+    so each posting list is a contiguous index range.
+    """
+
+    __tablename__ = "snippet_trigrams"
+    __table_args__ = (
+        Index("ix_snippet_trigrams_snippet_id", "snippet_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+    trigram: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    snippet_id: Mapped[UUID] = mapped_column(
+        ForeignKey("snippets.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<SnippetTrigram(trigram={self.trigram}, snippet_id='{self.snippet_id}')>"
+        )
@@ -1,19 +1,72 @@
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Any, Optional
 from uuid import UUID
 
-from sqlalchemy import JSON, ForeignKey, Integer, Text
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Computed,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
+from sqlalchemy.engine.default import DefaultExecutionContext
+from sqlalchemy.orm import Mapped, MappedColumn, mapped_column, relationship
+from sqlalchemy.types import TypeEngine
+
+from packages.common.hashing import content_hash
 
 from .base import Base, TimestampMixin, UUIDMixin
 
 if TYPE_CHECKING:
     from .snippet import Snippet
 
+# version_metadata keys exposed as indexed virtual columns, mapped to the
+# attribute holding them. Adding a key needs a migration that calls
+# ``apps.db.schema.add_promoted_metadata_column``.
+PROMOTED_METADATA_KEYS: dict[str, str] = {
+    "session_id": "meta_session_id",
+    "autosave": "meta_autosave",
+    "tests_passed": "meta_tests_passed",
+}
+
+
+def metadata_expression(key: str) -> str:
+    """SQL expression extracting a top-level ``version_metadata`` key."""
+    return f"json_extract(version_metadata, '$.{key}')"
+
+
+def promoted_metadata_column(key: str, type_: TypeEngine[Any]) -> MappedColumn[Any]:
+    """Declare a generated column mirroring a ``version_metadata`` key.
+
+    The column is ``VIRTUAL``: it takes no space in the row and can be added
+    with ``ALTER TABLE`` without rewriting the table, while its index makes
+    lookups by the key a B-tree search instead of a JSON scan.
+    """
+    return mapped_column(
+        type_,
+        Computed(metadata_expression(key), persisted=False),
+        nullable=True,
+    )
+
+
+def _default_content_hash(context: DefaultExecutionContext) -> str:
+    return content_hash(context.get_current_parameters()["content"])
+
 
 class Version(Base, UUIDMixin, TimestampMixin):
     """代码片段版本模型"""
 
     __tablename__ = "versions"
+    __table_args__ = (
+        *(
+            Index(f"ix_versions_{column}", column, "snippet_id")
+            for column in PROMOTED_METADATA_KEYS.values()
+        ),
+        Index("ix_versions_pack_id", "pack_id"),
+    )
 
     snippet_id: Mapped[UUID] = mapped_column(
         ForeignKey("snippets.id", ondelete="CASCADE"),
@@ -21,7 +74,17 @@ class Version(Base, UUIDMixin, TimestampMixin):
         index=True,
     )
     content: Mapped[str] = mapped_column(Text, nullable=False)
+    # SHA-256 of ``content``; NULL only on rows awaiting the
+    # ``versions.content_hash`` backfill.
+    content_hash: Mapped[str | None] = mapped_column(
+        String(64), nullable=True, default=_default_content_hash
+    )
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Archived versions keep an empty ``content`` column and point at their
+    # record in a pack file; ``apps.services.archive`` reads it back.
+    pack_id: Mapped[UUID | None] = mapped_column(nullable=True)
+    pack_offset: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    pack_length: Mapped[int | None] = mapped_column(Integer, nullable=True)
     version_number: Mapped[int] = mapped_column(Integer, nullable=False)
     parent_version_id: Mapped[UUID | None] = mapped_column(
         ForeignKey("versions.id", ondelete="SET NULL"),
@@ -30,6 +93,15 @@ class Version(Base, UUIDMixin, TimestampMixin):
     )
     version_metadata: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
 
+    # 提升的元数据列（只读）
+    meta_session_id: Mapped[str | None] = promoted_metadata_column(
+        "session_id", String(64)
+    )
+    meta_autosave: Mapped[bool | None] = promoted_metadata_column("autosave", Boolean())
+    meta_tests_passed: Mapped[bool | None] = promoted_metadata_column(
+        "tests_passed", Boolean()
+    )
+
     # 关联关系
     snippet: Mapped["Snippet"] = relationship(
         "Snippet",
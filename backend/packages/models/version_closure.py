@@ -0,0 +1,134 @@
+"""Closure table for the version graph."""
+
+from typing import Any, cast
+from uuid import UUID
+
+from sqlalchemy import (
+    ForeignKey,
+    Index,
+    Integer,
+    Table,
+    and_,
+    delete,
+    event,
+    insert,
+    inspect,
+    select,
+    true,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Mapped, Mapper, aliased, mapped_column
+
+from .base import Base
+from .version import Version
+
+
+class VersionClosure(Base):
+    """版本祖先-后代闭包表
+
+    Every version has a ``depth == 0`` row pointing at itself plus one row per
+    ancestor, so lineage questions are answered by a single indexed lookup
+    instead of walking ``parent_version`` one round trip at a time.
+    """
+
+    __tablename__ = "version_closure"
+    __table_args__ = (
+        Index("ix_version_closure_descendant_depth", "descendant_id", "depth"),
+    )
+
+    ancestor_id: Mapped[UUID] = mapped_column(
+        ForeignKey("versions.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    descendant_id: Mapped[UUID] = mapped_column(
+        ForeignKey("versions.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"<VersionClosure(ancestor_id='{self.ancestor_id}', "
+            f"descendant_id='{self.descendant_id}', depth={self.depth})>"
+        )
+
+
+_closure = cast(Table, VersionClosure.__table__)
+
+
+def _attach(connection: Connection, node_id: UUID, parent_id: UUID | None) -> None:
+    """Link the subtree rooted at ``node_id`` under ``parent_id``."""
+    if parent_id is None:
+        return
+    sup = aliased(VersionClosure, name="sup")
+    sub = aliased(VersionClosure, name="sub")
+    connection.execute(
+        insert(_closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(sup.ancestor_id, sub.descendant_id, sup.depth + sub.depth + 1)
+            .join(sub, true())
+            .where(sup.descendant_id == parent_id)
+            .where(sub.ancestor_id == node_id),
+        )
+    )
+
+
+def _detach(connection: Connection, node_id: UUID) -> None:
+    """Cut every link between the subtree at ``node_id`` and its ancestors."""
+    subtree = select(_closure.c.descendant_id).where(_closure.c.ancestor_id == node_id)
+    ancestors = select(_closure.c.ancestor_id).where(
+        and_(_closure.c.descendant_id == node_id, _closure.c.depth > 0)
+    )
+    connection.execute(
+        delete(_closure).where(
+            _closure.c.descendant_id.in_(subtree),
+            _closure.c.ancestor_id.in_(ancestors),
+        )
+    )
+
+
+@event.listens_for(Version, "after_insert")
+def _on_version_insert(
+    _mapper: Mapper[Any], connection: Connection, target: Version
+) -> None:
+    connection.execute(
+        insert(_closure).values(ancestor_id=target.id, descendant_id=target.id, depth=0)
+    )
+    _attach(connection, target.id, target.parent_version_id)
+
+
+@event.listens_for(Version, "after_update")
+def _on_version_update(
+    _mapper: Mapper[Any], connection: Connection, target: Version
+) -> None:
+    if not inspect(target).attrs.parent_version_id.history.has_changes():
+        return
+    new_parent = target.parent_version_id
+    if new_parent is not None:
+        cycle = connection.execute(
+            select(_closure.c.depth).where(
+                _closure.c.ancestor_id == target.id,
+                _closure.c.descendant_id == new_parent,
+            )
+        ).first()
+        if cycle is not None:
+            raise ValueError(
+                f"Version {new_parent} is a descendant of {target.id}; "
+                "re-parenting would create a cycle"
+            )
+    _detach(connection, target.id)
+    _attach(connection, target.id, new_parent)
+
+
+@event.listens_for(Version, "before_delete")
+def _on_version_delete(
+    _mapper: Mapper[Any], connection: Connection, target: Version
+) -> None:
+    # Mirror ``ondelete="SET NULL"`` on parent_version_id: children become roots.
+    _detach(connection, target.id)
+    connection.execute(
+        delete(_closure).where(
+            (_closure.c.ancestor_id == target.id)
+            | (_closure.c.descendant_id == target.id)
+        )
+    )
@@ -0,0 +1,244 @@
+"""Statistical sampling profiler.
+
+A :class:`Sampler` wakes up on its own thread every few milliseconds, takes
+the current frame of every other thread with ``sys._current_frames()`` and
+counts each stack once. It sees wall-clock time, so threads blocked on I/O
+or a lock show up where they wait. Stacks are kept in the collapsed format
+that flamegraph tools read: one line per distinct stack, thread first and
+frames from the outermost in, separated by semicolons.
+
+Taking samples holds the GIL, so its cost is kept bounded. The interval
+stretches when a round is slow, keeping the share of time spent sampling
+under ``max_overhead``; stacks are cut to their innermost ``max_depth``
+frames; and once ``max_stacks`` distinct stacks are stored, new ones are
+counted per thread only.
+
+Threads running an event loop spend their idle time in the selector and
+the rest in whichever callback happens to run, which says little about
+what coroutines are waiting on. :func:`awaiting_tasks` complements the
+samples with the await chain of every suspended task.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Coroutine, Iterable
+from dataclasses import dataclass, field
+from types import CodeType, FrameType
+from typing import Any
+
+_TRUNCATED = "[truncated]"
+
+
+@dataclass
+class Profile:
+    """Samples of all threads over one profiling run."""
+
+    seconds: float
+    rounds: int
+    overhead_seconds: float
+    stacks: Counter[tuple[str, ...]] = field(default_factory=Counter)
+    threads: set[str] = field(default_factory=set)
+    truncated: bool = False
+
+    @property
+    def overhead(self) -> float:
+        """Share of the run spent taking samples."""
+        return self.overhead_seconds / self.seconds if self.seconds else 0.0
+
+    def collapsed(self) -> list[str]:
+        """Collapsed stacks, most sampled first: ``thread;outer;...;leaf count``."""
+        return [
+            f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()
+        ]
+
+    def top_frames(self, limit: int) -> list[tuple[str, int, int]]:
+        """The frames seen running most often.
+
+        Returns:
+            list[tuple[str, int, int]]: ``(frame, self, total)`` per frame,
+            where ``self`` counts samples with the frame innermost and
+            ``total`` samples with the frame anywhere on the stack.
+        """
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack[1:]
+            if not frames or frames[-1] == _TRUNCATED:
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        return [(frame, count, total[frame]) for frame, count in own.most_common(limit)]
+
+
+class Sampler:
+    """Samples the stacks of all other threads at a bounded cost.
+
+    Args:
+        interval: Seconds between samples.
+        max_overhead: Largest share of wall time spent sampling; the
+            interval grows when taking a sample gets expensive.
+        max_depth: Innermost frames kept per stack.
+        max_stacks: Distinct stacks kept; the rest are counted per thread
+            under ``[truncated]``.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.01,
+        max_overhead: float = 0.05,
+        max_depth: int = 64,
+        max_stacks: int = 5000,
+    ) -> None:
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self._labels: dict[tuple[CodeType, int], str] = {}
+        self._paths: dict[str, str] = {}
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        """End a running :meth:`run` early."""
+        self._stopped.set()
+
+    def run(self, seconds: float) -> Profile:
+        """Sample for ``seconds`` on the calling thread, which is left out."""
+        own = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + seconds
+        profile = Profile(seconds=0.0, rounds=0, overhead_seconds=0.0)
+        while True:
+            before = time.perf_counter()
+            if before >= deadline:
+                break
+            self._sample(profile, own)
+            cost = time.perf_counter() - before
+            profile.rounds += 1
+            profile.overhead_seconds += cost
+            pause = max(self.interval - cost, cost / self.max_overhead - cost)
+            if self._stopped.wait(min(pause, max(deadline - before - cost, 0.0))):
+                break
+        profile.seconds = time.perf_counter() - started
+        return profile
+
+    def _sample(self, profile: Profile, own: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            thread = names.get(ident, f"thread-{ident}")
+            profile.threads.add(thread)
+            stack = self._stack(frame)
+            key = (thread, *stack)
+            if key not in profile.stacks and len(profile.stacks) >= self.max_stacks:
+                profile.truncated = True
+                key = (thread, _TRUNCATED)
+            profile.stacks[key] += 1
+
+    def _stack(self, frame: FrameType | None) -> list[str]:
+        frames: list[str] = []
+        while frame is not None:
+            if len(frames) == self.max_depth:
+                frames.append(_TRUNCATED)
+                break
+            frames.append(self._label(frame.f_code, frame.f_lineno))
+            frame = frame.f_back
+        frames.reverse()
+        return frames
+
+    def _label(self, code: CodeType, line: int) -> str:
+        key = (code, line)
+        label = self._labels.get(key)
+        if label is None:
+            label = _label(code, line, self._paths)
+            self._labels[key] = label
+        return label
+
+
+def _short_path(filename: str, cache: dict[str, str]) -> str:
+    short = cache.get(filename)
+    if short is None:
+        short = filename
+        for entry in sorted(filter(None, sys.path), key=len, reverse=True):
+            if filename.startswith(entry.rstrip("/") + "/"):
+                short = filename[len(entry.rstrip("/")) + 1 :]
+                break
+        cache[filename] = short
+    return short
+
+
+def _label(code: CodeType, line: int | None, paths: dict[str, str]) -> str:
+    # Semicolons separate frames and the last space the count. Qualified
+    # names need Python 3.11; older versions show the bare function name.
+    name = getattr(code, "co_qualname", code.co_name).replace(";", ":")
+    path = _short_path(code.co_filename, paths).replace(";", ":").replace(" ", "_")
+    return f"{name} ({path}:{line})"
+
+
+@dataclass
+class AwaitingTask:
+    """A suspended asyncio task and what it waits on."""
+
+    name: str
+    coroutine: str
+    awaiting: list[str]
+
+
+def _await_chain(coro: Any, limit: int, paths: dict[str, str]) -> list[str]:
+    chain: list[str] = []
+    awaitable = coro
+    while awaitable is not None and len(chain) < limit:
+        frame = next(
+            (
+                getattr(awaitable, attr)
+                for attr in ("cr_frame", "gi_frame", "ag_frame")
+                if getattr(awaitable, attr, None) is not None
+            ),
+            None,
+        )
+        if frame is None:
+            # A future or another awaitable that is not a coroutine.
+            chain.append(f"<{type(awaitable).__name__}>")
+            break
+        chain.append(_label(frame.f_code, frame.f_lineno, paths))
+        awaitable = next(
+            (
+                getattr(awaitable, attr)
+                for attr in ("cr_await", "gi_yieldfrom", "ag_await")
+                if getattr(awaitable, attr, None) is not None
+            ),
+            None,
+        )
+    return chain
+
+
+def awaiting_tasks(
+    *, limit: int = 64, exclude: Iterable[asyncio.Task[Any]] = ()
+) -> list[AwaitingTask]:
+    """Describe the suspended tasks of the running event loop.
+
+    Each task's await chain is followed from its coroutine inward, for at
+    most ``limit`` steps, down to the future it is blocked on. Call it from
+    the loop's own thread.
+    """
+    skipped = {asyncio.current_task(), *exclude}
+    paths: dict[str, str] = {}
+    tasks = []
+    for task in asyncio.all_tasks():
+        if task in skipped or task.done():
+            continue
+        coro: Coroutine[Any, Any, Any] = task.get_coro()  # type: ignore[assignment]
+        tasks.append(
+            AwaitingTask(
+                name=task.get_name(),
+                coroutine=getattr(coro, "__qualname__", type(coro).__name__),
+                awaiting=_await_chain(coro, limit, paths),
+            )
+        )
+    tasks.sort(key=lambda task: task.name)
+    return tasks
@@ -0,0 +1,81 @@
+"""Per-request phase timings.
+
+A :class:`Timings` collects the seconds a request spends in named phases.
+The request's timings live in a context variable, so code anywhere below
+the web layer, including sync endpoints running in the thread pool (which
+copies the context), records into them with :func:`record` without being
+handed anything. Outside a timed request recording does nothing, so hooks
+can stay installed permanently.
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+
+_current: ContextVar["Timings | None"] = ContextVar("timings", default=None)
+
+
+class Timings:
+    """Accumulated durations of one request's phases, in seconds."""
+
+    def __init__(self) -> None:
+        self.durations: dict[str, float] = {}
+        self.started = time.perf_counter()
+
+    def add(self, name: str, seconds: float) -> None:
+        """Add time to a phase."""
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def get(self, name: str) -> float:
+        """Time spent in a phase so far."""
+        return self.durations.get(name, 0.0)
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Add the time spent inside the block to a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def elapsed(self) -> float:
+        """Seconds since the timings were started."""
+        return time.perf_counter() - self.started
+
+
+def current() -> Timings | None:
+    """Return the timings of the request being handled, if it is timed."""
+    return _current.get()
+
+
+def record(name: str, seconds: float) -> None:
+    """Add time to a phase of the current request, if it is timed."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def start() -> tuple[Timings, Token["Timings | None"]]:
+    """Start timing the request handled in this context."""
+    timings = Timings()
+    return timings, _current.set(timings)
+
+
+def stop(token: Token["Timings | None"]) -> None:
+    """Stop timing; pass the token returned by :func:`start`."""
+    _current.reset(token)
+
+
+def format_server_timing(
+    metrics: dict[str, float], descriptions: dict[str, str]
+) -> str:
+    """Format durations in seconds as a ``Server-Timing`` header value."""
+    parts = []
+    for name, seconds in metrics.items():
+        part = f"{name};dur={seconds * 1000:.1f}"
+        if name in descriptions:
+            part += f';desc="{descriptions[name]}"'
+        parts.append(part)
+    return ", ".join(parts)
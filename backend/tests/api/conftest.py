@@ -1,14 +1,19 @@
 """API testing configuration and fixtures."""
 
-from collections.abc import AsyncGenerator, Callable
+from collections.abc import AsyncGenerator, Callable, Generator
 from typing import Any
 
 import pytest
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
+from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
+from apps.db.session import get_db, get_session_factory
 from apps.main import app
+from packages.models import Base
 
 
 @pytest.fixture
@@ -24,6 +29,36 @@ async def async_client() -> AsyncGenerator[AsyncClient, None]:
         yield client
 
 
+@pytest.fixture
+def sync_db() -> Generator[Session, None, None]:
+    """Serve ``get_db`` from a fresh in-memory database for one test."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session_local = sessionmaker(bind=engine, autoflush=False)
+
+    def _get_db() -> Generator[Session, None, None]:
+        db = session_local()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_session_factory] = lambda: session_local
+    session = session_local()
+    try:
+        yield session
+    finally:
+        session.close()
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_session_factory, None)
+        engine.dispose()
+
+
 @pytest.fixture
 def api_url() -> Callable[[str], str]:
     """Create a function to generate API URLs."""
@@ -0,0 +1,71 @@
+"""Admin API tests."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from apps.core.config import settings
+from apps.services import profiling
+from tests.constants import (
+    HTTP_200_OK,
+    HTTP_403_FORBIDDEN,
+    HTTP_404_NOT_FOUND,
+    HTTP_409_CONFLICT,
+)
+
+ADMIN = {"Authorization": "Bearer admin-secret"}
+
+
+@pytest.fixture
+def profiler(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Enable the profiler and the admin token."""
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(settings, "PROFILER_ENABLED", True)
+
+
+def test_profile(client: TestClient, profiler: None) -> None:
+    """A profile lists stacks, top frames and waiting tasks."""
+    response = client.post(
+        "/api/v1/admin/profile", params={"seconds": 0.2}, headers=ADMIN
+    )
+    assert response.status_code == HTTP_200_OK
+    body = response.json()
+    assert body["samples"] > 0
+    assert body["stacks"]
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in body["stacks"])
+    assert {"frame", "selfSamples", "totalSamples"} <= set(body["topFrames"][0])
+    assert isinstance(body["tasks"], list)
+
+
+def test_profile_requires_admin(client: TestClient, profiler: None) -> None:
+    """Without the admin token the profiler is out of reach."""
+    response = client.post("/api/v1/admin/profile", params={"seconds": 0.1})
+    assert response.status_code == HTTP_403_FORBIDDEN
+    response = client.post(
+        "/api/v1/admin/profile",
+        params={"seconds": 0.1},
+        headers={"Authorization": "Bearer wrong"},
+    )
+    assert response.status_code == HTTP_403_FORBIDDEN
+    assert response.json()["error_code"] == "FORBIDDEN"
+
+
+def test_profile_disabled(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The profiler answers 404 unless enabled."""
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin-secret")
+    response = client.post(
+        "/api/v1/admin/profile", params={"seconds": 0.1}, headers=ADMIN
+    )
+    assert response.status_code == HTTP_404_NOT_FOUND
+
+
+def test_profile_one_at_a_time(client: TestClient, profiler: None) -> None:
+    """A second run is refused while one is in progress."""
+    assert profiling._running.acquire(blocking=False)
+    try:
+        response = client.post(
+            "/api/v1/admin/profile", params={"seconds": 0.1}, headers=ADMIN
+        )
+    finally:
+        profiling._running.release()
+    assert response.status_code == HTTP_409_CONFLICT
+    assert response.json()["error_code"] == "PROFILER_BUSY"
@@ -0,0 +1,40 @@
+"""Change feed API tests."""
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from packages.models import Snippet
+from tests.constants import HTTP_200_OK
+
+SNIPPETS = 3
+
+
+def test_read_changes_pages_through_the_feed(
+    client: TestClient, sync_db: Session
+) -> None:
+    """Clients follow nextSince until hasMore is false."""
+    snippets = [
+        Snippet(title=str(i), content=str(i), language="python")
+        for i in range(SNIPPETS)
+    ]
+    for snippet in snippets:
+        sync_db.add(snippet)
+        sync_db.commit()
+
+    seen = []
+    since = 0
+    while True:
+        response = client.get("/api/v1/changes", params={"since": since, "limit": 2})
+        assert response.status_code == HTTP_200_OK
+        page = response.json()
+        seen += page["data"]
+        since = page["nextSince"]
+        if not page["hasMore"]:
+            break
+
+    assert [entry["seq"] for entry in seen] == [1, 2, 3]
+    assert [entry["entityId"] for entry in seen] == [str(s.id) for s in snippets]
+    assert {entry["op"] for entry in seen} == {"insert"}
+    assert since == SNIPPETS
+    empty = client.get("/api/v1/changes", params={"since": since}).json()
+    assert empty == {"data": [], "nextSince": since, "hasMore": False}
@@ -0,0 +1,66 @@
+"""Collaborative editing API tests."""
+
+from uuid import UUID
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.websockets import WebSocketDisconnect
+
+from apps.core.config import settings
+from apps.main import app
+from apps.services.collab import CLOSE_INVALID, CLOSE_NOT_FOUND, collab_sessions
+from packages.models import Snippet
+
+
+@pytest.fixture
+def collab_db(sync_db: Session, monkeypatch: pytest.MonkeyPatch) -> Session:
+    """Point the collaboration sessions at the test database."""
+    monkeypatch.setattr(settings, "JOBS_ENABLED", False)
+    monkeypatch.setattr(
+        collab_sessions, "session_factory", sessionmaker(bind=sync_db.get_bind())
+    )
+    return sync_db
+
+
+def test_collaborate(collab_db: Session) -> None:
+    """Edits of one client reach the other and are saved."""
+    snippet = Snippet(title="t", content="hello", language="python")
+    collab_db.add(snippet)
+    collab_db.commit()
+    url = f"/api/v1/code-snippets/{snippet.id}/collab"
+
+    # The application's lifespan saves open sessions when it shuts down.
+    with TestClient(app) as client:
+        with client.websocket_connect(url) as first:
+            (init,) = first.receive_json()
+            assert init["type"] == "init"
+            assert (init["revision"], init["content"]) == (0, "hello")
+            with client.websocket_connect(url) as second:
+                second.receive_json()
+                first.send_json({"type": "op", "revision": 0, "op": [5, "!"]})
+                assert first.receive_json() == [{"type": "ack", "revision": 1}]
+                assert second.receive_json() == [
+                    {
+                        "type": "op",
+                        "revision": 1,
+                        "op": [5, "!"],
+                        "clientId": init["clientId"],
+                    }
+                ]
+                second.send_text("not json")
+                with pytest.raises(WebSocketDisconnect) as exc_info:
+                    second.receive_json()
+                assert exc_info.value.code == CLOSE_INVALID
+
+    collab_db.expire_all()
+    assert collab_db.get(Snippet, snippet.id).content == "hello!"
+
+
+def test_collaborate_unknown_snippet(collab_db: Session) -> None:
+    """Unknown snippets close the socket with 4404."""
+    url = f"/api/v1/code-snippets/{UUID(int=1)}/collab"
+    with TestClient(app) as client, client.websocket_connect(url) as websocket:
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            websocket.receive_json()
+    assert exc_info.value.code == CLOSE_NOT_FOUND
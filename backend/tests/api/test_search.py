@@ -0,0 +1,36 @@
+"""Code search API tests."""
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from packages.models import Snippet
+from tests.constants import HTTP_200_OK, HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_search_code(client: TestClient, sync_db: Session) -> None:
+    """Hits come back with the first matching line."""
+    sync_db.add_all(
+        [
+            Snippet(
+                title="Loop",
+                content="for x in xs:\n    out.append(x)",
+                language="python",
+            ),
+            Snippet(title="Other", content="print('hi')", language="python"),
+        ]
+    )
+    sync_db.commit()
+
+    response = client.get("/api/v1/search/code", params={"q": "out.append("})
+    assert response.status_code == HTTP_200_OK
+    body = response.json()
+    assert body["candidates"] == 1
+    assert body["timedOut"] is False
+    assert [(hit["title"], hit["line"]) for hit in body["data"]] == [("Loop", 2)]
+
+
+def test_search_invalid_regex(client: TestClient, sync_db: Session) -> None:
+    """Invalid patterns are rejected with a domain error code."""
+    response = client.get("/api/v1/search/code", params={"q": "foo(", "regex": True})
+    assert response.status_code == HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["error_code"] == "INVALID_SEARCH_PATTERN"
@@ -0,0 +1,414 @@
+"""Code snippet API tests."""
+
+import asyncio
+from collections.abc import Iterator
+from unittest.mock import patch
+from uuid import UUID
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from apps.api import snippets as snippets_api
+from apps.core.config import Settings
+from apps.core.timing import ServerTimingMiddleware
+from apps.main import app
+from apps.services import hot_lists
+from apps.services.read_cache import read_cache
+from packages.common.hashing import content_hash
+from packages.models import Snippet, SnippetTag, Tag, Version
+from tests.constants import (
+    HTTP_200_OK,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_404_NOT_FOUND,
+    HTTP_409_CONFLICT,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
+
+CONCURRENT_REQUESTS = 20
+
+
+@pytest.fixture(autouse=True)
+def _clear_read_cache() -> Iterator[None]:
+    read_cache.clear()
+    yield
+    read_cache.clear()
+
+
+@pytest.fixture
+def snippet(sync_db: Session) -> Snippet:
+    """Create a snippet with tags and two versions."""
+    snippet = Snippet(
+        title="Example Snippet",
+        description="A simple hello world example",
+        content="print('Hello, World!')",
+        language="python",
+    )
+    sync_db.add(snippet)
+    sync_db.add_all(
+        [
+            SnippetTag(snippet=snippet, tag=Tag(name="example")),
+            Version(snippet=snippet, content="print(1)", version_number=1),
+            Version(snippet=snippet, content="print(2)", version_number=2),
+        ]
+    )
+    sync_db.commit()
+    return snippet
+
+
+def test_get_snippet(client: TestClient, snippet: Snippet) -> None:
+    """The documented camelCase detail payload is returned."""
+    response = client.get(f"/api/v1/code-snippets/{snippet.id}")
+    assert response.status_code == HTTP_200_OK
+    data = response.json()["data"]
+    assert data["id"] == str(snippet.id)
+    assert data["content"] == "print('Hello, World!')"
+    assert data["tags"] == ["example"]
+    assert data["currentVersion"]["number"] == 2  # noqa: PLR2004
+    assert "createdAt" in data
+    assert "updatedAt" in data
+    highlight = data["highlight"]
+    assert highlight["tokenizer"]
+    assert highlight["legend"][highlight["lines"][0][2]] == "nb"
+
+
+def test_get_missing_snippet(client: TestClient, sync_db: Session) -> None:
+    """Unknown and soft-deleted snippets are not found."""
+    deleted = Snippet(title="Gone", content="x", language="python")
+    deleted.soft_delete()
+    sync_db.add(deleted)
+    sync_db.commit()
+
+    for snippet_id in (deleted.id, "00000000-0000-0000-0000-000000000000"):
+        response = client.get(f"/api/v1/code-snippets/{snippet_id}")
+        assert response.status_code == HTTP_404_NOT_FOUND
+        assert response.json()["error_code"] == "SNIPPET_NOT_FOUND"
+
+
+def test_get_snippet_is_cached(client: TestClient, snippet: Snippet) -> None:
+    """Repeated reads are served from the read cache."""
+    with patch.object(
+        snippets_api,
+        "load_snippet_detail",
+        wraps=snippets_api.load_snippet_detail,
+    ) as load:
+        for _ in range(3):
+            assert client.get(f"/api/v1/code-snippets/{snippet.id}").status_code == (
+                HTTP_200_OK
+            )
+    assert load.call_count == 1
+
+
+async def test_concurrent_misses_are_coalesced(snippet: Snippet) -> None:
+    """A burst of identical cold reads triggers one load."""
+    load = snippets_api.load_snippet_detail
+    calls = 0
+
+    def slow_load(*args: object) -> object:
+        nonlocal calls
+        calls += 1
+        return load(*args)
+
+    transport = httpx.ASGITransport(app=app)
+    with patch.object(snippets_api, "load_snippet_detail", slow_load):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            responses = await asyncio.gather(
+                *(
+                    client.get(f"/api/v1/code-snippets/{snippet.id}")
+                    for _ in range(CONCURRENT_REQUESTS)
+                )
+            )
+    assert {response.status_code for response in responses} == {HTTP_200_OK}
+    assert calls == 1
+
+
+def test_similar_snippets(client: TestClient, sync_db: Session) -> None:
+    """Near-duplicates are listed with their estimated similarity."""
+    body = "\n".join(f"def f{i}(x):\n    return x * {i} + len(x)" for i in range(20))
+    original = Snippet(title="Original", content=body, language="python")
+    copy = Snippet(title="Copy", content=body.replace("* 3", "* 4"), language="python")
+    sync_db.add_all([original, copy, Snippet(title="Other", content="", language="c")])
+    sync_db.commit()
+
+    response = client.get(f"/api/v1/code-snippets/{original.id}/similar")
+    assert response.status_code == HTTP_200_OK
+    data = response.json()["data"]
+    assert [item["title"] for item in data] == ["Copy"]
+    assert data[0]["id"] == str(copy.id)
+    assert 0.8 < data[0]["similarity"] < 1  # noqa: PLR2004
+
+
+def test_similar_snippets_not_found(client: TestClient, sync_db: Session) -> None:
+    """Unknown snippets return 404."""
+    response = client.get(
+        "/api/v1/code-snippets/00000000-0000-0000-0000-000000000000/similar"
+    )
+    assert response.status_code == HTTP_404_NOT_FOUND
+
+
+def test_replace_tags(client: TestClient, snippet: Snippet) -> None:
+    """Tag sets are replaced and the cached detail is refreshed."""
+    assert client.get(f"/api/v1/code-snippets/{snippet.id}").json()["data"]["tags"] == [
+        "example"
+    ]
+
+    response = client.put(
+        f"/api/v1/code-snippets/{snippet.id}/tags",
+        json={"tags": ["python", " basics ", "python"]},
+    )
+    assert response.status_code == HTTP_200_OK
+    assert response.json()["data"] == [
+        {"snippetId": str(snippet.id), "tags": ["python", "basics"]}
+    ]
+    detail = client.get(f"/api/v1/code-snippets/{snippet.id}").json()["data"]
+    assert sorted(detail["tags"]) == ["basics", "python"]
+
+
+def test_replace_tags_bulk(
+    client: TestClient, sync_db: Session, snippet: Snippet
+) -> None:
+    """Many snippets are retagged in one request; unknown ids fail it."""
+    other = Snippet(title="Other", content="x", language="python")
+    sync_db.add(other)
+    sync_db.commit()
+
+    response = client.put(
+        "/api/v1/code-snippets/tags",
+        json={
+            "assignments": [
+                {"snippetId": str(snippet.id), "tags": ["a"]},
+                {"snippetId": str(other.id), "tags": ["a", "b"]},
+            ]
+        },
+    )
+    assert response.status_code == HTTP_200_OK
+    assert [item["tags"] for item in response.json()["data"]] == [["a"], ["a", "b"]]
+
+    response = client.put(
+        "/api/v1/code-snippets/tags",
+        json={
+            "assignments": [
+                {"snippetId": "00000000-0000-0000-0000-000000000000", "tags": []}
+            ]
+        },
+    )
+    assert response.status_code == HTTP_404_NOT_FOUND
+
+
+def test_hot_lists(client: TestClient, sync_db: Session, snippet: Snippet) -> None:
+    """Recent and trending lists come back newest or most active first."""
+    hot_lists._memory.clear()
+    other = Snippet(title="Other", content="x", language="go")
+    sync_db.add(other)
+    sync_db.commit()
+
+    response = client.get("/api/v1/code-snippets/recent")
+    assert response.status_code == HTTP_200_OK
+    data = response.json()["data"]
+    assert [item["id"] for item in data] == [str(other.id), str(snippet.id)]
+    assert data[1]["tags"] == ["example"]
+
+    snippet.content = "print('edited')"
+    sync_db.commit()
+    response = client.get("/api/v1/code-snippets/trending", params={"limit": 1})
+    assert [item["id"] for item in response.json()["data"]] == [str(snippet.id)]
+
+    response = client.get("/api/v1/code-snippets/recent", params={"language": "go"})
+    assert [item["title"] for item in response.json()["data"]] == ["Other"]
+    hot_lists._memory.clear()
+
+
+def test_batch_read(client: TestClient, sync_db: Session, snippet: Snippet) -> None:
+    """Batch reads answer every id in order and share the read cache."""
+    other = Snippet(title="Other", content="x = 1", language="python")
+    sync_db.add(other)
+    sync_db.commit()
+    missing = "00000000-0000-0000-0000-000000000000"
+    ids = [str(snippet.id), missing, str(other.id), str(snippet.id)]
+
+    with patch.object(
+        snippets_api,
+        "load_snippet_details",
+        wraps=snippets_api.load_snippet_details,
+    ) as load:
+        response = client.post("/api/v1/code-snippets/batch", json={"ids": ids})
+        assert response.status_code == HTTP_200_OK
+        data = response.json()["data"]
+        assert [(item["id"], item["status"]) for item in data] == [
+            (str(snippet.id), "ok"),
+            (missing, "not_found"),
+            (str(other.id), "ok"),
+        ]
+        assert data[0]["data"]["tags"] == ["example"]
+        assert data[0]["data"]["currentVersion"]["number"] == 2  # noqa: PLR2004
+        assert data[1]["data"] is None
+        assert data[2]["data"]["currentVersion"] is None
+        assert load.call_args.args[1] == [snippet.id, UUID(missing), other.id]
+
+        # Only the id that was not found is loaded again.
+        client.post("/api/v1/code-snippets/batch", json={"ids": ids})
+        assert load.call_args.args[1] == [UUID(missing)]
+
+    with patch.object(snippets_api, "load_snippet_detail") as load_one:
+        response = client.get(f"/api/v1/code-snippets/{other.id}")
+    assert response.json()["data"] == data[2]["data"]
+    load_one.assert_not_called()
+
+
+def test_list_fields(client: TestClient, sync_db: Session, snippet: Snippet) -> None:
+    """Lists return and read only the selected fields."""
+    hot_lists._memory.clear()
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = sync_db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/api/v1/code-snippets/recent")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    (item,) = response.json()["data"]
+    assert set(item) == {"id", "title", "language", "tags", "createdAt"}
+    loads = [statement for statement in statements if "FROM snippets" in statement]
+    assert loads
+    assert not any("snippets.content" in statement for statement in loads)
+
+    response = client.get(
+        "/api/v1/code-snippets/trending", params={"fields": "content,updatedAt"}
+    )
+    (item,) = response.json()["data"]
+    assert item == {
+        "id": str(snippet.id),
+        "content": snippet.content,
+        "updatedAt": item["updatedAt"],
+    }
+
+    response = client.get("/api/v1/code-snippets/recent", params={"fields": "owner"})
+    assert response.status_code == HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["error_code"] == "INVALID_FIELDS"
+    hot_lists._memory.clear()
+
+
+def test_autosave_and_save(client: TestClient, snippet: Snippet) -> None:
+    """Autosaves coalesce into a draft until the session saves it."""
+    url = f"/api/v1/code-snippets/{snippet.id}"
+    assert client.get(url).json()["data"]["content"] == snippet.content
+    for i in range(3):
+        response = client.put(
+            f"{url}/draft", json={"sessionId": "s-1", "content": f"print({i})"}
+        )
+        assert response.status_code == HTTP_200_OK
+        assert response.json() == {"editCount": i + 1, "version": None}
+
+    draft = client.get(f"{url}/draft", params={"sessionId": "s-1"}).json()
+    assert (draft["content"], draft["editCount"]) == ("print(2)", 3)
+
+    response = client.post(f"{url}/draft/save", json={"sessionId": "s-1"})
+    assert response.status_code == HTTP_200_OK
+    assert response.json()["version"]["number"] == 3  # noqa: PLR2004
+    detail = client.get(url).json()["data"]
+    assert (detail["content"], detail["currentVersion"]["number"]) == ("print(2)", 3)
+
+    response = client.get(f"{url}/draft", params={"sessionId": "s-1"})
+    assert response.status_code == HTTP_404_NOT_FOUND
+    assert response.json()["error_code"] == "DRAFT_NOT_FOUND"
+
+
+def test_patch_content(client: TestClient, snippet: Snippet) -> None:
+    """Patches apply against the current hash and conflict otherwise."""
+    url = f"/api/v1/code-snippets/{snippet.id}/content"
+    base_hash = content_hash(snippet.content)
+    response = client.patch(
+        url,
+        json={
+            "baseHash": base_hash,
+            "edits": [{"at": 7, "delete": 5, "insert": "Patch"}],
+        },
+    )
+    assert response.status_code == HTTP_200_OK
+    body = response.json()
+    assert body["version"]["number"] == 3  # noqa: PLR2004
+    assert body["contentHash"] == content_hash("print('Patch, World!')")
+
+    # The old base is stale now.
+    response = client.patch(url, json={"baseHash": base_hash, "edits": []})
+    assert response.status_code == HTTP_409_CONFLICT
+    assert response.json()["error_code"] == "VERSION_CONFLICT"
+
+    diff = (
+        "@@ -1 +1,2 @@\n"
+        "-print('Patch, World!')\n"
+        "\\ No newline at end of file\n"
+        "+print(1)\n"
+        "+print(2)\n"
+    )
+    response = client.patch(url, json={"baseHash": body["contentHash"], "diff": diff})
+    assert response.status_code == HTTP_200_OK
+    detail = client.get(f"/api/v1/code-snippets/{snippet.id}").json()["data"]
+    assert detail["content"] == "print(1)\nprint(2)\n"
+    assert detail["currentVersion"]["number"] == 4  # noqa: PLR2004
+
+    response = client.patch(
+        url, json={"baseHash": response.json()["contentHash"], "diff": "@@ -5 +5 @@\n"}
+    )
+    assert response.status_code == HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["error_code"] == "INVALID_PATCH"
+
+
+def test_server_timing_on_request(snippet: Snippet) -> None:
+    """The debug header asks for a breakdown of where the time went."""
+    config = Settings(SERVER_TIMING_ENABLED=True, SERVER_TIMING_HEADER="X-Debug-Timing")
+    client = TestClient(ServerTimingMiddleware(app, config))
+    plain = client.get(f"/api/v1/code-snippets/{snippet.id}")
+    assert "server-timing" not in plain.headers
+
+    response = client.get(
+        f"/api/v1/code-snippets/{snippet.id}", headers={"X-Debug-Timing": "1"}
+    )
+    assert response.status_code == HTTP_200_OK
+    names = [
+        part.split(";")[0] for part in response.headers["server-timing"].split(", ")
+    ]
+    assert names == ["queue", "db", "orm", "app", "serialize", "total"]
+
+
+def test_raw_snippet(client: TestClient, snippet: Snippet) -> None:
+    """The current content downloads as text and is revalidated by ETag."""
+    url = f"/api/v1/code-snippets/{snippet.id}/raw"
+    response = client.get(url)
+    assert response.status_code == HTTP_200_OK
+    assert response.text == "print('Hello, World!')"
+    assert response.headers["cache-control"] == "no-cache"
+    etag = response.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == (
+        HTTP_304_NOT_MODIFIED
+    )
+
+    client.patch(
+        f"/api/v1/code-snippets/{snippet.id}/content",
+        json={
+            "baseHash": content_hash(snippet.content),
+            "edits": [{"at": 0, "delete": 5, "insert": "log"}],
+        },
+    )
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == HTTP_200_OK
+    assert response.text == "log('Hello, World!')"
+    assert response.headers["etag"] == f'"{content_hash(response.text)}"'
+
+
+def test_raw_missing_snippet(client: TestClient, sync_db: Session) -> None:
+    """Soft-deleted snippets have no raw content."""
+    deleted = Snippet(title="Gone", content="x", language="python")
+    deleted.soft_delete()
+    sync_db.add(deleted)
+    sync_db.commit()
+    response = client.get(f"/api/v1/code-snippets/{deleted.id}/raw")
+    assert response.status_code == HTTP_404_NOT_FOUND
+    assert response.json()["error_code"] == "SNIPPET_NOT_FOUND"
@@ -0,0 +1,117 @@
+"""Version API tests."""
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from apps.services import version_diff
+from packages.common.hashing import content_hash
+from packages.common.ids import uuid7
+from packages.models import Snippet, Version
+from tests.constants import (
+    HTTP_200_OK,
+    HTTP_206_PARTIAL_CONTENT,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_404_NOT_FOUND,
+    HTTP_416_RANGE_NOT_SATISFIABLE,
+)
+
+
+def _versions(db: Session, *contents: str) -> list[Version]:
+    snippet = Snippet(title="Diff", content=contents[-1], language="python")
+    versions = [
+        Version(snippet=snippet, content=content, version_number=number)
+        for number, content in enumerate(contents, 1)
+    ]
+    db.add_all(versions)
+    db.commit()
+    return versions
+
+
+def test_diff_hunks(client: TestClient, sync_db: Session) -> None:
+    """Structured hunks describe the change."""
+    base, target = _versions(sync_db, "a\nb\nc\n", "a\nB\nc\n")
+    response = client.get(
+        "/api/v1/versions/diff",
+        params={"base": str(base.id), "target": str(target.id)},
+    )
+    assert response.status_code == HTTP_200_OK
+    data = response.json()
+    assert data["format"] == "hunks"
+    assert data["exact"] is True
+    assert data["truncated"] is False
+    assert (data["added"], data["removed"]) == (1, 1)
+    assert data["unified"] is None
+    assert [line["op"] for line in data["hunks"][0]["lines"]] == [" ", "-", "+", " "]
+
+
+def test_diff_unified(client: TestClient, sync_db: Session) -> None:
+    """Unified output is plain diff text."""
+    base, target = _versions(sync_db, "a\n", "a\nb\n")
+    response = client.get(
+        "/api/v1/versions/diff",
+        params={"base": str(base.id), "target": str(target.id), "format": "unified"},
+    )
+    assert response.status_code == HTTP_200_OK
+    assert response.json()["unified"].endswith("@@ -1,1 +1,2 @@\n a\n+b\n")
+
+
+def test_diff_is_cached_by_content(client: TestClient, sync_db: Session) -> None:
+    """Versions with the same contents reuse the cached diff."""
+    version_diff._diff_cache.clear()
+    v1, v2, v3, v4 = _versions(sync_db, "x\n", "y\n", "x\n", "y\n")
+    for base, target in ((v1, v2), (v3, v4)):
+        response = client.get(
+            "/api/v1/versions/diff",
+            params={"base": str(base.id), "target": str(target.id)},
+        )
+        assert response.status_code == HTTP_200_OK
+    assert len(version_diff._diff_cache) == 1
+    assert version_diff._diff_cache.hits == 1
+
+
+def test_diff_unknown_version(client: TestClient, sync_db: Session) -> None:
+    """Missing versions report a 404 with an error code."""
+    (base,) = _versions(sync_db, "a\n")
+    response = client.get(
+        "/api/v1/versions/diff",
+        params={"base": str(base.id), "target": "00000000-0000-0000-0000-000000000000"},
+    )
+    assert response.status_code == HTTP_404_NOT_FOUND
+    assert response.json()["error_code"] == "VERSION_NOT_FOUND"
+
+
+def test_raw_version(client: TestClient, sync_db: Session) -> None:
+    """Raw content streams as text with an immutable, validated cache entry."""
+    (version,) = _versions(sync_db, "print('hello')\n" * 100)
+    url = f"/api/v1/versions/{version.id}/raw"
+    response = client.get(url)
+    assert response.status_code == HTTP_200_OK
+    assert response.text == version.content
+    assert response.headers["content-type"] == "text/plain; charset=utf-8"
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert response.headers["accept-ranges"] == "bytes"
+    etag = response.headers["etag"]
+    assert etag == f'"{content_hash(version.content)}"'
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+    response = client.get(url, headers={"Range": "bytes=6-12"})
+    assert response.status_code == HTTP_206_PARTIAL_CONTENT
+    assert response.text == "'hello'"
+    assert response.headers["content-range"] == "bytes 6-12/1500"
+
+    response = client.get(url, headers={"Range": "bytes=6-12", "If-Range": '"old"'})
+    assert response.status_code == HTTP_200_OK
+
+    response = client.get(url, headers={"Range": "bytes=5000-"})
+    assert response.status_code == HTTP_416_RANGE_NOT_SATISFIABLE
+    assert response.headers["content-range"] == "bytes */1500"
+
+
+def test_raw_version_not_found(client: TestClient, sync_db: Session) -> None:
+    """Unknown versions are reported with the usual error body."""
+    response = client.get(f"/api/v1/versions/{uuid7()}/raw")
+    assert response.status_code == HTTP_404_NOT_FOUND
+    assert response.json()["error_code"] == "VERSION_NOT_FOUND"
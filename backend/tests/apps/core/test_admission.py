@@ -0,0 +1,116 @@
+"""Tests for adaptive admission control."""
+
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from apps.core.admission import AdaptiveLimiter, AdmissionControlMiddleware
+from apps.core.config import Settings
+
+HTTP_200_OK = 200
+HTTP_503_SERVICE_UNAVAILABLE = 503
+
+
+def _limiter(**overrides: float) -> AdaptiveLimiter:
+    options: dict = {
+        "initial_limit": 2,
+        "min_limit": 1,
+        "max_limit": 4,
+        "target_latency": 0.1,
+        "queue_size": 1,
+        "queue_timeout": 0.05,
+    }
+    options.update(overrides)
+    return AdaptiveLimiter(**options)
+
+
+async def test_limiter_sheds_when_queue_full() -> None:
+    """Requests beyond limit plus queue are rejected immediately."""
+    limiter = _limiter()
+    assert await limiter.acquire()
+    assert await limiter.acquire()
+
+    queued = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queued == 1
+    assert not await limiter.acquire()
+
+    limiter.release(0.01)
+    assert await queued
+    assert limiter.in_flight == 2  # noqa: PLR2004
+
+
+async def test_limiter_queue_timeout() -> None:
+    """A queued request gives up after the queue timeout."""
+    limiter = _limiter(initial_limit=1)
+    assert await limiter.acquire()
+    assert not await limiter.acquire()
+    assert limiter.queued == 0
+
+
+def test_limiter_aimd() -> None:
+    """Fast requests grow the limit, slow ones shrink it."""
+    limiter = _limiter(initial_limit=2)
+    for _ in range(20):
+        limiter.in_flight += 1
+        limiter.release(0.01)
+    assert limiter.limit == pytest.approx(4)
+
+    for _ in range(20):
+        limiter.in_flight += 1
+        limiter.release(1.0)
+    assert limiter.limit == pytest.approx(1)
+
+
+def _app(gate: asyncio.Event) -> AdmissionControlMiddleware:
+    async def slow(request: Request) -> PlainTextResponse:
+        await gate.wait()
+        return PlainTextResponse("ok")
+
+    async def health(request: Request) -> PlainTextResponse:
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/slow", slow), Route("/health", health)])
+    config = Settings(
+        ADMISSION_LIMITS={"read": 1, "write": 1, "heavy": 1},
+        ADMISSION_MIN_LIMIT=1,
+        ADMISSION_QUEUE_SIZE=0,
+        ADMISSION_RETRY_AFTER=3,
+    )
+    return AdmissionControlMiddleware(app, config)
+
+
+async def test_middleware_rejects_with_retry_after() -> None:
+    """Overflowing a route class returns a 503 ErrorResponse."""
+    gate = asyncio.Event()
+    transport = httpx.ASGITransport(app=_app(gate))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = asyncio.create_task(client.get("/slow"))
+        await asyncio.sleep(0.01)
+
+        rejected = await client.get("/slow")
+        assert rejected.status_code == HTTP_503_SERVICE_UNAVAILABLE
+        assert rejected.headers["Retry-After"] == "3"
+        assert rejected.json()["error_code"] == "SERVICE_OVERLOADED"
+
+        # Exempt paths and other route classes are unaffected.
+        assert (await client.get("/health")).status_code == HTTP_200_OK
+
+        gate.set()
+        assert (await first).status_code == HTTP_200_OK
+        assert (await client.get("/slow")).status_code == HTTP_200_OK
+
+
+def test_classify() -> None:
+    """Routes are classed by path and method."""
+    middleware = AdmissionControlMiddleware(Starlette(), Settings())
+    assert middleware.classify({"path": "/health", "method": "GET"}) is None
+    assert middleware.classify({"path": "/api/v1/x", "method": "GET"}) == "read"
+    assert middleware.classify({"path": "/api/v1/x", "method": "POST"}) == "write"
+    diff = {"path": "/api/v1/versions/diff", "method": "GET"}
+    assert middleware.classify(diff) == "heavy"
@@ -0,0 +1,100 @@
+"""Tests for the Server-Timing breakdown."""
+
+import re
+
+import httpx
+from fastapi import APIRouter, FastAPI
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from apps.core.config import Settings
+from apps.core.timing import ServerTimingMiddleware, TimedRoute
+from packages.models import Base, Snippet
+from packages.telemetry import timing
+
+HTTP_200_OK = 200
+
+
+def _app(**config: object) -> ServerTimingMiddleware:
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/sync")
+    def read_sync() -> dict[str, int]:
+        timing.record("db", 0.002)
+        return {"value": 1}
+
+    @router.get("/async")
+    async def read_async() -> dict[str, int]:
+        return {"value": 2}
+
+    app = FastAPI()
+    app.include_router(router)
+    return ServerTimingMiddleware(app, Settings(**config))
+
+
+def _metrics(header: str) -> dict[str, float]:
+    return {
+        name: float(duration)
+        for name, duration in re.findall(r"(\w+);dur=([\d.]+)", header)
+    }
+
+
+async def test_every_response_is_timed_when_enabled() -> None:
+    """Sync and async endpoints report all phases; timing stays per request."""
+    transport = httpx.ASGITransport(app=_app(SERVER_TIMING_ENABLED=True))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for path in ("/sync", "/async"):
+            response = await client.get(path)
+            assert response.status_code == HTTP_200_OK
+            metrics = _metrics(response.headers["server-timing"])
+            assert set(metrics) == {
+                "queue",
+                "db",
+                "orm",
+                "app",
+                "serialize",
+                "total",
+            }
+            assert metrics["total"] >= metrics["app"]
+        assert metrics["db"] == 0
+    assert timing.current() is None
+
+
+async def test_debug_header_is_sampled() -> None:
+    """With a header named, only sampled requests that send it are timed."""
+    for enabled, rate, expected in (
+        (True, 1.0, True),
+        (True, 0.0, False),
+        (False, 1.0, False),
+    ):
+        app = _app(
+            SERVER_TIMING_ENABLED=enabled,
+            SERVER_TIMING_HEADER="X-Timing",
+            SERVER_TIMING_SAMPLE_RATE=rate,
+        )
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            plain = await client.get("/sync")
+            asked = await client.get("/sync", headers={"X-Timing": "1"})
+        assert "server-timing" not in plain.headers
+        assert ("server-timing" in asked.headers) is expected
+
+
+def test_database_phases_are_measured() -> None:
+    """Engine and session hooks record statement and hydration time."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Snippet(title="t", content="x", language="python"))
+        db.commit()
+        timings, token = timing.start()
+        try:
+            assert len(db.scalars(select(Snippet)).all()) == 1
+        finally:
+            timing.stop(token)
+        db.scalars(select(Snippet)).all()
+    assert timings.get("db") > 0
+    assert "orm" in timings.durations
+    assert set(timings.durations) == {"db", "orm"}
@@ -0,0 +1,145 @@
+"""Tests for online backfills."""
+
+from collections.abc import Sequence
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import Row, create_engine, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.db import backfill as backfill_module
+from apps.db import backfills  # noqa: F401
+from apps.db.backfill import BACKFILLS, backfill, run_backfill, schedule_backfill
+from packages.common.hashing import content_hash
+from packages.models import BackfillCheckpoint, Base, Job, Snippet, Version
+
+VERSION_COUNT = 10
+CHUNK_SIZE = 4
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Create a file database so chunks can use their own connections."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'backfill.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def versions(engine) -> list[Version]:
+    """Create versions whose content hash is still missing."""
+    with Session(engine, expire_on_commit=False) as session:
+        snippet = Snippet(title="t", content="c", language="python")
+        versions = [
+            Version(snippet=snippet, content=f"v{i}", version_number=i)
+            for i in range(VERSION_COUNT)
+        ]
+        session.add_all(versions)
+        session.commit()
+        session.execute(update(Version).values(content_hash=None))
+        session.commit()
+    return versions
+
+
+def _missing(engine) -> int:
+    with Session(engine) as session:
+        return len(
+            session.scalars(
+                select(Version.id).where(Version.content_hash.is_(None))
+            ).all()
+        )
+
+
+def test_backfill_runs_in_throttled_chunks(engine, versions):
+    """Each chunk commits on its own and is followed by a proportional pause."""
+    with patch.object(backfill_module.time, "sleep") as sleep:
+        progress = run_backfill(
+            engine, "versions.content_hash", chunk_size=CHUNK_SIZE, duty_cycle=0.25
+        )
+    assert progress.finished
+    assert (progress.rows_done, progress.chunks_done) == (VERSION_COUNT, 3)
+    assert sleep.call_count == 2  # noqa: PLR2004
+    with Session(engine) as session:
+        hashes = dict(
+            session.execute(select(Version.content, Version.content_hash))
+            .tuples()
+            .all()
+        )
+    assert hashes == {f"v{i}": content_hash(f"v{i}") for i in range(VERSION_COUNT)}
+
+    # A finished backfill does nothing.
+    again = run_backfill(engine, "versions.content_hash", chunk_size=CHUNK_SIZE)
+    assert again.chunks_done == progress.chunks_done
+
+
+def test_backfill_resumes_after_budget_and_failure(engine, versions):
+    """Progress survives stopping early and a chunk that raises."""
+    progress = run_backfill(
+        engine, "versions.content_hash", chunk_size=CHUNK_SIZE, time_budget=0
+    )
+    assert (progress.rows_done, progress.finished) == (CHUNK_SIZE, False)
+    assert _missing(engine) == VERSION_COUNT - CHUNK_SIZE
+
+    seen: list[Any] = []
+    failures = [RuntimeError("boom")]
+
+    @backfill("test.flaky", Version.__table__)
+    def flaky(connection: Connection, rows: Sequence[Row[Any]]) -> None:
+        if seen and failures:
+            raise failures.pop()
+        seen.extend(row.id for row in rows)
+
+    try:
+        with pytest.raises(RuntimeError):
+            run_backfill(engine, "test.flaky", chunk_size=CHUNK_SIZE, duty_cycle=1)
+        with Session(engine) as session:
+            checkpoint = session.get(BackfillCheckpoint, "test.flaky")
+            assert (checkpoint.rows_done, checkpoint.last_key) == (
+                CHUNK_SIZE,
+                str(seen[CHUNK_SIZE - 1]),
+            )
+        progress = run_backfill(
+            engine, "test.flaky", chunk_size=CHUNK_SIZE, duty_cycle=1
+        )
+    finally:
+        BACKFILLS.pop("test.flaky")
+    assert progress.finished
+    assert progress.rows_done == VERSION_COUNT
+    assert seen == sorted(v.id for v in versions)
+
+
+def test_schedule_and_job_slices(engine, versions):
+    """Scheduling is idempotent and each job slice queues the next one."""
+    with engine.begin() as connection:
+        schedule_backfill(connection, "versions.content_hash")
+        schedule_backfill(connection, "versions.content_hash")
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        assert (
+            len(session.scalars(select(Job).where(Job.kind == "backfill.run")).all())
+            == 1
+        )
+
+    with (
+        factory() as session,
+        patch.object(backfill_module.settings, "BACKFILL_TIME_BUDGET_SECONDS", 0),
+        patch.object(backfill_module.settings, "BACKFILL_CHUNK_SIZE", CHUNK_SIZE),
+    ):
+        backfill_module.run_job(session, {"name": "versions.content_hash"})
+        session.commit()
+        assert (
+            len(session.scalars(select(Job).where(Job.kind == "backfill.run")).all())
+            == 2
+        )  # noqa: PLR2004
+
+    with factory() as session:
+        backfill_module.run_job(session, {"name": "versions.content_hash"})
+        session.commit()
+        assert (
+            len(session.scalars(select(Job).where(Job.kind == "backfill.run")).all())
+            == 2
+        )  # noqa: PLR2004
+    assert _missing(engine) == 0
@@ -0,0 +1,330 @@
+"""Tests for hash-sharded storage."""
+
+from datetime import timedelta
+from unittest.mock import patch
+from uuid import UUID
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from apps.core.config import settings
+from apps.db import backfills  # noqa: F401
+from apps.db import backfill, sharding
+from apps.db.reshard import reshard
+from apps.db.sharding import (
+    CATALOG,
+    ShardingError,
+    create_shard_engines,
+    create_shard_schema,
+    scatter,
+    shard_name,
+    sharded_sessionmaker,
+)
+from apps.services import archive, hot_lists, similarity
+from apps.services.code_search import search_code
+from apps.services.raw_content import open_snippet_content, open_version_content
+from apps.services.snippets import get_current_versions, get_snippet, get_snippets
+from apps.services.tags import set_tags
+from apps.services.version_metadata import find_versions_by_metadata
+from packages.common.ids import uuid7
+from packages.common.sharding import shard_of
+from packages.models import Base, Snippet, SnippetTag, Tag, Version, VersionPack
+
+SHARDS = 3
+SNIPPETS = 12
+
+
+@pytest.fixture
+def paths(tmp_path):
+    """Point the catalog and shard settings at a temporary directory."""
+    with (
+        patch.object(settings, "DB_PATH", str(tmp_path / "catalog.db")),
+        patch.object(settings, "DB_SHARD_PATH", str(tmp_path / "shard{shard}.db")),
+    ):
+        yield tmp_path
+
+
+def _open(count: int) -> tuple[dict, Session]:
+    catalog = create_engine(f"sqlite:///{settings.DB_PATH}")
+    Base.metadata.create_all(catalog)
+    engines = create_shard_engines(catalog, count)
+    for shard, engine in engines.items():
+        if shard != CATALOG:
+            create_shard_schema(engine)
+    return engines, sharded_sessionmaker(engines, expire_on_commit=False)()
+
+
+@pytest.fixture
+def sharded(paths):
+    """Open a session over the catalog and ``SHARDS`` shard files."""
+    engines, session = _open(SHARDS)
+    yield engines, session
+    session.close()
+    for engine in engines.values():
+        engine.dispose()
+
+
+def _id_on(shard: int) -> UUID:
+    """A fresh id that hashes to ``shard`` of ``SHARDS``."""
+    while shard_of(snippet_id := uuid7(), SHARDS) != shard:
+        pass
+    return snippet_id
+
+
+def _create(session: Session, count: int = SNIPPETS) -> list[Snippet]:
+    """Create snippets spread round-robin over the ``SHARDS`` shards."""
+    snippets = []
+    for i in range(count):
+        snippet = Snippet(
+            id=_id_on(i % SHARDS),
+            title=f"s{i}",
+            content=f"needle {i}",
+            language="python",
+        )
+        session.add(snippet)
+        session.add(Version(snippet=snippet, content=snippet.content, version_number=1))
+        snippets.append(snippet)
+    session.commit()
+    return snippets
+
+
+def _count(engine, table) -> int:
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(table.__table__)
+        ).scalar_one()
+
+
+def _held_by(engines: dict, count: int) -> dict:
+    """Snippet ids stored in each shard file, read from the files directly."""
+    held = {}
+    for index in range(count):
+        with engines[shard_name(index)].connect() as conn:
+            held[index] = set(conn.execute(select(Snippet.id)).scalars())
+    return held
+
+
+def test_snippets_and_dependents_live_on_their_shard(sharded):
+    """Each snippet, its versions and tag links are in the file its id hashes to."""
+    engines, session = sharded
+    snippets = _create(session)
+    set_tags(session, {snippet.id: ["python", "demo"] for snippet in snippets})
+    session.commit()
+
+    held = _held_by(engines, SHARDS)
+    for snippet in snippets:
+        assert snippet.id in held[shard_of(snippet.id, SHARDS)]
+    assert sum(len(ids) for ids in held.values()) == SNIPPETS
+    assert all(held.values())
+    for index in range(SHARDS):
+        engine = engines[shard_name(index)]
+        with engine.connect() as conn:
+            links = set(conn.execute(select(SnippetTag.snippet_id)).scalars())
+            versions = set(conn.execute(select(Version.snippet_id)).scalars())
+        assert links == versions == held[index]
+    assert _count(engines[CATALOG], Tag) == 2  # noqa: PLR2004
+    assert _count(engines[CATALOG], Snippet) == 0
+
+
+def test_reads_are_routed(sharded):
+    """Lookups by id reach the right shard, and other queries reach them all."""
+    _, session = sharded
+    snippets = _create(session)
+    set_tags(session, {snippets[0].id: ["python"]})
+    session.commit()
+    session.expunge_all()
+
+    loaded = get_snippet(session, snippets[0].id)
+    assert loaded.tags == ["python"]
+    ids = [snippet.id for snippet in snippets]
+    assert set(get_snippets(session, ids)) == set(ids)
+    assert set(get_current_versions(session, ids)) == set(ids)
+    assert len(session.scalars(select(Snippet.id)).all()) == SNIPPETS
+
+
+def test_multi_shard_insert_is_refused(sharded):
+    """A single INSERT of rows for snippets on different shards is an error."""
+    _, session = sharded
+    snippets = _create(session)
+    by_shard = {shard_of(snippet.id, SHARDS): snippet for snippet in snippets}
+    tag = Tag(name="x")
+    session.add(tag)
+    session.flush()
+    with pytest.raises(ShardingError):
+        session.execute(
+            insert(SnippetTag).values(
+                [
+                    {"snippet_id": snippet.id, "tag_id": tag.id}
+                    for snippet in by_shard.values()
+                ]
+            )
+        )
+
+
+def test_scatter_runs_once_per_shard(sharded):
+    """Each call sees one shard file."""
+    _, session = sharded
+    _create(session)
+    counts = scatter(
+        session, lambda shard: shard.scalar(select(func.count(Snippet.id)))
+    )
+    assert len(counts) == SHARDS
+    assert sum(counts) == SNIPPETS
+
+
+def test_hot_list_merges_shards(sharded):
+    """A list computed from the tables is ordered across all shards."""
+    _, session = sharded
+    snippets = _create(session)
+    hot_lists._memory.clear()
+    hot_lists.rebuild(session, "recent")
+    session.commit()
+    ids = hot_lists.hot_ids(session, "recent", limit=5)
+    assert ids == sorted((snippet.id for snippet in snippets), reverse=True)[:5]
+
+
+def test_search_merges_shards(sharded):
+    """Hits from every shard come back in creation order, up to the limit."""
+    _, session = sharded
+    snippets = _create(session)
+    result = search_code(session, "needle", limit=5)
+    assert [hit.snippet_id for hit in result.hits] == [
+        snippet.id for snippet in snippets[:5]
+    ]
+    assert result.candidates >= 5  # noqa: PLR2004
+
+
+def test_metadata_search_merges_shards(sharded):
+    """The newest matches overall come back, however many shards hold some."""
+    _, session = sharded
+    snippets = _create(session)
+    for snippet in snippets:
+        for number in (2, 3):
+            session.add(
+                Version(
+                    snippet=snippet,
+                    content=snippet.content,
+                    version_number=number,
+                    version_metadata={"autosave": True},
+                )
+            )
+    session.commit()
+
+    found = find_versions_by_metadata(session, {"autosave": True}, limit=4)
+    newest = sorted(
+        (version for snippet in snippets for version in snippet.versions),
+        key=lambda version: (version.version_number, version.id),
+        reverse=True,
+    )
+    assert [version.id for version in found] == [version.id for version in newest[:4]]
+
+
+def test_archive_batches_and_packs_span_shards(sharded, tmp_path):
+    """The batch limit holds overall, and packs spread over shards stay live."""
+    _, session = sharded
+    for snippet in _create(session):
+        session.add(Version(snippet=snippet, content="newer", version_number=2))
+    session.commit()
+    session.execute(
+        update(Version).values(created_at=archive.utcnow() - timedelta(days=60))
+    )
+    session.commit()
+
+    with patch.object(settings, "ARCHIVE_DIR", str(tmp_path / "packs")):
+        assert archive.archive_versions(session, limit=2) == 2  # noqa: PLR2004
+        session.commit()
+        assert archive.archive_versions(session) == SNIPPETS - 2
+        session.commit()
+        assert session.scalars(select(VersionPack.record_count)).all() == [
+            2,
+            SNIPPETS - 2,
+        ]
+        assert archive.compact_packs(session, threshold=0.5) == 0
+    archive._readers.clear()
+
+
+def test_near_duplicates_are_clustered_across_shards(sharded):
+    """Copies of one snippet form a cluster even when no shard holds two."""
+    _, session = sharded
+    body = "\n".join(f"def step_{i}(v):\n    return sorted(v)[{i}]" for i in range(20))
+    ids = [_id_on(shard) for shard in range(SHARDS)]
+    session.add_all(
+        Snippet(id=snippet_id, title="copy", content=body, language="python")
+        for snippet_id in ids
+    )
+    session.add(Snippet(title="other", content="print('unrelated')", language="python"))
+    session.commit()
+
+    assert similarity.near_duplicate_clusters(session) == [sorted(ids)]
+
+
+def test_backfills_walk_every_shard(sharded):
+    """A backfill of a shard table fills the rows of every shard file."""
+    engines, session = sharded
+    _create(session)
+    session.execute(update(Version).values(content_hash=None))
+    session.commit()
+
+    with patch.object(settings, "BACKFILL_DUTY_CYCLE", 1):
+        backfill.run_job(session, {"name": "versions.content_hash"})
+    session.commit()
+    for index in range(SHARDS):
+        with engines[shard_name(index)].connect() as conn:
+            assert (
+                conn.scalar(select(func.count()).where(Version.content_hash.is_(None)))
+                == 0
+            )
+
+
+def test_raw_content_reads_from_the_shard(sharded):
+    """Streaming reads the blob from the file that holds the row."""
+    _, session = sharded
+    snippet = _create(session, 1)[0]
+    version = snippet.versions[0]
+    assert b"".join(open_snippet_content(session, snippet.id).chunks()) == b"needle 0"
+    assert b"".join(open_version_content(session, version.id).chunks()) == b"needle 0"
+
+
+def test_reshard_moves_rows_to_their_new_files(paths):
+    """Growing, then folding back into the catalog, keeps every row reachable."""
+    engines, session = _open(2)
+    snippets = _create(session)
+    set_tags(session, {snippet.id: ["python"] for snippet in snippets})
+    session.commit()
+    session.close()
+    for engine in engines.values():
+        engine.dispose()
+    ids = {snippet.id for snippet in snippets}
+
+    assert reshard(2, SHARDS, batch_size=5) > 0
+    engines, session = _open(SHARDS)
+    held = _held_by(engines, SHARDS)
+    for snippet_id in ids:
+        assert snippet_id in held[shard_of(snippet_id, SHARDS)]
+    assert set(get_snippets(session, ids)) == ids
+    assert all(
+        snippet.tags == ["python"] for snippet in get_snippets(session, ids).values()
+    )
+    # Nothing is left behind, and a second run has nothing to do.
+    assert sum(len(found) for found in held.values()) == SNIPPETS
+    assert reshard(SHARDS, SHARDS) == 0
+    session.close()
+    for engine in engines.values():
+        engine.dispose()
+
+    assert reshard(SHARDS, 0) == SNIPPETS
+    catalog = create_engine(f"sqlite:///{settings.DB_PATH}")
+    with Session(catalog) as plain:
+        assert set(get_snippets(plain, ids)) == ids
+        assert _count(catalog, SnippetTag) == SNIPPETS
+    catalog.dispose()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_executor():
+    """Start each test with no scatter threads left from another layout."""
+    yield
+    if sharding._executor is not None:
+        sharding._executor.shutdown()
+        sharding._executor = None
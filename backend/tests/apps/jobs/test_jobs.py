@@ -0,0 +1,202 @@
+"""Tests for the background job queue."""
+
+from datetime import timedelta
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.jobs import JobWorkerPool, enqueue
+from apps.jobs import queue as job_queue
+from apps.jobs import schedule_next
+from apps.jobs.registry import JOB_HANDLERS
+from packages.models import Base, Job, JobStatus, Tag
+
+MAX_ATTEMPTS = 2
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Create a database that worker threads reach on their own connections."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'jobs.db'}",
+        connect_args={"check_same_thread": False, "timeout": 5},
+    )
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def session(session_factory):
+    """Create a new database session."""
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def handlers():
+    """Register temporary job handlers."""
+    calls: list[dict[str, Any]] = []
+
+    def record(db: Session, payload: dict[str, Any]) -> None:
+        calls.append(payload)
+        db.add(Tag(name=payload["tag"]))
+
+    def explode(db: Session, payload: dict[str, Any]) -> None:
+        db.add(Tag(name="never-committed"))
+        raise RuntimeError("boom")
+
+    JOB_HANDLERS.update({"test.record": record, "test.explode": explode})
+    yield calls
+    JOB_HANDLERS.pop("test.record")
+    JOB_HANDLERS.pop("test.explode")
+
+
+def _job(session: Session, job_id) -> Job:
+    session.expire_all()
+    return session.get(Job, job_id)
+
+
+def test_dedup_key(session: Session):
+    """Active jobs with the same dedup key are enqueued once."""
+    first = enqueue(session, "test.record", {"tag": "a"}, dedup_key="k")
+    second = enqueue(session, "test.record", {"tag": "b"}, dedup_key="k")
+    session.commit()
+    assert first is not None
+    assert second is None
+
+    session.execute(
+        update(Job).values(status=JobStatus.SUCCEEDED.value).where(Job.id == first)
+    )
+    session.commit()
+    assert enqueue(session, "test.record", {"tag": "c"}, dedup_key="k") is not None
+
+
+def test_claim_order(session: Session):
+    """Higher priority first, then oldest; delayed jobs wait."""
+    low = enqueue(session, "test.record", priority=0)
+    high = enqueue(session, "test.record", priority=10)
+    enqueue(session, "test.record", priority=99, delay=60)
+    session.commit()
+
+    assert job_queue.claim(session, 30).id == high
+    assert job_queue.claim(session, 30).id == low
+    assert job_queue.claim(session, 30) is None
+
+
+def test_failure_retries_with_backoff(session: Session):
+    """Failed attempts are rescheduled until max_attempts, then failed."""
+    job_id = enqueue(session, "test.record", max_attempts=MAX_ATTEMPTS)
+    session.commit()
+
+    job = job_queue.claim(session, 30)
+    assert job_queue.mark_failed(session, job, "first")
+    session.commit()
+    stored = _job(session, job_id)
+    assert stored.status == JobStatus.PENDING.value
+    assert stored.attempts == 1
+    assert stored.last_error == "first"
+
+    session.execute(
+        update(Job).values(run_after=job_queue.utcnow() - timedelta(seconds=1))
+    )
+    session.commit()
+    job = job_queue.claim(session, 30)
+    assert job.attempts == MAX_ATTEMPTS
+    job_queue.mark_failed(session, job, "second")
+    session.commit()
+    assert _job(session, job_id).status == JobStatus.FAILED.value
+
+
+def test_expired_lease_is_requeued(session: Session):
+    """Jobs held by a dead worker return to the queue after the timeout."""
+    job_id = enqueue(session, "test.record")
+    session.commit()
+    stale = job_queue.claim(session, visibility_timeout=-1)
+
+    assert job_queue.requeue_expired(session) == 1
+    fresh = job_queue.claim(session, 30)
+    assert fresh.id == job_id
+    # The stale worker can no longer complete the job.
+    assert not job_queue.mark_succeeded(session, stale)
+    assert job_queue.mark_succeeded(session, fresh)
+
+
+async def test_worker_pool_runs_handlers(session_factory, session, handlers):
+    """Handler writes commit with success and roll back on failure."""
+    ok = enqueue(session, "test.record", {"tag": "from-job"})
+    bad = enqueue(session, "test.explode", max_attempts=1)
+    unknown = enqueue(session, "test.unknown")
+    session.commit()
+
+    pool = JobWorkerPool(session_factory, concurrency=1)
+    while await pool.run_once():
+        pass
+
+    assert handlers == [{"tag": "from-job"}]
+    assert _job(session, ok).status == JobStatus.SUCCEEDED.value
+    assert _job(session, bad).status == JobStatus.FAILED.value
+    assert "boom" in _job(session, bad).last_error
+    assert _job(session, unknown).status == JobStatus.FAILED.value
+    assert session.scalars(select(Tag.name)).all() == ["from-job"]
+
+
+async def test_worker_pool_start_stop(session_factory, session, handlers):
+    """Started workers drain the queue and stop cleanly."""
+    enqueue(session, "test.record", {"tag": "bg"})
+    session.commit()
+
+    pool = JobWorkerPool(session_factory, concurrency=2, poll_interval=0.01)
+    await pool.start()
+    for _ in range(100):
+        if handlers:
+            break
+        await _sleep()
+    await pool.stop(timeout=1)
+    assert handlers == [{"tag": "bg"}]
+
+
+async def _sleep() -> None:
+    import asyncio
+
+    await asyncio.sleep(0.01)
+
+
+async def test_worker_pool_purges_finished_jobs(session_factory, session, handlers):
+    """Jobs finished before the retention window are deleted by the workers."""
+    old = enqueue(session, "test.record", {"tag": "old"})
+    session.commit()
+    pool = JobWorkerPool(session_factory, concurrency=1)
+    await pool.run_once()
+    session.execute(
+        update(Job)
+        .where(Job.id == old)
+        .values(finished_at=job_queue.utcnow() - timedelta(days=30))
+    )
+    recent = enqueue(session, "test.record", {"tag": "recent"})
+    session.commit()
+
+    pool._last_purge = None
+    await pool.run_once()
+    assert _job(session, old) is None
+    assert _job(session, recent).status == JobStatus.SUCCEEDED.value
+
+
+async def test_schedule_next_takes_over_the_dedup_key(session_factory, session):
+    """A handler's next run keeps the chain's key, so duplicates are dropped."""
+
+    def tick(db: Session, payload: dict[str, Any]) -> None:
+        schedule_next(db, {"n": payload["n"] + 1}, delay=60)
+
+    JOB_HANDLERS["test.tick"] = tick
+    try:
+        enqueue(session, "test.tick", {"n": 0}, dedup_key="tick")
+        session.commit()
+        assert await JobWorkerPool(session_factory, concurrency=1).run_once()
+        assert enqueue(session, "test.tick", {"n": 0}, dedup_key="tick") is None
+    finally:
+        JOB_HANDLERS.pop("test.tick")
+    pending = session.scalars(select(Job).where(Job.status == "pending")).one()
+    assert (pending.payload, pending.dedup_key) == ({"n": 1}, "tick")
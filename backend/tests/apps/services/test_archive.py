@@ -0,0 +1,173 @@
+"""Tests for the version archive."""
+
+import os
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, delete, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.core.config import settings
+from apps.jobs import JobWorkerPool
+from apps.services import archive
+from apps.services.version_diff import diff_versions
+from packages.common.hashing import content_hash
+from packages.models import Base, Job, Snippet, Version, VersionPack
+
+VERSIONS = 5
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path):
+    """Write packs to a temporary directory."""
+    archive._readers.clear()
+    with patch.object(settings, "ARCHIVE_DIR", str(tmp_path / "packs")):
+        yield tmp_path / "packs"
+    archive._readers.clear()
+
+
+@pytest.fixture
+def session():
+    """Create a new database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _snippet(session: Session, name: str) -> Snippet:
+    snippet = Snippet(title=name, content=f"{name} {VERSIONS - 1}", language="python")
+    session.add(snippet)
+    session.add_all(
+        Version(snippet=snippet, content=f"{name} {i}\n" * 50, version_number=i)
+        for i in range(VERSIONS)
+    )
+    session.commit()
+    return snippet
+
+
+def _age(session: Session) -> None:
+    session.execute(
+        update(Version).values(created_at=archive.utcnow() - timedelta(days=60))
+    )
+    session.commit()
+
+
+def test_archive_moves_superseded_versions(session: Session):
+    """Old versions leave the database but read back the same."""
+    snippet = _snippet(session, "a")
+    ids = {v.version_number: v.id for v in snippet.versions}
+    assert archive.archive_versions(session) == 0  # too recent
+    _age(session)
+
+    assert archive.archive_versions(session) == VERSIONS - 1
+    session.commit()
+    rows = session.execute(
+        select(Version.version_number, Version.content, Version.pack_id).order_by(
+            Version.version_number
+        )
+    ).all()
+    assert [row.content for row in rows[:-1]] == [""] * (VERSIONS - 1)
+    assert rows[-1].pack_id is None  # the current version stays hot
+    assert session.scalar(select(VersionPack.record_count)) == VERSIONS - 1
+
+    contents = archive.load_contents(session, ids.values())
+    assert contents == {ids[i]: f"a {i}\n" * 50 for i in range(VERSIONS)}
+    session.expunge_all()
+    assert session.get(Version, ids[0]).content == "a 0\n" * 50
+    assert session.get(Version, ids[0]).content_hash == content_hash("a 0\n" * 50)
+    assert diff_versions(session, ids[0], ids[4]).added == 50  # noqa: PLR2004
+
+
+def test_archived_content_survives_expiry(session: Session):
+    """Objects reloaded after a commit, expiry or refresh keep their body."""
+    snippet = _snippet(session, "a")
+    version = snippet.versions[0]
+    _age(session)
+    archive.archive_versions(session)
+    session.commit()
+    assert version.pack_id is not None
+    assert version.content == "a 0\n" * 50
+    session.expire(version, ["content"])
+    assert version.content == "a 0\n" * 50
+    session.expire(version)
+    assert version.content == "a 0\n" * 50
+    session.refresh(version)
+    assert version.content == "a 0\n" * 50
+
+
+async def test_archive_job_batches_then_compacts(tmp_path):
+    """Scheduled once, the job continues while batches are full, then queues
+    compaction and its next run."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'archive.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        _snippet(session, "a")
+        _age(session)
+        session.execute(delete(Job))  # the hot list rebuilds the snippet queued
+        archive.schedule_archiving(session)
+        archive.schedule_archiving(session)
+        session.commit()
+
+    pool = JobWorkerPool(factory, concurrency=1)
+    with patch.object(settings, "ARCHIVE_BATCH_SIZE", 2):
+        for _ in range(3):
+            assert await pool.run_once()
+    with factory() as session:
+        jobs = session.execute(
+            select(Job.kind, Job.status).order_by(Job.created_at)
+        ).all()
+        assert [tuple(job) for job in jobs] == [
+            ("versions.archive", "succeeded"),
+            ("versions.archive", "succeeded"),
+            ("versions.archive", "succeeded"),
+            ("packs.compact", "pending"),
+            ("versions.archive", "pending"),
+        ]
+        next_run = session.scalars(
+            select(Job).where(Job.status == "pending", Job.kind == "versions.archive")
+        ).one()
+        assert next_run.dedup_key == "versions.archive"
+        assert session.query(VersionPack).count() == 2  # noqa: PLR2004
+    engine.dispose()
+
+
+def test_compaction_merges_sparse_packs_and_sweeps(session: Session, archive_dir):
+    """Deleting snippets leaves packs sparse; compaction rewrites them."""
+    kept_id = _snippet(session, "kept").id
+    gone = _snippet(session, "gone")
+    _age(session)
+    # Packs of three: kept 0-2 | kept 3, gone 0-1 | gone 2-3.
+    while archive.archive_versions(session, limit=3):
+        pass
+    session.commit()
+    full, *old_packs = session.scalars(select(VersionPack.id).order_by(VersionPack.id))
+    assert len(old_packs) == 2  # noqa: PLR2004
+
+    session.delete(gone)
+    session.commit()
+    assert archive.compact_packs(session) == 2  # noqa: PLR2004
+    session.commit()
+    _, new_pack = session.scalars(select(VersionPack.id).order_by(VersionPack.id))
+    session.expunge_all()
+    kept = session.get(Snippet, kept_id)
+    assert sorted(v.content for v in kept.versions) == sorted(
+        f"kept {i}\n" * 50 for i in range(VERSIONS)
+    )
+
+    # Retired files survive one grace period, then the next run removes them.
+    assert len(list(archive_dir.glob("*.pack"))) == 4  # noqa: PLR2004
+    old = archive.time.time() - 2 * archive._ORPHAN_GRACE_SECONDS
+    for pack_id in old_packs:
+        os.utime(archive.pack_path(pack_id), (old, old))
+    assert archive.compact_packs(session) == 0
+    assert {p.name for p in archive_dir.glob("*.pack")} == {
+        f"{full}.pack",
+        f"{new_pack}.pack",
+    }
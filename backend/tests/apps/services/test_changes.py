@@ -0,0 +1,132 @@
+"""Tests for the change feed."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.services.changes import ChangeFeed, changes_since, head_seq
+from apps.services.tags import remove_tags, set_tags
+from packages.models import Base, Snippet, Version
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Create a database the feed's threads reach on their own connections."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'changes.db'}",
+        connect_args={"check_same_thread": False, "timeout": 5},
+    )
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def session(session_factory):
+    """Create a new database session."""
+    session = session_factory()
+    yield session
+    session.close()
+
+
+def _add(session: Session, title: str = "a") -> Snippet:
+    snippet = Snippet(title=title, content=title, language="python")
+    session.add(snippet)
+    session.commit()
+    return snippet
+
+
+def _log(session: Session, since: int = 0) -> list[tuple[str, str]]:
+    return [(c.entity, c.op) for c in changes_since(session, since, 100)]
+
+
+def test_writes_are_logged_in_their_transaction(session: Session):
+    """ORM writes append entries in order; rolled back writes leave none."""
+    snippet = _add(session)
+    session.add(Version(snippet=snippet, content="v0", version_number=0))
+    snippet.content = "edited"
+    session.commit()
+    session.add(Snippet(title="b", content="b", language="go"))
+    session.flush()
+    session.rollback()
+    snippet.soft_delete()
+    session.commit()
+    session.delete(snippet)
+    session.commit()
+
+    assert _log(session) == [
+        ("snippet", "insert"),
+        ("version", "insert"),
+        ("snippet", "update"),
+        ("snippet", "delete"),
+        ("version", "delete"),
+        ("snippet", "delete"),
+    ]
+    seqs = [c.seq for c in changes_since(session, 0, 100)]
+    assert seqs == sorted(set(seqs))
+    assert {c.snippet_id for c in changes_since(session, 0, 100)} == {snippet.id}
+
+
+def test_set_based_tag_writes_are_logged(session: Session):
+    """Only links actually added or removed are logged."""
+    snippet = _add(session)
+    start = head_seq(session)
+    set_tags(session, {snippet.id: ["a", "b"]})
+    set_tags(session, {snippet.id: ["b", "c"]})
+    remove_tags(session, [snippet.id], ["c", "missing"])
+    session.commit()
+    assert _log(session, start) == [
+        ("snippet_tag", "insert"),
+        ("snippet_tag", "insert"),
+        ("snippet_tag", "delete"),
+        ("snippet_tag", "insert"),
+        ("snippet_tag", "delete"),
+    ]
+
+
+async def _take(stream, count: int) -> list[int]:
+    seqs: list[int] = []
+    while len(seqs) < count:
+        batch = await asyncio.wait_for(anext(stream), 5)
+        seqs += [change.seq for change in batch]
+    return seqs
+
+
+async def test_streams_catch_up_then_follow_the_tailer(session_factory, session):
+    """Streams replay from their cursor, then share one live tailer."""
+    for title in "ab":
+        _add(session, title)
+    feed = ChangeFeed(session_factory, poll_interval=30, batch_size=1)
+    replay = feed.stream(0)
+    live = feed.stream()
+    try:
+        assert await _take(replay, 2) == [1, 2]
+        pending = asyncio.ensure_future(_take(live, 1))
+        await asyncio.sleep(0.1)
+        assert feed.subscribers == 2  # noqa: PLR2004
+        # The local commit wakes the tailer long before its next poll.
+        await asyncio.to_thread(_add, session, "c")
+        assert await pending == [3]
+        assert await _take(replay, 1) == [3]
+        assert feed.head == 3  # noqa: PLR2004
+    finally:
+        await replay.aclose()
+        await live.aclose()
+        await feed.stop()
+    assert feed.subscribers == 0
+
+
+async def test_overflowing_stream_catches_up_from_the_table(session_factory, session):
+    """A stream that falls behind loses nothing."""
+    feed = ChangeFeed(session_factory, poll_interval=0.01, queue_size=1)
+    stream = feed.stream(0, idle=0.05)
+    try:
+        assert await anext(stream) == []
+        for title in "abcd":
+            await asyncio.to_thread(_add, session, title)
+            await asyncio.sleep(0.05)
+        assert await _take(stream, 4) == [1, 2, 3, 4]
+    finally:
+        await stream.aclose()
+        await feed.stop()
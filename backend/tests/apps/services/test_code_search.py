@@ -0,0 +1,156 @@
+"""Tests for trigram-backed code search."""
+
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.core.config import settings
+from apps.core.exceptions import InvalidSearchPatternError
+from apps.services import code_search
+from packages.common.ids import uuid7
+from packages.common.trigram import trigrams
+from packages.models import Base, Snippet, SnippetTrigram
+
+
+@pytest.fixture
+def session():
+    """Create a new database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def corpus(session: Session) -> list[Snippet]:
+    """A few snippets plus filler that no query should touch."""
+    snippets = [
+        Snippet(
+            title="append", content="xs = []\nxs.append(item)\n", language="python"
+        ),
+        Snippet(title="extend", content="xs.extend(items)", language="python"),
+        Snippet(title="js", content="arr.push(item);\nfoo(arr)", language="javascript"),
+    ]
+    snippets += [
+        Snippet(title=f"filler {i}", content=f"value_{i} = {i}", language="python")
+        for i in range(20)
+    ]
+    session.add_all(snippets)
+    session.commit()
+    return snippets
+
+
+@pytest.fixture(autouse=True)
+def _inline_verifier(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "SEARCH_WORKERS", 0)
+
+
+def _indexed(session: Session, snippet: Snippet) -> set[int]:
+    return set(
+        session.scalars(
+            select(SnippetTrigram.trigram).where(
+                SnippetTrigram.snippet_id == snippet.id
+            )
+        )
+    )
+
+
+def test_index_follows_content(session: Session, corpus: list[Snippet]):
+    """Posting lists track content changes."""
+    snippet = corpus[0]
+    assert _indexed(session, snippet) == trigrams(snippet.content)
+    snippet.content = "ys.append(other)"
+    session.commit()
+    assert _indexed(session, snippet) == trigrams("ys.append(other)")
+
+
+def test_substring_search_uses_candidates(session: Session, corpus: list[Snippet]):
+    """Only snippets holding every trigram are verified."""
+    result = code_search.search_code(session, ".append(")
+    assert [hit.title for hit in result.hits] == ["append"]
+    assert result.hits[0].line == 2  # noqa: PLR2004
+    assert result.hits[0].preview == "xs.append(item)"
+    assert result.candidates == 1
+    assert not result.timed_out
+
+
+def test_case_sensitivity(session: Session, corpus: list[Snippet]):
+    """The case-folded index serves both modes."""
+    assert code_search.search_code(session, "XS.APPEND").hits == []
+    insensitive = code_search.search_code(session, "XS.APPEND", case_sensitive=False)
+    assert [hit.title for hit in insensitive.hits] == ["append"]
+
+
+def test_regex_search(session: Session, corpus: list[Snippet]):
+    """Regexes are narrowed by their literal parts, then verified."""
+    result = code_search.search_code(session, r"\.(append|push)\(\w+\)", regex=True)
+    assert [hit.title for hit in result.hits] == ["append", "js"]
+    assert result.candidates == 2  # noqa: PLR2004
+
+    filtered = code_search.search_code(
+        session, r"\.(append|push)\(\w+\)", regex=True, language="javascript"
+    )
+    assert [hit.title for hit in filtered.hits] == ["js"]
+
+    # Nothing to narrow on: every live snippet is a candidate.
+    unplanned = code_search.search_code(session, r"\w\(", regex=True, limit=100)
+    assert unplanned.candidates == len(corpus)
+
+    with pytest.raises(InvalidSearchPatternError):
+        code_search.search_code(session, "foo(", regex=True)
+
+
+def test_deleted_snippets_are_skipped(session: Session, corpus: list[Snippet]):
+    """Soft-deleted snippets never match."""
+    corpus[0].soft_delete()
+    session.commit()
+    assert code_search.search_code(session, ".append(").hits == []
+
+
+def test_regex_timeout(
+    session: Session, corpus: list[Snippet], monkeypatch: pytest.MonkeyPatch
+):
+    """Catastrophic patterns are cut off by killing the verifier processes."""
+    monkeypatch.setattr(settings, "SEARCH_WORKERS", 1)
+    monkeypatch.setattr(settings, "SEARCH_REGEX_TIMEOUT_SECONDS", 1.0)
+    session.add(Snippet(title="evil", content="a" * 40 + "!", language="text"))
+    session.commit()
+    try:
+        fine = code_search.search_code(session, r"xs\.\w+", regex=True)
+        assert [hit.title for hit in fine.hits] == ["append", "extend"]
+
+        result = code_search.search_code(session, r"(a+)+$", regex=True)
+        assert result.timed_out
+        assert result.hits == []
+    finally:
+        code_search.shutdown_verifiers()
+
+
+def test_reindex(session: Session, corpus: list[Snippet]):
+    """The reindex job rebuilds wiped posting lists."""
+    session.execute(SnippetTrigram.__table__.delete())
+    session.commit()
+    code_search.reindex_job(session, {})
+    session.commit()
+    total = session.scalar(select(func.count()).select_from(SnippetTrigram))
+    assert total == sum(len(trigrams(snippet.content)) for snippet in corpus)
+
+
+def test_regex_timeout_spares_concurrent_searches(
+    session: Session, corpus: list[Snippet], monkeypatch: pytest.MonkeyPatch
+):
+    """A search that times out kills only its own verifier processes."""
+    monkeypatch.setattr(settings, "SEARCH_WORKERS", 1)
+    monkeypatch.setattr(settings, "SEARCH_REGEX_TIMEOUT_SECONDS", 1.0)
+    try:
+        other = code_search._verifiers.lease(1)
+        running = other[0].submit(r"xs\.\w+", 0, [(corpus[0].id, corpus[0].content)])
+        evil = [SimpleNamespace(id=uuid7(), content="a" * 40 + "!")]
+        assert code_search._verify_in_pool(iter([evil]), r"(a+)+$", 0, 10)[2]
+        assert running.get(timeout=10)[0][0] == corpus[0].id
+        code_search._verifiers.release(other)
+    finally:
+        code_search.shutdown_verifiers()
@@ -0,0 +1,295 @@
+"""Tests for collaborative editing sessions."""
+
+import asyncio
+from datetime import timedelta
+from uuid import UUID
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+
+from apps.jobs.queue import utcnow
+from apps.services.collab import (
+    CLOSE_CHANGED,
+    CLOSE_IDLE,
+    CLOSE_INVALID,
+    CLOSE_NOT_FOUND,
+    CLOSE_OVERLOADED,
+    CLOSE_PINNED,
+    CLOSE_STALE,
+    CollabDocument,
+    CollabError,
+    CollabManager,
+)
+from apps.services.versions import create_version
+from packages.common import ot
+from packages.common.hashing import content_hash
+from packages.models import Base, CollabLease, Snippet, Version
+
+
+class _Connection:
+    """Records what a session sends; ``gate`` holds sends back while unset."""
+
+    def __init__(self) -> None:
+        self.frames: list[list[dict]] = []
+        self.closed: tuple[int, str] | None = None
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send(self, batch: list[dict]) -> None:
+        await self.gate.wait()
+        self.frames.append(batch)
+
+    async def close(self, code: int, reason: str) -> None:
+        self.closed = (code, reason)
+
+    @property
+    def messages(self) -> list[dict]:
+        return [message for frame in self.frames for message in frame]
+
+
+async def _settle() -> None:
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Create a database the manager's threads reach on their own connections."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'collab.db'}",
+        connect_args={"check_same_thread": False, "timeout": 5},
+    )
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def snippet_id(session_factory) -> UUID:
+    """Create a snippet to edit."""
+    with session_factory() as db:
+        snippet = Snippet(title="t", content="hello", language="python")
+        db.add(snippet)
+        db.commit()
+        return snippet.id
+
+
+@pytest.fixture
+async def manager(session_factory):
+    """Create a manager that owns leases as worker ``w1``."""
+    manager = CollabManager(session_factory, owner="w1")
+    yield manager
+    await manager.stop()
+
+
+def _op(revision: int, op: list) -> dict:
+    return {"type": "op", "revision": revision, "op": op}
+
+
+async def test_concurrent_edits_converge_and_are_saved(
+    manager, session_factory, snippet_id
+):
+    """Ops on the same revision are rebased, acked, broadcast and saved."""
+    conn_a, conn_b = _Connection(), _Connection()
+    a = await manager.join(snippet_id, conn_a.send, conn_a.close)
+    b = await manager.join(snippet_id, conn_b.send, conn_b.close)
+    op_a, op_b = [5, " world"], ["> ", 5]
+    manager.submit(a, _op(0, op_a))
+    manager.submit(b, _op(0, op_b))
+    await _settle()
+
+    session = manager.get(snippet_id)
+    assert session.document.text == "> hello world"
+    assert conn_a.messages[0] == {
+        "type": "init",
+        "clientId": a.id,
+        "revision": 0,
+        "content": "hello",
+    }
+    assert [m["type"] for m in conn_a.messages] == ["init", "ack", "op"]
+    assert conn_a.messages[2] == {
+        "type": "op",
+        "revision": 2,
+        "op": ["> ", 11],
+        "clientId": b.id,
+    }
+    assert [m["type"] for m in conn_b.messages] == ["init", "op", "ack"]
+    # b applied its own edit first and rebases a's broadcast over it.
+    broadcast, _ = ot.transform(conn_b.messages[1]["op"], op_b)
+    assert ot.apply(ot.apply("hello", op_b), broadcast) == session.document.text
+
+    await manager.leave(a)
+    await manager.leave(b)
+    assert manager.sessions == 0
+    with session_factory() as db:
+        assert db.get(Snippet, snippet_id).content == "> hello world"
+        version = db.scalars(select(Version)).one()
+        assert version.version_metadata == {"collab": True, "collab_revision": 2}
+        assert db.scalars(select(CollabLease)).all() == []
+
+
+async def test_sessions_are_pinned_to_one_worker(manager, session_factory, snippet_id):
+    """Another worker is turned away until the lease is released or expires."""
+    other = CollabManager(session_factory, owner="w2")
+    conn = _Connection()
+    client = await manager.join(snippet_id, conn.send, conn.close)
+    with pytest.raises(CollabError) as exc_info:
+        await other.join(snippet_id, conn.send, conn.close)
+    assert exc_info.value.code == CLOSE_PINNED
+
+    with session_factory() as db:
+        db.execute(update(CollabLease).values(expires_at=utcnow() - timedelta(1)))
+        db.commit()
+    taken = await other.join(snippet_id, conn.send, conn.close)
+    # The first worker finds out at its next renewal and lets its clients go.
+    await manager.maintain()
+    await _settle()
+    assert conn.closed[0] == CLOSE_PINNED
+    await manager.leave(client)
+    await other.leave(taken)
+    await other.stop()
+
+    # Released on close, so the snippet can move back.
+    again = await manager.join(snippet_id, conn.send, conn.close)
+    assert manager.sessions == 1
+    await manager.leave(again)
+
+
+async def test_unknown_snippet_is_rejected(manager):
+    """Joining a snippet that does not exist fails."""
+    with pytest.raises(CollabError) as exc_info:
+        await manager.join(UUID(int=1), _Connection().send, None)
+    assert exc_info.value.code == CLOSE_NOT_FOUND
+
+
+async def test_slow_client_is_dropped(session_factory, snippet_id):
+    """A client whose queue fills up is closed instead of buffering more."""
+    manager = CollabManager(session_factory, owner="w1", queue_size=2)
+    fast, slow = _Connection(), _Connection()
+    slow.gate.clear()
+    writer = await manager.join(snippet_id, fast.send, fast.close)
+    await manager.join(snippet_id, slow.send, slow.close)
+    await _settle()
+    for revision in range(4):
+        manager.submit(writer, _op(revision, [5 + revision, "!"]))
+        await _settle()
+    slow.gate.set()
+    await _settle()
+
+    assert slow.closed[0] == CLOSE_OVERLOADED
+    assert fast.closed is None
+    assert [m["revision"] for m in fast.messages[1:]] == [1, 2, 3, 4]
+    await manager.stop()
+
+
+@pytest.mark.parametrize(
+    ("message", "code"),
+    [
+        (_op(3, [5]), CLOSE_STALE),
+        (_op(0, [4, "x"]), CLOSE_INVALID),
+        (_op(0, [5, 0]), CLOSE_INVALID),
+        ({"type": "cursor"}, CLOSE_INVALID),
+        ([1, 2], CLOSE_INVALID),
+    ],
+)
+async def test_bad_messages_close_the_connection(manager, snippet_id, message, code):
+    """Invalid or stale ops end the sender's connection with a close code."""
+    conn = _Connection()
+    client = await manager.join(snippet_id, conn.send, conn.close)
+    with pytest.raises(CollabError) as exc_info:
+        manager.submit(client, message)
+    assert exc_info.value.code == code
+    await manager.leave(client, exc_info.value)
+    assert conn.closed[0] == code
+    assert manager.sessions == 0
+
+
+async def test_maintenance_checkpoints_and_evicts_idle_sessions(
+    session_factory, snippet_id
+):
+    """Edits are saved periodically and idle sessions are closed."""
+    manager = CollabManager(session_factory, owner="w1", idle_timeout=0.05)
+    conn = _Connection()
+    client = await manager.join(snippet_id, conn.send, conn.close)
+    manager.submit(client, _op(0, [5, "!"]))
+    await manager.maintain()
+    await manager.maintain()
+    with session_factory() as db:
+        assert db.scalar(select(Snippet.content)) == "hello!"
+        assert len(db.scalars(select(Version)).all()) == 1
+    assert conn.closed is None
+
+    await asyncio.sleep(0.06)
+    await manager.maintain()
+    await _settle()
+    assert conn.closed[0] == CLOSE_IDLE
+    await manager.leave(client)
+    assert manager.sessions == 0
+    with session_factory() as db:
+        assert len(db.scalars(select(Version)).all()) == 1
+    await manager.stop()
+
+
+async def test_outside_changes_are_not_overwritten(
+    manager, session_factory, snippet_id
+):
+    """A REST write during the session ends it instead of being lost."""
+    conn = _Connection()
+    client = await manager.join(snippet_id, conn.send, conn.close)
+    manager.submit(client, _op(0, [5, "!"]))
+    await manager.maintain()
+    manager.submit(client, _op(1, [6, "?"]))
+    with session_factory() as db:
+        create_version(db, snippet_id, "from rest")
+        db.commit()
+
+    await manager.maintain()
+    await _settle()
+    assert conn.closed[0] == CLOSE_CHANGED
+    assert manager.sessions == 0
+    await manager.leave(client)
+    with session_factory() as db:
+        assert db.get(Snippet, snippet_id).content == "from rest"
+        assert db.scalars(select(CollabLease)).all() == []
+
+    rejoined = _Connection()
+    await manager.join(snippet_id, rejoined.send, rejoined.close)
+    await _settle()
+    assert rejoined.messages[0]["content"] == "from rest"
+
+
+
+def test_save_loses_to_a_write_after_its_check(
+    manager, session_factory, snippet_id, monkeypatch: pytest.MonkeyPatch
+):
+    """A REST write landing between the hash check and the save wins."""
+    live_content = manager._live_content
+
+    def read_then_write(db, snippet_id):
+        content = live_content(db, snippet_id)
+        with session_factory() as other:
+            create_version(other, snippet_id, "from rest")
+            other.commit()
+        return content
+
+    monkeypatch.setattr(manager, "_live_content", read_then_write)
+    with pytest.raises(CollabError) as exc_info:
+        manager._save(snippet_id, "hello!", 1, content_hash("hello"))
+    assert exc_info.value.code == CLOSE_CHANGED
+    with session_factory() as db:
+        assert db.get(Snippet, snippet_id).content == "from rest"
+        assert len(db.scalars(select(Version)).all()) == 1
+
+def test_document_history_is_bounded():
+    """Operations beyond the history window can no longer be rebased."""
+    document = CollabDocument("", max_chars=10, history_size=2, history_chars=100)
+    for revision, op in enumerate([["x"], [1, "x"], [2, "x"]]):
+        document.submit(revision, op)
+    assert document.text == "xxx"
+    assert document.oldest_revision == 1
+    with pytest.raises(CollabError) as exc_info:
+        document.submit(0, ["y"])
+    assert exc_info.value.code == CLOSE_STALE
+    assert document.submit(1, ["y", 1]) == ["y", 3]
+    with pytest.raises(CollabError):
+        document.submit(document.revision, [4, "x" * 7])
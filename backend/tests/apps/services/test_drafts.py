@@ -0,0 +1,142 @@
+"""Tests for autosave drafts."""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.core.config import settings
+from apps.core.exceptions import DraftNotFoundError
+from apps.jobs import JobWorkerPool
+from apps.services import drafts
+from packages.models import Base, Draft, Job, Snippet, Version
+
+SESSION = "editor-1"
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Create a database that job workers reach from their own threads."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'drafts.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def session(session_factory):
+    """Create a new database session."""
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def snippet(session: Session) -> Snippet:
+    """Create a snippet to edit."""
+    snippet = Snippet(title="a", content="x = 0", language="python")
+    session.add(snippet)
+    session.commit()
+    return snippet
+
+
+def _versions(session: Session) -> list[Version]:
+    return list(session.scalars(select(Version).order_by(Version.version_number)))
+
+
+def _age(session: Session, seconds: float) -> None:
+    session.execute(
+        update(Draft).values(updated_at=drafts.utcnow() - timedelta(seconds=seconds))
+    )
+
+
+def test_autosaves_coalesce_until_idle(session: Session, snippet: Snippet):
+    """Autosaves overwrite one draft; the idle flush writes one version."""
+    for i in range(1, 6):
+        result = drafts.autosave(session, snippet.id, SESSION, f"x = {i}")
+        assert (result.edit_count, result.version) == (i, None)
+    session.commit()
+    assert _versions(session) == []
+    assert drafts.get_draft(session, snippet.id, SESSION).content == "x = 5"
+    assert session.scalars(
+        select(Job.kind).where(Job.kind != "hot_lists.rebuild")
+    ).all() == ["drafts.flush"]
+
+    assert drafts.flush_idle_drafts(session) is not None  # not idle yet
+    _age(session, settings.AUTOSAVE_IDLE_SECONDS)
+    assert drafts.flush_idle_drafts(session) is None
+    session.commit()
+
+    (version,) = _versions(session)
+    assert version.content == "x = 5"
+    assert version.version_metadata == {
+        "session_id": SESSION,
+        "autosave": True,
+        "coalesced_edits": 5,
+    }
+    assert session.get(Snippet, snippet.id).content == "x = 5"
+    with pytest.raises(DraftNotFoundError):
+        drafts.get_draft(session, snippet.id, SESSION)
+
+
+def test_thresholds_and_explicit_save(session: Session, snippet: Snippet):
+    """Edit count, size change and explicit saves write versions early."""
+    with patch.object(settings, "AUTOSAVE_MAX_EDITS", 3):
+        results = [
+            drafts.autosave(session, snippet.id, SESSION, f"x = {i}") for i in range(3)
+        ]
+    assert results[-1].version is not None
+    assert results[-1].version.version_metadata["coalesced_edits"] == 3  # noqa: PLR2004
+
+    drafts.autosave(session, snippet.id, "editor-2", "z = 1")
+    saved = drafts.save_draft(session, snippet.id, "editor-2", "z = 2")
+    assert saved.edit_count == 2  # noqa: PLR2004
+    assert saved.version.version_metadata["autosave"] is False
+
+    big = "y = 1\n" * settings.AUTOSAVE_MAX_DELTA_CHARS
+    assert drafts.autosave(session, snippet.id, SESSION, big).version is not None
+    session.commit()
+
+    assert [(v.version_number, v.content) for v in _versions(session)] == [
+        (1, "x = 2"),
+        (2, "z = 2"),
+        (3, big),
+    ]
+    assert _versions(session)[2].parent_version_id == _versions(session)[1].id
+    with pytest.raises(DraftNotFoundError):
+        drafts.save_draft(session, snippet.id, "editor-2")
+
+
+async def test_flush_job_reschedules_and_drops_orphans(
+    session_factory, session: Session, snippet: Snippet
+):
+    """The job saves idle drafts, discards deleted ones and comes back once."""
+    other = Snippet(title="b", content="", language="python")
+    session.add(other)
+    session.commit()
+    drafts.autosave(session, snippet.id, SESSION, "x = 1")
+    drafts.autosave(session, other.id, SESSION, "gone")
+    _age(session, settings.AUTOSAVE_IDLE_SECONDS)
+    other.soft_delete()
+    drafts.autosave(session, snippet.id, "editor-2", "x = 2")
+    session.commit()
+
+    session.execute(update(Job).values(run_after=drafts.utcnow()))
+    session.commit()
+    assert await JobWorkerPool(session_factory, concurrency=1).run_once()
+    session.expire_all()
+    assert [v.content for v in _versions(session)] == ["x = 1"]
+    assert session.scalars(select(Draft.session_id)).all() == ["editor-2"]
+
+    # Later autosaves join the rescheduled flush instead of starting a chain.
+    drafts.autosave(session, snippet.id, "editor-2", "x = 3")
+    session.commit()
+    pending = session.scalars(
+        select(Job).where(Job.kind == "drafts.flush", Job.status == "pending")
+    ).all()
+    assert [job.dedup_key for job in pending] == ["drafts.flush"]
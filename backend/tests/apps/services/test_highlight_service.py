@@ -0,0 +1,90 @@
+"""Tests for the highlight cache service."""
+
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.core.config import settings
+from apps.core.exceptions import VersionNotFoundError
+from apps.services import highlight as service
+from packages.common.highlight import tokenize
+from packages.common.ids import uuid7
+from packages.models import Base, ContentHighlight, Snippet, Version
+
+CODE = "def f():\n    return 1\n"
+
+
+@pytest.fixture
+def session():
+    """Create a new database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def _inline_tokenizer(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "HIGHLIGHT_WORKERS", 0)
+
+
+def _stored(session: Session) -> int:
+    return session.scalar(select(func.count()).select_from(ContentHighlight))
+
+
+def test_computed_once_per_content(session: Session):
+    """A second request for the same body is served from the table."""
+    with patch.object(service, "tokenize", wraps=tokenize) as spy:
+        first = service.get_highlight(session, CODE, "Python")
+        session.commit()
+        second = service.get_highlight(session, CODE, "python")
+    assert first == second == tokenize(CODE, "python")
+    assert spy.call_count == 1
+    assert _stored(session) == 1
+
+
+def test_oversized_content(session: Session, monkeypatch: pytest.MonkeyPatch):
+    """Content over the limit is not tokenized."""
+    monkeypatch.setattr(settings, "HIGHLIGHT_MAX_CHARS", 4)
+    assert service.get_highlight(session, CODE, "python") is None
+    assert _stored(session) == 0
+
+
+def test_highlight_version(session: Session):
+    """Versions are tokenized from their own content."""
+    snippet = Snippet(title="t", content=CODE, language="python")
+    parent = Version(snippet=snippet, content=CODE, version_number=1)
+    session.add(parent)
+    session.flush()
+    child = Version(
+        snippet=snippet,
+        content=CODE + "x = 1\n",
+        version_number=2,
+        parent_version_id=parent.id,
+    )
+    session.add(child)
+    session.commit()
+
+    assert service.highlight_version(session, parent.id) == tokenize(CODE, "python")
+    service.highlight_version_job(session, {"version_id": str(child.id)})
+    assert _stored(session) == 2  # noqa: PLR2004
+
+    with pytest.raises(VersionNotFoundError):
+        service.highlight_version(session, uuid7())
+    # The job treats a missing version as done rather than failing.
+    service.highlight_version_job(session, {"version_id": str(uuid7())})
+    assert _stored(session) == 2  # noqa: PLR2004
+
+
+def test_process_pool(session: Session, monkeypatch: pytest.MonkeyPatch):
+    """Tokenization runs in worker processes when enabled."""
+    monkeypatch.setattr(settings, "HIGHLIGHT_WORKERS", 1)
+    try:
+        assert service.get_highlight(session, CODE, "python") == tokenize(
+            CODE, "python"
+        )
+    finally:
+        service.shutdown_executor()
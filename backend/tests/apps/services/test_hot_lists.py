@@ -0,0 +1,139 @@
+"""Tests for materialized hot lists."""
+
+from collections.abc import Iterator
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.core.config import settings
+from apps.services import hot_lists
+from packages.models import Base, HotList, Job, Snippet
+
+LIST_SIZE = 3
+
+
+@pytest.fixture(autouse=True)
+def _small_lists() -> Iterator[None]:
+    hot_lists._memory.clear()
+    with patch.object(settings, "HOT_LIST_SIZE", LIST_SIZE):
+        yield
+    hot_lists._memory.clear()
+
+
+@pytest.fixture
+def session():
+    """Create a new database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _add(session: Session, title: str, language: str = "python") -> Snippet:
+    snippet = Snippet(title=title, content=title, language=language)
+    session.add(snippet)
+    session.commit()
+    return snippet
+
+
+def _stored(session: Session, name: str) -> list:
+    row = session.scalars(select(HotList).where(HotList.name == name)).one()
+    return hot_lists.RankedIds.unpack(100, row.ids, row.scores).ids()
+
+
+def test_writes_maintain_lists(session: Session):
+    """Creates, edits, language moves and deletes update the stored lists."""
+    a = _add(session, "a")
+    b = _add(session, "b", "go")
+    c = _add(session, "c")
+    assert _stored(session, "recent") == [c.id, b.id, a.id]
+    assert _stored(session, "recent:python") == [c.id, a.id]
+    assert _stored(session, "trending:go") == [b.id]
+
+    a.content = "edited"
+    session.commit()
+    assert _stored(session, "trending")[0] == a.id
+
+    b.language = "python"
+    session.commit()
+    assert _stored(session, "recent:go") == []
+    assert _stored(session, "recent:python") == [c.id, b.id, a.id]
+
+    c.soft_delete()
+    session.commit()
+    assert c.id not in _stored(session, "recent")
+    assert c.id not in _stored(session, "trending:python")
+
+    session.delete(a)
+    session.commit()
+    assert _stored(session, "recent") == [b.id]
+
+
+def test_rolled_back_writes_leave_lists_alone(session: Session):
+    """List updates share the transaction of the write."""
+    a = _add(session, "a")
+    session.add(Snippet(title="b", content="b", language="python"))
+    session.flush()
+    session.rollback()
+    assert _stored(session, "recent") == [a.id]
+
+
+def test_reads_use_memory_and_refresh_after_commit(session: Session):
+    """A served list stays in memory until a commit touches it."""
+    a = _add(session, "a")
+    hot_lists.rebuild(session, "recent")
+    session.commit()
+    assert hot_lists.hot_ids(session, "recent") == [a.id]
+    with patch.object(hot_lists, "_compute") as compute:
+        assert hot_lists.hot_ids(session, "recent") == [a.id]
+    compute.assert_not_called()
+
+    b = _add(session, "b")
+    assert hot_lists.hot_ids(session, "recent", limit=1) == [b.id]
+
+
+def test_missing_or_depleted_list_falls_back_and_rebuilds(session: Session):
+    """Writes that leave a list short queue its rebuild; reads fall back."""
+    snippets = [_add(session, str(i)) for i in range(2 * LIST_SIZE + 1)]
+    newest = [s.id for s in reversed(snippets)]
+    # The first write started the lists, knowing only one snippet.
+    assert {job.payload["name"] for job in session.scalars(select(Job))} == {
+        "recent",
+        "recent:python",
+        "trending",
+        "trending:python",
+    }
+    session.execute(delete(Job))
+    session.commit()
+    for snippet in snippets[-LIST_SIZE - 1 :]:
+        snippet.soft_delete()
+    session.commit()
+    assert len(_stored(session, "recent")) < LIST_SIZE
+    queued = session.scalars(select(Job)).all()
+    assert ("hot_lists.rebuild", {"name": "recent"}) in [
+        (job.kind, job.payload) for job in queued
+    ]
+
+    assert hot_lists.hot_ids(session, "recent") == newest[LIST_SIZE + 1 :][:LIST_SIZE]
+    assert hot_lists.hot_ids(session, "recent:go") == []
+    assert session.scalar(select(func.count()).select_from(Job)) == len(queued)
+    assert session.get(HotList, "recent:go") is None
+
+    hot_lists.rebuild_job(session, {})
+    session.commit()
+    assert _stored(session, "recent") == newest[LIST_SIZE + 1 :]
+    assert session.get(HotList, "recent").exhaustive
+
+
+def test_trending_prefers_recent_activity(session: Session):
+    """Older activity decays, so a fresh edit outranks an old creation."""
+    with patch.object(hot_lists.time, "time", return_value=0.0):
+        old = _add(session, "old")
+        old.content = "old edit"
+        session.commit()
+    with patch.object(hot_lists.time, "time", return_value=48 * 3600.0):
+        new = _add(session, "new")
+    assert hot_lists.hot_ids(session, "trending") == [new.id, old.id]
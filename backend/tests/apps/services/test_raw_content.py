@@ -0,0 +1,101 @@
+"""Tests for streaming raw content."""
+
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.core.config import settings
+from apps.services import archive
+from apps.services.raw_content import open_snippet_content, open_version_content
+from packages.common.hashing import content_hash
+from packages.models import Base, Snippet, Version
+
+CHUNK = 16
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(tmp_path):
+    """Read in small pieces and write packs to a temporary directory."""
+    archive._readers.clear()
+    with (
+        patch.object(settings, "ARCHIVE_DIR", str(tmp_path / "packs")),
+        patch.object(settings, "RAW_CHUNK_SIZE", CHUNK),
+    ):
+        yield
+    archive._readers.clear()
+
+
+@pytest.fixture
+def session(tmp_path):
+    """Create a session on a database file."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'raw.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _snippet(session: Session, *contents: str) -> Snippet:
+    snippet = Snippet(title="Raw", content=contents[-1], language="python")
+    session.add(snippet)
+    session.add_all(
+        Version(snippet=snippet, content=content, version_number=number)
+        for number, content in enumerate(contents, 1)
+    )
+    session.commit()
+    return snippet
+
+
+def test_version_is_streamed_in_chunks(session: Session):
+    """Stored versions come out in pieces, and any byte range of them."""
+    text = "héllo wörld\n" * 10
+    snippet = _snippet(session, text)
+    content = open_version_content(session, snippet.versions[0].id)
+    data = text.encode("utf-8")
+    assert (content.size, content.etag) == (len(data), content_hash(text))
+    chunks = list(content.chunks())
+    assert max(len(chunk) for chunk in chunks) == CHUNK
+    assert b"".join(chunks) == data
+    assert b"".join(content.chunks(5, 40)) == data[5:40]
+
+
+def test_archived_version_is_streamed_from_its_pack(session: Session):
+    """Archived versions are decompressed as they are read."""
+    old = "old line\n" * 20
+    snippet = _snippet(session, old, "new")
+    assert archive.archive_versions(session, older_than=-archive.timedelta(1)) == 1
+    session.commit()
+    content = open_version_content(session, snippet.versions[0].id)
+    assert content.etag == content_hash(old)
+    assert b"".join(content.chunks()).decode() == old
+    assert b"".join(content.chunks(10, 30)) == old.encode()[10:30]
+
+
+def test_archiving_midstream_continues_from_the_pack(session: Session):
+    """A version archived while it is read is finished from the pack."""
+    old = "".join(f"line {i}\n" for i in range(30))
+    snippet = _snippet(session, old, "new")
+    content = open_version_content(session, snippet.versions[0].id)
+    chunks = content.chunks()
+    first = next(chunks)
+    archive.archive_versions(session, older_than=-archive.timedelta(1))
+    session.commit()
+    assert (first + b"".join(chunks)).decode() == old
+
+
+def test_snippet_reads_its_current_version(session: Session):
+    """A snippet streams its current version; without one it is read whole."""
+    snippet = _snippet(session, "first", "second")
+    content = open_snippet_content(session, snippet.id)
+    assert content.etag == content_hash("second")
+    assert b"".join(content.chunks()) == b"second"
+
+    loose = Snippet(title="Loose", content="no versions", language="text")
+    session.add(loose)
+    session.commit()
+    content = open_snippet_content(session, loose.id)
+    assert content.etag == content_hash("no versions")
+    assert b"".join(content.chunks(3)) == b"versions"
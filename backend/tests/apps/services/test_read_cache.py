@@ -0,0 +1,104 @@
+"""Tests for the shared read-through cache."""
+
+import asyncio
+import threading
+from collections.abc import Iterator
+
+import pytest
+
+from apps.services.read_cache import (
+    cache_key,
+    cached_read,
+    cached_read_many,
+    invalidate,
+    read_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clear_read_cache() -> Iterator[None]:
+    read_cache.clear()
+    yield
+    read_cache.clear()
+
+
+async def test_fill_is_cached() -> None:
+    """A finished load is stored under its key."""
+    value = await cached_read("things.get", {"id": 1}, lambda: "fresh")
+    assert value == "fresh"
+    assert read_cache.get(cache_key("things.get", {"id": 1})) == "fresh"
+
+
+async def test_invalidated_fill_is_not_cached() -> None:
+    """A load overtaken by an invalidation answers its caller but is dropped."""
+    started, release = threading.Event(), threading.Event()
+
+    def load() -> str:
+        started.set()
+        release.wait(5)
+        return "old"
+
+    reading = asyncio.create_task(cached_read("things.get", {"id": 1}, load))
+    await asyncio.to_thread(started.wait, 5)
+    invalidate("things.get", {"id": 1})
+    release.set()
+
+    assert await reading == "old"
+    assert read_cache.get(cache_key("things.get", {"id": 1})) is None
+    assert await cached_read("things.get", {"id": 1}, lambda: "new") == "new"
+
+
+async def test_invalidated_batch_fill_is_not_cached() -> None:
+    """Batch loads skip caching the entries invalidated while they ran."""
+    started, release = threading.Event(), threading.Event()
+
+    def load(ids: list[int]) -> dict[int, str]:
+        started.set()
+        release.wait(5)
+        return {i: f"old {i}" for i in ids}
+
+    reading = asyncio.create_task(cached_read_many("things.get", "id", [1, 2], load))
+    await asyncio.to_thread(started.wait, 5)
+    invalidate("things.get", {"id": 1})
+    release.set()
+
+    assert await reading == {1: "old 1", 2: "old 2"}
+    assert read_cache.get(cache_key("things.get", {"id": 1})) is None
+    assert read_cache.get(cache_key("things.get", {"id": 2})) == "old 2"
+
+
+async def test_batch_and_single_reads_share_loads() -> None:
+    """A batch joins a running single load, and a single read joins a batch."""
+    started, release = threading.Event(), threading.Event()
+    loaded: list[list[int]] = []
+
+    def load_one() -> str:
+        started.set()
+        release.wait(5)
+        return "single 1"
+
+    def load_many(ids: list[int]) -> dict[int, str]:
+        loaded.append(ids)
+        release.wait(5)
+        return {i: f"batch {i}" for i in ids if i != 3}  # noqa: PLR2004
+
+    def not_found() -> str:
+        raise LookupError("gone")
+
+    single = asyncio.create_task(cached_read("things.get", {"id": 1}, load_one))
+    await asyncio.to_thread(started.wait, 5)
+    batch = asyncio.create_task(
+        cached_read_many("things.get", "id", [1, 2, 3], load_many)
+    )
+    await asyncio.sleep(0.01)
+    joined = asyncio.create_task(cached_read("things.get", {"id": 2}, lambda: "unused"))
+    missing = asyncio.create_task(cached_read("things.get", {"id": 3}, not_found))
+    await asyncio.sleep(0.01)
+    release.set()
+
+    assert await batch == {1: "single 1", 2: "batch 2"}
+    assert loaded == [[2, 3]]
+    assert await single == "single 1"
+    assert await joined == "batch 2"
+    with pytest.raises(LookupError):
+        await missing
@@ -0,0 +1,134 @@
+"""Tests for near-duplicate detection."""
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.core.exceptions import SnippetNotFoundError
+from apps.services import similarity
+from packages.common.ids import uuid7
+from packages.models import Base, Snippet, SnippetLSHBand, SnippetSignature
+
+SOLUTION = "\n".join(
+    f"def step_{i}(values):\n    result = sorted(values)[{i}]\n    return result * {i}"
+    for i in range(20)
+)
+
+
+@pytest.fixture
+def session():
+    """Create a new database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _add(session: Session, title: str, content: str) -> Snippet:
+    snippet = Snippet(title=title, content=content, language="python")
+    session.add(snippet)
+    session.commit()
+    return snippet
+
+
+def _bands(session: Session, snippet: Snippet) -> dict[int, int]:
+    rows = session.execute(
+        select(SnippetLSHBand.band, SnippetLSHBand.bucket).where(
+            SnippetLSHBand.snippet_id == snippet.id
+        )
+    )
+    return dict(rows.tuples().all())
+
+
+def test_index_follows_content(session: Session):
+    """Inserts index a snippet; content changes rewrite only changed bands."""
+    snippet = _add(session, "original", SOLUTION)
+    before = _bands(session, snippet)
+    assert len(before) == similarity.hasher.bands
+
+    snippet.content = SOLUTION.replace("* 7", "+ 7")
+    session.commit()
+    after = _bands(session, snippet)
+    assert len(after) == similarity.hasher.bands
+    assert after != before
+    assert set(after.items()) & set(before.items())
+
+    stored = session.scalar(
+        select(SnippetSignature.signature).where(
+            SnippetSignature.snippet_id == snippet.id
+        )
+    )
+    assert similarity.hasher.unpack(stored) == similarity.hasher.signature(
+        snippet.content
+    )
+    assert not similarity.index_content(
+        session.connection(), snippet.id, snippet.content
+    )
+
+
+def test_find_similar(session: Session):
+    """Light edits are found; unrelated and deleted snippets are not."""
+    original = _add(session, "original", SOLUTION)
+    tweaked = _add(session, "tweaked", SOLUTION.replace("* 3", "* 4"))
+    _add(session, "unrelated", "print('hello world')")
+    deleted = _add(session, "deleted", SOLUTION)
+    deleted.soft_delete()
+    session.commit()
+
+    matches = similarity.find_similar(session, original.id)
+    assert [match.snippet_id for match in matches] == [tweaked.id]
+    assert matches[0].similarity > 0.8  # noqa: PLR2004
+    assert similarity.find_similar(session, original.id, threshold=1.0) == []
+
+    by_content = similarity.find_similar_to_content(session, SOLUTION)
+    assert [match.snippet_id for match in by_content] == [original.id, tweaked.id]
+    assert by_content[0].similarity == 1.0
+
+    with pytest.raises(SnippetNotFoundError):
+        similarity.find_similar(session, uuid7())
+
+
+def test_clusters_and_reindex(session: Session):
+    """Clusters group near duplicates; reindex fills a wiped index."""
+    first = _add(session, "a", SOLUTION)
+    second = _add(session, "b", SOLUTION.replace("* 5", "- 5"))
+    _add(session, "c", "import os\nprint(os.getcwd())")
+    _add(session, "d", "")
+    assert similarity.near_duplicate_clusters(session) == [
+        sorted([first.id, second.id])
+    ]
+
+    session.execute(SnippetLSHBand.__table__.delete())
+    session.execute(SnippetSignature.__table__.delete())
+    session.commit()
+    assert similarity.near_duplicate_clusters(session) == []
+
+    similarity.reindex_job(session, {})
+    session.commit()
+    assert (
+        session.scalar(select(func.count()).select_from(SnippetSignature)) == 4
+    )  # noqa: PLR2004
+    assert similarity.near_duplicate_clusters(session) == [
+        sorted([first.id, second.id])
+    ]
+
+
+def test_signatures_are_computed_before_the_flush(
+    session: Session, monkeypatch: pytest.MonkeyPatch
+):
+    """MinHash runs before the flush writes anything, so no lock is held."""
+    writing: list[bool] = []
+    original = similarity.hasher.signature
+
+    def record(content: str) -> tuple[int, ...]:
+        writing.append(session.connection().connection.dbapi_connection.in_transaction)
+        return original(content)
+
+    monkeypatch.setattr(similarity.hasher, "signature", record)
+    snippet = _add(session, "original", SOLUTION)
+    snippet.content = SOLUTION.replace("* 7", "+ 7")
+    session.commit()
+
+    assert writing == [False, False]
+    assert "similarity_signatures" not in session.info
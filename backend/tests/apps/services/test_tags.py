@@ -0,0 +1,134 @@
+"""Tests for set-based tag assignment."""
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.core.exceptions import InvalidTagError, SnippetNotFoundError
+from apps.services import tags as tag_service
+from packages.common.ids import uuid7
+from packages.models import Base, Snippet, SnippetTag, Tag
+
+SNIPPET_COUNT = 30
+
+
+@pytest.fixture
+def engine():
+    """Create an in-memory database."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session(engine):
+    """Create a new database session."""
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def snippets(session: Session) -> list[Snippet]:
+    """Create untagged snippets."""
+    snippets = [
+        Snippet(title=f"s{i}", content="x", language="python")
+        for i in range(SNIPPET_COUNT)
+    ]
+    session.add_all(snippets)
+    session.commit()
+    return snippets
+
+
+@pytest.fixture
+def statements(engine):
+    """Record the SQL statements executed."""
+    seen: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_normalize_tag_names():
+    """Names are stripped and deduplicated in order."""
+    assert tag_service.normalize_tag_names([" b", "a", "b ", ""]) == ["b", "a"]
+    with pytest.raises(InvalidTagError):
+        tag_service.normalize_tag_names(["x" * 51])
+
+
+def test_set_tags_replaces(session: Session, snippets: list[Snippet]):
+    """The new set replaces the old one, reusing existing tags."""
+    snippet = snippets[0]
+    tag_service.set_tags(session, {snippet.id: ["python", "sorting"]})
+    session.commit()
+    assert sorted(snippet.tags) == ["python", "sorting"]
+
+    applied = tag_service.set_tags(session, {snippet.id: ["sorting", " graphs "]})
+    session.commit()
+    assert applied == {snippet.id: ["sorting", "graphs"]}
+    assert sorted(snippet.tags) == ["graphs", "sorting"]
+    assert session.scalar(select(func.count()).select_from(Tag)) == 3  # noqa: PLR2004
+
+    tag_service.set_tags(session, {snippet.id: []})
+    session.commit()
+    assert snippet.tags == []
+
+
+def test_bulk_statement_count_is_fixed(
+    session: Session, snippets: list[Snippet], statements: list[str]
+):
+    """Retagging many snippets costs the same statements as retagging one."""
+    ids = [snippet.id for snippet in snippets]
+    tag_service.set_tags(session, {ids[0]: ["a", "b"]})
+    statements.clear()
+    tag_service.set_tags(session, {ids[0]: ["a", "own-0"]})
+    single = len(statements)
+    tag_service.set_tags(session, {ids[0]: ["a", "b"]})
+    statements.clear()
+
+    tag_service.set_tags(
+        session,
+        {snippet_id: ["a", f"own-{i}", "c"] for i, snippet_id in enumerate(ids)},
+    )
+    assert len(statements) == single
+    session.commit()
+    assert session.scalar(select(func.count()).select_from(SnippetTag)) == (
+        3 * SNIPPET_COUNT
+    )
+
+
+def test_concurrent_style_duplicates_are_ignored(
+    session: Session, snippets: list[Snippet]
+):
+    """Existing tags and links never raise integrity errors."""
+    session.add(Tag(name="existing"))
+    session.commit()
+    ids = [snippet.id for snippet in snippets[:3]]
+    tag_service.add_tags(session, ids, ["existing", "new"])
+    tag_service.add_tags(session, ids, ["existing", "new"])
+    session.commit()
+    assert all(sorted(s.tags) == ["existing", "new"] for s in snippets[:3])
+
+    tag_service.remove_tags(session, ids[:2], ["new", "absent"])
+    session.commit()
+    assert [sorted(s.tags) for s in snippets[:3]] == [
+        ["existing"],
+        ["existing"],
+        ["existing", "new"],
+    ]
+
+
+def test_missing_snippet(session: Session, snippets: list[Snippet]):
+    """Unknown or deleted snippets abort the whole assignment."""
+    deleted = snippets[1]
+    deleted.soft_delete()
+    session.commit()
+    for snippet_id in (uuid7(), deleted.id):
+        with pytest.raises(SnippetNotFoundError):
+            tag_service.set_tags(session, {snippets[0].id: ["a"], snippet_id: ["a"]})
+    session.rollback()
+    assert snippets[0].tags == []
@@ -0,0 +1,146 @@
+"""Tests for version graph queries."""
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.services.version_graph import (
+    get_ancestors,
+    get_depth,
+    get_descendants,
+    get_lowest_common_ancestor,
+)
+from packages.models import Base, Snippet, Version, VersionClosure
+
+
+@pytest.fixture
+def engine():
+    """Create a new database engine."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session(engine):
+    """Create a new database session."""
+    session_local = sessionmaker(bind=engine)
+    session = session_local()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def snippet(session: Session):
+    """Create a test snippet."""
+    snippet = Snippet(title="Test Snippet", content="v0", language="python")
+    session.add(snippet)
+    session.commit()
+    return snippet
+
+
+def _version(
+    session: Session, snippet: Snippet, number: int, parent: Version | None = None
+) -> Version:
+    version = Version(
+        snippet=snippet,
+        content=f"v{number}",
+        version_number=number,
+        parent_version=parent,
+    )
+    session.add(version)
+    session.commit()
+    return version
+
+
+@pytest.fixture
+def tree(session: Session, snippet: Snippet) -> dict[str, Version]:
+    """Build ``root -> a -> a1`` and ``root -> b -> b1 -> b2``."""
+    root = _version(session, snippet, 1)
+    a = _version(session, snippet, 2, root)
+    a1 = _version(session, snippet, 3, a)
+    b = _version(session, snippet, 4, root)
+    b1 = _version(session, snippet, 5, b)
+    b2 = _version(session, snippet, 6, b1)
+    return {"root": root, "a": a, "a1": a1, "b": b, "b1": b1, "b2": b2}
+
+
+@pytest.mark.model
+class TestVersionGraph:
+    """Test cases for closure-table backed lineage queries."""
+
+    def test_ancestors_nearest_first(self, session: Session, tree):
+        """Ancestors are returned from parent up to root."""
+        assert get_ancestors(session, tree["b2"].id) == [
+            tree["b1"],
+            tree["b"],
+            tree["root"],
+        ]
+        assert get_ancestors(session, tree["root"].id) == []
+        assert get_ancestors(session, tree["a"].id, include_self=True) == [
+            tree["a"],
+            tree["root"],
+        ]
+
+    def test_descendants(self, session: Session, tree):
+        """Descendants cover the whole subtree."""
+        assert get_descendants(session, tree["b"].id) == [tree["b1"], tree["b2"]]
+        assert set(get_descendants(session, tree["root"].id)) == {
+            tree[key] for key in ("a", "a1", "b", "b1", "b2")
+        }
+
+    def test_depth(self, session: Session, tree):
+        """Depth counts edges to the root."""
+        assert get_depth(session, tree["root"].id) == 0
+        assert get_depth(session, tree["b2"].id) == 3  # noqa: PLR2004
+        assert get_depth(session, tree["a"].id) == 1
+
+    def test_lowest_common_ancestor(self, session: Session, tree):
+        """The divergence point of two branches is found."""
+        lca = get_lowest_common_ancestor
+        assert lca(session, tree["a1"].id, tree["b2"].id) == tree["root"]
+        assert lca(session, tree["b2"].id, tree["b1"].id) == tree["b1"]
+        assert lca(session, tree["a1"].id, tree["a1"].id) == tree["a1"]
+
+    def test_unrelated_lineages(self, session: Session, snippet: Snippet, tree):
+        """Versions from separate roots share no ancestor."""
+        other = _version(session, snippet, 7)
+        assert get_lowest_common_ancestor(session, other.id, tree["a1"].id) is None
+
+    def test_reparent_moves_subtree(self, session: Session, tree):
+        """Changing a parent rewrites the closure rows of the whole subtree."""
+        tree["b"].parent_version = tree["a1"]
+        session.commit()
+
+        assert get_ancestors(session, tree["b2"].id) == [
+            tree["b1"],
+            tree["b"],
+            tree["a1"],
+            tree["a"],
+            tree["root"],
+        ]
+        assert get_depth(session, tree["b2"].id) == 5  # noqa: PLR2004
+        lca = get_lowest_common_ancestor(session, tree["b2"].id, tree["a1"].id)
+        assert lca == tree["a1"]
+
+    def test_reparent_rejects_cycle(self, session: Session, tree):
+        """A version cannot become a child of its own descendant."""
+        tree["b"].parent_version = tree["b2"]
+        with pytest.raises(ValueError, match="cycle"):
+            session.commit()
+        session.rollback()
+
+    def test_delete_detaches_children(self, session: Session, tree):
+        """Deleting a version turns its children into roots."""
+        session.delete(tree["b"])
+        session.commit()
+
+        assert get_ancestors(session, tree["b2"].id) == [tree["b1"]]
+        assert get_depth(session, tree["b1"].id) == 0
+        removed = session.scalars(
+            select(VersionClosure).where(
+                (VersionClosure.ancestor_id == tree["b"].id)
+                | (VersionClosure.descendant_id == tree["b"].id)
+            )
+        ).all()
+        assert removed == []
@@ -0,0 +1,92 @@
+"""Tests for metadata-filtered version queries."""
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from apps.services.version_metadata import find_versions_by_metadata, metadata_filter
+from packages.models import Base, Snippet, Version
+
+
+@pytest.fixture
+def engine():
+    """Create a new database engine."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session(engine):
+    """Create a new database session."""
+    session_local = sessionmaker(bind=engine)
+    session = session_local()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def versions(session: Session) -> list[Version]:
+    """Create versions with assorted metadata."""
+    snippet = Snippet(title="Test Snippet", content="x", language="python")
+    metadata = [
+        {"session_id": "s-1", "autosave": True},
+        {"session_id": "s-1", "autosave": False, "tests_passed": True},
+        {"session_id": "s-2", "autosave": True, "tests_passed": False},
+        {"author": "tutor"},
+    ]
+    versions = [
+        Version(
+            snippet=snippet,
+            content=f"v{number}",
+            version_number=number,
+            version_metadata=meta,
+        )
+        for number, meta in enumerate(metadata, 1)
+    ]
+    session.add_all(versions)
+    session.commit()
+    return versions
+
+
+@pytest.mark.model
+class TestVersionMetadata:
+    """Test cases for metadata filters."""
+
+    def test_promoted_columns_mirror_metadata(self, versions: list[Version]):
+        """Generated columns expose the promoted keys."""
+        assert versions[0].meta_session_id == "s-1"
+        assert versions[0].meta_autosave is True
+        assert versions[0].meta_tests_passed is None
+        assert versions[2].meta_tests_passed is False
+
+    def test_filter_by_promoted_keys(self, session: Session, versions):
+        """Filters combine and return newest first."""
+        found = find_versions_by_metadata(session, {"session_id": "s-1"})
+        assert found == [versions[1], versions[0]]
+
+        found = find_versions_by_metadata(
+            session, {"autosave": True, "tests_passed": False}
+        )
+        assert found == [versions[2]]
+
+    def test_filter_by_missing_value(self, session: Session, versions):
+        """``None`` matches versions without the key."""
+        found = find_versions_by_metadata(session, {"session_id": None})
+        assert found == [versions[3]]
+
+    def test_filter_by_other_key(self, session: Session, versions):
+        """Keys that are not promoted fall back to json_extract."""
+        found = find_versions_by_metadata(session, {"author": "tutor"})
+        assert found == [versions[3]]
+        with pytest.raises(ValueError, match="Invalid metadata key"):
+            find_versions_by_metadata(session, {"a') OR 1=1 --": 1})
+
+    def test_promoted_key_uses_index(self, session: Session, versions):
+        """Promoted filters are answered from the index."""
+        stmt = select(Version.id).where(metadata_filter("session_id", "s-1"))
+        compiled = stmt.compile(
+            session.get_bind(), compile_kwargs={"literal_binds": True}
+        )
+        plan = session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        assert "ix_versions_meta_session_id" in " ".join(row[-1] for row in plan)
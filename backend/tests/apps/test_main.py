@@ -0,0 +1,32 @@
+"""Tests for application startup."""
+
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from apps import main
+from packages.models import Base, Job
+
+
+def test_startup_queues_archiving(tmp_path) -> None:
+    """Starting the app queues the archive job once, however often it starts."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    workers = AsyncMock()
+    with (
+        patch.object(main, "SessionLocal", factory),
+        patch.object(main, "JobWorkerPool", return_value=workers),
+    ):
+        for _ in range(2):
+            with TestClient(main.app):
+                pass
+    workers.start.assert_awaited()
+    with factory() as db:
+        jobs = db.execute(select(Job.kind, Job.dedup_key)).all()
+    assert [tuple(job) for job in jobs] == [("versions.archive", "versions.archive")]
+    engine.dispose()
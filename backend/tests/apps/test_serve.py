@@ -0,0 +1,63 @@
+"""Tests for the production server entry point."""
+
+from unittest.mock import patch
+
+from apps import serve
+from apps.core.config import Settings
+
+DEFAULT_PORT = 8000
+CUSTOM_PORT = 9000
+CORES = 6
+
+
+def test_workers_default_to_core_count() -> None:
+    """SERVER_WORKERS=0 sizes the pool from the available cores."""
+    with patch.object(serve, "available_cores", return_value=CORES):
+        config = serve.build_server_config(Settings(SERVER_WORKERS=0))
+    assert config.workers == CORES
+    assert config.port == DEFAULT_PORT
+
+
+def test_overrides_take_precedence() -> None:
+    """Command line values win over settings."""
+    config = serve.build_server_config(
+        Settings(SERVER_WORKERS=4), host="127.0.0.1", port=CUSTOM_PORT, workers=2
+    )
+    assert (config.host, config.port, config.workers) == ("127.0.0.1", CUSTOM_PORT, 2)
+
+
+def test_uvicorn_options() -> None:
+    """Settings map onto uvicorn's keyword arguments."""
+    config = serve.build_server_config(
+        Settings(SERVER_WORKERS=2, SERVER_MAX_REQUESTS=100, SERVER_BACKLOG=128)
+    )
+    options = serve.uvicorn_options(config)
+    assert options["workers"] == 2  # noqa: PLR2004
+    assert options["loop"] == "auto"
+    assert options["http"] == "auto"
+    assert options["backlog"] == 128  # noqa: PLR2004
+    assert "limit_max_requests" not in options
+
+
+def test_gunicorn_options_preload() -> None:
+    """Gunicorn preloads the app and recycles workers."""
+    config = serve.build_server_config(Settings(SERVER_WORKERS=3))
+    options = serve.gunicorn_options(config)
+    assert options["preload_app"] is True
+    assert options["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert options["max_requests"] == config.max_requests
+    assert options["bind"] == f"{config.host}:{config.port}"
+
+
+def test_main_falls_back_to_uvicorn() -> None:
+    """Without gunicorn the app is served by uvicorn."""
+    with (
+        patch.object(serve.importlib.util, "find_spec", return_value=None),
+        patch("uvicorn.run") as run,
+    ):
+        serve.main(["--workers", "2", "--port", str(CUSTOM_PORT)])
+    run.assert_called_once()
+    args, kwargs = run.call_args
+    assert args == (serve.APP_IMPORT_PATH,)
+    assert kwargs["workers"] == 2  # noqa: PLR2004
+    assert kwargs["port"] == CUSTOM_PORT
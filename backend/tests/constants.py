@@ -2,7 +2,13 @@
 
 # HTTP Status Codes
 HTTP_200_OK = 200
+HTTP_206_PARTIAL_CONTENT = 206
+HTTP_304_NOT_MODIFIED = 304
+HTTP_403_FORBIDDEN = 403
 HTTP_404_NOT_FOUND = 404
+HTTP_409_CONFLICT = 409
+HTTP_416_RANGE_NOT_SATISFIABLE = 416
+HTTP_422_UNPROCESSABLE_ENTITY = 422
 
 # Python Version
 PYTHON_MAJOR_VERSION = 3
@@ -0,0 +1,46 @@
+"""Tests for in-process caches."""
+
+from unittest.mock import patch
+
+from packages.common import cache as cache_module
+from packages.common.cache import LRUCache
+
+
+def test_lru_eviction() -> None:
+    """The least recently used entry is evicted first."""
+    cache: LRUCache[str, int] = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3  # noqa: PLR2004
+
+
+def test_ttl_expiry() -> None:
+    """Entries expire ``ttl`` seconds after being stored."""
+    cache: LRUCache[str, int] = LRUCache(maxsize=2, ttl=10)
+    with patch.object(cache_module.time, "monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch.object(cache_module.time, "monotonic", return_value=109.0):
+        assert cache.get("a") == 1
+    with patch.object(cache_module.time, "monotonic", return_value=110.0):
+        assert cache.get("a") is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_weight_bound() -> None:
+    """Entries are evicted to keep the summed weight under the budget."""
+    cache: LRUCache[str, str] = LRUCache(maxsize=10, max_weight=10, weigher=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "yyyy")
+    cache.set("c", "zzzz")
+    assert "a" not in cache
+    assert cache.weight == 8  # noqa: PLR2004
+    cache.set("d", "w" * 11)
+    assert "d" not in cache
+    cache.pop("b")
+    assert cache.weight == 4  # noqa: PLR2004
@@ -0,0 +1,105 @@
+"""Tests for the line diff."""
+
+import random
+
+import pytest
+
+from packages.common.diff import build_hunks, diff_lines, format_unified, split_lines
+
+
+def _apply(base: list[str], target: list[str], opcodes) -> list[str]:
+    out: list[str] = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            assert base[i1:i2] == target[j1:j2]
+            out.extend(base[i1:i2])
+        else:
+            out.extend(target[j1:j2])
+    return out
+
+
+def _lcs_length(a: list[str], b: list[str]) -> int:
+    row = [0] * (len(b) + 1)
+    for x in a:
+        prev = 0
+        for j, y in enumerate(b, 1):
+            cur = row[j]
+            row[j] = prev + 1 if x == y else max(row[j], row[j - 1])
+            prev = cur
+    return row[-1]
+
+
+def test_identical_texts() -> None:
+    """Identical inputs produce no hunks."""
+    result = diff_lines("a\nb\n", "a\nb\n")
+    assert result.identical
+    assert result.exact
+    assert build_hunks(result) == ([], False)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_edits_are_minimal(seed: int) -> None:
+    """Opcodes rebuild the target with the minimal number of edits."""
+    rng = random.Random(seed)
+    base = [f"{rng.choice('abcd')}\n" for _ in range(rng.randint(0, 30))]
+    target = [f"{rng.choice('abcd')}\n" for _ in range(rng.randint(0, 30))]
+    result = diff_lines("".join(base), "".join(target))
+
+    assert _apply(base, target, result.opcodes) == target
+    lcs = _lcs_length(base, target)
+    assert result.added + result.removed == len(base) + len(target) - 2 * lcs
+
+
+def test_unified_output() -> None:
+    """Hunks render with headers and context lines."""
+    base = "".join(f"{i}\n" for i in range(20))
+    lines = base.splitlines(keepends=True)
+    lines[3] = "three\n"
+    del lines[15]
+    target = "".join(lines)
+    hunks, truncated = build_hunks(diff_lines(base, target), context=1)
+
+    assert not truncated
+    assert format_unified(hunks) == (
+        "--- a\n+++ b\n"
+        "@@ -3,3 +3,3 @@\n 2\n-3\n+three\n 4\n"
+        "@@ -15,3 +15,2 @@\n 14\n-15\n 16\n"
+    )
+
+
+def test_early_cutoff_falls_back_to_replacement() -> None:
+    """Diffs past the edit budget become one coarse replacement."""
+    base = "head\n" + "".join(f"{i}\n" for i in range(500)) + "tail\n"
+    target = "head\n" + "".join(f"{i}x\n" for i in range(500)) + "tail\n"
+    result = diff_lines(base, target, max_edit_distance=10)
+
+    assert not result.exact
+    assert result.opcodes == [
+        ("equal", 0, 1, 0, 1),
+        ("replace", 1, 501, 1, 501),
+        ("equal", 501, 502, 501, 502),
+    ]
+
+
+def test_output_cap_truncates() -> None:
+    """Hunk output stops at the line cap."""
+    base = "".join(f"{i}\n" for i in range(100))
+    target = "".join(f"{i}\n" if i % 10 else "changed\n" for i in range(100))
+    hunks, truncated = build_hunks(diff_lines(base, target), context=0, max_lines=6)
+
+    assert truncated
+    assert len(hunks) == 3  # noqa: PLR2004
+
+
+def test_lines_split_at_newlines_only() -> None:
+    """Form feeds and other separators stay inside their line."""
+    assert split_lines("a\x0cb\r\nc\u2028d") == ["a\x0cb\r\n", "c\u2028d"]
+    assert split_lines("x\n\n") == ["x\n", "\n"]
+    assert split_lines("") == []
+
+
+def test_unified_output_with_form_feed() -> None:
+    """A line holding a form feed is not reported as lacking a newline."""
+    result = diff_lines("x = 1\n\x0c\ny = 2\n", "x = 1\n\x0c\ny = 3\n")
+    hunks, _ = build_hunks(result)
+    assert "No newline" not in format_unified(hunks)
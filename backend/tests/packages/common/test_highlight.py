@@ -0,0 +1,43 @@
+"""Tests for server-side tokenization."""
+
+from packages.common.highlight import LEGEND, Highlight, tokenize
+
+SOURCE = '''def greet(name):
+    """Say hello.
+
+    Twice.
+    """
+    message = "hi " + name
+    return message
+
+
+class Greeter:
+    pass
+'''
+
+
+def _kinds(highlight: Highlight, line: int) -> list[str]:
+    spans = highlight.lines[line]
+    return [LEGEND[spans[i + 2]] for i in range(0, len(spans), 3)]
+
+
+def test_tokenize_spans():
+    """Every line gets compact spans with offsets relative to the line."""
+    highlight = tokenize(SOURCE, "python")
+    assert len(highlight.lines) == len(SOURCE.split("\n"))
+    assert highlight.lines[0][:6] == [0, 3, LEGEND.index("k"), 4, 5, LEGEND.index("nf")]
+    # The docstring spans three lines, each with its own span.
+    assert _kinds(highlight, 3) == ["sd"]
+
+
+def test_tokenize_unknown_language():
+    """Unknown languages produce no spans."""
+    highlight = tokenize("a\nb", "no-such-language")
+    assert highlight.lines == [[], []]
+
+
+def test_tokenize_normalizes_line_endings():
+    """CRLF content tokenizes like LF content."""
+    assert tokenize(SOURCE.replace("\n", "\r\n"), "python") == tokenize(
+        SOURCE, "python"
+    )
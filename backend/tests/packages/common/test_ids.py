@@ -0,0 +1,39 @@
+"""Tests for identifier generation."""
+
+import time
+from uuid import uuid4
+
+import pytest
+
+from packages.common.ids import uuid7, uuid7_timestamp_ms
+
+UUID_VERSION_7 = 7
+
+
+def test_uuid7_layout() -> None:
+    """Version and variant bits follow RFC 9562."""
+    value = uuid7()
+    assert value.version == UUID_VERSION_7
+    assert value.variant == "specified in RFC 4122"
+
+
+def test_uuid7_embeds_timestamp() -> None:
+    """The leading 48 bits carry the creation time in milliseconds."""
+    before = time.time_ns() // 1_000_000
+    value = uuid7()
+    after = time.time_ns() // 1_000_000
+    assert before <= uuid7_timestamp_ms(value) <= after + 1
+
+
+def test_uuid7_is_monotonic() -> None:
+    """Ids generated in a tight loop sort in creation order."""
+    values = [uuid7() for _ in range(10_000)]
+    assert values == sorted(values)
+    assert [v.hex for v in values] == sorted(v.hex for v in values)
+    assert len(set(values)) == len(values)
+
+
+def test_timestamp_rejects_other_versions() -> None:
+    """Only version 7 UUIDs carry a timestamp."""
+    with pytest.raises(ValueError, match="Not a version 7 UUID"):
+        uuid7_timestamp_ms(uuid4())
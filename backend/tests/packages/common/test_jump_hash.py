@@ -0,0 +1,46 @@
+"""Tests for shard placement."""
+
+import uuid
+from collections import Counter
+
+import pytest
+
+from packages.common.ids import uuid7
+from packages.common.sharding import jump_hash, shard_of
+
+KEYS = [uuid7() for _ in range(4000)]
+
+
+def test_jump_hash_is_stable_and_in_range():
+    """The same key always lands in the same bucket, within range."""
+    for key in range(1000):
+        bucket = jump_hash(key, 7)
+        assert 0 <= bucket < 7  # noqa: PLR2004
+        assert jump_hash(key, 7) == bucket  # noqa: PLR2004
+    assert jump_hash(12345, 1) == 0
+
+
+def test_jump_hash_rejects_no_buckets():
+    """At least one bucket is needed."""
+    with pytest.raises(ValueError):
+        jump_hash(1, 0)
+
+
+def test_growing_only_moves_keys_to_the_new_shard():
+    """From n to n + 1 shards, keys either stay or move to shard n."""
+    for shards in range(1, 8):
+        for key in KEYS:
+            before, after = shard_of(key, shards), shard_of(key, shards + 1)
+            assert after in (before, shards)
+
+
+def test_sequential_ids_spread_evenly():
+    """Time-ordered UUIDv7 ids are hashed, so they do not cluster."""
+    counts = Counter(shard_of(key, 4) for key in KEYS)
+    assert len(counts) == 4  # noqa: PLR2004
+    assert min(counts.values()) > len(KEYS) / 4 * 0.8
+
+
+def test_shard_of_accepts_any_uuid():
+    """Random UUIDs are placed too."""
+    assert 0 <= shard_of(uuid.uuid4(), 3) < 3  # noqa: PLR2004
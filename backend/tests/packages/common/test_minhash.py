@@ -0,0 +1,73 @@
+"""Tests for MinHash signatures."""
+
+import random
+
+import pytest
+
+from packages.common.minhash import MinHasher, jaccard, tokenize_code
+
+BASE = "\n".join(
+    f"def handler_{i}(request):\n    total = compute(request.items[{i}])\n"
+    f"    return respond(total + {i})\n"
+    for i in range(30)
+)
+
+
+@pytest.fixture
+def hasher() -> MinHasher:
+    """A hasher with the default parameters."""
+    return MinHasher()
+
+
+def _exact_jaccard(hasher: MinHasher, a: str, b: str) -> float:
+    left, right = hasher.shingles(a), hasher.shingles(b)
+    return len(left & right) / len(left | right)
+
+
+def test_tokenize_ignores_formatting():
+    """Whitespace changes do not change the token stream."""
+    assert tokenize_code("x=f( 1 )") == tokenize_code("x = f(1)\n")
+    assert tokenize_code("a.b") == ["a", ".", "b"]
+
+
+def test_signature_is_deterministic(hasher: MinHasher):
+    """Signatures only depend on the content and parameters."""
+    signature = hasher.signature(BASE)
+    assert len(signature) == hasher.num_perm
+    assert MinHasher().signature(BASE) == signature
+    assert hasher.unpack(hasher.pack(signature)) == signature
+    assert len(hasher.pack(signature)) == hasher.num_perm * 4
+
+
+def test_estimate_tracks_jaccard(hasher: MinHasher):
+    """The signature estimate is close to the exact shingle Jaccard."""
+    edited = BASE.replace("respond", "reply", 10)
+    exact = _exact_jaccard(hasher, BASE, edited)
+    estimate = jaccard(hasher.signature(BASE), hasher.signature(edited))
+    assert abs(exact - estimate) < 0.15  # noqa: PLR2004
+
+
+def test_band_keys(hasher: MinHasher):
+    """Near duplicates share a bucket, unrelated contents do not."""
+    keys = hasher.band_keys(hasher.signature(BASE))
+    assert len(keys) == hasher.bands
+    edited = BASE.replace("total + 3", "total - 3")
+    assert set(keys) & set(hasher.band_keys(hasher.signature(edited)))
+
+    rng = random.Random(0)
+    unrelated = " ".join(f"w{rng.randrange(10**6)}" for _ in range(300))
+    assert not set(keys) & set(hasher.band_keys(hasher.signature(unrelated)))
+
+
+def test_short_and_empty_content(hasher: MinHasher):
+    """Tiny content is one shingle; empty content has no shingles."""
+    assert len(hasher.shingles("x = 1")) == 1
+    assert hasher.shingles("  \n") == set()
+
+
+def test_invalid_parameters():
+    """Bands must divide the signature length."""
+    with pytest.raises(ValueError):
+        MinHasher(num_perm=128, bands=10)
+    with pytest.raises(ValueError):
+        jaccard((1, 2), (1,))
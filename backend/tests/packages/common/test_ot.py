@@ -0,0 +1,86 @@
+"""Tests for operational transformation."""
+
+import random
+
+import pytest
+
+from packages.common.ot import (
+    OperationError,
+    apply,
+    base_length,
+    normalize,
+    target_length,
+    transform,
+)
+
+
+def test_apply():
+    """Retains keep, deletes drop and strings insert, in document order."""
+    assert apply("hello world", [6, -5, "there"]) == "hello there"
+    assert apply("", ["new"]) == "new"
+    assert apply("abc", [-3]) == ""
+    with pytest.raises(OperationError):
+        apply("abc", [2, "x"])
+
+
+def test_normalize():
+    """Neighbours merge, inserts go before deletes and bad components raise."""
+    assert normalize([1, 2, -1, -1, "a", "b", 3]) == [3, "ab", -2, 3]
+    op = normalize([2, -3, "xy"])
+    assert op == [2, "xy", -3]
+    assert (base_length(op), target_length(op)) == (5, 4)  # noqa: PLR2004
+    for bad in ([0], [""], [1.5], [True], [None]):
+        with pytest.raises(OperationError):
+            normalize(bad)
+
+
+def test_concurrent_inserts_keep_the_first_operation_first():
+    """Inserts at the same position are ordered by argument position."""
+    a, b = ["A", 3], ["B", 3]
+    a_prime, b_prime = transform(a, b)
+    assert apply(apply("xyz", a), b_prime) == "ABxyz"
+    assert apply(apply("xyz", b), a_prime) == "ABxyz"
+
+
+def test_overlapping_deletes():
+    """Characters deleted by both operations are deleted once."""
+    text = "0123456789"
+    a, b = [2, -5, 3], [4, -5, 1]
+    a_prime, b_prime = transform(a, b)
+    assert apply(apply(text, a), b_prime) == "019"
+    assert apply(apply(text, b), a_prime) == "019"
+
+
+def _random_op(rng: random.Random, text: str) -> list[int | str]:
+    op: list[int | str] = []
+    remaining = len(text)
+    while remaining:
+        count = rng.randint(1, remaining)
+        kind = rng.random()
+        if kind < 0.4:  # noqa: PLR2004
+            op.append(count)
+            remaining -= count
+        elif kind < 0.7:  # noqa: PLR2004
+            op.append(-count)
+            remaining -= count
+        else:
+            op.append(rng.choice("abc") * rng.randint(1, 3))
+    if rng.random() < 0.5:  # noqa: PLR2004
+        op.append("end")
+    return normalize(op)
+
+
+def test_transform_converges():
+    """Applying either operation, then the other rebased, gives one text."""
+    rng = random.Random(46)
+    for _ in range(500):
+        text = "".join(rng.choice("xyz") for _ in range(rng.randint(0, 12)))
+        a, b = _random_op(rng, text), _random_op(rng, text)
+        a_prime, b_prime = transform(a, b)
+        assert apply(apply(text, a), b_prime) == apply(apply(text, b), a_prime)
+
+
+def test_transform_rejects_operations_on_different_texts():
+    """Both operations must span the same base text."""
+    with pytest.raises(OperationError):
+        transform([3], [4])
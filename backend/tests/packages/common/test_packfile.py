@@ -0,0 +1,83 @@
+"""Tests for pack files."""
+
+import os
+
+import pytest
+
+from packages.common.ids import uuid7
+from packages.common.packfile import MAGIC, PackCorruptError, PackReader, PackWriter
+
+
+def test_round_trip_and_listing(tmp_path):
+    """Records come back by offset and the pack lists itself."""
+    path = tmp_path / "a.pack"
+    records = {uuid7(): f"body {i}\n".encode() * (i + 1) for i in range(5)}
+    with PackWriter(path) as writer:
+        pointers = {rid: writer.append(rid, data) for rid, data in records.items()}
+    assert writer.count == len(records)
+    assert path.stat().st_size == writer.size
+
+    reader = PackReader(path)
+    for rid, (offset, length) in pointers.items():
+        assert reader.read(offset, length, rid) == records[rid]
+    assert [(rid, (off, ln)) for rid, off, ln in reader] == list(pointers.items())
+
+    copy = tmp_path / "b.pack"
+    rid, (offset, length) = next(iter(pointers.items()))
+    with PackWriter(copy) as writer:
+        new_offset, new_length = writer.append_raw(*reader.raw(offset, length))
+    assert PackReader(copy).read(new_offset, new_length, rid) == records[rid]
+
+
+def test_failed_write_leaves_nothing(tmp_path):
+    """A pack only appears under its name once fully written."""
+    path = tmp_path / "a.pack"
+    with pytest.raises(RuntimeError), PackWriter(path) as writer:
+        writer.append(uuid7(), b"data")
+        raise RuntimeError("boom")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_corruption_is_detected(tmp_path):
+    """Wrong ids, lengths and flipped bytes raise PackCorruptError."""
+    path = tmp_path / "a.pack"
+    rid = uuid7()
+    with PackWriter(path) as writer:
+        offset, length = writer.append(rid, b"hello world" * 10)
+    reader = PackReader(path)
+    with pytest.raises(PackCorruptError):
+        reader.read(offset, length, uuid7())
+    with pytest.raises(PackCorruptError):
+        reader.read(offset, length + 1, rid)
+    reader.close()
+
+    data = bytearray(path.read_bytes())
+    data[-3] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(PackCorruptError):
+        PackReader(path).read(offset, length, rid)
+
+    (tmp_path / "bad.pack").write_bytes(b"x" * len(MAGIC))
+    with pytest.raises(PackCorruptError):
+        PackReader(tmp_path / "bad.pack")
+
+
+def test_stream_matches_read(tmp_path):
+    """Streaming yields the record in bounded pieces and checks it at the end."""
+    path = tmp_path / "a.pack"
+    rid = uuid7()
+    data = os.urandom(5000) + b"abc" * 20000
+    with PackWriter(path) as writer:
+        offset, length = writer.append(rid, data)
+    reader = PackReader(path)
+    assert reader.raw_length(offset, length, rid) == len(data)
+    chunks = list(reader.stream(offset, length, rid, chunk_size=1000))
+    assert max(len(chunk) for chunk in chunks) <= 1000  # noqa: PLR2004
+    assert b"".join(chunks) == data
+    reader.close()
+
+    damaged = bytearray(path.read_bytes())
+    damaged[-3] ^= 0xFF
+    path.write_bytes(bytes(damaged))
+    with pytest.raises(PackCorruptError):
+        list(PackReader(path).stream(offset, length, rid))
@@ -0,0 +1,75 @@
+"""Tests for applying patches."""
+
+import random
+
+import pytest
+
+from packages.common.diff import build_hunks, diff_lines, format_unified
+from packages.common.patch import Edit, PatchError, apply_edits, apply_unified
+
+
+def test_apply_edits():
+    """Edits splice the base at base offsets."""
+    base = "def f(x):\n    return x\n"
+    edits = [Edit(4, 1, "g"), Edit(6, 1, "y"), Edit(21, 1, "y + 1")]
+    assert apply_edits(base, edits) == "def g(y):\n    return y + 1\n"
+    assert apply_edits("", [Edit(0, 0, "new")]) == "new"
+    assert apply_edits(base, []) == base
+
+
+@pytest.mark.parametrize(
+    "edits",
+    [
+        [Edit(5, 1), Edit(4, 1)],
+        [Edit(2, 3), Edit(4, 0, "x")],
+        [Edit(3, 10)],
+        [Edit(0, -1)],
+    ],
+)
+def test_bad_edits_are_rejected(edits):
+    """Out of order, overlapping and out of range edits raise."""
+    with pytest.raises(PatchError):
+        apply_edits("abcdef", edits)
+
+
+def test_unified_round_trip():
+    """Diffs from packages.common.diff apply back to their target."""
+    rng = random.Random(7)
+    lines = ["a\n", "b\n", "c\r\n", "d", "e\n"]
+    for _ in range(500):
+        base = "".join(rng.choices(lines, k=rng.randint(0, 10)))
+        target = "".join(rng.choices(lines, k=rng.randint(0, 10)))
+        hunks, _ = build_hunks(diff_lines(base, target), context=rng.randint(0, 3))
+        assert apply_unified(base, format_unified(hunks)) == target
+
+
+def test_unified_round_trip_keeps_other_separators():
+    """Form feeds, lone carriage returns and Unicode separators stay in
+    their line, on both the diff and the patch side."""
+    base = "x = 1\n\x0c\ny = 2\n"
+    target = "x = 1\n\x0c\ny = 3\n"
+    hunks, _ = build_hunks(diff_lines(base, target), context=3)
+    assert apply_unified(base, format_unified(hunks)) == target
+
+    rng = random.Random(11)
+    lines = ["a\n", "b\x0cc\n", "d\re\n", "f\u2028g\n", "\x85\n", "h"]
+    for _ in range(300):
+        base = "".join(rng.choices(lines, k=rng.randint(0, 8)))
+        target = "".join(rng.choices(lines, k=rng.randint(0, 8)))
+        hunks, _ = build_hunks(diff_lines(base, target), context=rng.randint(0, 2))
+        assert apply_unified(base, format_unified(hunks)) == target
+
+
+@pytest.mark.parametrize(
+    "diff",
+    [
+        "@@ -1,1 +1,1 @@\n-x\n+y\n",  # removed line differs
+        "@@ -1,2 +1,2 @@\n a\n",  # header counts do not match
+        "@@ -9,1 +9,1 @@\n-a\n+b\n",  # out of range
+        "garbage\n",
+    ],
+)
+def test_bad_diffs_are_rejected(diff):
+    """Diffs that do not match the base raise instead of applying fuzzily."""
+    with pytest.raises(PatchError):
+        apply_unified("a\nb\n", diff)
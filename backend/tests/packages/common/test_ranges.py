@@ -0,0 +1,55 @@
+"""Tests for HTTP range and conditional headers."""
+
+import pytest
+
+from packages.common.ranges import (
+    RangeNotSatisfiableError,
+    etag_matches,
+    if_range_matches,
+    parse_range,
+)
+
+SIZE = 100
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, None),
+        ("bytes=0-9", (0, 10)),
+        ("bytes=90-", (90, 100)),
+        ("bytes=90-500", (90, 100)),
+        ("bytes=-10", (90, 100)),
+        ("bytes=-500", (0, 100)),
+        ("bytes=0-1,5-6", None),
+        ("items=0-9", None),
+        ("bytes=9-0", None),
+        ("bytes=a-b", None),
+        ("bytes=-", None),
+    ],
+)
+def test_parse_range(header: str | None, expected: tuple[int, int] | None) -> None:
+    """Single byte ranges resolve; anything else asks for the whole body."""
+    assert parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=500-600"])
+def test_unsatisfiable_range(header: str) -> None:
+    """Ranges starting past the end cannot be served."""
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range(header, SIZE)
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range("bytes=-5", 0)
+
+
+def test_etag_matching() -> None:
+    """If-None-Match compares weakly; If-Range only accepts strong tags."""
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+    assert if_range_matches(None, '"b"')
+    assert if_range_matches('"b"', '"b"')
+    assert not if_range_matches('W/"b"', '"b"')
+    assert not if_range_matches("Tue, 01 Jan 2030 00:00:00 GMT", '"b"')
@@ -0,0 +1,73 @@
+"""Tests for ranked id lists and decayed scores."""
+
+import math
+
+import pytest
+
+from packages.common.ids import uuid7
+from packages.common.ranking import RankedIds, decayed_score
+
+HOUR = 3600.0
+
+
+def _decayed_value(events: list[tuple[float, float]], now: float) -> float:
+    return sum(weight * 0.5 ** ((now - at) / HOUR) for weight, at in events)
+
+
+def test_decayed_score_orders_like_decayed_sums():
+    """Stored scores compare like the decayed values at any later time."""
+    histories = [
+        [(1.0, 0.0), (1.0, 10.0)],
+        [(1.0, 2 * HOUR)],
+        [(0.5, 0.0), (0.5, HOUR), (0.5, 1.5 * HOUR)],
+        [(3.0, -5 * HOUR)],
+    ]
+    scores = []
+    for events in histories:
+        score = None
+        for weight, at in events:
+            score = decayed_score(score, weight, at, HOUR)
+        scores.append(score)
+    for now in (2 * HOUR, 10 * HOUR, 100 * HOUR):
+        values = [_decayed_value(events, now) for events in histories]
+        assert sorted(range(4), key=scores.__getitem__) == sorted(
+            range(4), key=values.__getitem__
+        )
+
+
+def test_decayed_score_adds_in_log_space():
+    """Two equal events double the value: one more in log2 terms."""
+    once = decayed_score(None, 1.0, 0.0, HOUR)
+    twice = decayed_score(once, 1.0, 0.0, HOUR)
+    assert math.isclose(twice - once, 1.0)
+    assert math.isclose(decayed_score(None, 1.0, HOUR, HOUR), once + 1)
+
+
+def test_ranked_ids_keeps_best_within_capacity():
+    """Upserts reorder, the worst entry falls off and ties go to the larger id."""
+    a, b, c, d = sorted(uuid7() for _ in range(4))
+    ranked = RankedIds(3, [(a, 1.0), (b, 2.0), (c, 3.0)])
+    assert ranked.ids() == [c, b, a]
+    assert ranked.upsert(d, 2.0)
+    assert ranked.ids() == [c, d, b]
+    assert a not in ranked
+    assert not ranked.upsert(a, 0.5)
+    assert ranked.upsert(a, 5.0)
+    assert ranked.ids(2) == [a, c]
+    assert ranked.remove(c)
+    assert not ranked.remove(c)
+    assert ranked.entries() == [(a, 5.0), (d, 2.0)]
+
+
+def test_ranked_ids_pack_round_trip():
+    """Packing keeps order and scores; unpacking can shrink the capacity."""
+    ids = [uuid7() for _ in range(5)]
+    ranked = RankedIds(10, [(item, float(i)) for i, item in enumerate(ids)])
+    packed_ids, packed_scores = ranked.pack()
+    assert len(packed_ids) == 16 * 5  # noqa: PLR2004
+    assert RankedIds.unpack(10, packed_ids, packed_scores).entries() == (
+        ranked.entries()
+    )
+    assert RankedIds.unpack(2, packed_ids, packed_scores).ids() == ids[:-3:-1]
+    with pytest.raises(ValueError):
+        RankedIds(0)
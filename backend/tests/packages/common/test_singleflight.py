@@ -0,0 +1,120 @@
+"""Tests for request coalescing."""
+
+import asyncio
+
+import pytest
+
+from packages.common.singleflight import NotInBatch, SingleFlight
+
+CALLERS = 50
+
+
+async def test_concurrent_calls_share_one_execution() -> None:
+    """Only the first caller runs the work; the rest await its result."""
+    flight: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def work() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*(flight.do("k", work) for _ in range(CALLERS)))
+    assert results == [42] * CALLERS
+    assert calls == 1
+    assert flight.shared == CALLERS - 1
+    assert len(flight) == 0
+
+
+async def test_sequential_calls_run_again() -> None:
+    """Completed calls are forgotten, so later callers get fresh work."""
+    flight: SingleFlight[int] = SingleFlight()
+    counter = iter(range(10))
+
+    async def work() -> int:
+        return next(counter)
+
+    assert await flight.do("k", work) == 0
+    assert await flight.do("k", work) == 1
+
+
+async def test_exceptions_reach_every_caller() -> None:
+    """A failing call fails all callers waiting on it."""
+    flight: SingleFlight[int] = SingleFlight()
+
+    async def work() -> int:
+        await asyncio.sleep(0.01)
+        raise LookupError("missing")
+
+    results = await asyncio.gather(
+        *(flight.do("k", work) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, LookupError) for result in results)
+
+
+async def test_cancelled_caller_does_not_cancel_work() -> None:
+    """Followers still get the result if the leader is cancelled."""
+    flight: SingleFlight[str] = SingleFlight()
+
+    async def work() -> str:
+        await asyncio.sleep(0.02)
+        return "done"
+
+    leader = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_batches_join_and_are_joined() -> None:
+    """A batch computes only the keys not in flight, and single calls join it."""
+    flight: SingleFlight[str] = SingleFlight()
+    batches: list[list[str]] = []
+
+    async def one() -> str:
+        await asyncio.sleep(0.02)
+        return "single a"
+
+    async def many(keys: list[str]) -> dict[str, str]:
+        batches.append(keys)
+        await asyncio.sleep(0.02)
+        return {key: f"batch {key}" for key in keys if key != "c"}
+
+    single = asyncio.create_task(flight.do("a", one))
+    await asyncio.sleep(0)
+    batch = asyncio.create_task(flight.do_many(["a", "b", "c"], many))
+    await asyncio.sleep(0)
+    joined_b = asyncio.create_task(flight.do("b", one))
+    joined_c = asyncio.create_task(flight.do("c", one))
+
+    assert await batch == {"a": "single a", "b": "batch b"}
+    assert batches == [["b", "c"]]
+    assert await single == "single a"
+    assert await joined_b == "batch b"
+    with pytest.raises(NotInBatch):
+        await joined_c
+    assert len(flight) == 0
+
+
+async def test_batches_skip_absent_errors() -> None:
+    """A joined call failing with an ``absent`` error leaves its key out."""
+    flight: SingleFlight[str] = SingleFlight()
+
+    async def missing() -> str:
+        await asyncio.sleep(0.01)
+        raise LookupError("missing")
+
+    async def many(keys: list[str]) -> dict[str, str]:
+        return {key: key for key in keys}
+
+    single = asyncio.create_task(flight.do("a", missing))
+    await asyncio.sleep(0)
+    assert await flight.do_many(["a", "b"], many, absent=(LookupError,)) == {"b": "b"}
+    with pytest.raises(LookupError):
+        await single
@@ -0,0 +1,87 @@
+"""Tests for trigram query planning."""
+
+import re
+
+import pytest
+
+from packages.common.trigram import (
+    And,
+    Or,
+    TrigramQuery,
+    encode,
+    regex_query,
+    substring_query,
+    trigrams,
+)
+
+DOCS = [
+    "items.append(item)\nreturn items",
+    "def foo(x):\n    return bar(x)",
+    "FooBar = foo_bar",
+    "while True: pass",
+    "result = [a for a in b]",
+]
+
+
+def _admits(query: TrigramQuery, text: str) -> bool:
+    present = trigrams(text)
+    if query is None:
+        return True
+    if isinstance(query, frozenset):
+        return query <= present
+    if isinstance(query, And):
+        return all(_admits(part, text) for part in query.parts)
+    return any(_admits(part, text) for part in query.parts)
+
+
+def test_trigrams_are_case_folded():
+    """Trigrams ignore case and encode to distinct integers."""
+    assert trigrams("AbCd") == {encode("abc"), encode("bcd")}
+    assert trigrams("ab") == set()
+    assert encode("abc") != encode("acb")
+    assert encode("\U0010ffff" * 3) < 2**63
+
+
+def test_substring_query():
+    """Short substrings cannot be narrowed."""
+    assert substring_query("foo(") == frozenset(trigrams("foo("))
+    assert substring_query("x(") is None
+
+
+def test_regex_query_shapes():
+    """Literals, alternations and repetitions map onto the query tree."""
+    assert regex_query(r"\.append\(\w+\)") == frozenset(trigrams(".append("))
+    assert regex_query(r"a.b") is None
+    assert regex_query(r"ab|cde") is None
+    branch = regex_query(r"(foo|bar)baz")
+    assert isinstance(branch, And)
+    assert isinstance(branch.parts[0], Or)
+    assert regex_query(r"x(abc)+y") == frozenset(trigrams("abc"))
+    assert regex_query(r"x(abc)*y") is None
+    assert regex_query(r"^def foo\b") == frozenset(trigrams("def foo"))
+
+
+@pytest.mark.parametrize(
+    ("pattern", "flags"),
+    [
+        (r"\.append\(\w+\)", 0),
+        (r"def \w+\(x\)", 0),
+        (r"foo(bar|_bar)", re.IGNORECASE),
+        (r"(while|for) \w+", 0),
+        (r"return (items|bar)", 0),
+        (r"[Ff]oo", 0),
+        (r"pa(ss)+", 0),
+    ],
+)
+def test_regex_query_never_drops_matches(pattern: str, flags: int):
+    """Every document the regex matches is admitted by its plan."""
+    query = regex_query(pattern, flags)
+    for doc in DOCS:
+        if re.search(pattern, doc, flags):
+            assert _admits(query, doc), doc
+
+
+def test_invalid_regex():
+    """Invalid patterns raise ``re.error``."""
+    with pytest.raises(re.error):
+        regex_query("foo(")
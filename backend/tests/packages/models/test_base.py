@@ -120,3 +120,14 @@ def test_base_model_inheritance():
     assert hasattr(TestModel, "updated_at")  # From TimestampMixin
     assert hasattr(TestModel, "deleted_at")  # From SoftDeleteMixin
     assert hasattr(TestModel, "is_deleted")  # From SoftDeleteMixin
+
+
+def test_uuid_mixin_ids_follow_creation_order(session: Session):
+    """Test UUIDMixin generates time-ordered UUIDv7 keys."""
+    models = [TestModel() for _ in range(5)]
+    for model in models:
+        session.add(model)
+        session.flush()
+
+    assert all(model.id.version == 7 for model in models)  # noqa: PLR2004
+    assert [model.id for model in models] == sorted(model.id for model in models)
@@ -0,0 +1,91 @@
+"""Tests for the sampling profiler."""
+
+import asyncio
+import threading
+
+from packages.telemetry.profiler import Profile, Sampler, awaiting_tasks
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(100))
+
+
+def _profile_spinner(sampler: Sampler, seconds: float = 0.2) -> Profile:
+    stop = threading.Event()
+    thread = threading.Thread(target=_spin, args=(stop,), name="spinner")
+    thread.start()
+    try:
+        return sampler.run(seconds)
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_collapsed_stacks_name_thread_and_frames() -> None:
+    """Stacks start at the thread and end in the running function."""
+    profile = _profile_spinner(Sampler(interval=0.005))
+    assert profile.rounds > 0
+    assert "spinner" in profile.threads
+    assert threading.current_thread().name not in profile.threads
+    spinner = [line for line in profile.collapsed() if line.startswith("spinner;")]
+    assert spinner
+    stack, count = spinner[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert stack.split(";")[-1].startswith("_spin (")
+    frame, own, total = profile.top_frames(10)[0]
+    assert own <= total
+
+
+def test_stacks_are_bounded() -> None:
+    """Deep stacks are cut and extra distinct stacks lumped together."""
+    profile = _profile_spinner(Sampler(interval=0.005, max_depth=2))
+    spinner = [stack for stack in profile.stacks if stack[0] == "spinner"]
+    assert spinner
+    for stack in spinner:
+        assert stack[1] == "[truncated]"
+        assert len(stack) == 4  # noqa: PLR2004
+
+    profile = _profile_spinner(Sampler(interval=0.005, max_stacks=0))
+    assert profile.truncated
+    assert profile.stacks[("spinner", "[truncated]")] == profile.rounds
+    assert profile.top_frames(10) == []
+
+
+def test_overhead_stays_under_the_cap() -> None:
+    """A tiny interval stretches so sampling keeps to its time share."""
+    profile = _profile_spinner(Sampler(interval=0.0, max_overhead=0.1))
+    assert profile.overhead < 0.2  # noqa: PLR2004
+
+
+def test_stop_ends_a_run_early() -> None:
+    """A stopped sampler returns well before its deadline."""
+    sampler = Sampler()
+    sampler.stop()
+    assert sampler.run(10).seconds < 1
+
+
+async def test_awaiting_tasks_follow_the_await_chain() -> None:
+    """Suspended tasks are listed with what they are waiting on."""
+    event = asyncio.Event()
+
+    async def inner() -> None:
+        await event.wait()
+
+    async def outer() -> None:
+        await inner()
+
+    task = asyncio.create_task(outer(), name="waiter")
+    await asyncio.sleep(0)
+    try:
+        (waiter,) = [t for t in awaiting_tasks() if t.name == "waiter"]
+        assert waiter.coroutine.endswith("outer")
+        frames = [step.split(" (")[0] for step in waiter.awaiting]
+        assert frames[:3] == [
+            "test_awaiting_tasks_follow_the_await_chain.<locals>.outer",
+            "test_awaiting_tasks_follow_the_await_chain.<locals>.inner",
+            "Event.wait",
+        ]
+    finally:
+        event.set()
+        await task